@@ -30,7 +30,6 @@ from .delphi import UpdateConversion
 from .find_overlay import FindOverlay
 from .spot import AlignSpot, FindSpot
 from odemis.util.img import Subtract
-from odemis.dataio import hdf5
 
 
 def FindEbeamCenter(ccd, detector, escan):
@@ -24,7 +24,6 @@ from __future__ import division
 
 from concurrent.futures._base import CancelledError, CANCELLED, FINISHED, \
     RUNNING
-import cv2
 import logging
 import numpy
 from odemis import model
@@ -38,6 +37,21 @@ import time
 MAX_STEPS_NUMBER = 100  # Max steps to perform autofocus
 MAX_BS_NUMBER = 1  # Maximum number of applying binary search with a smaller max_step
 
+# For the coarse-to-fine search:
+COARSE_BINNING = 4  # binning (or scale) used for the coarse search
+COARSE_MIN_STEP_FACTOR = 2 ** 2  # the coarse search stops at this step factor
+MAX_FINE_STEPS = 10  # Max steps of the fine search (at full resolution)
+
+
+def _ConvertRGBToGray(image):
+    """
+    Convert a RGB image into a gray image, by summing the 3 channels
+    image (ndarray of shape YX3): RGB image
+    returns (ndarray of shape YX): gray image
+    """
+    # A single pass over the data is much faster than summing each channel separately
+    return numpy.sum(image[:, :, 0:3], axis=2, dtype=numpy.uint16)
+
 
 def MeasureSEMFocus(image):
     """
@@ -48,12 +62,7 @@ def MeasureSEMFocus(image):
     """
     # Handle RGB image
     if len(image.shape) == 3:
-        # TODO find faster solution
-        r, g, b = image[:, :, 0], image[:, :, 1], image[:, :, 2]
-        gray = numpy.empty(image.shape[0:2], dtype="uint16")
-        gray[...] = r
-        gray += g
-        gray += b
+        gray = _ConvertRGBToGray(image)
     else:
         gray = image
 
@@ -69,18 +78,63 @@ def MeasureOpticalFocus(image):
     """
     # Handle RGB image
     if len(image.shape) == 3:
-        # TODO find faster solution
-        r, g, b = image[:, :, 0], image[:, :, 1], image[:, :, 2]
-        gray = numpy.empty(image.shape[0:2], dtype="uint16")
-        gray[...] = r
-        gray += g
-        gray += b
+        gray = _ConvertRGBToGray(image)
     else:
         gray = image
 
+    import cv2  # autofocus is imported by acq.align, but rarely run
     return cv2.Laplacian(gray, cv2.CV_64F).var()
 
 
+class FocusLevelCache(object):
+    """
+    Stores the focus level measured at each focus position during an autofocus
+    run. Positions are considered identical if they are closer than a given
+    distance, which allows to hit the cache even when the actuator doesn't go
+    exactly to the requested position.
+    """
+
+    def __init__(self, atol=0):
+        """
+        atol (0 <= float): maximum distance (m) between two positions to be
+          considered identical
+        """
+        self._atol = atol
+        self._levels = {}  # focus pos (float) -> focus level (float)
+
+    def _find(self, pos):
+        """
+        returns (float or None): the known position closest to pos, within
+          the tolerance, or None if there is no such position
+        """
+        if pos in self._levels:
+            return pos
+        if not self._levels:
+            return None
+        closest = min(self._levels.keys(), key=lambda p: abs(p - pos))
+        if abs(closest - pos) <= self._atol:
+            return closest
+        return None
+
+    def __contains__(self, pos):
+        return self._find(pos) is not None
+
+    def __getitem__(self, pos):
+        p = self._find(pos)
+        if p is None:
+            raise KeyError(pos)
+        return self._levels[p]
+
+    def __setitem__(self, pos, level):
+        self._levels[pos] = level
+
+    def __len__(self):
+        return len(self._levels)
+
+    def items(self):
+        return self._levels.items()
+
+
 def AcquireNoBackground(ccd, dfbkg=None):
     """
     Performs optical acquisition with background subtraction if possible.
@@ -112,12 +166,14 @@ def _discard_data(df, data):
     pass
 
 
-def _DoAutoFocus(future, detector, min_step, et, focus, dfbkg, good_focus):
+def _DoAutoFocus(future, detector, emt, min_step, et, focus, dfbkg, good_focus,
+                 coarse_to_fine=False):
     """
     Iteratively acquires an optical image, measures its focus level and adjusts
     the optical focus with respect to the focus level.
     future (model.ProgressiveFuture): Progressive future provided by the wrapper
     detector: model.DigitalCamera or model.Detector
+    emt (None or model.Emitter): In case of a SED this is the scanner used
     min_step (float): minimum step size used, equal to depth of field (m)
     thres_factor: threshold factor depending on type of detector and binning
     et (float): acquisition time (s) of one image exposure time if detector is a ccd,
@@ -126,6 +182,8 @@ def _DoAutoFocus(future, detector, min_step, et, focus, dfbkg, good_focus):
     dfbkg (model.DataFlow): dataflow of se- or bs- detector
     good_focus (float): if provided, an already known good focus position to be
       taken into consideration while autofocusing
+    coarse_to_fine (bool): if True, first search for the rough focus on binned
+      images, and then refine it on full resolution images.
     returns (float):    Focus position (m)
                         Focus level
     raises:
@@ -142,19 +200,14 @@ def _DoAutoFocus(future, detector, min_step, et, focus, dfbkg, good_focus):
     #   focus levels (due to noise and sample degradation)
     # * if the focus actuator is not precise (eg, open loop), it's hard to
     #   even go back to the same focus position when wanted
+    # In coarse-to-fine mode, the same search is first done on fast binned
+    # images, with big steps. The peak position is then estimated by fitting
+    # the last measurements, and the search is finished at full resolution
+    # with only small steps.
     logging.debug("Starting Autofocus...")
 
+    best_pos = focus.position.value['z']
     try:
-        max_reached = False  # True once we've passed the maximum level (ie, start bouncing)
-        # It's used to cache the focus level, to avoid reacquiring at the same
-        # position. We do it only for the 'rough' max search because for the fine
-        # search, the actuator and acquisition delta are likely to play a role
-        focus_levels = {}  # focus pos (float) -> focus level (float)
-
-        best_pos = focus.position.value['z']
-        best_fm = 0
-        last_pos = None
-
         rng = focus.axes["z"].range
         # Pick measurement method
         if detector.role == "ccd":
@@ -162,84 +215,92 @@ def _DoAutoFocus(future, detector, min_step, et, focus, dfbkg, good_focus):
         else:
             Measure = MeasureSEMFocus
 
-        step_factor = 2 ** 7
-        if good_focus is not None:
-            current_pos = focus.position.value['z']
-            image = AcquireNoBackground(detector, dfbkg)
-            fm_current = Measure(image)
-            logging.debug("Focus level at %f is %f", current_pos, fm_current)
-            focus_levels[current_pos] = fm_current
-
-            focus.moveAbsSync({"z": good_focus})
+        def measure_here():
             image = AcquireNoBackground(detector, dfbkg)
-            fm_good = Measure(image)
-            logging.debug("Focus level at %f is %f", good_focus, fm_good)
-            focus_levels[good_focus] = fm_good
-            last_pos = good_focus
-
-            if fm_good < fm_current:
-                # Move back to current position if good_pos is not that good
-                # after all
-                focus.moveAbsSync({"z": current_pos})
-                # it also means we are pretty close
-            step_factor = 2 ** 4
+            return Measure(image)
+
+        prev_settings = {}
+        if coarse_to_fine:
+            prev_settings = _SetCoarseSettings(detector, emt)
+            # The positions reached by the big steps are not always exactly
+            # the ones requested, so accept approximately the same position
+            cache_atol = min_step / 16
+        else:
+            cache_atol = 0
+
+        try:
+            # It's used to cache the focus level, to avoid reacquiring at the same
+            # position. We do it only for the 'rough' max search because for the fine
+            # search, the actuator and acquisition delta are likely to play a role
+            focus_levels = FocusLevelCache(cache_atol)
+            last_pos = None
+
+            step_factor = 2 ** 7
+            if good_focus is not None:
+                current_pos = focus.position.value['z']
+                fm_current = measure_here()
+                logging.debug("Focus level at %f is %f", current_pos, fm_current)
+                focus_levels[current_pos] = fm_current
+
+                focus.moveAbsSync({"z": good_focus})
+                fm_good = measure_here()
+                logging.debug("Focus level at %f is %f", good_focus, fm_good)
+                focus_levels[good_focus] = fm_good
+                last_pos = good_focus
+
+                if fm_good < fm_current:
+                    # Move back to current position if good_pos is not that good
+                    # after all
+                    focus.moveAbsSync({"z": current_pos})
+                    # it also means we are pretty close
+                step_factor = 2 ** 4
+
+            if coarse_to_fine:
+                logging.debug("Step factor used for coarse autofocus: %d", step_factor)
+                best_pos, best_fm, last_meas, step_cntr = _StepSearch(future, measure_here,
+                                      focus, rng, min_step, step_factor,
+                                      COARSE_MIN_STEP_FACTOR, focus_levels,
+                                      last_pos, MAX_STEPS_NUMBER)
+        finally:
+            if prev_settings:
+                _RestoreSettings(prev_settings)
+
+        if coarse_to_fine:
+            # Jump directly to the estimated peak, and finish at full resolution
+            # with small steps around it
+            peak = _EstimatePeak(*last_meas)
+            if peak is not None:
+                logging.debug("Coarse autofocus estimated peak @ %g m", peak)
+                best_pos = peak
+                focus.moveAbsSync({"z": peak})
+            # The focus levels at full resolution cannot be compared with the
+            # coarse ones
+            focus_levels = FocusLevelCache(cache_atol)
+            last_pos = None
+            step_factor = max(1, COARSE_MIN_STEP_FACTOR // 2)
+            max_steps = MAX_FINE_STEPS
+        else:
+            max_steps = MAX_STEPS_NUMBER
 
         logging.debug("Step factor used for autofocus: %d", step_factor)
-        step_cntr = 1
-        while step_factor >= 1 and step_cntr <= MAX_STEPS_NUMBER:
-            # Start at the current focus position
-            center = focus.position.value['z']
-            # Don't redo the acquisition either if we've just done it, or if it
-            # was already done and we are still doing a rough search
-            if (not max_reached or last_pos == center) and center in focus_levels:
-                fm_center = focus_levels[center]
-            else:
-                image = AcquireNoBackground(detector, dfbkg)
-                fm_center = Measure(image)
-                logging.debug("Focus level at %f is %f", center, fm_center)
-                focus_levels[center] = fm_center
-
-            # Move to right position
-            right = center + step_factor * min_step
-            if not max_reached and right in focus_levels:
-                fm_right = focus_levels[right]
-            else:
-                right = _ClippedMove(rng, focus, step_factor * min_step)
-                image = AcquireNoBackground(detector, dfbkg)
-                fm_right = Measure(image)
-                logging.debug("Focus level at %f is %f", right, fm_right)
-                focus_levels[right] = fm_right
-
-            # Move to left position
-            left = center - step_factor * min_step
-            if not max_reached and left in focus_levels:
-                fm_left = focus_levels[left]
-            else:
-                left = _ClippedMove(rng, focus, -2 * step_factor * min_step)
-                image = AcquireNoBackground(detector, dfbkg)
-                fm_left = Measure(image)
-                logging.debug("Focus level at %f is %f", left, fm_left)
-                focus_levels[left] = fm_left
-                last_pos = left
-
-            fm_range = [fm_left, fm_center, fm_right]
-            pos_range = [left, center, right]
-            best_fm = max(fm_range)
-            i_max = fm_range.index(best_fm)
-            best_pos = pos_range[i_max]
-
-            if future._autofocus_state == CANCELLED:
-                raise CancelledError()
-
-            # if best focus was found at the center
-            if i_max == 1:
-                step_factor = step_factor // 2
-                max_reached = True
-
-            focus.moveAbsSync({"z": best_pos})
-            step_cntr += 1
-
-        if step_cntr == MAX_STEPS_NUMBER:
+        best_pos, best_fm, last_meas, step_cntr = _StepSearch(future, measure_here,
+                                      focus, rng, min_step, step_factor, 1,
+                                      focus_levels, last_pos, max_steps)
+
+        if coarse_to_fine:
+            # Check whether the estimated peak is even better than the best
+            # position measured
+            peak = _EstimatePeak(*last_meas)
+            if peak is not None and peak not in focus_levels:
+                focus.moveAbsSync({"z": peak})
+                fm_peak = measure_here()
+                logging.debug("Focus level at estimated peak %f is %f", peak, fm_peak)
+                if fm_peak > best_fm:
+                    best_pos, best_fm = peak, fm_peak
+                else:
+                    focus.moveAbsSync({"z": best_pos})
+
+        if step_cntr > max_steps:
             logging.info("Auto focus gave up after %d steps @ %g m", step_cntr, best_pos)
         else:
             logging.info("Auto focus found best level %g @ %g m", best_fm, best_pos)
@@ -256,6 +317,179 @@ def _DoAutoFocus(future, detector, min_step, et, focus, dfbkg, good_focus):
             future._autofocus_state = FINISHED
 
 
+def _StepSearch(future, measure, focus, rng, min_step, step_factor, min_factor,
+                focus_levels, last_pos, max_steps):
+    """
+    Search for the best focus position by bouncing around the current position,
+    with steps of decreasing size.
+    future (model.ProgressiveFuture): future of the autofocus
+    measure (callable): acquires an image and returns its focus level
+    focus (model.Actuator): The focus actuator
+    rng (float, float): range of the focus axis
+    min_step (float): minimum step size (m)
+    step_factor (int): initial step size, as a multiple of min_step
+    min_factor (int): the search stops once the step factor goes below it
+    focus_levels (FocusLevelCache): cache of the focus levels already measured
+      (at the same acquisition settings). It is updated with the new measurements.
+    last_pos (float or None): the last position at which a measure was done
+    max_steps (int): maximum number of steps
+    returns:
+       best_pos (float): best focus position found (m)
+       best_fm (float): focus level at best_pos
+       last_meas (list of float, list of float): positions and focus levels
+         of the last step
+       step_cntr (int): number of steps done + 1
+    raises CancelledError: if the future was cancelled
+    """
+    max_reached = False  # True once we've passed the maximum level (ie, start bouncing)
+    best_pos = focus.position.value['z']
+    best_fm = 0
+    last_meas = [], []
+    step_cntr = 1
+    while step_factor >= min_factor and step_cntr <= max_steps:
+        # Start at the current focus position
+        center = focus.position.value['z']
+        # Don't redo the acquisition either if we've just done it, or if it
+        # was already done and we are still doing a rough search
+        if (not max_reached or last_pos == center) and center in focus_levels:
+            fm_center = focus_levels[center]
+        else:
+            fm_center = measure()
+            logging.debug("Focus level at %f is %f", center, fm_center)
+            focus_levels[center] = fm_center
+
+        # Move to right position
+        right = center + step_factor * min_step
+        if not max_reached and right in focus_levels:
+            fm_right = focus_levels[right]
+        else:
+            right = _ClippedMove(rng, focus, step_factor * min_step)
+            fm_right = measure()
+            logging.debug("Focus level at %f is %f", right, fm_right)
+            focus_levels[right] = fm_right
+
+        # Move to left position
+        left = center - step_factor * min_step
+        if not max_reached and left in focus_levels:
+            fm_left = focus_levels[left]
+        else:
+            left = _ClippedMove(rng, focus, -2 * step_factor * min_step)
+            fm_left = measure()
+            logging.debug("Focus level at %f is %f", left, fm_left)
+            focus_levels[left] = fm_left
+            last_pos = left
+
+        fm_range = [fm_left, fm_center, fm_right]
+        pos_range = [left, center, right]
+        last_meas = pos_range, fm_range
+        best_fm = max(fm_range)
+        i_max = fm_range.index(best_fm)
+        best_pos = pos_range[i_max]
+
+        if future._autofocus_state == CANCELLED:
+            raise CancelledError()
+
+        # if best focus was found at the center
+        if i_max == 1:
+            step_factor = step_factor // 2
+            max_reached = True
+
+        focus.moveAbsSync({"z": best_pos})
+        step_cntr += 1
+
+    return best_pos, best_fm, last_meas, step_cntr
+
+
+def _EstimatePeak(positions, levels):
+    """
+    Estimates the position of the maximum focus level, by fitting a Gaussian
+    (or a parabola if some levels are not positive) on the measurements.
+    positions (list of floats): focus positions
+    levels (list of floats): focus level at each position
+    returns (float or None): the estimated position of the peak, within the
+      range of the positions given, or None if no peak could be estimated
+    """
+    if len(positions) < 3 or len(set(positions)) < 3:
+        return None
+
+    pos = numpy.array(positions, dtype=numpy.float64)
+    lvl = numpy.array(levels, dtype=numpy.float64)
+    # A Gaussian is a parabola in log-space
+    if numpy.all(lvl > 0):
+        lvl = numpy.log(lvl)
+    # Center the positions to keep the fit well conditioned
+    offset = pos.mean()
+    try:
+        a, b, c = numpy.polyfit(pos - offset, lvl, 2)
+    except (ValueError, numpy.linalg.LinAlgError):
+        logging.debug("Failed to fit focus levels", exc_info=True)
+        return None
+
+    if a >= 0:  # Not a peak
+        return None
+
+    peak = -b / (2 * a) + offset
+    return min(max(pos.min(), peak), pos.max())
+
+
+def _SetCoarseSettings(detector, emt):
+    """
+    Changes the acquisition settings to acquire images faster, at the cost of
+    a lower resolution.
+    detector (model.DigitalCamera or model.Detector): detector used
+    emt (None or model.Emitter): emitter used with the detector
+    returns (list of (VigilantAttribute, value)): the VAs changed and their
+      previous value, in the order they should be restored.
+    """
+    prev_settings = []
+    if (hasattr(detector, "binning") and
+        isinstance(detector.binning, model.VigilantAttributeBase)):
+        # CCD => increase binning, and reduce the exposure time accordingly
+        b = detector.binning.value
+        try:
+            maxb = detector.binning.range[1]
+        except (AttributeError, model.NotApplicableError):
+            maxb = max(detector.binning.choices)
+        coarseb = tuple(max(v, min(COARSE_BINNING, m)) for v, m in zip(b, maxb))
+        if coarseb == b:
+            return prev_settings
+        prev_settings = [(detector.binning, b),
+                         (detector.resolution, detector.resolution.value),
+                         (detector.exposureTime, detector.exposureTime.value)]
+        detector.binning.value = coarseb
+        gain = numpy.prod(coarseb) / numpy.prod(b)
+        et = detector.exposureTime.value / gain
+        et = max(detector.exposureTime.range[0], et)
+        detector.exposureTime.value = et
+        logging.debug("Coarse autofocus using binning %s", coarseb)
+    elif (emt is not None and hasattr(emt, "scale") and
+          isinstance(emt.scale, model.VigilantAttributeBase)):
+        # SEM => increase the scale (to reduce the number of pixels)
+        scale = emt.scale.value
+        maxs = emt.scale.range[1]
+        coarses = tuple(max(v, min(v * COARSE_BINNING, m)) for v, m in zip(scale, maxs))
+        if coarses == scale:
+            return prev_settings
+        prev_settings = [(emt.scale, scale),
+                         (emt.resolution, emt.resolution.value)]
+        emt.scale.value = coarses
+        logging.debug("Coarse autofocus using scale %s", coarses)
+
+    return prev_settings
+
+
+def _RestoreSettings(settings):
+    """
+    Sets back the values of the VAs, as returned by _SetCoarseSettings()
+    settings (list of (VigilantAttribute, value))
+    """
+    for va, v in settings:
+        try:
+            va.value = v
+        except Exception:
+            logging.exception("Failed to restore setting to %s", v)
+
+
 def _ClippedMove(rng, focus, shift):
     """
     Clips the focus move requested within the range
@@ -290,14 +524,24 @@ def _CancelAutoFocus(future):
     return True
 
 
-def estimateAutoFocusTime(exposure_time, steps=MAX_STEPS_NUMBER):
+def estimateAutoFocusTime(exposure_time, steps=MAX_STEPS_NUMBER,
+                          coarse_to_fine=False):
     """
-    Estimates overlay procedure duration
+    Estimates autofocus procedure duration
+    exposure_time (float): time to acquire one full resolution image (s)
+    steps (int): maximum number of steps of the (coarse) search
+    coarse_to_fine (bool): if True, estimate for the coarse-to-fine search
+    returns (float): duration (s)
     """
+    if coarse_to_fine:
+        # The coarse search acquires binned images (so much faster), and then
+        # a few steps are done at full resolution, with 3 images per step.
+        return (steps * exposure_time / COARSE_BINNING ** 2 +
+                3 * MAX_FINE_STEPS * exposure_time)
     return steps * exposure_time
 
 
-def AutoFocus(detector, emt, focus, dfbkg=None, good_focus=None):
+def AutoFocus(detector, emt, focus, dfbkg=None, good_focus=None, coarse_to_fine=False):
     """
     Wrapper for DoAutoFocus. It provides the ability to check the progress of autofocus 
     procedure or even cancel it.
@@ -311,6 +555,10 @@ def AutoFocus(detector, emt, focus, dfbkg=None, good_focus=None):
      performed.
     good_focus (float): if provided, an already known good focus position to be
       taken into consideration while autofocusing
+    coarse_to_fine (bool): if True, first looks for the focus using fast,
+      binned, images and then only refines it with full resolution images.
+      Typically much faster, but the detector (and emitter) settings are
+      temporarily changed.
     returns (model.ProgressiveFuture):  Progress of DoAutoFocus, whose result() will return:
             Focus position (m)
             Focus level
@@ -338,7 +586,7 @@ def AutoFocus(detector, emt, focus, dfbkg=None, good_focus=None):
     min_stp_sz = dof / 2
 
     f = model.ProgressiveFuture(start=est_start,
-                                end=est_start + estimateAutoFocusTime(et))
+                                end=est_start + estimateAutoFocusTime(et, coarse_to_fine=coarse_to_fine))
     f._autofocus_state = RUNNING
     f._autofocus_lock = threading.Lock()
     f.task_canceller = _CancelAutoFocus
@@ -346,8 +594,8 @@ def AutoFocus(detector, emt, focus, dfbkg=None, good_focus=None):
     # Run in separate thread
     autofocus_thread = threading.Thread(target=executeTask,
                                         name="Autofocus",
-                                        args=(f, _DoAutoFocus, f, detector, min_stp_sz,
-                                              et, focus, dfbkg, good_focus))
+                                        args=(f, _DoAutoFocus, f, detector, emt, min_stp_sz,
+                                              et, focus, dfbkg, good_focus, coarse_to_fine))
 
     autofocus_thread.start()
     return f
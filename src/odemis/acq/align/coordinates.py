@@ -268,12 +268,17 @@ def MatchCoordinates(input_coordinates, electron_coordinates, guess_scale, max_a
     guess_center = numpy.mean(guess_coordinates, 0) - numpy.mean(electron_coordinates, 0)
     transformed_coordinates = [(c[0] - guess_center[0], c[1] - guess_center[1]) for c in guess_coordinates]
 
+    # The electron coordinates never change, so the search tree can be reused
+    # for every step
+    electron_tree = cKDTree(numpy.array(electron_coordinates))
+
     max_wrong_points = math.ceil(0.5 * math.sqrt(len(electron_coordinates)))
     for step in xrange(MAX_STEPS_NUMBER):
         # Calculate nearest point
         estimated_coordinates, index1, e_wrong_points, o_wrong_points, total_shift = _MatchAndCalculate(transformed_coordinates,
                                                                                                         optical_coordinates,
-                                                                                                        electron_coordinates)
+                                                                                                        electron_coordinates,
+                                                                                                        electron_tree)
 
         if not estimated_coordinates:
             logging.warning("Failed to get any coordinate match")
@@ -324,16 +329,18 @@ def MatchCoordinates(input_coordinates, electron_coordinates, guess_scale, max_a
     return known_ordered_coordinates, known_optical_coordinates
 
 
-def _KNNsearch(x_coordinates, y_coordinates):
+def _KNNsearch(x_coordinates, y_coordinates, tree=None):
     """
     Applies K-nearest neighbors search to the lists x_coordinates and y_coordinates.
     x_coordinates (List of tuples): List of coordinates
     y_coordinates (List of tuples): List of coordinates
+    tree (None or cKDTree): tree already built from x_coordinates. If None,
+      it will be computed.
     returns (List of integers): Contains the index of nearest neighbor in x_coordinates
                                 for the corresponding element in y_coordinates
     """
-    points = numpy.array(x_coordinates)
-    tree = cKDTree(points)
+    if tree is None:
+        tree = cKDTree(numpy.array(x_coordinates))
     distance, index = tree.query(y_coordinates)
     list_index = numpy.array(index).tolist()
 
@@ -363,7 +370,8 @@ def _TransformCoordinates(x_coordinates, translation, rotation, scale):
     return transformed_coordinates
 
 
-def _MatchAndCalculate(transformed_coordinates, optical_coordinates, electron_coordinates):
+def _MatchAndCalculate(transformed_coordinates, optical_coordinates, electron_coordinates,
+                       electron_tree=None):
     """
     Applies transformation to the optical coordinates in order to match electron coordinates and returns
     the transformed coordinates. This function must be used recursively until the transformed coordinates
@@ -371,6 +379,8 @@ def _MatchAndCalculate(transformed_coordinates, optical_coordinates, electron_co
     transformed_coordinates (List of tuples): List of transformed coordinates
     optical_coordinates (List of tuples): List of optical coordinates
     electron_coordinates (List of tuples): List of electron coordinates
+    electron_tree (None or cKDTree): search tree of the electron coordinates,
+      to avoid recomputing it at every call
     returns estimated_coordinates (List of tuples): Estimated optical coordinates
             index1 (List of integers): Indexes of nearest points in optical with respect to electron
             e_wrong_points (List of booleans): Electron coordinates that have no proper match
@@ -381,7 +391,9 @@ def _MatchAndCalculate(transformed_coordinates, optical_coordinates, electron_co
     # Sort optical coordinates based on the _KNNsearch output index
     knn_points1 = [optical_coordinates[i] for i in index1]
 
-    index2 = _KNNsearch(electron_coordinates, transformed_coordinates)
+    if electron_tree is None:
+        electron_tree = cKDTree(numpy.array(electron_coordinates))
+    index2 = _KNNsearch(electron_coordinates, transformed_coordinates, electron_tree)
     # Sort electron coordinates based on the _KNNsearch output index
     knn_points2 = [electron_coordinates[i] for i in index2]
 
@@ -493,7 +505,7 @@ def _MatchAndCalculate(transformed_coordinates, optical_coordinates, electron_co
                                                   avg_rotation,
                                                   avg_scale)
     index1 = _KNNsearch(estimated_coordinates, electron_coordinates)
-    index2 = _KNNsearch(electron_coordinates, estimated_coordinates)
+    index2 = _KNNsearch(electron_coordinates, estimated_coordinates, electron_tree)
     e_index = [index2[i] for i in index1]
     e_wrong_points = [i != r for i, r in zip(e_index, electron_range)]
     if (all(e_wrong_points) or index1.count(index1[0]) == len(index1)):
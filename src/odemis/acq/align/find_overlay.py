@@ -22,15 +22,16 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 
 from __future__ import division
 
+from concurrent import futures
 from concurrent.futures._base import CancelledError, CANCELLED, FINISHED, \
     RUNNING
 import heapq
 import logging
 import math
+import multiprocessing
 import numpy
 from odemis import model
 from odemis.acq._futures import executeTask
-from odemis.dataio import hdf5
 from odemis.util import spot
 import os
 import threading
@@ -41,6 +42,8 @@ from .images import GridScanner
 
 
 MAX_TRIALS_NUMBER = 2  # Maximum number of scan grid repetitions
+# Maximum number of threads used to process the spots in parallel
+MAX_WORKERS = multiprocessing.cpu_count()
 
 
 def FindOverlay(repetitions, dwell_time, max_allowed_diff, escan, ccd, detector, skew=False, bgsub=False):
@@ -117,6 +120,9 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
     """
     logging.debug("Starting Overlay...")
 
+    # Duration of each phase of the procedure (for debugging/reporting)
+    timings = []
+    executor = futures.ThreadPoolExecutor(max_workers=MAX_WORKERS)
     try:
         # Repeat until we can find overlay (matching coordinates is feasible)
         for trial in range(MAX_TRIALS_NUMBER):
@@ -130,7 +136,9 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
                                                     repetitions))
 
             # Wait for ScanGrid to finish
+            tstart = time.time()
             optical_image, electron_coordinates, electron_scale = future._scanner.DoAcquisition()
+            _addTiming(timings, trial, "grid scan", tstart)
             if future._find_overlay_state == CANCELLED:
                 raise CancelledError()
 
@@ -140,12 +148,14 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
             # Check if ScanGrid gave one image or list of images
             # If it is a list, follow the "one image per spot" procedure
             logging.debug("Isolating spots...")
+            tstart = time.time()
             if isinstance(optical_image, list):
                 opt_img_shape = optical_image[0].shape
                 subimages = []
                 subimage_coordinates = []
-                for img in optical_image:
-                    subspots, subspot_coordinates = coordinates.DivideInNeighborhoods(img, (1, 1), img.shape[0] / 2)
+                divided = executor.map(lambda img: coordinates.DivideInNeighborhoods(img, (1, 1), img.shape[0] / 2),
+                                       optical_image)
+                for subspots, subspot_coordinates in divided:
                     subimages.append(subspots[0])
                     subimage_coordinates.append(subspot_coordinates[0])
             else:
@@ -157,6 +167,7 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
                 if future._find_overlay_state == CANCELLED:
                     raise CancelledError()
                 subimages, subimage_coordinates = coordinates.DivideInNeighborhoods(optical_image, repetitions, optical_dist)
+            _addTiming(timings, trial, "spot isolation", tstart)
 
             if not subimages:
                 raise ValueError("Overlay failure")
@@ -165,7 +176,10 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
             if future._find_overlay_state == CANCELLED:
                 raise CancelledError()
             logging.debug("Finding spot centers with %d subimages...", len(subimages))
-            spot_coordinates = [spot.FindCenterCoordinates(i) for i in subimages]
+            tstart = time.time()
+            # Each spot is independent, so they can be processed in parallel
+            spot_coordinates = list(executor.map(spot.FindCenterCoordinates, subimages))
+            _addTiming(timings, trial, "spot centers", tstart)
 
             # Reconstruct the optical coordinates
             if future._find_overlay_state == CANCELLED:
@@ -205,10 +219,12 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
                 raise CancelledError()
 
             logging.debug("Matching coordinates...")
+            tstart = time.time()
             known_ec, known_oc = coordinates.MatchCoordinates(optical_coordinates,
                                                               electron_coordinates,
                                                               scale,
                                                               max_allowed_diff_px)
+            _addTiming(timings, trial, "coordinates matching", tstart)
             if known_ec:
                 break
             else:
@@ -217,7 +233,7 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
                     logging.warning("Trying with dwell time = %g s...", future._scanner.dwell_time)
         else:
             # Make failure report
-            _MakeReport(optical_image, repetitions, escan.magnification.value, escan.pixelSize.value, dwell_time, electron_coordinates)
+            _MakeReport(optical_image, repetitions, escan.magnification.value, escan.pixelSize.value, dwell_time, electron_coordinates, timings)
             raise ValueError("Overlay failure")
 
         # Calculate transformation parameters
@@ -232,7 +248,7 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
             ret = transform.CalculateTransform(known_ec, known_oc, skew)
         except ValueError as exp:
             # Make failure report
-            _MakeReport(optical_image, repetitions, escan.magnification.value, escan.pixelSize.value, dwell_time, electron_coordinates)
+            _MakeReport(optical_image, repetitions, escan.magnification.value, escan.pixelSize.value, dwell_time, electron_coordinates, timings)
             raise ValueError("Overlay failure: %s" % (exp,))
 
         if future._find_overlay_state == CANCELLED:
@@ -247,7 +263,8 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
             transform_data = transform_d
         transform_d[model.MD_DWELL_TIME] = dwell_time
 
-        logging.debug("Overlay done.")
+        logging.debug("Overlay done. Time spent: %s",
+                      ", ".join("%s: %g s" % (n, d) for _, n, d in timings))
         return ret, transform_data
     except CancelledError:
         pass
@@ -255,6 +272,7 @@ def _DoFindOverlay(future, repetitions, dwell_time, max_allowed_diff, escan,
         logging.debug("Finding overlay failed", exc_info=1)
         raise exp
     finally:
+        executor.shutdown(wait=False)
         with future._overlay_lock:
             future._done.set()
             if future._find_overlay_state == CANCELLED:
@@ -280,6 +298,20 @@ def _CancelFindOverlay(future):
     return True
 
 
+def _addTiming(timings, trial, phase, tstart):
+    """
+    Record the duration of a phase of the overlay procedure
+    timings (list of (int, str, float)): trial, phase name, duration in s.
+      It is updated with the new phase.
+    trial (int): trial number (0-based)
+    phase (str): name of the phase
+    tstart (float): time at which the phase started
+    """
+    dur = time.time() - tstart
+    logging.debug("Overlay phase '%s' took %g s", phase, dur)
+    timings.append((trial, phase, dur))
+
+
 def _computeGridRatio(coord, shape):
     """
     coord (list of tuple of 2 floats): coordinates
@@ -357,17 +389,21 @@ def _transformMetadata(optical_image, transformation_values, escan, ccd, skew=Fa
     return transform_md
 
 
-def _MakeReport(optical_image, repetitions, magnification, pixel_size, dwell_time, electron_coordinates):
+def _MakeReport(optical_image, repetitions, magnification, pixel_size, dwell_time, electron_coordinates,
+                timings=None):
     """
     Creates failure report in case we cannot match the coordinates.
     optical_image (2d array): Image from CCD
     repetitions (tuple of ints): The number of CL spots are used
     dwell_time (float): Time to scan each spot (in s)
     electron_coordinates (list of tuples): Coordinates of e-beam grid
+    timings (None or list of (int, str, float)): trial number, phase name and
+      duration (in s) of each phase of the procedure
     """
     path = os.path.join(os.path.expanduser(u"~"), u"odemis-overlay-report",
                         time.strftime(u"%Y%m%d-%H%M%S"))
     os.makedirs(path)
+    from odemis.dataio import hdf5  # h5py is slow to load, so only when needed
     hdf5.export(os.path.join(path, u"OpticalGrid.h5"), optical_image)
     report = open(os.path.join(path, u"report.txt"), 'w')
     report.write("\n****Overlay Failure Report****\n\n"
@@ -377,6 +413,10 @@ def _MakeReport(optical_image, repetitions, magnification, pixel_size, dwell_tim
                  + "\n\nMaximum dwell time used:\n" + str(dwell_time)
                  + "\n\nElectron coordinates of the scanned grid:\n" + str(electron_coordinates)
                  + "\n\nThe optical image of the grid can be seen in OpticalGrid.h5\n\n")
+    if timings:
+        report.write("Duration of each phase:\n")
+        for trial, phase, dur in timings:
+            report.write("Trial %d, %s: %g s\n" % (trial + 1, phase, dur))
     report.close()
 
     logging.warning("Failed to find overlay. Please check the failure report in %s.",
@@ -373,6 +373,17 @@ class TestMatchCoordinates(unittest.TestCase):
 
         if known_estimated_coordinates != []:
             numpy.testing.assert_equal(known_estimated_coordinates.__len__(), electron_coordinates.__len__() - 1)
-            
+
+    def test_knn_search_reused_tree(self):
+        """
+        Test _KNNsearch gives the same result with a precomputed tree
+        """
+        electron_coordinates = self.electron_coordinates_10x10
+        transformed_coordinates = coordinates._TransformCoordinates(electron_coordinates, (self.translation_x, self.translation_y), self.rotation, (self.scale_x, self.scale_y))
+        tree = coordinates.cKDTree(numpy.array(electron_coordinates))
+        index = coordinates._KNNsearch(electron_coordinates, transformed_coordinates)
+        index_tree = coordinates._KNNsearch(electron_coordinates, transformed_coordinates, tree)
+        self.assertEqual(index, index_tree)
+
 if __name__ == '__main__':
     unittest.main()
@@ -19,7 +19,10 @@ PURPOSE. See the GNU General Public License for more details.
 You should have received a copy of the GNU General Public License along with 
 Odemis. If not, see http://www.gnu.org/licenses/.
 '''
+from concurrent.futures._base import RUNNING
 import logging
+import math
+import numpy
 from odemis import model
 import odemis
 from odemis.acq import align
@@ -28,6 +31,7 @@ from odemis.dataio import hdf5
 from odemis.util import test, timeout
 import os
 from scipy import ndimage
+import threading
 import time
 import unittest
 
@@ -117,6 +121,23 @@ class TestAutofocus(unittest.TestCase):
         self.assertAlmostEqual(foc_pos, self._opt_good_focus, 3)
         self.assertGreater(foc_lev, 0)
 
+    @timeout(1000)
+    def test_autofocus_opt_coarse(self):
+        """
+        Test AutoFocus on CCD with the coarse-to-fine search
+        """
+        focus = self.focus
+        ccd = self.ccd
+        focus.moveAbs({"z": self._opt_good_focus - 400e-6}).result()
+        ccd.exposureTime.value = ccd.exposureTime.range[0]
+        prev_bin = ccd.binning.value
+        future_focus = align.AutoFocus(ccd, self.ebeam, focus, coarse_to_fine=True)
+        foc_pos, foc_lev = future_focus.result(timeout=900)
+        self.assertAlmostEqual(foc_pos, self._opt_good_focus, 3)
+        self.assertGreater(foc_lev, 0)
+        # settings should be back
+        self.assertEqual(ccd.binning.value, prev_bin)
+
     @timeout(1000)
     def test_autofocus_sem(self):
         """
@@ -143,6 +164,123 @@ class TestAutofocus(unittest.TestCase):
         self.assertAlmostEqual(foc_pos, self._sem_good_focus, 3)
         self.assertGreater(foc_lev, 0)
 
+
+class FakeFocus(object):
+    """
+    Focus actuator which doesn't go exactly where requested (like an open-loop
+    actuator), in a reproducible way: each move ends alternately a bit too far
+    or not far enough.
+    """
+    def __init__(self, pos, rng, error):
+        self.axes = {"z": model.Axis(range=rng)}
+        self.position = model.VigilantAttribute({"z": pos}, readonly=True)
+        self._error = error
+        self._nmoves = 0
+
+    def _moveTo(self, pos):
+        self._nmoves += 1
+        pos += self._error * (-1) ** self._nmoves
+        self.position._set_value({"z": pos}, force_write=True)
+
+    def moveRel(self, shift):
+        self._moveTo(self.position.value["z"] + shift["z"])
+        return model.InstantaneousFuture()
+
+    def moveAbsSync(self, pos):
+        self._moveTo(pos["z"])
+
+
+class FakeDetector(object):
+    role = "se-detector"
+
+
+class TestFocusHelpers(unittest.TestCase):
+    """
+    Test the helper functions of the autofocus (no hardware needed)
+    """
+
+    def _search(self, start, error, peak, good_focus=None):
+        """
+        Runs the (default) autofocus on a simulated focus curve
+        returns best position, number of measurements, final position
+        """
+        focus = FakeFocus(start, (-300e-6, 300e-6), error)
+        measured = []
+
+        def measure(z):
+            measured.append(z)
+            return 1000 * math.exp(-((z - peak) / 20e-6) ** 2)
+
+        # The "image" is just the focus position
+        orig_acq, orig_measure = autofocus.AcquireNoBackground, autofocus.MeasureSEMFocus
+        autofocus.AcquireNoBackground = lambda d, dfbkg=None: focus.position.value["z"]
+        autofocus.MeasureSEMFocus = measure
+        try:
+            f = model.ProgressiveFuture()
+            f._autofocus_state = RUNNING
+            f._autofocus_lock = threading.Lock()
+            pos, lvl = autofocus._DoAutoFocus(f, FakeDetector(), None, 0.5e-6, 0.1,
+                                              focus, None, good_focus)
+        finally:
+            autofocus.AcquireNoBackground = orig_acq
+            autofocus.MeasureSEMFocus = orig_measure
+
+        return pos, len(measured), focus.position.value["z"]
+
+    def test_default_search(self):
+        """
+        The default mode finds the same positions, with the same number of
+        measurements, as it always did
+        """
+        # Imprecise actuator
+        pos, nmeas, final = self._search(0, 1e-8, 31.234e-6)
+        self.assertAlmostEqual(pos, 31.00e-6, delta=1e-12)
+        self.assertEqual(nmeas, 30)
+        self.assertAlmostEqual(final, 31.01e-6, delta=1e-12)
+
+        # Known good focus
+        pos, nmeas, final = self._search(0, 1e-8, 31.234e-6, good_focus=40e-6)
+        self.assertAlmostEqual(pos, 31.01e-6, delta=1e-12)
+        self.assertEqual(nmeas, 22)
+        self.assertAlmostEqual(final, 31.00e-6, delta=1e-12)
+
+        # Peak close to the end of the range (so moves are clipped)
+        pos, nmeas, final = self._search(250e-6, 1e-8, 270e-6)
+        self.assertAlmostEqual(pos, 270.00e-6, delta=1e-12)
+        self.assertEqual(nmeas, 33)
+        self.assertAlmostEqual(final, 269.99e-6, delta=1e-12)
+
+    def test_estimate_peak(self):
+        # Perfect Gaussian => exact peak
+        pos = [1e-6, 2e-6, 3e-6]
+        lvl = [numpy.exp(-((p - 2.3e-6) / 1e-6) ** 2) for p in pos]
+        peak = autofocus._EstimatePeak(pos, lvl)
+        self.assertAlmostEqual(peak, 2.3e-6, 12)
+
+        # Negative levels => parabola, still within the range
+        peak = autofocus._EstimatePeak([-1, 0, 1], [-2, -1, -3])
+        self.assertTrue(-1 <= peak <= 1)
+
+        # No peak (monotonic convex, even in log-space) => None
+        self.assertIsNone(autofocus._EstimatePeak([0, 1, 2], [1, 2, 8]))
+        # Not enough positions
+        self.assertIsNone(autofocus._EstimatePeak([0, 0, 1], [1, 2, 1]))
+
+    def test_level_cache(self):
+        cache = autofocus.FocusLevelCache(atol=1e-7)
+        self.assertNotIn(1e-6, cache)
+        cache[1e-6] = 5
+        self.assertIn(1e-6 + 5e-8, cache)
+        self.assertEqual(cache[1e-6 - 5e-8], 5)
+        self.assertNotIn(1.2e-6, cache)
+        with self.assertRaises(KeyError):
+            cache[2e-6]
+
+    def test_estimate_time(self):
+        et = 0.1
+        self.assertLess(autofocus.estimateAutoFocusTime(et, coarse_to_fine=True),
+                        autofocus.estimateAutoFocusTime(et))
+
+
 if __name__ == '__main__':
-    suite = unittest.TestLoader().loadTestsFromTestCase(TestAutofocus)
-    unittest.TextTestRunner(verbosity=2).run(suite)
+    unittest.main()
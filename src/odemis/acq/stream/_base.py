@@ -37,6 +37,138 @@ from odemis.model import isasync
 # to identify a ROI which must still be defined by the user
 UNDEFINED_ROI = (0, 0, 0, 0)
 
+# Update priorities of the streams, depending on the view they are shown in
+PRIORITY_HIDDEN = 0.1
+PRIORITY_VISIBLE = 1
+PRIORITY_FOCUSSED = 4
+
+
+class ImageUpdateScheduler(object):
+    """
+    Decides how often the image of each stream can be recomputed, so that all
+    the streams together use at most a given share of the CPU time.
+    The cost of an update of a stream is the time to compute its image, plus
+    the time to display it (as reported by the GUI). The available time is
+    shared between the streams recently updated, proportionally to their
+    priority.
+    """
+
+    def __init__(self, cpu_share=0.5, min_period=1 / 30, max_period=2,
+                 timeout=5, smoothing=0.2):
+        """
+        cpu_share (0 < float <= 1): maximum ratio of the time spent updating
+          the images of all the streams.
+        min_period (float): minimum time between two updates of a stream (s)
+        max_period (float): maximum time between two updates of a stream (s)
+        timeout (float): a stream which has not been updated for this long is
+          not taken into account anymore (s)
+        smoothing (0 < float <= 1): weight of a new cost measurement compared
+          to the previous ones
+        """
+        self.cpu_share = cpu_share
+        self.min_period = min_period
+        self.max_period = max_period
+        self.timeout = timeout
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        # Stream -> _StreamUpdateInfo
+        self._infos = weakref.WeakKeyDictionary()
+
+    def _get_info(self, stream):
+        """ Must be called with the lock taken """
+        try:
+            return self._infos[stream]
+        except KeyError:
+            info = _StreamUpdateInfo()
+            self._infos[stream] = info
+            return info
+
+    def set_priority(self, stream, source, priority):
+        """
+        Set the update priority of a stream. A stream can receive a priority
+        from several sources (eg, the views it is shown in), in which case
+        the highest priority is used.
+        stream (Stream): the stream
+        source (object): who sets the priority
+        priority (None or float >= 0): the priority, or None to remove the
+          priority set by this source. A stream without any priority has
+          the priority PRIORITY_VISIBLE.
+        """
+        with self._lock:
+            info = self._get_info(stream)
+            if priority is None:
+                info.priorities.pop(id(source), None)
+            else:
+                info.priorities[id(source)] = priority
+
+    def report_cost(self, stream, dur, kind="image"):
+        """
+        Record the time spent to update the image of a stream
+        stream (Stream): the stream
+        dur (float): the time spent on this update (s)
+        kind (str): which part of the update took this time. The costs of
+          the different kinds are added, eg, "image" for the computation of
+          the image, and "display" for drawing it.
+        """
+        with self._lock:
+            info = self._get_info(stream)
+            info.last_update = time.time()
+            prev = info.costs.get(kind)
+            if prev is None:
+                info.costs[kind] = dur
+            else:
+                info.costs[kind] = prev + self.smoothing * (dur - prev)
+
+    def get_period(self, stream):
+        """
+        Compute how long to wait until the next update of the image of the stream
+        stream (Stream): the stream
+        return (float): minimum time between the last update and the next one (s)
+        """
+        with self._lock:
+            info = self._get_info(stream)
+            prio = info.priority
+            if info.cost is None:
+                return self.min_period
+            if prio <= 0:
+                return self.max_period
+
+            # With the period of each stream being the total weighted cost
+            # divided by its priority, the sum of cost/period of all the
+            # streams is equal to the CPU share.
+            tmin = time.time() - self.timeout
+            wcost = sum(i.priority * i.cost for i in self._infos.values()
+                        if i.cost is not None and i.last_update >= tmin)
+            wcost = max(wcost, prio * info.cost)  # in case the stream is too old
+            period = wcost / (self.cpu_share * prio)
+
+        return min(max(self.min_period, period), self.max_period)
+
+
+class _StreamUpdateInfo(object):
+    """ Information about the updates of a stream, for the ImageUpdateScheduler """
+
+    def __init__(self):
+        self.costs = {}  # str -> float: kind -> smoothed duration of an update (s)
+        self.last_update = 0  # s, time of the last update
+        self.priorities = {}  # id of source -> float
+
+    @property
+    def cost(self):
+        if not self.costs:
+            return None
+        return sum(self.costs.values())
+
+    @property
+    def priority(self):
+        if not self.priorities:
+            return PRIORITY_VISIBLE
+        return max(self.priorities.values())
+
+
+# The scheduler shared by all the streams of the process
+image_update_scheduler = ImageUpdateScheduler()
+
 
 class Stream(object):
     """ A stream combines a Detector, its associated Dataflow and an Emitter.
@@ -736,7 +868,7 @@ class Stream(object):
     @staticmethod
     def _image_thread(wstream):
         """ Called as a separate thread, and recomputes the image whenever it receives an event
-        asking for it.
+        asking for it. The update rate is limited by the image_update_scheduler.
 
         Args:
             wstream (Weakref to a Stream): the stream to follow
@@ -767,9 +899,11 @@ class Stream(object):
                 if tsleep > 0.0001:
                     time.sleep(tsleep)
 
-                tnext = time.time() + 0.1  # max 10 Hz
                 im_needs_recompute.clear()
+                tstart = time.time()
                 stream._updateImage()
+                image_update_scheduler.report_cost(stream, time.time() - tstart)
+                tnext = tstart + image_update_scheduler.get_period(stream)
         except Exception:
             logging.exception("image update thread failed")
 
@@ -22,6 +22,7 @@ You should have received a copy of the GNU General Public License along with Ode
 from __future__ import division
 
 from abc import abstractmethod
+from concurrent.futures.thread import ThreadPoolExecutor
 from functools import wraps
 import logging
 import math
@@ -30,6 +31,7 @@ import numpy
 from odemis import model
 from odemis.acq import align
 from odemis.acq.stream._sync import MomentOfInertiaMDStream
+from odemis.model import isasync
 from odemis.util import img
 import time
 
@@ -409,10 +411,44 @@ class SpectrumSettingsStream(CCDSettingsStream):
         # Contains one 1D spectrum (start with an empty array)
         self.image.value = model.DataArray([])
 
+        # If True, before starting the live view, the readout of the CCD is
+        # restricted to the rows which receive light.
+        if model.hasVA(detector, "readoutBand"):
+            self.autoReadoutBand = model.BooleanVA(False)
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
         # TODO: grating/cw as VAs (from the spectrometer)
 
     # onActive: same as the standard LiveStream (ie, acquire from the dataflow)
 
+    @isasync
+    def prepare(self):
+        """
+        Set the optical path, and detect the readout band if requested.
+        """
+        if not (model.hasVA(self, "autoReadoutBand") and self.autoReadoutBand.value):
+            return super(SpectrumSettingsStream, self).prepare()
+
+        # actually indicate that preparation has been triggered, don't wait for
+        # it to be completed
+        self._prepared = True
+        return self._executor.submit(self._doPrepare)
+
+    def _doPrepare(self):
+        super(SpectrumSettingsStream, self).prepare().result()
+
+        try:
+            band = self._detector.detectReadoutBand()
+        except (LookupError, IOError) as ex:
+            logging.warning("Keeping readout band %s: %s",
+                            self._detector.readoutBand.value, ex)
+            return
+
+        logging.info("Readout band of %s set to %s", self._detector.name, band)
+        # The vertical binning follows the band
+        if model.hasVA(self, "detBinning"):
+            self.detBinning.value = self._detector.binning.value
+
     def _updateImage(self):
         # Just copy the raw data into the image, removing useless second dimension
         data = self.raw[0]
@@ -522,6 +558,8 @@ class MonochromatorSettingsStream(PMTSettingsStream):
         else:
             age = date  # empty
         im.metadata[model.MD_ACQ_DATE] = age
+        # The absolute dates too, so that the new points can be told apart
+        im.metadata[model.MD_AD_LIST] = date
         assert len(im) == len(date)
         assert im.ndim == 1
 
@@ -27,7 +27,7 @@ from odemis import model
 from odemis.acq import drift
 from odemis.acq.align import FindEbeamCenter
 from odemis.model import MD_POS_COR
-from odemis.util import img, conversion, fluo
+from odemis.util import img, conversion, fluo, mosaic
 import threading
 import time
 import weakref
@@ -224,6 +224,10 @@ class SEMStream(LiveStream):
         # Actually use the ROI
         self.roi.subscribe(self._onROI)
 
+        # If the detector can send the frames while they are being scanned,
+        # show them, so that long scans build up progressively.
+        self._partial_dataflow = getattr(detector, "partialData", None)
+
         # drift correction VAs:
         # Not currently supported by this standard stream, but some synchronised
         #   streams do.
@@ -358,6 +362,33 @@ class SEMStream(LiveStream):
                                       "acquisition not yet implemented")
 
         super(SEMStream, self)._startAcquisition()
+        if self._partial_dataflow is not None:
+            self._partial_dataflow.subscribe(self._onPartialData)
+
+    def _onActive(self, active):
+        if not active and self._partial_dataflow is not None:
+            self._partial_dataflow.unsubscribe(self._onPartialData)
+        super(SEMStream, self)._onActive(active)
+
+    def _onPartialData(self, dataflow, data):
+        """
+        Called when a frame in progress is received. The rows already scanned
+        replace the ones of the previous image, like on a SEM screen.
+        """
+        nrows = data.metadata.get(model.MD_ROWS_ACQUIRED, data.shape[0])
+        if self.raw:
+            prev = self.raw[0]
+            date = data.metadata.get(model.MD_ACQ_DATE)
+            if (model.MD_ROWS_ACQUIRED not in prev.metadata and
+                date is not None and prev.metadata.get(model.MD_ACQ_DATE) == date):
+                # The complete frame was already received
+                return
+            if prev.shape == data.shape and prev.dtype == data.dtype:
+                merged = model.DataArray(prev.copy(), data.metadata)
+                merged[:nrows] = data[:nrows]
+                data = merged
+
+        self._onNewData(self._dataflow, data)
 
     def _onDwellTime(self, value):
         self._updateAcquisitionTime()
@@ -786,6 +817,8 @@ class CameraCountStream(CameraStream):
         else:
             age = date  # empty
         im.metadata[model.MD_ACQ_DATE] = age
+        # The absolute dates too, so that the new points can be told apart
+        im.metadata[model.MD_AD_LIST] = date
         assert len(im) == len(date)
         assert im.ndim == 1
 
@@ -1000,3 +1033,60 @@ class RGBCameraStream(CameraStream):
         except Exception:
             logging.exception("Updating %s image", self.__class__.__name__)
 
+
+class MosaicStream(Stream):
+    """
+    Stream which stitches all the images received by another stream into a
+    large mosaic (typically, to show all the places of the sample already seen
+    with the overview camera).
+    It doesn't acquire anything by itself: .should_update and .is_active are
+    the ones of the source stream, and .image is always the latest image of the
+    source stream. The mosaic is available in .mosaic .
+    """
+
+    def __init__(self, name, stream, **kwargs):
+        """
+        name (string): user-friendly name of this stream
+        stream (Stream): the stream which provides the RGB images (via .image)
+        kwargs: passed to the TiledMosaic (eg, tile_size, levels, max_size)
+        """
+        super(MosaicStream, self).__init__(name, None, None, None)
+        self._stream = stream
+        self.mosaic = mosaic.TiledMosaic(**kwargs)
+
+        # The acquisition is entirely controlled by the source stream
+        self.should_update = stream.should_update
+        self.is_active = stream.is_active
+
+        stream.image.subscribe(self._onSourceImage, init=True)
+
+    @property
+    def stream(self):
+        """ The stream which provides the images """
+        return self._stream
+
+    def prepare(self):
+        return self._stream.prepare()
+
+    def estimateAcquisitionTime(self):
+        return self._stream.estimateAcquisitionTime()
+
+    def clear(self):
+        """
+        Remove all the images from the mosaic (eg, because the sample has been
+        changed). The mosaic restarts from the next image of the source stream.
+        """
+        self.mosaic.clear()
+        # Let the listeners know that the mosaic has changed
+        self.image.value = None
+
+    def _onSourceImage(self, im):
+        if im is None:
+            return
+
+        try:
+            self.mosaic.insert(im)
+        except Exception:
+            logging.exception("Failed to add image to the mosaic of %s", self.name.value)
+        # Update the image only after the mosaic, so that listeners can rely on it
+        self.image.value = im
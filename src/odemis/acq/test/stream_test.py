@@ -448,6 +448,64 @@ class StreamTestCase(unittest.TestCase):
         assert(wss() is None)
 
 
+class FakeStream(object):
+    """ Anything which can be weakly referenced is fine for the scheduler """
+    pass
+
+
+class ImageUpdateSchedulerTestCase(unittest.TestCase):
+
+    def test_single(self):
+        sched = stream.ImageUpdateScheduler(cpu_share=0.5, min_period=0.01, max_period=2)
+        s = FakeStream()
+        # Unknown cost => as fast as possible
+        self.assertEqual(sched.get_period(s), 0.01)
+
+        sched.report_cost(s, 0.1)
+        self.assertAlmostEqual(sched.get_period(s), 0.2)
+        # The display time is added
+        sched.report_cost(s, 0.05, "display")
+        self.assertAlmostEqual(sched.get_period(s), 0.3)
+
+        # Very cheap => limited by the minimum period
+        sched = stream.ImageUpdateScheduler(cpu_share=0.5, min_period=0.01, max_period=2)
+        s2 = FakeStream()
+        sched.report_cost(s2, 0.0001)
+        self.assertEqual(sched.get_period(s2), 0.01)
+
+    def test_priority(self):
+        sched = stream.ImageUpdateScheduler(cpu_share=0.5, min_period=0.001, max_period=10)
+        streams = [FakeStream() for i in range(5)]
+        for s in streams:
+            sched.report_cost(s, 0.02)
+
+        periods = [sched.get_period(s) for s in streams]
+        for p in periods:
+            self.assertAlmostEqual(p, periods[0])
+        # Altogether, they use the CPU share
+        self.assertAlmostEqual(sum(0.02 / p for p in periods), 0.5)
+
+        # One stream is focussed, and another one hidden by two sources
+        sched.set_priority(streams[0], "view1", stream.PRIORITY_FOCUSSED)
+        sched.set_priority(streams[1], "view1", stream.PRIORITY_HIDDEN)
+        sched.set_priority(streams[1], "view2", stream.PRIORITY_HIDDEN)
+        periods = [sched.get_period(s) for s in streams]
+        self.assertLess(periods[0], periods[2])
+        self.assertGreater(periods[1], periods[2])
+        self.assertAlmostEqual(sum(0.02 / p for p in periods), 0.5)
+
+        # The highest priority of all the sources is used
+        sched.set_priority(streams[1], "view2", stream.PRIORITY_FOCUSSED)
+        self.assertAlmostEqual(sched.get_period(streams[1]), sched.get_period(streams[0]))
+        sched.set_priority(streams[1], "view2", None)
+        self.assertAlmostEqual(sched.get_period(streams[1]), periods[1])
+
+        # Removed streams are not taken into account anymore
+        del streams[2:], s
+        gc.collect()
+        self.assertLess(sched.get_period(streams[1]), periods[1])
+
+
 # @skip("faster")
 class SECOMTestCase(unittest.TestCase):
     """
@@ -1815,6 +1873,31 @@ class StaticStreamsTestCase(unittest.TestCase):
         numpy.testing.assert_equal(im[0, 0], [0, 0, 0])
         numpy.testing.assert_equal(im[12, 1], md[model.MD_USER_TINT])
 
+    def test_mosaic(self):
+        """Test MosaicStream"""
+        md = {
+            model.MD_PIXEL_SIZE: (1e-6, 1e-6),  # m/px
+            model.MD_POS: (1.2e-3, -30e-3),  # m
+            model.MD_DIMS: "YXC",
+        }
+        da = model.DataArray(numpy.zeros((256, 512, 3), dtype=numpy.uint8) + 128, md)
+        rgbs = stream.RGBStream("test", da)
+        ms = stream.MosaicStream("overview", rgbs)
+        time.sleep(0.5)  # wait a bit for the image to update
+
+        # The image of the source stream is in the mosaic
+        self.assertIs(ms.image.value, rgbs.image.value)
+        bbox = ms.mosaic.get_bbox()
+        self.assertAlmostEqual(bbox[0], 1.2e-3 - 256e-6)
+        self.assertAlmostEqual(bbox[2], 1.2e-3 + 256e-6)
+        self.assertTrue(ms.mosaic.get_tiles(1e-6))
+
+        # After unloading the sample, the mosaic is empty
+        ms.clear()
+        self.assertIsNone(ms.mosaic.get_bbox())
+        self.assertFalse(ms.mosaic.get_tiles(1e-6))
+        self.assertIsNone(ms.image.value)
+
     def test_cl(self):
         """Test StaticCLStream"""
         # AR background data
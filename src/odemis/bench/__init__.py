@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the
+terms  of the GNU General Public License version 2 as published by the Free
+Software  Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY;  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR  PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+"""
+
+# Benchmarks of the computation-heavy parts of Odemis. They run without GUI
+# nor hardware, on synthetic data, so that the performance of different
+# versions (or computers) can be compared.
+# Run them with: python -m odemis.bench --help
+
+from __future__ import division
+
+import collections
+import fnmatch
+import itertools
+import json
+import logging
+import math
+import numpy
+import odemis
+import platform
+import time
+
+
+class SkipBenchmark(Exception):
+    """
+    Raised by the setup of a benchmark when it cannot run on this computer
+    (eg, missing optional module).
+    """
+    pass
+
+
+class Benchmark(object):
+    """
+    A function to time, for different sets of parameters.
+    """
+
+    def __init__(self, name, setup, params, quick_params):
+        """
+        name (str): unique name of the benchmark
+        setup (callable): called with each set of parameters as keyword
+          arguments. It prepares the input data, and returns a callable without
+          argument, which is the code to time. It may raise SkipBenchmark.
+        params (list of dict str -> value): all the sets of parameters
+        quick_params (list of dict str -> value): the sets of parameters to use
+          for a quick run.
+        """
+        self.name = name
+        self.setup = setup
+        self.params = params
+        self.quick_params = quick_params
+        self.description = (setup.__doc__ or "").strip()
+
+    def __repr__(self):
+        return "<Benchmark %s>" % (self.name,)
+
+
+# str -> Benchmark: all the benchmarks known, in registration order
+_benchmarks = collections.OrderedDict()
+
+
+def register(name, params=None, quick_params=None):
+    """
+    Decorator to add a benchmark to the list of known benchmarks.
+    The decorated function is the setup, as described in Benchmark.
+    name (str): unique name of the benchmark
+    params (None or list of dict str -> value): sets of parameters to pass to
+      the function. If None, the function is called without parameters.
+    quick_params (None or list of dict str -> value): sets of parameters used
+      for a quick run. If None, only the first set of parameters is used.
+    """
+    if params is None:
+        params = [{}]
+    if quick_params is None:
+        quick_params = params[:1]
+
+    def register_setup(f):
+        if name in _benchmarks:
+            raise ValueError("Benchmark %s already registered" % (name,))
+        _benchmarks[name] = Benchmark(name, f, params, quick_params)
+        return f
+
+    return register_setup
+
+
+def grid(**kwargs):
+    """
+    Generates all the combinations of parameters
+    kwargs (str -> list of values): the possible values of each parameter
+    return (list of dict str -> value): one dict per combination. The
+      first parameters (in alphabetical order) vary the slowest.
+    """
+    names = sorted(kwargs.keys())
+    return [dict(zip(names, values))
+            for values in itertools.product(*[kwargs[n] for n in names])]
+
+
+def load_all():
+    """
+    Import all the modules containing benchmarks, so that they are registered
+    """
+    from odemis.bench import imgproc, acq, actuator, sem
+
+
+def get_benchmarks(patterns=None):
+    """
+    Find the benchmarks registered
+    patterns (None or list of str): shell-like patterns (eg, "hist*") matching
+      the names of the benchmarks to select. If None, all are selected.
+    return (list of Benchmark): in registration order
+    """
+    if not patterns:
+        return list(_benchmarks.values())
+    return [b for n, b in _benchmarks.items()
+            if any(fnmatch.fnmatch(n, p) for p in patterns)]
+
+
+def measure(func, repeat=5, min_time=0.1):
+    """
+    Time how long it takes to run a function.
+    The function is called as many times as needed so that each measurement
+    lasts at least min_time, and this is done repeat times. The first call
+    is only used to estimate the duration (and warm up the caches).
+    func (callable): the function to time, without argument. If it returns
+      a dict str -> float, these are considered extra metrics measured by the
+      function itself (eg, throughput, memory usage...).
+    repeat (int >= 1): number of measurements
+    min_time (float >= 0): minimum duration of each measurement (s)
+    return (dict str -> value): with the keys:
+      number (int): number of calls per measurement
+      times (list of floats): the time per call of each measurement (s)
+      min, median, mean, stdev (floats): statistics of the times (s)
+      metrics (dict str -> float): median of each extra metric, only if the
+        function returned some.
+    """
+    tstart = time.time()
+    func()
+    dur = time.time() - tstart
+    number = max(1, int(math.ceil(min_time / max(dur, 1e-9))))
+
+    times = []
+    metrics = collections.defaultdict(list)  # str -> list of floats
+    for i in range(repeat):
+        tstart = time.time()
+        for j in xrange(number):
+            ret = func()
+            if isinstance(ret, dict):
+                for k, v in ret.items():
+                    metrics[k].append(v)
+        times.append((time.time() - tstart) / number)
+
+    res = {"number": number,
+           "times": times,
+           "min": min(times),
+           "median": float(numpy.median(times)),
+           "mean": float(numpy.mean(times)),
+           "stdev": float(numpy.std(times)),
+           }
+    if metrics:
+        res["metrics"] = {k: float(numpy.median(v)) for k, v in metrics.items()}
+
+    return res
+
+
+def run(benchmarks, repeat=5, min_time=0.1, quick=False, callback=None):
+    """
+    Run benchmarks for all their sets of parameters
+    benchmarks (list of Benchmark): the benchmarks to run
+    repeat (int >= 1): number of measurements of each case
+    min_time (float >= 0): minimum duration of each measurement (s)
+    quick (bool): if True, only run the quick sets of parameters
+    callback (None or callable): called after each case with the result
+    return (list of dict str -> value): one result per case, with the keys
+      "name", "params" and either the ones returned by measure(), or
+      "skipped" (str) with the reason the case couldn't run.
+    """
+    results = []
+    for b in benchmarks:
+        for p in (b.quick_params if quick else b.params):
+            res = {"name": b.name, "params": p}
+            func = None
+            try:
+                func = b.setup(**p)
+                res.update(measure(func, repeat, min_time))
+            except SkipBenchmark as ex:
+                res["skipped"] = str(ex)
+            except Exception as ex:
+                logging.exception("Benchmark %s failed with %s", b.name, p)
+                res["skipped"] = "failed: %s" % (ex,)
+            del func  # Free the input data before the next case
+            results.append(res)
+            if callback:
+                callback(res)
+
+    return results
+
+
+def get_environment():
+    """
+    return (dict str -> str): information about the software and hardware,
+      to interpret the results
+    """
+    env = {"odemis": odemis.__version__,
+           "python": platform.python_version(),
+           "numpy": numpy.__version__,
+           "platform": platform.platform(),
+           "machine": platform.machine(),
+           "processor": platform.processor(),
+           "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+           }
+
+    try:
+        import scipy
+        env["scipy"] = scipy.__version__
+    except ImportError:
+        pass
+
+    try:
+        from odemis.util import img_fast
+        env["img_fast"] = "yes"
+    except ImportError:
+        env["img_fast"] = "no"
+
+    return env
+
+
+def _case_key(res):
+    return res["name"], json.dumps(res["params"], sort_keys=True)
+
+
+def compare(results, reference, threshold=0.2):
+    """
+    Compare results with reference results (eg, from a previous version)
+    results (list of dict): as returned by run()
+    reference (list of dict): as returned by run(), possibly loaded from a file
+    threshold (float >= 0): relative slow down above which a case is
+      considered a regression
+    return (list of (dict, float, bool)): for each result which is also in the
+      reference: the result, the ratio of its (min) time compared to the
+      reference, and whether it's a regression.
+    """
+    ref_times = {_case_key(r): r["min"] for r in reference if "min" in r}
+    comp = []
+    for r in results:
+        try:
+            ratio = r["min"] / ref_times[_case_key(r)]
+        except (KeyError, ZeroDivisionError):
+            continue
+        comp.append((r, ratio, ratio > 1 + threshold))
+
+    return comp
+
+
+def write_results(f, results, env=None):
+    """
+    Save the results in JSON format
+    f (file): opened file to write to
+    results (list of dict): as returned by run()
+    env (None or dict): as returned by get_environment(). If None, it is
+      computed.
+    """
+    if env is None:
+        env = get_environment()
+    json.dump({"environment": env, "results": results}, f, indent=1, sort_keys=True)
+    f.write("\n")
+
+
+def read_results(f):
+    """
+    Load the results saved by write_results()
+    f (file): opened file to read
+    return (dict, list of dict): the environment and the results
+    """
+    content = json.load(f)
+    return content["environment"], content["results"]
+
+
+def format_params(params):
+    """
+    return (str): compact representation of a set of parameters
+    """
+    return ", ".join("%s=%s" % (k, _format_value(v))
+                     for k, v in sorted(params.items()))
+
+
+def _format_value(v):
+    if isinstance(v, (tuple, list)):
+        return "x".join(str(i) for i in v)
+    return str(v)
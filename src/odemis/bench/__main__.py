@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the
+terms  of the GNU General Public License version 2 as published by the Free
+Software  Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY;  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR  PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+"""
+
+# Command line interface to run the benchmarks.
+# Example usage:
+# python -m odemis.bench --quick
+# python -m odemis.bench --output odemis-2.4.json "hist*" DataArray2RGB
+# python -m odemis.bench --compare odemis-2.4.json
+# python -m odemis.bench --config sparc2-sim.odm.yaml "acq.*"
+
+from __future__ import division
+
+import argparse
+import logging
+from odemis import bench
+from odemis.bench import acq
+from odemis.util import units
+import sys
+
+
+def print_result(res):
+    params = bench.format_params(res["params"])
+    if "skipped" in res:
+        print("%-20s %-50s skipped (%s)" % (res["name"], params, res["skipped"]))
+    else:
+        print("%-20s %-50s %12s (± %s)" % (res["name"], params,
+                                           units.readable_str(res["min"], "s", sig=3),
+                                           units.readable_str(res["stdev"], "s", sig=2)))
+        for k, v in sorted(res.get("metrics", {}).items()):
+            print("%-20s   %-48s %12s" % ("", k, units.readable_str(v, sig=3)))
+
+
+def main(args):
+    """
+    Handles the command line arguments
+    args is the list of arguments passed
+    return (int): value to return to the OS as program exit code
+    """
+    parser = argparse.ArgumentParser(prog="odemis.bench",
+                                     description="Benchmarks of the data processing")
+    parser.add_argument("--list", "-l", dest="list", action="store_true", default=False,
+                        help="List the benchmarks available, and exit")
+    parser.add_argument("--quick", "-q", dest="quick", action="store_true", default=False,
+                        help="Only run the benchmarks with small data")
+    parser.add_argument("--repeat", "-r", dest="repeat", type=int, default=5,
+                        help="Number of measurements of each case (default: 5)")
+    parser.add_argument("--min-time", dest="min_time", type=float, default=0.1,
+                        help="Minimum duration of a measurement in s (default: 0.1)")
+    parser.add_argument("--output", "-o", dest="output",
+                        help="JSON file where to save the results")
+    parser.add_argument("--compare", "-c", dest="compare",
+                        help="JSON file with reference results to compare with")
+    parser.add_argument("--threshold", dest="threshold", type=float, default=0.2,
+                        help="Relative slow down reported as a regression (default: 0.2)")
+    parser.add_argument("--config", dest="config",
+                        help="Microscope file of the backend started for the acquisition "
+                             "benchmarks, if no backend is running (default: simulated SPARC)")
+    parser.add_argument("--log-level", dest="loglev", metavar="<level>", type=int,
+                        default=0, help="set verbosity level (0-2, default = 0)")
+    parser.add_argument("benchmarks", nargs="*",
+                        help="Names (or shell patterns) of the benchmarks to run (default: all)")
+
+    options = parser.parse_args(args[1:])
+
+    loglev_names = (logging.WARNING, logging.INFO, logging.DEBUG)
+    loglev = loglev_names[min(len(loglev_names) - 1, options.loglev)]
+    logging.getLogger().setLevel(loglev)
+
+    if options.config:
+        acq.CONFIG = options.config
+    bench.load_all()
+    benchmarks = bench.get_benchmarks(options.benchmarks)
+    if not benchmarks:
+        logging.error("No benchmark matching %s", ", ".join(options.benchmarks))
+        return 127
+
+    if options.list:
+        for b in benchmarks:
+            print("%-20s %s" % (b.name, b.description))
+        return 0
+
+    reference = None
+    if options.compare:
+        with open(options.compare) as f:
+            _, reference = bench.read_results(f)
+
+    env = bench.get_environment()
+    results = bench.run(benchmarks, options.repeat, options.min_time,
+                        options.quick, callback=print_result)
+
+    if options.output:
+        with open(options.output, "w") as f:
+            bench.write_results(f, results, env)
+
+    if reference is not None:
+        print("")
+        nreg = 0
+        for res, ratio, regression in bench.compare(results, reference, options.threshold):
+            print("%-20s %-50s x %.2f%s" % (res["name"], bench.format_params(res["params"]),
+                                            ratio, " REGRESSION" if regression else ""))
+            nreg += regression
+        if nreg:
+            logging.warning("%d regressions found", nreg)
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    ret = main(sys.argv)
+    logging.shutdown()
+    exit(ret)
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the
+terms  of the GNU General Public License version 2 as published by the Free
+Software  Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY;  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR  PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+"""
+
+# Benchmarks of complete acquisitions, from the hardware (simulated) to the
+# data received by the client. They need a backend. If none is running, one
+# is started with the simulated microscope CONFIG, and stopped at the end.
+# Each acquisition reports these metrics:
+#  * pixels_per_s: number of pixels (or CCD images, for the multiple detector
+#    streams) acquired per second.
+#  * overhead_per_pixel (s): the time spent per pixel in addition to the
+#    ideal hardware time (dwell time or exposure + readout time).
+#  * latency (s): time between the end of the acquisition of a frame by the
+#    hardware and its reception by the client (only for simple acquisitions).
+#  * peak_rss (B): maximum memory used by this process so far.
+#  * backend_peak_rss (B): maximum memory used by all the processes of the
+#    backend so far (only on Linux).
+
+from __future__ import division
+
+import atexit
+import glob
+import logging
+import numpy
+import odemis
+from odemis import model, acq
+from odemis.acq import stream
+from odemis.bench import register, grid, SkipBenchmark
+from odemis.util import test
+import os
+import resource
+import threading
+import time
+
+
+# The microscope file started if no backend is running
+CONFIG = os.path.join(os.path.dirname(odemis.__file__),
+                      "../../install/linux/usr/share/odemis/sim/sparc-sim.odm.yaml")
+
+# None if the backend hasn't been looked for yet, True if it is available,
+# or the exception which prevented to start it.
+_backend_status = None
+
+
+def _ensure_backend():
+    """
+    Start the backend, if not yet running
+    raise SkipBenchmark: if the backend couldn't be started
+    """
+    global _backend_status
+    if _backend_status is None:
+        try:
+            test.start_backend(CONFIG)
+            atexit.register(test.stop_backend)
+            _backend_status = True
+        except LookupError:
+            logging.info("Using the backend already running")
+            _backend_status = True
+        except Exception as ex:
+            logging.exception("Failed to start the backend")
+            _backend_status = ex
+
+    if _backend_status is not True:
+        raise SkipBenchmark("No backend available: %s" % (_backend_status,))
+
+
+def _get_component(role):
+    """
+    return (HwComponent): the component with the given role
+    raise SkipBenchmark: if the microscope has no such component
+    """
+    _ensure_backend()
+    try:
+        return model.getComponent(role=role)
+    except LookupError:
+        raise SkipBenchmark("No component with role %s" % (role,))
+
+
+def _read_proc_status(pid, key):
+    """
+    return (int): the value of a memory entry of /proc/<pid>/status in bytes
+    raise (IOError, ValueError): if the value cannot be read
+    """
+    with open("/proc/%s/status" % (pid,)) as f:
+        for l in f:
+            if l.startswith(key + ":"):
+                return int(l.split()[1]) * 1024  # always in kB
+    raise ValueError("No %s in status of process %s" % (key, pid))
+
+
+def _get_backend_peak_rss():
+    """
+    return (None or int): the sum of the peak memory usage of all the processes
+      of the backend (in B), or None if it cannot be found.
+    """
+    total = 0
+    for cmdf in glob.glob("/proc/[0-9]*/cmdline"):
+        try:
+            with open(cmdf) as f:
+                cmdline = f.read()
+            if "odemisd" not in cmdline:
+                continue
+            total += _read_proc_status(cmdf.split("/")[2], "VmHWM")
+        except (IOError, ValueError):
+            continue  # The process might have disappeared
+    return total or None
+
+
+def _get_metrics(dur, npixels, ideal_dur, latency=None):
+    """
+    Compute the standard metrics of an acquisition
+    dur (float): duration of the acquisition (s)
+    npixels (int): number of pixels acquired
+    ideal_dur (float): duration of the acquisition by the hardware (s)
+    latency (None or float): delay before reception of the data (s)
+    return (dict str -> float): metrics
+    """
+    metrics = {"pixels_per_s": npixels / dur,
+               "overhead_per_pixel": (dur - ideal_dur) / npixels,
+               # On Linux, maxrss is in kB
+               "peak_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+               }
+    if latency is not None:
+        metrics["latency"] = latency
+    backend_rss = _get_backend_peak_rss()
+    if backend_rss is not None:
+        metrics["backend_peak_rss"] = backend_rss
+    return metrics
+
+
+def _get_readout_time(det, res):
+    """
+    return (float): time to read a frame of the detector (s)
+    """
+    if model.hasVA(det, "readoutRate"):
+        return numpy.prod(res) / det.readoutRate.value
+    return 0
+
+
+def _setup_ccd(ccd, binning, exp):
+    """
+    Configure a CCD for the acquisition of full frames
+    return (float): the ideal time for acquiring one frame (s)
+    """
+    if model.hasVA(ccd, "binning"):
+        ccd.binning.value = ccd.binning.clip(binning)
+        binning = ccd.binning.value
+    else:
+        binning = (1, 1)
+    ccd.resolution.value = ccd.resolution.clip((ccd.shape[0] // binning[0],
+                                                ccd.shape[1] // binning[1]))
+    ccd.exposureTime.value = ccd.exposureTime.clip(exp)
+    return ccd.exposureTime.value + _get_readout_time(ccd, ccd.resolution.value)
+
+
+@register("acq.SEMScan",
+          grid(res=[(512, 512), (2048, 2048)], dwellTime=[1e-6, 10e-6]),
+          [{"res": (512, 512), "dwellTime": 1e-6}])
+def bench_sem_scan(res, dwellTime):
+    """ SEM image acquisition """
+    ebeam = _get_component("e-beam")
+    sed = _get_component("se-detector")
+    sems = stream.SEMStream("bench sem", sed, sed.data, ebeam)
+
+    if model.hasVA(ebeam, "scale"):
+        ebeam.scale.value = ebeam.scale.clip((1, 1))
+    ebeam.resolution.value = ebeam.resolution.clip(res)
+    ebeam.dwellTime.value = ebeam.dwellTime.clip(dwellTime)
+
+    def acquire():
+        tstart = time.time()
+        data, exp = acq.acquire([sems]).result()
+        tend = time.time()
+        if exp:
+            raise exp
+
+        npixels = numpy.prod(data[0].shape)
+        ideal = npixels * ebeam.dwellTime.value
+        try:
+            latency = tend - (data[0].metadata[model.MD_ACQ_DATE] + ideal)
+        except KeyError:
+            latency = None
+        return _get_metrics(tend - tstart, npixels, ideal, latency)
+
+    return acquire
+
+
+@register("acq.CCDLive",
+          grid(binning=[(1, 1), (4, 4)], exposureTime=[0.01, 0.1]),
+          [{"binning": (4, 4), "exposureTime": 0.01}])
+def bench_ccd_live(binning, exposureTime, nframes=10):
+    """ Continuous acquisition of CCD images, as for the live view """
+    ccd = _get_component("ccd")
+    frame_dur = _setup_ccd(ccd, binning, exposureTime)
+
+    def acquire():
+        received = []  # time of reception, time of end of exposure
+        done = threading.Event()
+
+        def on_data(df, data):
+            tend_exp = data.metadata.get(model.MD_ACQ_DATE, 0) + ccd.exposureTime.value
+            received.append((time.time(), tend_exp))
+            if len(received) >= nframes:
+                done.set()
+
+        tstart = time.time()
+        ccd.data.subscribe(on_data)
+        try:
+            if not done.wait(10 + 2 * nframes * frame_dur):
+                raise IOError("Only received %d frames" % (len(received),))
+        finally:
+            ccd.data.unsubscribe(on_data)
+
+        tend = received[nframes - 1][0]
+        npixels = nframes * numpy.prod(ccd.resolution.value)
+        latency = numpy.mean([tr - te for tr, te in received[:nframes]])
+        return _get_metrics(tend - tstart, npixels, nframes * frame_dur, latency)
+
+    return acquire
+
+
+def _bench_sem_ccd_mdstream(mds, rep_det, rep_stream, repetition):
+    """
+    Prepare the benchmark of a multiple detector stream (SEM + CCD)
+    return (callable): the function running one acquisition
+    """
+    rep_stream.repetition.value = repetition
+
+    def acquire():
+        # The repetition can be adjusted to fit the ROI
+        nrep = numpy.prod(rep_stream.repetition.value)
+        ideal = nrep * (rep_det.exposureTime.value +
+                        _get_readout_time(rep_det, rep_det.resolution.value))
+
+        tstart = time.time()
+        data, exp = acq.acquire([mds]).result()
+        tend = time.time()
+        if exp:
+            raise exp
+        return _get_metrics(tend - tstart, nrep, ideal)
+
+    return acquire
+
+
+@register("acq.SEMSpectrumMDStream",
+          grid(repetition=[(4, 4), (16, 16), (64, 64)], exposureTime=[0.01, 0.1]),
+          [{"repetition": (4, 4), "exposureTime": 0.01}])
+def bench_sem_spectrum(repetition, exposureTime):
+    """ Spectrum cube acquisition """
+    ebeam = _get_component("e-beam")
+    sed = _get_component("se-detector")
+    spec = _get_component("spectrometer")
+    spec.exposureTime.value = spec.exposureTime.clip(exposureTime)
+
+    sems = stream.SEMStream("bench sem", sed, sed.data, ebeam)
+    specs = stream.SpectrumSettingsStream("bench spec", spec, spec.data, ebeam)
+    sps = stream.SEMSpectrumMDStream("bench sem-spec", sems, specs)
+    return _bench_sem_ccd_mdstream(sps, spec, specs, repetition)
+
+
+@register("acq.SEMARMDStream",
+          grid(repetition=[(2, 2), (4, 4), (8, 8)], binning=[(1, 1), (4, 4)]),
+          [{"repetition": (2, 2), "binning": (4, 4)}])
+def bench_sem_ar(repetition, binning):
+    """ Angle-resolved acquisition """
+    ebeam = _get_component("e-beam")
+    sed = _get_component("se-detector")
+    ccd = _get_component("ccd")
+    _setup_ccd(ccd, binning, 0.01)
+
+    sems = stream.SEMStream("bench sem", sed, sed.data, ebeam)
+    ars = stream.ARSettingsStream("bench ar", ccd, ccd.data, ebeam)
+    sas = stream.SEMARMDStream("bench sem-ar", sems, ars)
+    return _bench_sem_ccd_mdstream(sas, ccd, ars, repetition)
+
+
+@register("acq.MomentOfInertiaMDStream",
+          grid(repetition=[(9, 9), (25, 25)]),
+          [{"repetition": (9, 9)}])
+def bench_moi(repetition):
+    """ Moment of inertia acquisition, as used for the mirror alignment """
+    ebeam = _get_component("e-beam")
+    sed = _get_component("se-detector")
+    ccd = _get_component("ccd")
+    _setup_ccd(ccd, (4, 4), 0.01)
+
+    sems = stream.SEMStream("bench sem", sed, sed.data, ebeam)
+    ccds = stream.ARSettingsStream("bench ccd", ccd, ccd.data, ebeam)
+    mois = stream.MomentOfInertiaMDStream("bench moi", sems, ccds)
+    return _bench_sem_ccd_mdstream(mois, ccd, ccds, repetition)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the
+terms  of the GNU General Public License version 2 as published by the Free
+Software  Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY;  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR  PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+"""
+
+# Benchmarks of the actuator drivers, using their simulators. The simulator
+# can add a delay to each instruction, to reproduce the round-trip time of the
+# connection to a real controller.
+# Each move reports these metrics:
+#  * latency (s): time between the (simulated) end of the move of an axis and
+#    the end of its future, averaged over the axes.
+#  * instructions: number of instructions sent to the controller per move.
+
+from __future__ import division
+
+import atexit
+import numpy
+from odemis.bench import register, grid, SkipBenchmark
+import time
+
+
+@register("tmcm.moveRel",
+          grid(naxes=[1, 3], latency=[0, 1e-3, 5e-3]),
+          [{"naxes": 3, "latency": 1e-3}])
+def bench_tmcm_move(naxes, latency, dist=10e-6):
+    """ Simultaneous relative moves on several axes of a TMCM controller """
+    try:
+        from odemis.driver import tmcm
+    except ImportError as ex:
+        raise SkipBenchmark("TMCM driver not available: %s" % (ex,))
+
+    axes = ["x", "y", "z"][:naxes]
+    dev = tmcm.TMCLController("bench", "stage", port="/dev/fake3",
+                              axes=axes, ustepsize=[5.9e-9] * naxes)
+    atexit.register(dev.terminate)
+    sim = dev._serial
+    sim.latency = latency
+
+    # Count the instructions sent
+    ninst = [0]
+    sim_write = sim.write
+
+    def write(data):
+        ninst[0] += len(data) // 9
+        sim_write(data)
+
+    sim.write = write
+    direction = [1]
+
+    def move():
+        direction[0] = -direction[0]
+        ninst[0] = 0
+        ends = {}
+
+        def on_done(f, n):
+            ends[n] = time.time()
+
+        fs = []
+        for i, n in enumerate(axes):
+            f = dev.moveRel({n: direction[0] * dist})
+            f.add_done_callback(lambda f, n=n: on_done(f, n))
+            fs.append(f)
+        for f in fs:
+            f.result()
+
+        # Time at which the simulator considered the moves finished
+        latencies = [ends[n] - sim._axis_move[i][1] for i, n in enumerate(axes)]
+        return {"latency": float(numpy.mean(latencies)),
+                "instructions": ninst[0]}
+
+    return move
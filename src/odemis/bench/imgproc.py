@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the
+terms  of the GNU General Public License version 2 as published by the Free
+Software  Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY;  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR  PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+"""
+
+# Benchmarks of the image processing functions, which are used on every new
+# image displayed or analysed.
+
+from __future__ import division
+
+import numpy
+from odemis import model
+from odemis.acq.drift import calculation
+from odemis.bench import register, grid, SkipBenchmark
+from odemis.util import img, polar, spot, peak
+
+
+IMAGE_SHAPES = [(512, 512), (2048, 2048), (4096, 4096)]
+IMAGE_DTYPES = ["uint8", "uint16", "float64"]
+
+
+def synthetic_image(shape, dtype, nspots=20, seed=0):
+    """
+    Generate an image looking like a microscope image: a smooth background,
+     a few blurry spots and some noise.
+    shape (tuple of int): shape of the image. If more than 2 dimensions, the
+      image is repeated on the first dimensions, with a different intensity.
+    dtype (numpy.dtype): type of the data. Integer images use most of a 12
+      bits range (or all the 8 bits for uint8), floats are between 0 and 1.
+    nspots (int >= 0): number of spots
+    seed (int): seed of the random generator, to always get the same image
+    return (DataArray of shape and dtype)
+    """
+    rng = numpy.random.RandomState(seed)
+    h, w = shape[-2:]
+    y = numpy.linspace(0, 1, h)[:, numpy.newaxis]
+    x = numpy.linspace(0, 1, w)[numpy.newaxis, :]
+    im = 0.1 + 0.1 * x + 0.05 * y
+    for i in range(nspots):
+        cy, cx = rng.uniform(0, 1, 2)
+        sigma = rng.uniform(0.005, 0.05)
+        # Separable, to be fast even on very large images
+        gy = numpy.exp(-(y - cy) ** 2 / (2 * sigma ** 2))
+        gx = numpy.exp(-(x - cx) ** 2 / (2 * sigma ** 2))
+        im = im + rng.uniform(0.2, 0.7) * (gy * gx)
+    im += rng.normal(0, 0.02, size=(h, w))
+    numpy.clip(im, 0, 1, out=im)
+
+    if len(shape) > 2:
+        nim = int(numpy.prod(shape[:-2]))
+        factors = numpy.linspace(0.5, 1, nim).reshape(shape[:-2] + (1, 1))
+        im = im * factors
+
+    dtype = numpy.dtype(dtype)
+    if dtype.kind in "ui":
+        maxv = 255 if dtype.itemsize == 1 else 4095
+        im = (im * maxv).astype(dtype)
+    else:
+        im = im.astype(dtype)
+
+    return model.DataArray(im, {model.MD_PIXEL_SIZE: (1e-6, 1e-6),
+                                model.MD_POS: (0, 0)})
+
+
+def synthetic_spectrum(length, npeaks=3, seed=0):
+    """
+    Generate a spectrum with a few gaussian peaks over some noise
+    length (int): number of wavelengths
+    return (ndarray of float, ndarray of float): the intensities, and the
+      wavelengths (m)
+    """
+    rng = numpy.random.RandomState(seed)
+    wl = numpy.linspace(470e-9, 1030e-9, length)
+    spec = numpy.full(length, 100.0)
+    for i in range(npeaks):
+        pos = rng.uniform(520e-9, 980e-9)
+        width = rng.uniform(10e-9, 40e-9)
+        spec += rng.uniform(500, 2000) * numpy.exp(-(wl - pos) ** 2 / (2 * width ** 2))
+    spec += rng.normal(0, 20, length)
+    return spec, wl
+
+
+def synthetic_ar_image(shape):
+    """
+    Generate an angle-resolved image, with a bright disk around the pole
+    shape (int, int): shape of the image
+    return (DataArray of uint16): with the AR metadata
+    """
+    h, w = shape
+    binning = 1024 / w  # The sensor is 1024 px wide
+    data = synthetic_image(shape, "uint16", nspots=0)
+    pole = (w * 0.55, h * 0.5)
+    y, x = numpy.ogrid[0:h, 0:w]
+    r2 = ((x - pole[0]) ** 2 + (y - pole[1]) ** 2) / (w / 3) ** 2
+    data += (2000 * numpy.exp(-r2)).astype(numpy.uint16)
+    data.metadata[model.MD_AR_POLE] = pole
+    data.metadata[model.MD_PIXEL_SIZE] = (13e-6 * binning / 0.4917,) * 2
+    data.metadata[model.MD_AR_XMAX] = 13.25e-3
+    data.metadata[model.MD_AR_HOLE_DIAMETER] = 0.6e-3
+    data.metadata[model.MD_AR_FOCUS_DISTANCE] = 0.5e-3
+    data.metadata[model.MD_AR_PARABOLA_F] = 2.5e-3
+    return data
+
+
+@register("histogram",
+          grid(shape=IMAGE_SHAPES + [(128, 256, 256)], dtype=IMAGE_DTYPES),
+          grid(shape=IMAGE_SHAPES[:1], dtype=IMAGE_DTYPES))
+def bench_histogram(shape, dtype):
+    """ Histogram of an image (or spectrum cube) """
+    data = synthetic_image(shape, dtype)
+    return lambda: img.histogram(data)
+
+
+@register("findOptimalRange",
+          grid(dtype=IMAGE_DTYPES, outliers=[0, 1 / 256]),
+          grid(dtype=IMAGE_DTYPES[1:2], outliers=[1 / 256]))
+def bench_find_optimal_range(dtype, outliers):
+    """ Automatic brightness/contrast from the histogram """
+    data = synthetic_image((2048, 2048), dtype)
+    hist, edges = img.histogram(data)
+    return lambda: img.findOptimalRange(hist, edges, outliers)
+
+
+@register("DataArray2RGB",
+          grid(shape=IMAGE_SHAPES, dtype=IMAGE_DTYPES, fast=[True, False],
+               tint=[(255, 255, 255), (0, 255, 128)]),
+          grid(shape=IMAGE_SHAPES[:1], dtype=["uint16"], fast=[True, False],
+               tint=[(255, 255, 255)]))
+def bench_dataarray2rgb(shape, dtype, fast, tint):
+    """ Conversion of a greyscale image to RGB, with the optimised (cython) or Python version """
+    if fast:
+        if img.img_fast is None:
+            raise SkipBenchmark("img_fast module not available")
+        if dtype != "uint16":
+            raise SkipBenchmark("img_fast only supports uint16")
+    data = synthetic_image(shape, dtype)
+    # Same as the default brightness/contrast
+    hist, edges = img.histogram(data)
+    irange = img.findOptimalRange(hist, edges, 1 / 256)
+    tint = tuple(tint)  # To be exactly the same as white, it must be a tuple
+    img_fast = img.img_fast if fast else None
+
+    def convert():
+        orig_fast = img.img_fast
+        img.img_fast = img_fast
+        try:
+            img.DataArray2RGB(data, irange, tint)
+        finally:
+            img.img_fast = orig_fast
+
+    return convert
+
+
+@register("rescale_hq",
+          grid(shape=IMAGE_SHAPES[:2], dtype=IMAGE_DTYPES[:2], factor=[0.25, 2]),
+          grid(shape=IMAGE_SHAPES[:1], dtype=["uint16"], factor=[0.25]))
+def bench_rescale_hq(shape, dtype, factor):
+    """ Smooth resizing of an image """
+    data = synthetic_image(shape, dtype)
+    nshape = tuple(int(s * factor) for s in shape)
+    return lambda: img.rescale_hq(data, nshape)
+
+
+@register("AngleResolved2Polar",
+          grid(shape=[(256, 256), (512, 512), (1024, 1024)], output_size=[400, 1134]),
+          [{"shape": (256, 256), "output_size": 400}])
+def bench_ar_to_polar(shape, output_size):
+    """ Projection of an angle-resolved image """
+    data = synthetic_ar_image(shape)
+    data = polar.ARBackgroundSubtract(data)
+    return lambda: polar.AngleResolved2Polar(data, output_size, hole=False)
+
+
+@register("CalculateDrift",
+          grid(shape=[(128, 128), (512, 512), (2048, 2048)], precision=[1, 10]),
+          [{"shape": (128, 128), "precision": 10}])
+def bench_calculate_drift(shape, precision):
+    """ Drift estimation between two images """
+    data = synthetic_image((shape[0] + 8, shape[1] + 8), "uint16")
+    prev = data[:-8, :-8]
+    cur = data[3:-5, 5:-3]
+    return lambda: calculation.CalculateDrift(prev, cur, precision)
+
+
+@register("MomentOfInertia",
+          grid(shape=IMAGE_SHAPES[:2], dtype=IMAGE_DTYPES[:2]),
+          grid(shape=IMAGE_SHAPES[:1], dtype=["uint16"]))
+def bench_moment_of_inertia(shape, dtype):
+    """ Spot size estimation, as done during spot alignment """
+    data = synthetic_image(shape, dtype, nspots=1)
+    return lambda: spot.MomentOfInertia(data)
+
+
+@register("PeakFitter",
+          grid(length=[167, 1024], type=["gaussian", "lorentzian"]),
+          [{"length": 167, "type": "gaussian"}])
+def bench_peak_fitter(length, type):
+    """ Fitting of the peaks of a spectrum """
+    spec, wl = synthetic_spectrum(length)
+    fitter = peak.PeakFitter()
+    return lambda: fitter.Fit(spec, wl, type).result()
+
+
+@register("format_rgba_darray",
+          grid(shape=IMAGE_SHAPES, alpha=[None, 128]),
+          [{"shape": IMAGE_SHAPES[0], "alpha": None}])
+def bench_format_rgba_darray(shape, alpha):
+    """ Conversion of a RGB image to the format used by the canvas (BGRA) """
+    try:
+        from odemis.gui.util.img import format_rgba_darray
+    except ImportError as ex:
+        raise SkipBenchmark("GUI not available: %s" % (ex,))
+    rgb = img.DataArray2RGB(synthetic_image(shape, "uint8"), (0, 255))
+    rgb = model.DataArray(rgb)
+    return lambda: format_rgba_darray(rgb, alpha)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the
+terms  of the GNU General Public License version 2 as published by the Free
+Software  Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY;  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR  PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+"""
+
+# Benchmarks of the (remote) SEM drivers, using their simulators. The simulator
+# can add a delay to each command, to reproduce the round-trip time of the
+# connection to the SEM server.
+# Each acquisition reports these metrics:
+#  * pixels_per_s: number of pixels acquired per second.
+#  * overhead_per_pixel (s): the time spent per pixel in addition to the
+#    dwell time.
+#  * set_time (s): average time to change a setting (the field of view) while
+#    acquiring.
+
+from __future__ import division
+
+import atexit
+import numpy
+from odemis.bench import register, grid, SkipBenchmark
+import threading
+import time
+
+
+@register("tescan.acquire",
+          grid(res=[(256, 256), (1024, 1024)], latency=[0, 1e-3, 5e-3]),
+          [{"res": (256, 256), "latency": 1e-3}])
+def bench_tescan_acquire(res, latency, dwellTime=1e-6, nframes=5):
+    """ Live acquisition on a Tescan SEM, while changing the field of view """
+    try:
+        from odemis.driver import tescan
+    except ImportError as ex:
+        raise SkipBenchmark("Tescan driver not available: %s" % (ex,))
+
+    children = {"scanner": {"name": "scanner", "role": "ebeam",
+                            "fov_range": [196.e-9, 25586.e-6]},
+                "detector0": {"name": "sed", "role": "sed", "channel": 0, "detector": 0},
+                "stage": {"name": "stg", "role": "stage"},
+                "focus": {"name": "focus", "role": "focus", "axes": ["z"]},
+                }
+    sem = tescan.SEM("bench", "sem", children=children, host="fake")
+    atexit.register(sem.terminate)
+    sem._device.latency = latency
+    scanner = sem._scanner
+    det = sem._detectors["detector0"]
+    scanner.scale.value = (1, 1)
+    scanner.resolution.value = res
+    res = scanner.resolution.value
+    scanner.dwellTime.value = dwellTime
+    fov = scanner.horizontalFoV.value
+    fovs = (fov, fov / 2)
+
+    def acquire():
+        received = threading.Event()
+        nimages = [0]
+
+        def on_image(df, da):
+            nimages[0] += 1
+            if nimages[0] >= nframes:
+                received.set()
+
+        set_times = []
+        start = time.time()
+        det.data.subscribe(on_image)
+        try:
+            while not received.wait(0.01):
+                tset = time.time()
+                scanner.horizontalFoV.value = fovs[len(set_times) % 2]
+                set_times.append(time.time() - tset)
+        finally:
+            det.data.unsubscribe(on_image)
+        dur = time.time() - start
+
+        npx = nimages[0] * res[0] * res[1]
+        return {"pixels_per_s": npx / dur,
+                "overhead_per_pixel": (dur - npx * dwellTime) / npx,
+                "set_time": float(numpy.mean(set_times)) if set_times else 0,
+                }
+
+    return acquire
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the terms
+of the GNU General Public License version 2 as published by the Free Software
+Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+'''
+from __future__ import division
+
+import StringIO
+import logging
+import numpy
+from odemis import bench
+from odemis.bench import imgproc
+import unittest
+
+
+logging.getLogger().setLevel(logging.DEBUG)
+
+
+class TestBench(unittest.TestCase):
+
+    def test_grid(self):
+        params = bench.grid(b=[1, 2], a=["x", "y", "z"])
+        self.assertEqual(len(params), 6)
+        self.assertEqual(params[0], {"a": "x", "b": 1})
+        self.assertEqual(params[1], {"a": "x", "b": 2})
+
+    def test_measure(self):
+        calls = []
+        res = bench.measure(lambda: calls.append(1), repeat=3, min_time=0.01)
+        self.assertEqual(len(res["times"]), 3)
+        self.assertEqual(len(calls), 1 + 3 * res["number"])
+        self.assertLessEqual(res["min"], res["median"])
+        self.assertNotIn("metrics", res)
+
+        # Extra metrics returned by the function
+        values = iter(range(100))
+        res = bench.measure(lambda: {"speed": next(values)}, repeat=3, min_time=0)
+        self.assertEqual(res["number"], 1)
+        self.assertEqual(res["metrics"], {"speed": 2})  # first value is for warm up
+
+    def test_run_and_compare(self):
+        bench.load_all()
+        benchmarks = bench.get_benchmarks(["hist*", "findOptimalRange"])
+        self.assertEqual([b.name for b in benchmarks], ["histogram", "findOptimalRange"])
+
+        results = bench.run(benchmarks, repeat=1, min_time=0, quick=True)
+        self.assertEqual(len(results), len(benchmarks[0].quick_params) + len(benchmarks[1].quick_params))
+        for r in results:
+            self.assertNotIn("skipped", r)
+            self.assertGreater(r["min"], 0)
+
+        # Write and read back
+        f = StringIO.StringIO()
+        bench.write_results(f, results)
+        f.seek(0)
+        env, ref = bench.read_results(f)
+        self.assertIn("numpy", env)
+        self.assertEqual(len(ref), len(results))
+
+        # Same results => no regression
+        comp = bench.compare(results, ref)
+        self.assertEqual(len(comp), len(results))
+        for r, ratio, regression in comp:
+            self.assertAlmostEqual(ratio, 1)
+            self.assertFalse(regression)
+
+        # Twice faster reference => regression
+        for r in ref:
+            r["min"] /= 2
+        for r, ratio, regression in bench.compare(results, ref):
+            self.assertTrue(regression)
+
+    def test_synthetic(self):
+        im = imgproc.synthetic_image((64, 128), "uint16")
+        self.assertEqual(im.shape, (64, 128))
+        self.assertEqual(im.dtype, numpy.uint16)
+        self.assertLess(im.max(), 4096)
+        self.assertGreater(im.max(), im.min())
+
+        cube = imgproc.synthetic_image((3, 64, 128), "float64")
+        self.assertEqual(cube.shape, (3, 64, 128))
+
+        spec, wl = imgproc.synthetic_spectrum(100)
+        self.assertEqual(spec.shape, wl.shape)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -34,11 +34,11 @@ import logging
 import numbers
 from odemis import model, dataio, util
 import odemis
-from odemis.cli.video_displayer import VideoDisplayer
 from odemis.util import units
 from odemis.util.conversion import convert_to_object
 from odemis.util.driver import BACKEND_RUNNING, \
     BACKEND_DEAD, BACKEND_STOPPED, get_backend_status, BACKEND_STARTING
+from odemis.util.startup import StartupProfiler
 import sys
 import threading
 
@@ -721,6 +721,8 @@ def live_display(comp_name, df_name):
         size = (512, 512)
 
     # create a window
+    # only here, as it needs wx and scipy, which are slow to load
+    from odemis.cli.video_displayer import VideoDisplayer
     window = VideoDisplayer("Live from %s.%s" % (comp_name, df_name), size)
 
     # update the picture and wait
@@ -768,6 +770,9 @@ def main(args):
                          default=0, help="set verbosity level (0-2, default = 0)")
     opt_grp.add_argument("--machine", dest="machine", action="store_true", default=False,
                          help="display in a machine-friendly way (i.e., no pretty printing)")
+    opt_grp.add_argument("--profile-startup", dest="profile", action="store_true", default=False,
+                         help="report the time taken to import each module and "
+                         "to run the command")
     dm_grp = parser.add_argument_group('Microscope management')
     dm_grpe = dm_grp.add_mutually_exclusive_group()
     dm_grpe.add_argument("--kill", "-k", dest="kill", action="store_true", default=False,
@@ -819,6 +824,12 @@ def main(args):
 
     options = parser.parse_args(args[1:])
 
+    if options.profile:
+        profiler = StartupProfiler()
+        profiler.install_import_hook()
+    else:
+        profiler = None
+
     # To allow printing unicode even with pipes
     ensure_output_encoding()
 
@@ -954,6 +965,11 @@ def main(args):
     except Exception:
         logging.exception("Unexpected error while performing action.")
         return 130
+    finally:
+        if profiler:
+            profiler.remove_import_hook()
+            # On stderr, to not mix it with the output of the command
+            sys.stderr.write(profiler.report() + "\n")
 
     return 0
 
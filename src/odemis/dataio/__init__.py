@@ -25,7 +25,6 @@ from __future__ import division
 # for listing all the types of file format supported
 import importlib
 import logging
-from odemis.dataio import tiff
 import os
 
 
@@ -98,12 +97,13 @@ def get_converter(fmt):
     raise ValueError("No converter for format %s found" % fmt)
 
 
-def find_fittest_converter(filename, default=tiff, mode=os.O_WRONLY, allowlossy=False):
+def find_fittest_converter(filename, default="tiff", mode=os.O_WRONLY, allowlossy=False):
     """
     Find the most fitting exporter according to a filename (actually, its extension)
     filename (string): (path +) filename with extension
-    default (dataio. Module): default exporter to pick if no really fitting
-      exporter is found
+    default (dataio. Module or str or None): default exporter to pick if no
+      really fitting exporter is found. If it's a string, it's the name of the
+      module in dataio (which is only loaded if needed).
     mode: cf get_available_formats()
     allowlossy: cf get_available_formats()
     returns (dataio. Module): the right exporter
@@ -126,6 +126,8 @@ def find_fittest_converter(filename, default=tiff, mode=os.O_WRONLY, allowlossy=
         logging.debug("Determined that '%s' corresponds to %s format",
                       basename, best_fmt)
         conv = get_converter(best_fmt)
+    elif isinstance(default, basestring):
+        conv = importlib.import_module("." + default, "odemis.dataio")
     else:
         conv = default
 
@@ -21,7 +21,6 @@ import logging
 from odemis import model
 from odemis.util import img
 import os
-import scipy
 
 
 FORMAT = "PNG"
@@ -57,6 +56,7 @@ def _saveAsPNG(filename, data):
         rgb8 = img.DataArray2RGB(data, irange)
 
     # save to file
+    import scipy.misc  # only needed to write the file, and it loads a large part of scipy
     scipy.misc.imsave(filename, rgb8)
 
 def export(filename, data, thumbnail=None):
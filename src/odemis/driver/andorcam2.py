@@ -32,6 +32,7 @@ import numpy
 from odemis import model, util, dataio
 from odemis.model import HwError
 from odemis.util import img
+from odemis.util.driver import SequenceBuffer
 import os
 import random
 import threading
@@ -525,6 +526,7 @@ class AndorCam2(model.DigitalCamera):
             self._setFanSpeed(1.0, force=True)
 
         self._binning = (1, 1) # px, horizontal, vertical
+        self._translation = (0, 0) # px, shift of the centre of the ROI
         self._image_rect = (1, resolution[0], 1, resolution[1])
         if resolution[1] == 1:
             # If limit is obvious, indicate it via the VA range
@@ -544,6 +546,22 @@ class AndorCam2(model.DigitalCamera):
                                            self._transposeSizeToUser(maxbin)),
                                           setter=self._setBinning)
 
+        # translation is automatically adjusted to fit whenever res/bin change
+        if self.GetCapabilities().ReadModes & AndorCapabilities.READMODE_SUBIMAGE:
+            # Support ROI anywhere => provide translation
+            # With a ROI of 1 px, it can be shifted up to the first and last pixel
+            hlf_shape = (self._shape[0] // 2, self._shape[1] // 2)
+            uh_shape = self._transposeSizeToUser(hlf_shape)
+            tran_rng = ((-uh_shape[0], -uh_shape[1]),
+                        (uh_shape[0], uh_shape[1]))
+            self.translation = model.ResolutionVA((0, 0), tran_rng,
+                                                  cls=(int, long), unit="px",
+                                                  setter=self._setTranslation)
+        else:
+            # to keep it simple, provide a translation VA but fixed to 0,0
+            self.translation = model.VigilantAttribute((0, 0), unit="px",
+                                                       readonly=True)
+
         # default values try to get live microscopy imaging more likely to show something
         maxexp = c_float()
         self.atcore.GetMaximumExposure(byref(maxexp))
@@ -623,8 +641,8 @@ class AndorCam2(model.DigitalCamera):
         current_temp = self.GetTemperature()
         self.temperature = model.FloatVA(current_temp, unit=u"°C", readonly=True)
         self._metadata[model.MD_SENSOR_TEMP] = current_temp
-        self.temp_timer = util.RepeatingTimer(10, self.updateTemperatureVA,
-                                              "AndorCam2 temperature update")
+        self.temp_timer = util.PeriodicTask(10, self.updateTemperatureVA,
+                                            "AndorCam2 temperature update")
         self.temp_timer.start()
 
         self.acquisition_lock = threading.Lock()
@@ -641,11 +659,18 @@ class AndorCam2(model.DigitalCamera):
         self._got_event = threading.Event()
         self._late_events = collections.deque() # events which haven't been handled yet
         self._ready_for_acq_start = False
+        self._seq_armed = False  # True if the camera waits for software triggers
 
         self.data = AndorCam2DataFlow(self)
         # Convenience event for the user to connect and fire
         self.softwareTrigger = model.Event()
 
+        # When synchronized, the camera can be armed for a whole sequence of
+        # frames (kinetic series), and each event just triggers the next frame.
+        # 1 means each frame is a separate acquisition.
+        if self.IsTriggerModeAvailable(10):  # 10 = software trigger
+            self.sequenceLength = model.IntContinuous(1, (1, 1000000), unit="")
+
         logging.debug("Camera component ready to use.")
 
     def _setStaticSettings(self):
@@ -791,7 +816,7 @@ class AndorCam2(model.DigitalCamera):
         self._setTargetTemperature(self.targetTemperature.value, force=True)
         self._setFanSpeed(self.fanSpeed.value, force=True)
 
-        self.temp_timer = util.RepeatingTimer(10, self.updateTemperatureVA,
+        self.temp_timer = util.PeriodicTask(10, self.updateTemperatureVA,
                                          "AndorCam2 temperature update")
         self.temp_timer.start()
 
@@ -970,6 +995,22 @@ class AndorCam2(model.DigitalCamera):
 
         return driver_str.value, sdk_str.value
 
+    def IsTriggerModeAvailable(self, mode):
+        """
+        mode (int): trigger mode
+        returns (bool): True if the camera supports the trigger mode
+        """
+        try:
+            self.atcore.IsTriggerModeAvailable(mode)
+        except AttributeError:
+            # Old SDK which doesn't have the function
+            return False
+        except AndorV2Error as exp:
+            if exp.errno == 20095:  # DRV_INVALID_TRIGGER_MODE
+                return False
+            raise
+        return True
+
     def WaitForAcquisition(self, timeout=None):
         """
         timeout (float or None): maximum time to wait in second (None for infinite)
@@ -1343,9 +1384,9 @@ class AndorCam2(model.DigitalCamera):
         """
         Check the size is correct (it should) and store it ready for SetImage
         size (2-tuple int): Width and height of the image. It will be centred
-         on the captor. It depends on the binning, so the same region has a size
-         twice smaller if the binning is 2 instead of 1. It must be a allowed
-         resolution.
+         on the captor, shifted by the translation. It depends on the binning,
+         so the same region has a size twice smaller if the binning is 2 instead
+         of 1. It must be a allowed resolution.
         """
         full_res = self._shape[:2]
         resolution = full_res[0] // self._binning[0], full_res[1] // self._binning[1]
@@ -1362,19 +1403,71 @@ class AndorCam2(model.DigitalCamera):
             return
 
         # Region of interest
-        # center the image
-        lt = ((resolution[0] - size[0]) // 2, (resolution[1] - size[1]) // 2)
+        # center the image (in normal pixels), and shift it by the translation,
+        # while staying within the sensor
+        lt = [max(0, min((fr - s * b) // 2 + t, fr - s * b))
+              for fr, s, b, t in zip(full_res, size, self._binning,
+                                     self._translation)]
 
         # the rectangle is defined in normal pixels (not super-pixels) from (1,1)
-        self._image_rect = (lt[0] * self._binning[0] + 1, (lt[0] + size[0]) * self._binning[0],
-                            lt[1] * self._binning[1] + 1, (lt[1] + size[1]) * self._binning[1])
+        self._image_rect = (lt[0] + 1, lt[0] + size[0] * self._binning[0],
+                            lt[1] + 1, lt[1] + size[1] * self._binning[1])
 
     def _setResolution(self, value):
         value = self._transposeSizeFromUser(value)
         new_res = self.resolutionFitter(value)
         self._storeSize(new_res)
+        if model.hasVA(self, "translation") and not self.translation.readonly:
+            self.translation.value = self.translation.value  # force re-check
         return self._transposeSizeToUser(new_res)
 
+    def _setTranslation(self, value):
+        """
+        value (int, int): shift from the center. It will always ensure that
+          the whole ROI fits the sensor.
+        returns actual shift accepted
+        """
+        value = self._transposeTransFromUser(value)
+        rect = self._image_rect
+        roi_size = (rect[1] - rect[0] + 1, rect[3] - rect[2] + 1)
+        # compute the min/max of the shift. It's the same as the margin between
+        # the centered ROI and the border, taking into account the binning.
+        # If the margin is odd, the ROI is centred towards the top-left, so
+        # the shift can be one pixel more to the bottom-right.
+        margin = (self._shape[0] - roi_size[0], self._shape[1] - roi_size[1])
+        min_tran = (-(margin[0] // 2), -(margin[1] // 2))
+        max_tran = (margin[0] - margin[0] // 2, margin[1] - margin[1] // 2)
+
+        # between -margin and +margin
+        trans = (max(min_tran[0], min(value[0], max_tran[0])),
+                 max(min_tran[1], min(value[1], max_tran[1])))
+        self._translation = trans
+        self._storeSize((roi_size[0] // self._binning[0],
+                         roi_size[1] // self._binning[1]))
+        return self._transposeTransToUser(trans)
+
+    def _getPhysTrans(self):
+        """
+        Compute the translation in physical units (using the available metadata).
+        Note: the convention is that in internal coordinates Y goes down, while
+        in physical coordinates, Y goes up.
+        returns (tuple of 2 floats): physical position in meters
+        """
+        try:
+            pxs = self._metadata[model.MD_PIXEL_SIZE]
+            # take into account correction
+            pxs_cor = self._metadata.get(model.MD_PIXEL_SIZE_COR, (1, 1))
+            pxs = (pxs[0] * pxs_cor[0], pxs[1] * pxs_cor[1])
+        except KeyError:
+            pxs = self._metadata[model.MD_SENSOR_PIXEL_SIZE]
+
+        trans = self.translation.value # use user transposed value, as it's external world
+        # subtract 0.5 px if the resolution is a odd number
+        shift = [t - (r % 2) / 2 for t, r in zip(trans, self.resolution.value)]
+        phyt = (shift[0] * pxs[0], -shift[1] * pxs[1]) # - to invert Y
+
+        return phyt
+
     def resolutionFitter(self, size_req):
         """
         Finds a resolution allowed by the camera which fits best the requested
@@ -1625,6 +1718,9 @@ class AndorCam2(model.DigitalCamera):
             self._prev_settings[1] = None # 1 => exposure time
             size = self._update_settings()
             metadata = dict(self._metadata) # duplicate
+            center = metadata.get(model.MD_POS, (0, 0))
+            phyt = self._getPhysTrans()
+            metadata[model.MD_POS] = (center[0] + phyt[0], center[1] + phyt[1])
 
             # Acquire the image
             self.atcore.StartAcquisition()
@@ -1660,7 +1756,11 @@ class AndorCam2(model.DigitalCamera):
         assert(self.GetStatus() == AndorV2DLL.DRV_IDLE) # Just to be sure
 
         # Set up thread
-        if self.data._sync_event:
+        if (self.data._sync_event and hasattr(self, "sequenceLength") and
+            self.sequenceLength.value > 1):
+            # synchronized acquisition of several frames in a row
+            target = self._acquire_thread_sequence
+        elif self.data._sync_event:
             # need synchronized acquisition
             target = self._acquire_thread_synchronized
         else:
@@ -1706,6 +1806,7 @@ class AndorCam2(model.DigitalCamera):
                     # Seems exposure needs to be re-set after setting acquisition mode
                     self._prev_settings[1] = None # 1 => exposure time
                     size = self._update_settings()
+                    phyt = self._getPhysTrans()
                     if not has_hw_lock:
                         self.hw_lock.acquire()
                         has_hw_lock = True
@@ -1720,6 +1821,8 @@ class AndorCam2(model.DigitalCamera):
 
                 # Acquire the images
                 metadata = dict(self._metadata) # duplicate
+                center = metadata.get(model.MD_POS, (0, 0))
+                metadata[model.MD_POS] = (center[0] + phyt[0], center[1] + phyt[1])
                 tstart = time.time()
                 tend = tstart + duration
                 metadata[model.MD_ACQ_DATE] = tstart # time at the beginning
@@ -1839,6 +1942,7 @@ class AndorCam2(model.DigitalCamera):
                     # Seems exposure needs to be re-set after setting acquisition mode
                     self._prev_settings[1] = None # 1 => exposure time
                     size = self._update_settings()
+                    phyt = self._getPhysTrans()
 
                     exposure, accumulate, kinetic = self.GetAcquisitionTimings()
                     logging.debug("Accumulate time = %f, kinetic = %f", accumulate, kinetic)
@@ -1853,6 +1957,8 @@ class AndorCam2(model.DigitalCamera):
                 tstart = time.time()
                 tend = tstart + duration
                 metadata = dict(self._metadata) # duplicate
+                center = metadata.get(model.MD_POS, (0, 0))
+                metadata[model.MD_POS] = (center[0] + phyt[0], center[1] + phyt[1])
                 metadata[model.MD_ACQ_DATE] = tstart
                 cbuffer = self._allocate_buffer(size)
                 array = self._buffer_as_array(cbuffer, size, metadata)
@@ -1940,27 +2046,178 @@ class AndorCam2(model.DigitalCamera):
             logging.debug("Acquisition thread closed")
             self.acquire_must_stop.clear()
 
+    def _acquire_thread_sequence(self, callback):
+        """
+        The core of the acquisition thread. Runs until acquire_must_stop is set.
+        Version for synchronized acquisition, with the camera armed for a
+        sequence of sequenceLength frames (kinetic series). Each event only
+        sends a software trigger, and the frames are read into memory allocated
+        in advance, so the overhead per frame is close to the readout time.
+        When the sequence is over, the camera is armed again.
+        """
+        need_reinit = True
+        failures = 0
+        num_gc = 0
+        seqbuf = None
+        try:
+            while not self.acquire_must_stop.is_set():
+                if need_reinit or self._need_update_settings() or seqbuf.remaining == 0:
+                    try:
+                        if self.GetStatus() == AndorV2DLL.DRV_ACQUIRING:
+                            self.atcore.AbortAcquisition()
+                    except AndorV2Error as (errno, strerr):
+                        # it was already aborted
+                        if errno != 20073: # DRV_IDLE
+                            raise
+                    self._seq_armed = False
+                    nframes = self.sequenceLength.value
+                    self.atcore.SetAcquisitionMode(3)  # 3 = Kinetics
+                    self.atcore.SetNumberKinetics(nframes)
+                    self.atcore.SetTriggerMode(10)  # 10 = Software trigger
+                    # Seems exposure needs to be re-set after setting acquisition mode
+                    self._prev_settings[1] = None # 1 => exposure time
+                    size = self._update_settings()
+                    phyt = self._getPhysTrans()
+
+                    exposure, accumulate, kinetic = self.GetAcquisitionTimings()
+                    logging.debug("Accumulate time = %f, kinetic = %f", accumulate, kinetic)
+                    readout = size[0] * size[1] * self._metadata[model.MD_READOUT_TIME] # s
+                    duration = max(accumulate, exposure + readout)
+                    seqbuf = SequenceBuffer(nframes, (size[1], size[0]), numpy.uint16)
+
+                    # Arm the camera: it now only waits for the triggers
+                    self.atcore.StartAcquisition()
+                    self._seq_armed = True
+                    logging.debug("Armed for a sequence of %d frames", nframes)
+                    need_reinit = False
+
+                # Acquire the images
+                self._start_acquisition()
+                tstart = time.time()
+                tend = tstart + duration
+                metadata = dict(self._metadata) # duplicate
+                center = metadata.get(model.MD_POS, (0, 0))
+                metadata[model.MD_POS] = (center[0] + phyt[0], center[1] + phyt[1])
+                metadata[model.MD_ACQ_DATE] = tstart
+                frame = seqbuf.get()
+
+                # first we wait ourselves the typical time (which might be very long)
+                # while detecting requests for stop
+                if self.acquire_must_stop.wait(max(0, duration - 0.1)):
+                    raise CancelledError()
+
+                # then wait a bounded time to ensure the image is acquired
+                try:
+                    while True:
+                        # cancelled by the user?
+                        if self.acquire_must_stop.is_set():
+                            raise CancelledError()
+
+                        # we actually _expect_ a timeout
+                        try:
+                            self.WaitForAcquisition(0.1)
+                        except AndorV2Error as (errno, strerr):
+                            if errno == 20024: # DRV_NO_NEW_DATA
+                                if time.time() > tend + 1:
+                                    raise # seems actually serious
+                                else:
+                                    pass
+                        else:
+                            break # new image!
+
+                    # Each trigger produces one frame => the oldest one is the
+                    # frame of this trigger
+                    self.atcore.GetOldestImage16(frame.ctypes.data_as(POINTER(c_uint16)),
+                                                 c_uint32(frame.size))
+                except AndorV2Error as (errno, strerr):
+                    # try again up to 5 times
+                    failures += 1
+                    if failures >= 5:
+                        raise
+                    try:
+                        self.atcore.CancelWait()
+                    except AndorV2Error:
+                        pass
+                    time.sleep(0.1)
+                    logging.warning("trying again to acquire image after error %s", strerr)
+                    need_reinit = True
+                    continue
+                else:
+                    failures = 0
+
+                logging.debug("image acquired successfully after %g s", time.time() - tstart)
+                array = model.DataArray(frame, metadata)
+                callback(self._transposeDAToUser(array))
+                del frame, array
+
+                # The memory is allocated by blocks, so the GC doesn't need to
+                # run after every frame
+                num_gc += 1
+                if num_gc >= 10:
+                    gc.collect()
+                    num_gc = 0
+        except CancelledError:
+            # received a must-stop event
+            pass
+        except Exception:
+            logging.exception("Failure during acquisition")
+        finally:
+            # ending cleanly
+            self._seq_armed = False
+            try:
+                if self.GetStatus() == AndorV2DLL.DRV_ACQUIRING:
+                    self.atcore.AbortAcquisition()
+            except AndorV2Error as (errno, strerr):
+                # it was already aborted
+                if errno != 20073: # DRV_IDLE
+                    self.acquisition_lock.release()
+                    logging.debug("Acquisition thread closed after giving up")
+                    self.acquire_must_stop.clear()
+                    raise
+            try:
+                # Other acquisition modes expect the internal trigger
+                self.atcore.SetTriggerMode(0)  # 0 = internal
+            except AndorV2Error:
+                logging.exception("Failed to reset the trigger mode")
+            self.atcore.FreeInternalMemory() # TODO not sure it's needed
+            self.acquisition_lock.release()
+            gc.collect()
+            logging.debug("Acquisition thread closed")
+            self.acquire_must_stop.clear()
+
+    def _triggerAcquisition(self):
+        """
+        Starts the acquisition of one frame: if the camera is armed for a
+         sequence, it's just a software trigger, otherwise it's a whole new
+         acquisition.
+        """
+        if self._seq_armed:
+            self.atcore.SendSoftwareTrigger()
+        else:
+            self.atcore.StartAcquisition()
+
     def _start_acquisition(self):
         """
         Triggers the start of the acquisition on the camera. If the DataFlow
          is synchronized, wait for the Event to be triggered.
         raises CancelledError if the acquisition must stop
         """
-        # catch up late events if we missed the start
-        if self._late_events:
-            event_time = self._late_events.popleft()
-            logging.warning("starting acquisition late by %g s", time.time() - event_time)
-            self.atcore.StartAcquisition()
-            return
-
         self._ready_for_acq_start = True
         try:
             # wait until onEvent was called (it will directly start acquisition)
             # or must stop
             while not self.acquire_must_stop.is_set():
+                # catch up late events if we missed the start (checked in the
+                # loop, as onEvent() runs in a separate thread and might queue
+                # the event just after we got ready)
+                if self._late_events:
+                    event_time = self._late_events.popleft()
+                    logging.warning("starting acquisition late by %g s", time.time() - event_time)
+                    self._triggerAcquisition()
+                    return
                 if not self.data._sync_event: # not synchronized (anymore)?
                     logging.debug("starting acquisition")
-                    self.atcore.StartAcquisition()
+                    self._triggerAcquisition()
                     return
                 # doesn't need to be very frequent, just not too long to delay
                 # cancelling the acquisition, and to check for the event frequently
@@ -1986,7 +2243,7 @@ class AndorCam2(model.DigitalCamera):
             return
 
         logging.debug("starting sync acquisition")
-        self.atcore.StartAcquisition()
+        self._triggerAcquisition()
         self._got_event.set() # let the acquisition thread know it's starting
 
     def req_stop_flow(self):
@@ -2331,6 +2588,12 @@ class FakeAndorV2DLL(object):
         self.acq_end = None
         self.acq_aborted = threading.Event()
 
+        # For the software trigger mode
+        self.nkinetics = 1  # number of frames in the kinetic series
+        self.triggered = collections.deque()  # end time of the frames triggered
+        self.frames_ready = 0  # number of frames acquired, but not yet read
+        self.frames_done = 0  # number of frames acquired in the kinetic series
+
     def Initialize(self, path):
         if not os.path.isdir(path):
             logging.warning("Trying to inialise simulator with an incorrect path: %s",
@@ -2537,16 +2800,26 @@ class FakeAndorV2DLL(object):
 
     def SetTriggerMode(self, mode):
         # 0 = internal
+        # 10 = software trigger
         if _val(mode) > 12:
             raise AndorV2Error()
-        if _val(mode) != 0:
+        if _val(mode) not in (0, 10):
             raise NotImplementedError()
+        self.triggermode = _val(mode)
+
+    def IsTriggerModeAvailable(self, mode):
+        if _val(mode) not in (0, 10):
+            raise AndorV2Error(20095, "DRV_INVALID_TRIGGER_MODE")
 
     def SetAcquisitionMode(self, mode):
         # 1 = Single scan
+        # 3 = Kinetics (only with software trigger)
         # 5 = Run till abort
         self.acqmode = _val(mode)
 
+    def SetNumberKinetics(self, n):
+        self.nkinetics = _val(n)
+
     def SetKineticCycleTime(self, t):
         self.kinetic = _val(t)
 
@@ -2575,12 +2848,50 @@ class FakeAndorV2DLL(object):
 
     def StartAcquisition(self):
         self.status = AndorV2DLL.DRV_ACQUIRING
+        if self.triggermode == 10:
+            # Waits for the triggers
+            self.triggered.clear()
+            self.frames_ready = 0
+            self.frames_done = 0
+            return
+
         duration = self.exposure + self._getReadout()
         self.acq_end = time.time() + duration
 #         if random.randint(0, 10) == 0:  # DEBUG
 #             self.acq_end += 15
 
+    def SendSoftwareTrigger(self):
+        if self.triggermode != 10 or self.status != AndorV2DLL.DRV_ACQUIRING:
+            raise AndorV2Error(20073, "DRV_IDLE, not waiting for a trigger")
+        duration = self.exposure + self._getReadout()
+        self.triggered.append(time.time() + duration)
+
+    def _WaitForTriggeredFrame(self, timeout=None):
+        if self.triggered:
+            left = self.triggered[0] - time.time()
+            if timeout is None:
+                timeout = left
+            timeout = max(0.001, min(timeout, left))
+        try:
+            must_stop = self.acq_aborted.wait(timeout)
+            if must_stop:
+                raise AndorV2Error(20024, "No new data, simulated acquistion aborted")
+
+            if not self.triggered or time.time() < self.triggered[0]:
+                raise AndorV2Error(20024, "No new data, simulated acquisition waiting for trigger")
+
+            self.triggered.popleft()
+            self.frames_ready += 1
+            self.frames_done += 1
+            if self.acqmode == 3 and self.frames_done >= self.nkinetics:
+                self.status = AndorV2DLL.DRV_IDLE
+        finally:
+            self.acq_aborted.clear()
+
     def _WaitForAcquisition(self, timeout=None):
+        if self.triggermode == 10:
+            return self._WaitForTriggeredFrame(timeout)
+
         left = self.acq_end - time.time()
         if timeout is None:
             timeout = left
@@ -2613,8 +2924,15 @@ class FakeAndorV2DLL(object):
 
     def AbortAcquisition(self):
         self.status = AndorV2DLL.DRV_IDLE
+        self.triggered.clear()
         self.acq_aborted.set()
 
+    def GetOldestImage16(self, cbuffer, size):
+        if self.frames_ready <= 0:
+            raise AndorV2Error(20024, "No new data")
+        self.frames_ready -= 1
+        self.GetMostRecentImage16(cbuffer, size)
+
     def GetMostRecentImage16(self, cbuffer, size):
         p = cast(cbuffer, POINTER(c_uint16))
         res = ((self.roi[1] - self.roi[0] + 1) // self.binning[0],
@@ -380,7 +380,7 @@ class AndorCam3(model.DigitalCamera):
         current_temp = self.GetFloat(u"SensorTemperature")
         self.temperature = model.FloatVA(current_temp, unit=u"°C", readonly=True)
         self._metadata[model.MD_SENSOR_TEMP] = current_temp
-        self.temp_timer = util.RepeatingTimer(10, self.updateTemperatureVA,
+        self.temp_timer = util.PeriodicTask(10, self.updateTemperatureVA,
                                          "AndorCam3 temperature update")
         self.temp_timer.start()
 
@@ -396,6 +396,11 @@ class AndorCam3(model.DigitalCamera):
             # Convenience event for the user to connect and fire
             # Also a way to indicate to the DataFlow it's synchronisable
             self.softwareTrigger = model.Event()
+            # Number of frames acquired in a row when synchronised: as many
+            # buffers are queued in advance (up to MAX_SEQ_BUFFERS), so that the
+            # camera never waits for the buffer of the next trigger.
+            # Taken into account at the next start of the acquisition.
+            self.sequenceLength = model.IntContinuous(1, (1, 1000000), unit="")
 
         self._SetStaticSettings()
 
@@ -1422,6 +1427,7 @@ class AndorCam3(model.DigitalCamera):
         self.acquire_thread.start()
 
     GC_PERIOD = 10 # how often the garbage collector should run (in number of buffers)
+    MAX_SEQ_BUFFERS = 16  # maximum number of buffers queued for a sequence
     def _acquire_thread_run(self, callback):
         """
         The core of the acquisition thread. Runs until acquire_must_stop is True.
@@ -1454,8 +1460,12 @@ class AndorCam3(model.DigitalCamera):
                         # about all the data (and so don't want to discard it).
                         # TODO: new API on the dataflow to explicitly indicate that?
                         max_discard = 0
+                        # Pre-arm for the sequence
+                        nbuffers = max(2, min(self.sequenceLength.value,
+                                              self.MAX_SEQ_BUFFERS))
                     else:
                         max_discard = 8
+                        nbuffers = 2
                     exposure_time = self._exp_time
                     if self.isImplemented(u"ReadoutTime"):
                         readout_time = self.GetFloat(u"ReadoutTime")
@@ -167,8 +167,8 @@ class LLE(model.Emitter):
         # Update temperature every 10s
         current_temp = self.GetTemperature()
         self.temperature = model.FloatVA(current_temp, unit=u"°C", readonly=True)
-        self._temp_timer = util.RepeatingTimer(10, self._updateTemperature,
-                                               "LLE temperature update")
+        self._temp_timer = util.PeriodicTask(10, self._updateTemperature,
+                                             "LLE temperature update")
         self._temp_timer.start()
 
     def _sendCommand(self, com):
@@ -223,6 +223,10 @@ class SEM(model.HwComponent):
         # Lock in order to synchronize all the child component functions
         # that acquire data from the SEM while we continuously acquire images
         self._acq_progress_lock = threading.Lock()
+        # The settings changed via the VAs are sent from this queue, so that
+        # the caller doesn't wait for the image being downloaded, and only the
+        # latest value of a setting is sent.
+        self._requests = util.RequestQueue("Phenom requests", lock=self._acq_progress_lock)
 
         self._imagingDevice = self._objects.create('ns0:imagingDevice')
 
@@ -296,6 +300,7 @@ class SEM(model.HwComponent):
         self._navcam.terminate()
         self._navcam_focus.terminate()
         self._pressure.terminate()
+        self._requests.shutdown()
 
 
 class Scanner(model.Emitter):
@@ -496,10 +501,15 @@ class Scanner(model.Emitter):
         return new_dt
 
     def _onRotation(self, rot):
-        with self.parent._acq_progress_lock:
-            self.parent._device.SetSEMRotation(-rot)
+        self.parent._requests.submit_coalesced("rotation", self._applyRotation, rot)
+
+    def _applyRotation(self, rot):
+        self.parent._device.SetSEMRotation(-rot)
 
     def _onVoltage(self, volt):
+        self.parent._requests.submit_coalesced("voltage", self._applyVoltage, volt)
+
+    def _applyVoltage(self, volt):
         # When we change voltage while SEM stream is off
         # beam is unblanked. Thus we keep and reset the
         # last known source tilt
@@ -640,12 +650,14 @@ class Scanner(model.Emitter):
         return value
 
     def _onShift(self, shift):
+        self.parent._requests.submit_coalesced("shift", self._applyShift, shift)
+
+    def _applyShift(self, shift):
         beamShift = self.parent._objects.create('ns0:position')
-        with self.parent._acq_progress_lock:
-            new_shift = (shift[0], shift[1])
-            beamShift.x, beamShift.y = new_shift[0], new_shift[1]
-            logging.debug("EBeam shifted by %s m,m", new_shift)
-            self.parent._device.SetSEMImageShift(beamShift, True)
+        new_shift = (shift[0], shift[1])
+        beamShift.x, beamShift.y = new_shift[0], new_shift[1]
+        logging.debug("EBeam shifted by %s m,m", new_shift)
+        self.parent._device.SetSEMImageShift(beamShift, True)
 
     def _setShift(self, value):
         """
@@ -796,20 +808,24 @@ class Detector(model.Detector):
         return value
 
     def _onContrast(self, value):
-        with self.parent._acq_progress_lock:
-            # Actual range in Phenom is (0,4]
-            contr = numpy.clip(4 * value, 0.00001, 4)
-            try:
-                self.parent._device.SetSEMContrast(contr)
-            except suds.WebFault:
-                logging.debug("Setting SEM contrast may be unsuccesful")
+        self.parent._requests.submit_coalesced("contrast", self._applyContrast, value)
+
+    def _applyContrast(self, value):
+        # Actual range in Phenom is (0,4]
+        contr = numpy.clip(4 * value, 0.00001, 4)
+        try:
+            self.parent._device.SetSEMContrast(contr)
+        except suds.WebFault:
+            logging.debug("Setting SEM contrast may be unsuccesful")
 
     def _onBrightness(self, value):
-        with self.parent._acq_progress_lock:
-            try:
-                self.parent._device.SetSEMBrightness(value)
-            except suds.WebFault:
-                logging.debug("Setting SEM brightness may be unsuccesful")
+        self.parent._requests.submit_coalesced("brightness", self._applyBrightness, value)
+
+    def _applyBrightness(self, value):
+        try:
+            self.parent._device.SetSEMBrightness(value)
+        except suds.WebFault:
+            logging.debug("Setting SEM brightness may be unsuccesful")
 
     def _updateContrast(self):
         """
@@ -1126,32 +1142,35 @@ class Detector(model.Detector):
                     # Just to wait long enough before we get a frame with the new
                     # parameters applied. In the meantime, it can be the case that
                     # Phenom generates semi-created frames that we want to avoid.
-                    img_str = self._acq_device.SEMAcquireImageCopy(self._scanParams)
+                    download = functools.partial(self._acq_device.SEMAcquireImageCopy, self._scanParams)
+                elif self._high_fr:
+                    download = functools.partial(self._acq_device.SEMGetLiveImageCopy, 0)
                 else:
-                    if self._high_fr:
-                        img_str = self._acq_device.SEMGetLiveImageCopy(0)
-                    else:
-                        # This is to avoid using high frame rate in Phenom versions
-                        # that misbehave with frequent SEMGetLiveImageCopy calls
-                        img_str = self._acq_device.SEMAcquireImageCopy(self._scanParams)
-
-                # Use the metadata from the string to update some metadata
-                # metadata[model.MD_POS] = (img_str.aAcqState.position.x, img_str.aAcqState.position.y)
-                metadata[model.MD_EBEAM_VOLTAGE] = abs(img_str.aAcqState.highVoltage)
-                metadata[model.MD_EBEAM_CURRENT] = img_str.aAcqState.emissionCurrent
-                metadata[model.MD_ROTATION] = -img_str.aAcqState.rotation
-                metadata[model.MD_DWELL_TIME] = img_str.aAcqState.dwellTime * img_str.aAcqState.integrations
-                metadata[model.MD_PIXEL_SIZE] = (img_str.aAcqState.pixelWidth,
-                                                 img_str.aAcqState.pixelHeight)
-                metadata[model.MD_HW_NAME] = self._hwVersion + " (s/n %s)" % img_str.aAcqState.instrumentID
-
-                # image to ndarray
-                sem_img = numpy.frombuffer(base64.b64decode(img_str.image.buffer[0]),
-                                           dtype=dataType)
-                sem_img.shape = res[::-1]
-                logging.debug("Returning SEM image of %s with %d bpp and %d frames",
-                              res, bpp, self._scanParams.nrOfFrames)
-                return model.DataArray(sem_img, metadata)
+                    # This is to avoid using high frame rate in Phenom versions
+                    # that misbehave with frequent SEMGetLiveImageCopy calls
+                    download = functools.partial(self._acq_device.SEMAcquireImageCopy, self._scanParams)
+
+        # The image is downloaded via the dedicated connection, so the settings
+        # changed in the mean time don't have to wait for it.
+        img_str = download()
+
+        # Use the metadata from the string to update some metadata
+        # metadata[model.MD_POS] = (img_str.aAcqState.position.x, img_str.aAcqState.position.y)
+        metadata[model.MD_EBEAM_VOLTAGE] = abs(img_str.aAcqState.highVoltage)
+        metadata[model.MD_EBEAM_CURRENT] = img_str.aAcqState.emissionCurrent
+        metadata[model.MD_ROTATION] = -img_str.aAcqState.rotation
+        metadata[model.MD_DWELL_TIME] = img_str.aAcqState.dwellTime * img_str.aAcqState.integrations
+        metadata[model.MD_PIXEL_SIZE] = (img_str.aAcqState.pixelWidth,
+                                         img_str.aAcqState.pixelHeight)
+        metadata[model.MD_HW_NAME] = self._hwVersion + " (s/n %s)" % img_str.aAcqState.instrumentID
+
+        # image to ndarray
+        sem_img = numpy.frombuffer(base64.b64decode(img_str.image.buffer[0]),
+                                   dtype=dataType)
+        sem_img.shape = res[::-1]
+        logging.debug("Returning SEM image of %s with %d bpp and %d frames",
+                      res, bpp, self._scanParams.nrOfFrames)
+        return model.DataArray(sem_img, metadata)
 
     def _acquire_thread(self, callback):
         """
@@ -1159,17 +1178,26 @@ class Detector(model.Detector):
         center (e-beam) position and provides the new generated output to the
         Dataflow.
         """
+        # The images are passed to the callback from a separate thread, so
+        # that the next image is already downloaded in the mean time.
+        notifier = util.RequestQueue("PhenomSEM notifier")
+        fnotify = None
         try:
             while not self._acquisition_must_stop.is_set():
                 with self._acquisition_init_lock:
                     if self._acquisition_must_stop.is_set():
                         break
-                callback(self._acquire_image())
+                da = self._acquire_image()
+                # At most one image waiting to be passed on
+                if fnotify is not None:
+                    fnotify.result()
+                fnotify = notifier.submit(callback, da)
         except CancelledError:
             logging.debug("Acquisition thread cancelled")
         except Exception:
             logging.exception("Unexpected failure during image acquisition")
         finally:
+            notifier.shutdown(wait=True)
             logging.debug("Acquisition thread closed")
             self._acquisition_must_stop.clear()
 
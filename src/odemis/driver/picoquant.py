@@ -24,6 +24,7 @@ import numpy
 from odemis import model, util
 from odemis.model import HwError
 import random
+import threading
 import time
 import weakref
 
@@ -75,6 +76,20 @@ PHR800LVMAX = 2400  # mV
 
 HOLDOFFMAX = 210480  # ns
 
+# From the TTTR demo programs
+T2WRAPAROUND = 210698240  # time-tag overflow period in T2 mode
+T3WRAPAROUND = 65536  # sync counter overflow period in T3 mode
+T2RESOLUTION = 4e-12  # s, unit of the time-tags in T2 mode
+T3HISTCHAN = 4096  # number of start-stop time bins in T3 mode (12 bits)
+MARKER_CHANNEL = 0xf  # channel of the special records (markers and overflows)
+
+# Decoded TTTR event (photon or marker). "time" is the time-tag in T2RESOLUTION
+# in T2 mode, and the sync counter in T3 mode. "dtime" is the start-stop time
+# in T3 mode (in resolution unit), or the marker bits for the markers.
+EVENT_DTYPE = numpy.dtype([("channel", numpy.uint8),
+                           ("time", numpy.uint64),
+                           ("dtime", numpy.uint16)])
+
 
 class PHError(Exception):
     def __init__(self, errno, strerror, *args, **kwargs):
@@ -181,6 +196,136 @@ class PHDLL(CDLL):
     }
 
 
+def decode_records(records, mode, overflow=0):
+    """
+    Decode the TTTR records, as read from the FIFO. All the records are
+    processed at once, using only array operations.
+    records (ndarray of uint32): the records, in the order they were read
+    mode (MODE_T2 or MODE_T3): the mode of the device during the acquisition
+    overflow (0<=int): number of overflows which happened before the first
+      record (ie, the value returned by the previous call)
+    return:
+      events (ndarray of EVENT_DTYPE): the photons and markers, with the
+        overflows taken into account. The markers are on the MARKER_CHANNEL.
+      overflow (int): number of overflows which happened up to the last record
+    """
+    records = numpy.asarray(records, dtype=numpy.uint32)
+    channel = (records >> 28).astype(numpy.uint8)
+    if mode == MODE_T2:
+        # 4 bits channel | 28 bits time-tag
+        timetag = records & 0x0fffffff
+        markers = records & 0xf
+        wraparound = T2WRAPAROUND
+    elif mode == MODE_T3:
+        # 4 bits channel | 12 bits start-stop time | 16 bits sync counter
+        timetag = records & 0xffff
+        dtime = (records >> 16) & 0xfff
+        markers = dtime & 0xf
+        wraparound = T3WRAPAROUND
+    else:
+        raise ValueError("Mode %s has no TTTR records" % (mode,))
+
+    special = (channel == MARKER_CHANNEL)
+    is_ovf = special & (markers == 0)
+    # Number of overflows before each record (each overflow record counts for
+    # itself, but it's dropped anyway)
+    novf = numpy.cumsum(is_ovf, dtype=numpy.uint64) + overflow
+
+    keep = ~is_ovf
+    events = numpy.empty(numpy.count_nonzero(keep), dtype=EVENT_DTYPE)
+    events["channel"] = channel[keep]
+    events["time"] = novf[keep] * wraparound + timetag[keep]
+    if mode == MODE_T3:
+        events["dtime"] = dtime[keep]
+        # For the markers, only the marker bits are meaningful
+        events["dtime"][special[keep]] = markers[keep & special]
+    else:
+        events["dtime"] = numpy.where(special[keep], markers[keep], 0)
+
+    if novf.size:
+        overflow = int(novf[-1])
+    return events, overflow
+
+
+def t2_start_stop(events, last_sync=-1):
+    """
+    Compute the start-stop times in T2 mode: the time between each photon and
+    the sync event (on channel 0) which precedes it.
+    events (ndarray of EVENT_DTYPE): events decoded in T2 mode
+    last_sync (int): time-tag of the last sync event before these events, or
+      -1 if there was none.
+    return:
+      dtimes (ndarray of int64): start-stop time of each photon which has a
+        sync event before (in T2RESOLUTION)
+      last_sync (int): time-tag of the last sync event, or -1 if none so far
+    """
+    chan = events["channel"]
+    times = events["time"].astype(numpy.int64)
+    sync_times = numpy.concatenate(([last_sync], times[chan == 0]))
+    ph_times = times[(chan != 0) & (chan != MARKER_CHANNEL)]
+
+    # Index of the last sync event before each photon (0 = previous one)
+    idx = numpy.searchsorted(sync_times, ph_times, side="right") - 1
+    dtimes = ph_times - sync_times[idx]
+    if last_sync < 0:
+        dtimes = dtimes[idx > 0]
+    return dtimes, int(sync_times[-1])
+
+
+class RingBuffer(object):
+    """
+    Fixed size FIFO of values, to pass data between the thread reading the
+    device and the thread processing it, without allocating memory.
+    It's thread-safe, for one writer and one reader.
+    """
+
+    def __init__(self, size, dtype=numpy.uint32):
+        """
+        size (int > 0): maximum number of values stored
+        dtype (numpy.dtype): type of the values
+        """
+        self._buf = numpy.empty(size, dtype=dtype)
+        self._start = 0  # index of the first value not yet read
+        self._len = 0  # number of values not yet read
+        self._lock = threading.Lock()
+        self.lost = 0  # number of values dropped because the buffer was full
+
+    def write(self, data):
+        """
+        Append values at the end. If the buffer is full, the values which
+        don't fit are dropped.
+        data (ndarray): the values
+        return (int): number of values actually stored
+        """
+        size = self._buf.size
+        with self._lock:
+            n = min(len(data), size - self._len)
+            end = (self._start + self._len) % size
+            first = min(n, size - end)  # before wrapping around
+            self._buf[end:end + first] = data[:first]
+            self._buf[:n - first] = data[first:n]
+            self._len += n
+            self.lost += len(data) - n
+        return n
+
+    def read(self):
+        """
+        Remove all the values available
+        return (ndarray): the values, in order (can be empty)
+        """
+        size = self._buf.size
+        with self._lock:
+            end = self._start + self._len
+            if end <= size:
+                data = self._buf[self._start:end].copy()
+            else:
+                data = numpy.concatenate((self._buf[self._start:],
+                                          self._buf[:end - size]))
+            self._start = end % size
+            self._len = 0
+        return data
+
+
 class PH300(model.Detector):
     """
     Represents a PicoQuant PicoHarp 300.
@@ -195,6 +340,7 @@ class PH300(model.Detector):
         if children is None:
             children = {}
 
+        self._mode = None
         if device == "fake":
             device = None
             self._dll = FakePHDLL()
@@ -204,10 +350,8 @@ class PH300(model.Detector):
 
         super(PH300, self).__init__(name, role, daemon=daemon, **kwargs)
 
-        # TODO: what's the shape? 1D array with count as value, and time as dim
-        # TODO: metadata for indicating the range? cf WL_LIST?
-
-        # TODO: do we need TTTR mode?
+        # The histogram mode is only used for the count rates. The device is
+        # switched to a TTTR mode when the data is acquired.
         self.Initialise(MODE_HIST)
         self._swVersion = self.GetLibraryVersion()
         mod, partnum, ver = self.GetHardwareInfo()
@@ -232,14 +376,22 @@ class PH300(model.Detector):
             self._detectors[name] = PH300RawDetector(channel=i, parent=self, daemon=daemon, **ckwargs)
             self.children.value.add(self._detectors[name])
 
-        # TODO: what are good VA names?
-        # dwellTime (= measurement duration) should be understandable and easily compatible
+        # The data is streamed in TTTR mode: a thread continuously reads the
+        # records from the FIFO into a ring buffer, and another thread decodes
+        # them and sends them at the refresh period, either as raw events
+        # (.rawData) or as the start-stop histogram accumulated since the
+        # beginning of the acquisition (.data).
+        self.recordMode = model.StringEnumerated("T3", {"T2", "T3"})
+        self.refreshPeriod = model.FloatContinuous(0.1, (1e-3, 100), unit="s")
 
-        # TODO: how to get the data while it's building up via a dataflow?
-        # => two dataflows? one that is only sending full data, and one that sends
-        # data while it's building up? Does reading histogram while the data is
-        # building works? Otherwise, just let the client ask for shorter dwellTime
-        # and accumulate client side?
+        self._shape = (T3HISTCHAN, 2**32)  # histogram of 32 bits counts
+        self.data = TTTRDataFlow(self)
+        self.rawData = TTTRDataFlow(self)
+
+        self._acq_lock = threading.Lock()  # to be taken to change the acquisition state
+        self._acquisitions = set()  # TTTRDataFlows active
+        self._acq_stop = None  # Event to stop the current acquisition
+        self._acq_reader = None  # thread reading the FIFO
 
     def _openDevice(self, sn=None):
         """
@@ -267,9 +419,151 @@ class PH300(model.Detector):
             raise HwError("No PicoHarp300 found, check the device is turned on and connected to the computer")
 
     def terminate(self):
+        with self._acq_lock:
+            self._acquisitions.clear()
+            self._stop_acquisition()
+        if self._acq_reader:
+            self._acq_reader.join(10)
         model.Detector.terminate(self)
         self.CloseDevice()
 
+    def start_acquire(self, df):
+        """
+        Start the acquisition, if not yet running
+        df (TTTRDataFlow): the dataflow which needs the data
+        """
+        with self._acq_lock:
+            self._acquisitions.add(df)
+            if self._acq_stop is not None and not self._acq_stop.is_set():
+                return  # already running
+
+            # Wait for the end of the previous acquisition, if still reading
+            if self._acq_reader:
+                self._acq_reader.join(10)
+
+            mode = {"T2": MODE_T2, "T3": MODE_T3}[self.recordMode.value]
+            if self._mode != mode:
+                self.Initialise(mode)
+                self.Calibrate()
+            resolution = self.GetResolution()
+
+            # Each acquisition has its own buffer and event, so that the
+            # previous one can finish independently.
+            ring = RingBuffer(16 * TTREADMAX)
+            self._acq_stop = threading.Event()
+            self._acq_reader = threading.Thread(target=self._readFiFoLoop,
+                                                name="PicoHarp FIFO reader",
+                                                args=(ring, self._acq_stop))
+            self._acq_reader.daemon = True
+            self._acq_reader.start()
+            decoder = threading.Thread(target=self._decodeLoop,
+                                       name="PicoHarp TTTR decoder",
+                                       args=(ring, self._acq_stop, mode, resolution))
+            decoder.daemon = True
+            decoder.start()
+
+    def stop_acquire(self, df):
+        """
+        Stop the acquisition, if no other dataflow needs it
+        df (TTTRDataFlow): the dataflow which doesn't need the data anymore
+        """
+        with self._acq_lock:
+            self._acquisitions.discard(df)
+            if not self._acquisitions:
+                self._stop_acquisition()
+
+    def _stop_acquisition(self):
+        """
+        Request the acquisition threads to stop. Non-blocking.
+        Must be called with _acq_lock taken.
+        """
+        if self._acq_stop is not None:
+            self._acq_stop.set()
+            self._acq_stop = None
+
+    def _readFiFoLoop(self, ring, stop):
+        """
+        Drains the FIFO of the device into the ring buffer, until stopped.
+        ring (RingBuffer): where to store the records
+        stop (Event): set to request to stop
+        """
+        buf = numpy.empty((TTREADMAX,), dtype=numpy.uint32)
+        try:
+            # Acquisition time is limited, so it's restarted when over
+            self.StartMeas(ACQTMAX)
+            try:
+                while not stop.is_set():
+                    if self.GetFlags() & FLAG_FIFOFULL:
+                        logging.warning("FIFO overrun, some events have been lost")
+                    records = self.ReadFiFo(TTREADMAX, buf)
+                    if records.size:
+                        n = ring.write(records)
+                        if n < records.size:
+                            logging.warning("Ring buffer full, dropped %d records",
+                                            records.size - n)
+                    else:
+                        if self.CTCStatus():
+                            self.StopMeas()
+                            self.StartMeas(ACQTMAX)
+                        # The FIFO is empty => give it time to fill up
+                        stop.wait(1e-3)
+            finally:
+                self.StopMeas()
+        except Exception:
+            logging.exception("Failure while reading the FIFO")
+        finally:
+            stop.set()
+            logging.debug("FIFO reader thread closed")
+
+    def _decodeLoop(self, ring, stop, mode, resolution):
+        """
+        Decodes the records and sends the data on the dataflows at every
+        refresh period, until stopped.
+        ring (RingBuffer): where to read the records from
+        stop (Event): set to request to stop
+        mode (MODE_T2 or MODE_T3): mode of the acquisition
+        resolution (float): duration of a start-stop time bin (s)
+        """
+        try:
+            tstart = time.time()
+            md = self._metadata.copy()
+            md[model.MD_ACQ_DATE] = tstart
+            md[model.MD_PIXEL_DUR] = resolution
+            md[model.MD_DIMS] = "T"
+            # In T2 mode the start-stop times are computed with the T2 resolution
+            t2_bin = max(1, int(round(resolution / T2RESOLUTION)))
+
+            overflow = 0
+            last_sync = -1
+            hist = numpy.zeros(T3HISTCHAN, dtype=numpy.int64)
+            while not stop.wait(self.refreshPeriod.value):
+                events, overflow = decode_records(ring.read(), mode, overflow)
+                now = time.time()
+
+                if self.rawData in self._acquisitions and events.size:
+                    rmd = self._metadata.copy()
+                    rmd[model.MD_ACQ_DATE] = now
+                    rmd[model.MD_PIXEL_DUR] = resolution
+                    self.rawData.notify(model.DataArray(events, rmd))
+
+                if mode == MODE_T3:
+                    chan = events["channel"]
+                    dtimes = events["dtime"][(chan != 0) & (chan != MARKER_CHANNEL)]
+                else:
+                    dtimes, last_sync = t2_start_stop(events, last_sync)
+                    dtimes //= t2_bin
+                    dtimes = dtimes[dtimes < T3HISTCHAN]
+                hist += numpy.bincount(dtimes, minlength=T3HISTCHAN)
+
+                if self.data in self._acquisitions:
+                    md[model.MD_EXP_TIME] = now - tstart
+                    self.data.notify(model.DataArray(hist.astype(numpy.uint32), md.copy()))
+        except Exception:
+            logging.exception("Failure while decoding the records")
+        finally:
+            stop.set()
+            logging.debug("TTTR decoder thread closed")
+
     def CloseDevice(self):
         self._dll.PH_CloseDevice(self._idx)
 
@@ -284,6 +578,7 @@ class PH300(model.Detector):
         """
         logging.debug("Initializing device %d", self._idx)
         self._dll.PH_Initialize(self._idx, mode)
+        self._mode = mode
 
     def GetHardwareInfo(self):
         mod = create_string_buffer(16)
@@ -312,13 +607,50 @@ class PH300(model.Detector):
         self._dll.PH_GetCountRate(self._idx, channel, byref(rate))
         return rate.value
 
-    def ReadFiFo(self, count):
+    def GetResolution(self):
+        """
+        return (0<float): duration of a start-stop time bin (s)
+        """
+        resolution = c_double()  # ps
+        self._dll.PH_GetResolution(self._idx, byref(resolution))
+        return resolution.value * 1e-12
+
+    def GetFlags(self):
+        """
+        return (int): the status flags (FLAG_*)
+        """
+        flags = c_int()
+        self._dll.PH_GetFlags(self._idx, byref(flags))
+        return flags.value
+
+    def StartMeas(self, tacq):
+        """
+        Start a measurement
+        tacq (ACQTMIN<=int<=ACQTMAX): acquisition time in ms
+        """
+        self._dll.PH_StartMeas(self._idx, tacq)
+
+    def StopMeas(self):
+        self._dll.PH_StopMeas(self._idx)
+
+    def CTCStatus(self):
+        """
+        return (bool): True if the acquisition time of the measurement is over
+        """
+        status = c_int()
+        self._dll.PH_CTCStatus(self._idx, byref(status))
+        return status.value != 0
+
+    def ReadFiFo(self, count, buf=None):
         """
         Warning, the device must be initialised in a special mode (T2 or T3)
-        count (int < TTREADMAX): number of values to read
+        count (int <= TTREADMAX): number of values to read
+        buf (None or ndarray of uint32): array of at least count values where
+          to store the records, to avoid allocating memory at each call. If
+          None, a new array is allocated.
         return ndarray of uint32: can be shorter than count, even 0 length.
           each unint32 is a 'record'. The interpretation of the record depends
-          on the mode.
+          on the mode. If buf is passed, it's a view on it.
         """
         # From the doc (p. 31 & 32):
         # * Each T2 mode event record consists of 32 bits.
@@ -333,8 +665,9 @@ class PH300(model.Detector):
         #   case the next 12 bits are the marker number. Marker 0 indicates the
         #   counter overflow.
 
-        assert 0 < count < TTREADMAX
-        buf = numpy.empty((count,), dtype=numpy.uint32)
+        assert 0 < count <= TTREADMAX
+        if buf is None:
+            buf = numpy.empty((count,), dtype=numpy.uint32)
         buf_ct = buf.ctypes.data_as(POINTER(c_uint32))
         nactual = c_int()
         self._dll.PH_ReadFiFo(self._idx, buf_ct, count, byref(nactual))
@@ -453,6 +786,40 @@ class RawDetDataFlow(model.DataFlow):
             # component has been deleted, it's all fine, we'll be GC'd soon
             pass
 
+
+class TTTRDataFlow(model.DataFlow):
+    def __init__(self, detector):
+        """
+        detector (PH300): the device that the dataflow corresponds to
+        """
+        model.DataFlow.__init__(self)
+        self._detector = weakref.ref(detector)
+
+    # start/stop_generate are _never_ called simultaneously (thread-safe)
+    def start_generate(self):
+        det = self._detector()
+        if det is None:
+            # component has been deleted, it's all fine, we'll be GC'd soon
+            return
+
+        try:
+            det.start_acquire(self)
+        except ReferenceError:
+            # component has been deleted, it's all fine, we'll be GC'd soon
+            pass
+
+    def stop_generate(self):
+        det = self._detector()
+        if det is None:
+            # component has been deleted, it's all fine, we'll be GC'd soon
+            return
+
+        try:
+            det.stop_acquire(self)
+        except ReferenceError:
+            # component has been deleted, it's all fine, we'll be GC'd soon
+            pass
+
 # Only for testing/simulation purpose
 # Very rough version that is just enough so that if the wrapper behaves correctly,
 # it returns the expected values.
@@ -493,6 +860,15 @@ class FakePHDLL(object):
         self._mode = None
         self._sn = "10234567"
 
+        # TTTR measurement
+        self._meas_end = None  # time of the end of the measurement, or None if not running
+        self._last_read = 0  # time up to which the records have been generated
+        self._photon_rate = 50000  # photons/s
+        self._sync_rate = 20e6  # Hz
+        self._sync_count = 0  # T3: sync counter of the last photon
+        self._time_tag = 0  # T2: time-tag of the last record
+        self._rng = numpy.random.RandomState(0)
+
     def PH_OpenDevice(self, i, sn_str):
         if i == self._idx:
             sn_str.value = self._sn
@@ -522,3 +898,91 @@ class FakePHDLL(object):
     def PH_GetCountRate(self, i, channel, p_rate):
         rate = _deref(p_rate, c_int)
         rate.value = random.randint(0, 5000)
+
+    def PH_GetResolution(self, i, p_resolution):
+        resolution = _deref(p_resolution, c_double)
+        resolution.value = 4  # ps
+
+    def PH_GetFlags(self, i, p_flags):
+        flags = _deref(p_flags, c_int)
+        flags.value = 0
+
+    def PH_StartMeas(self, i, tacq):
+        self._last_read = time.time()
+        self._meas_end = self._last_read + _val(tacq) * 1e-3
+
+    def PH_StopMeas(self, i):
+        self._meas_end = None
+
+    def PH_CTCStatus(self, i, p_ctcstatus):
+        ctcstatus = _deref(p_ctcstatus, c_int)
+        ctcstatus.value = int(self._meas_end is None or time.time() > self._meas_end)
+
+    def PH_ReadFiFo(self, i, buf, count, p_nactual):
+        nactual = _deref(p_nactual, c_int)
+        if self._mode not in (MODE_T2, MODE_T3):
+            raise PHError(-18, PHDLL.err_code[-18])  # ERROR_INVALID_MODE
+        if self._meas_end is None:
+            nactual.value = 0
+            return
+
+        # Generate the photons since the last read, with at most 3 records
+        # per photon (sync, photon, overflow)
+        count = _val(count)
+        now = min(time.time(), self._meas_end)
+        nphotons = min(int((now - self._last_read) * self._photon_rate), count // 3)
+        self._last_read += nphotons / self._photon_rate
+        if self._mode == MODE_T2:
+            records = self._generateT2Records(nphotons)
+        else:
+            records = self._generateT3Records(nphotons)
+
+        out = numpy.ctypeslib.as_array(buf, shape=(count,))
+        out[:records.size] = records
+        nactual.value = records.size
+
+    def _syncGaps(self, n, wraparound):
+        """
+        return (ndarray of int64): number of sync periods between each photon
+        """
+        gaps = self._rng.geometric(self._photon_rate / self._sync_rate, n)
+        return numpy.minimum(gaps, wraparound // 2)
+
+    def _insertOverflows(self, records, times, prev_time, wraparound):
+        """
+        Add an overflow record before each record which is after a wrap around
+        records (ndarray of uint32)
+        times (ndarray of int): absolute time of each record
+        prev_time (int): absolute time of the previous record
+        return (ndarray of uint32): the records with the overflow records
+        """
+        wraps = numpy.diff(numpy.concatenate(([prev_time], times)) // wraparound)
+        return numpy.insert(records, numpy.flatnonzero(wraps),
+                            numpy.uint32(MARKER_CHANNEL << 28))
+
+    def _generateT3Records(self, n):
+        """
+        Photons on channel 1, with an exponential decay after the sync
+        """
+        nsync = self._sync_count + numpy.cumsum(self._syncGaps(n, T3WRAPAROUND))
+        dtime = numpy.clip(100 + self._rng.exponential(300, n), 0, T3HISTCHAN - 1).astype(numpy.uint32)
+        records = ((1 << 28) | (dtime << 16) | (nsync & 0xffff)).astype(numpy.uint32)
+        records = self._insertOverflows(records, nsync, self._sync_count, T3WRAPAROUND)
+        if n:
+            self._sync_count = int(nsync[-1])
+        return records
+
+    def _generateT2Records(self, n):
+        """
+        Each photon on channel 1 is preceded by its sync event on channel 0
+        """
+        period = int(round(1 / (self._sync_rate * T2RESOLUTION)))
+        tsync = self._time_tag + period * numpy.cumsum(self._syncGaps(n, T2WRAPAROUND // period))
+        delay = numpy.minimum(self._rng.exponential(300, n), period - 1).astype(numpy.int64)
+        times = numpy.column_stack((tsync, tsync + delay)).ravel()
+        channels = numpy.tile(numpy.array([0, 1], dtype=numpy.uint32), n)
+        records = ((channels << 28) | (times % T2WRAPAROUND)).astype(numpy.uint32)
+        records = self._insertOverflows(records, times, self._time_tag, T2WRAPAROUND)
+        if n:
+            self._time_tag = int(times[-1])
+        return records
@@ -723,12 +723,28 @@ class Controller(object):
         axis (1<int<16): axis number
         returns (int or float or str): value returned depending on the type detected
         """
+        resp = self._sendQueryCommand(self._axisValueQuery(com, axis))
+        return self._parseAxisValue(com, axis, resp)
+
+    def _axisValueQuery(self, com, axis):
+        """
+        return (str): the full command to read a value of an axis
+        com (str): the 4 letter command (including the ?)
+        axis (1<int<16): axis number
+        """
         assert(axis in self._channels)
         assert(2 < len(com) < 8)
         if com not in self._avail_cmds:
             raise NotImplementedError("Command %s not supported by the controller" % (com,))
+        return "%s %d\n" % (com, axis)
 
-        resp = self._sendQueryCommand("%s %d\n" % (com, axis))
+    @staticmethod
+    def _parseAxisValue(com, axis, resp):
+        """
+        Decode the report of a command with axis
+        Ex: 1=25.3
+        returns (int or float or str): value returned depending on the type detected
+        """
         try:
             value_str = resp.split("=")[1]
         except IndexError:
@@ -787,6 +803,14 @@ class Controller(object):
         else:
             answer = self._sendQueryCommand("\x05")
 
+        return self._parseMotionStatus(answer)
+
+    @staticmethod
+    def _parseMotionStatus(answer):
+        """
+        answer (str): report of the motion status command
+        returns (set of int): the set of moving axes
+        """
         bitmap = int(answer, 16)
         # convert to a set
         i = 1
@@ -1539,6 +1563,37 @@ class Controller(object):
                 raise IOError("Timeout while waiting for end of motion")
             time.sleep(0.005)
 
+    # Batched queries: to read the state of several controllers in one
+    # round-trip on the bus, the queries are generators. They first yield the
+    # commands to send, then receive the reports (via .send()), and yield the
+    # result. See batchQuery().
+
+    def queryPositions(self, axes):
+        """
+        Query generator to read the current position of axes
+        axes (set of int): the axes
+        yields (list of str): the commands to send
+        yields (dict int -> float): the position of each axis
+        """
+        # The position is interpolated, so no command to send
+        yield []
+        yield dict((a, self.getPosition(a)) for a in axes)
+
+    def queryMoving(self, axes):
+        """
+        Query generator to find out which axes are moving
+        axes (set of int): the axes to check
+        yields (list of str): the commands to send
+        yields (set of int): the axes which are moving
+        raise PIGCSError: if an error on the controller happened
+        """
+        assert axes.issubset(self._channels)
+        reports = yield ["ERR?\n", "\x05"]
+        err = int(reports[0])
+        if err:
+            raise PIGCSError(err)
+        yield axes & self._parseMotionStatus(reports[1])
+
     def isReferenced(self, axis):
         """
         return (bool or None): None if the axis cannot be referenced, or a boolean
@@ -1770,6 +1825,31 @@ class CLAbsController(Controller):
 
         return False
 
+    def queryPositions(self, axes):
+        """
+        See Controller.queryPositions
+        """
+        axes = sorted(axes)
+        reports = yield [self._axisValueQuery("POS?", a) for a in axes]
+        now = time.time()
+        pos = {}
+        for a, r in zip(axes, reports):
+            pos[a] = self._parseAxisValue("POS?", a, r) * self._upm[a]
+            self._lastpos[a] = (pos[a], now)
+        yield pos
+
+    def queryMoving(self, axes):
+        """
+        See Controller.queryMoving
+        """
+        axes = sorted(axes)
+        reports = yield ["ERR?\n"] + [self._axisValueQuery("ONT?", a) for a in axes]
+        err = int(reports[0])
+        if err:
+            raise PIGCSError(err)
+        yield set(a for a, r in zip(axes, reports[1:])
+                  if self._parseAxisValue("ONT?", a, r) != 1)
+
     # TODO allow to reference, but need to get multiple axes, and to check the
     # status, isMoving() cannot be used, but just GetMotionStatus()
     # def startReferencing(self, axis):
@@ -2232,6 +2312,40 @@ class CLRelController(Controller):
     def getTargetPosition(self, axis):
         return self.GetTargetPosition(axis) * self._upm[axis]
 
+    def queryPositions(self, axes):
+        """
+        See Controller.queryPositions
+        """
+        axes = sorted(axes)
+        # Same as getPosition(): don't read while the encoder is switched on/off
+        locks = [self._pos_lock[a] for a in axes]
+        for l in locks:
+            l.acquire()
+        try:
+            reports = yield [self._axisValueQuery("POS?", a) for a in axes]
+            yield dict((a, self._parseAxisValue("POS?", a, r) * self._upm[a])
+                       for a, r in zip(axes, reports))
+        finally:
+            for l in locks:
+                l.release()
+
+    def queryMoving(self, axes):
+        """
+        See Controller.queryMoving
+        """
+        assert axes.issubset(self._channels)
+        axes = sorted(axes)
+        # Same as isMoving(), but each axis is considered separately
+        reports = yield [self._axisValueQuery("ONT?", a) for a in axes]
+        moving = set()
+        for a, r in zip(axes, reports):
+            if self._parseAxisValue("ONT?", a, r) != 1:
+                moving.add(a)
+            elif self._auto_suspend:
+                # Not moving anymore => turn off encoder (in a few seconds)
+                self._releaseAxis(a, self._auto_suspend)
+        yield moving
+
     # Warning: if the settling window is too small or settling time too big,
     # it might take several seconds to reach target (or even never reach it)
     def isMoving(self, axes=None):
@@ -2682,6 +2796,14 @@ class SMOController(Controller):
                 return True
         return False
 
+    def queryMoving(self, axes):
+        """
+        See Controller.queryMoving
+        """
+        # The move status of each axis is computed from several commands
+        yield []
+        yield set(c for c in axes if self._isAxisMovingOLViaPID(c))
+
     def stopMotion(self):
         """
         Stop the motion on all axes immediately
@@ -2694,6 +2816,51 @@ class SMOController(Controller):
             self.RelaxPiezos(c)
 
 
+def batchQuery(queries):
+    """
+    Run queries on several controllers of the same bus, with a single round-trip
+    queries (list of (Controller, generator)): each controller with its query
+      (eg, as returned by Controller.queryPositions())
+    return (list): the result of each query
+    raise:
+       IOError: if error communicating with the hardware
+       PIGCSError: if a query reported an error of a controller
+    """
+    if not queries:
+        return []
+
+    busacc = queries[0][0].busacc
+    # The queries can take locks of their controller (eg, _pos_lock) when
+    # generating the commands. Like when switching the servo, these locks must
+    # be taken before the bus, and always in the same order to not deadlock
+    # with another batch => generate the commands by order of address, and
+    # only then take the bus.
+    order = sorted(range(len(queries)), key=lambda i: queries[i][0].address)
+    try:
+        coms = {}
+        for i in order:
+            coms[i] = next(queries[i][1])
+
+        # Keep the bus for the whole batch, so that no other command is interleaved
+        with busacc.ser_access:
+            reqs = [(queries[i][0].address, com) for i in order for com in coms[i]]
+            if reqs:
+                reports = busacc.sendQueryCommands(reqs)
+            else:
+                reports = []
+
+            results = [None] * len(queries)
+            j = 0
+            for i in order:
+                n = len(coms[i])
+                results[i] = queries[i][1].send(reports[j:j + n])
+                j += n
+            return results
+    finally:
+        for c, q in queries:
+            q.close()
+
+
 class Bus(model.Actuator):
     """
     Represent a chain of PIGCS controllers over a serial port
@@ -2855,18 +3022,64 @@ class Bus(model.Actuator):
             pos = self.position._value.copy()
 
         npos = {}
-        for a, (controller, channel) in self._axis_to_cc.items():
-            if axes is None or a in axes:
-                try:
-                    npos[a] = controller.getPosition(channel)
-                except PIGCSError:
-                    logging.warning("Failed to update position of axis %s", a, exc_info=True)
+        ctrl_axes = self._groupByController(axes)
+        try:
+            queries = [(c, c.queryPositions(set(chs))) for c, chs in ctrl_axes.items()]
+            for (c, q), cpos in zip(queries, batchQuery(queries)):
+                for ch, p in cpos.items():
+                    npos[ctrl_axes[c][ch]] = p
+        except (IOError, PIGCSError):
+            # Read one axis at a time, to recover from timeouts and skip the
+            # axes in error
+            logging.warning("Failed to read all the positions at once, will "
+                            "try one at a time", exc_info=True)
+            for c, chs in ctrl_axes.items():
+                for ch, a in chs.items():
+                    try:
+                        npos[a] = c.getPosition(ch)
+                    except PIGCSError:
+                        logging.warning("Failed to update position of axis %s", a, exc_info=True)
 
         pos.update(self._applyInversion(npos))
         logging.debug("Reporting new position at %s", pos)
 
         self.position._set_value(pos, force_write=True)
 
+    def _groupByController(self, axes=None):
+        """
+        axes (None or set of str): the axes names (None indicates all of them)
+        return (dict Controller -> (dict int -> str)): for each controller, the
+          channels and the corresponding axis names
+        """
+        ctrl_axes = {}
+        for a, (controller, channel) in self._axis_to_cc.items():
+            if axes is None or a in axes:
+                ctrl_axes.setdefault(controller, {})[channel] = a
+        return ctrl_axes
+
+    def _getMovingAxes(self, axes):
+        """
+        Check which axes are moving, by querying all the controllers at once
+        axes (set of str): the axes names
+        return (set of str): the axes which are still moving
+        raise PIGCSError: if a controller reported an error
+        """
+        ctrl_axes = self._groupByController(axes)
+        queries = [(c, c.queryMoving(set(chs))) for c, chs in ctrl_axes.items()]
+        try:
+            results = batchQuery(queries)
+        except IOError:
+            # One axis at a time, to recover from timeouts
+            logging.warning("Failed to read all the move status at once, will "
+                            "try one at a time", exc_info=True)
+            return set(a for c, chs in ctrl_axes.items() for ch, a in chs.items()
+                       if c.isMoving({ch}))
+
+        moving = set()
+        for (c, q), mv in zip(queries, results):
+            moving |= set(ctrl_axes[c][ch] for ch in mv)
+        return moving
+
     def _refreshPosition(self):
         """
         Called regularly to update the position of the closed-loop axes
@@ -3103,11 +3316,7 @@ class Bus(model.Actuator):
                     logging.debug("Ending move control early as next move is an update containing %s", moving_axes)
                     return
 
-                for an in moving_axes.copy():  # need copy to remove during iteration
-                    controller, channel = self._axis_to_cc[an]
-                    # TODO: change isMoving to report separate info on multiple channels
-                    if not controller.isMoving({channel}):
-                        moving_axes.discard(an)
+                moving_axes = self._getMovingAxes(moving_axes)
                 if not moving_axes:
                     # no more axes to wait for
                     break
@@ -3390,6 +3599,124 @@ class Bus(model.Actuator):
         return sock
 
 
+class _ReportParser(object):
+    """
+    Splits the data received from the bus into reports, and dispatches them to
+    the queries sent, based on the address prefix of each report.
+    The basic is simple. A report starts with a prefix, and finishes with \n.
+    If it actually finishes with " \n", then it's just a new line and not the
+    end of the report.
+    However, it gets muddy sometimes with empty reports. For instance, it can
+    answer "0 1 \n", which is an empty report. But some controllers answer
+    "1 HLP\n" with "0 1 \nBla bla \nBla\n"
+    """
+    def __init__(self, reqs):
+        """
+        reqs (list of (None or 1<=int<=16 or 254, str)): the address and command
+          (without address prefix but with \n) of each query, in order.
+          Either all the addresses are None, or none of them.
+        """
+        assert reqs
+        if any(a is None for a, c in reqs):
+            assert all(a is None for a, c in reqs)
+        self._reqs = reqs
+        self.full_com = ""  # all the commands, as sent on the bus
+        self._expected = {}  # address -> number of reports expected
+        for a, c in reqs:
+            assert(a is None or 1 <= a <= 16 or a == 254)
+            assert(len(c) <= 100)  # commands can be quite long (with floats)
+            if a is None:
+                self.full_com += c
+            else:
+                self.full_com += "%d %s" % (a, c)
+            self._expected[a] = self._expected.get(a, 0) + 1
+
+        # address -> prefix of the reports from the controller
+        self._prefixes = dict((a, "" if a is None else "0 %d " % a)
+                              for a in self._expected)
+        self._reports = dict((a, []) for a in self._expected)  # address -> reports
+        self._data = ""  # received data not yet processed
+        self._lines = None  # lines of the report being received, or None if complete
+        self._addr = None  # address of the last report started
+
+    def feed(self, data):
+        """
+        Process the data received
+        data (str): new data received from the bus
+        return (bool): True if all the reports have (apparently) been received
+        raise IOError: if the data doesn't look like a report
+        """
+        self._data += data
+        lines = self._data.split("\n")
+        # if the data finishes with \n, last split is empty
+        lines, self._data = lines[:-1], lines[-1]
+        if lines:
+            logging.debug("Received: '%s'", "\n".join(lines).encode('string_escape'))
+
+        for l in lines:
+            if self._lines is None:  # beginning of a report
+                for a, p in self._prefixes.items():
+                    if l.startswith(p):
+                        l = l[len(p):]
+                        self._addr = a
+                        self._lines = []
+                        break
+                else:
+                    # Maybe the previous line was actually continuing (but the hardware is strange)?
+                    reports = self._reports.get(self._addr)
+                    if reports and reports[-1] == "":
+                        logging.debug("Reconcidering previous line as beginning of multi-line")
+                        reports.pop()
+                        self._lines = [""]
+                    else:
+                        # TODO: maybe we got some garbage data from before,
+                        # check if there is already data available that fits the
+                        # prefix. (=> keep reading but with a short timeout)
+                        logging.debug("Failed to decode answer '%s'", l.encode('string_escape'))
+                        raise IOError("Report prefix unexpected after '%s': '%s'." %
+                                      (self.full_com.encode('string_escape'), l))
+
+            if l[-1:] == " ":  # multi-line
+                self._lines.append(l[:-1])  # remove the space indicating multi-line
+            else:
+                # End of the report for that command
+                self._lines.append(l)
+                if len(self._lines) == 1:
+                    self._reports[self._addr].append(self._lines[0])
+                else:
+                    self._reports[self._addr].append(self._lines)
+                self._lines = None
+
+        return self._lines is None and not self._data and not self.missing()
+
+    def missing(self):
+        """
+        return (list of None or int): addresses of the controllers which haven't
+          sent all their reports yet
+        """
+        return sorted(a for a, n in self._expected.items()
+                      if len(self._reports[a]) < n)
+
+    def get_reports(self):
+        """
+        return (list of (str or list of str)): the report of each query, in the
+          same order as the queries. If a report is multiline, it's a list of
+          each line.
+        raise IOError: if some reports are missing
+        """
+        reports = {}
+        for a, n in self._expected.items():
+            r = self._reports[a]
+            if len(r) > n:
+                logging.warning("Skipping previous answers from hardware %r", r[:-n])
+                r = r[-n:]
+            elif len(r) < n:
+                raise IOError("Expected %d answers from controller %s but only got %d" %
+                              (n, a, len(r)))
+            reports[a] = list(reversed(r))
+        return [reports[a].pop() for a, c in self._reqs]
+
+
 class SerialBusAccesser(object):
     """
     Manages connections to the low-level bus
@@ -3425,10 +3752,11 @@ class SerialBusAccesser(object):
         """
         Send a command and return its report (raw)
         addr (None or 1<=int<=16): address of the controller
-        com (string): the command to send (without address prefix but with \n)
+        com (str or list of str): the command(s) to send (without address prefix but with \n)
         return (string or list of strings): the report without prefix
            (e.g.,"0 1") nor newline.
            If answer is multiline: returns a list of each line
+           If command was a list: one str or list of str per command
         Note: multiline answers seem to always begin with a \x00 character, but
          it's left as is.
         raise:
@@ -3437,89 +3765,41 @@ class SerialBusAccesser(object):
            IOError: if error during the communication (such as the protocol is
               not respected)
         """
-        assert(addr is None or 1 <= addr <= 16 or addr == 254)
-
         if isinstance(com, basestring):
-            com = [com]
-            multicom = False
-        else:
-            multicom = True
-
-        for c in com:
-            assert(len(c) <= 100)  # commands can be quite long (with floats)
-
-        if addr is None:
-            full_com = "".join(com)
-            prefix = ""
+            return self.sendQueryCommands([(addr, com)])[0]
         else:
-            full_com = "".join("%d %s" % (addr, c) for c in com)
-            prefix = "0 %d " % addr
+            return self.sendQueryCommands([(addr, c) for c in com])
 
+    def sendQueryCommands(self, reqs):
+        """
+        Send queries, possibly to different controllers of the daisy chain, and
+        return their reports (raw). All the queries are written back-to-back
+        before reading the reports, so that it costs only one round-trip.
+        reqs (list of (None or 1<=int<=16, str)): address of the controller and
+          command (without address prefix but with \n) of each query
+        return (list of (str or list of str)): the report of each query, in
+          the same order, as returned by sendQueryCommand()
+        raise: same as sendQueryCommand()
+        """
+        parser = _ReportParser(reqs)
         with self.ser_access:
-            logging.debug("Sending: '%s'", full_com.encode('string_escape'))
-            self.serial.write(full_com)
+            logging.debug("Sending: '%s'", parser.full_com.encode('string_escape'))
+            self.serial.write(parser.full_com)
 
             # ensure everything is received, before expecting an answer
             self.serial.flush()
 
-            ans = ""  # received data not yet processed
-            ret = []  # one answer per command
-            continuing = False
             while True:
                 char = self.serial.read()  # empty if timeout
                 if not char:
                     raise model.HwError("Controller %s timed out, check the device is "
-                                        "plugged in and turned on." % addr)
-                ans += char
-
-                anssplited = ans.split("\n")
-                # if the answer finishes with \n, last split is empty
-                anssplited, ans = anssplited[:-1], anssplited[-1]
-                if anssplited:
-                    logging.debug("Received: '%s'", "\n".join(anssplited).encode('string_escape'))
-
-                for l in anssplited:
-                    if not continuing:
-                        lines = []  # one string per answer line
-                        # remove the prefix
-                        if l.startswith(prefix):
-                            l = l[len(prefix):]
-                        else:
-                            # Maybe the previous line was actually continuing (but the hardware is strange)?
-                            if ret and ret[-1] == "":
-                                logging.debug("Reconcidering previous line as beginning of multi-line")
-                                ret = ret[:-1]
-                            else:
-                                logging.debug("Failed to decode answer '%s'", l.encode('string_escape'))
-                                raise IOError("Report prefix unexpected after '%s': '%s'." % (full_com, l))
-
-                    if l[-1:] == " ":  # multi-line
-                        continuing = True
-                        lines.append(l[:-1])  # remove the space indicating multi-line
-                    else:
-                        # End of the answer for that command
-                        continuing = False
-                        lines.append(l)
-                        if len(lines) == 1:
-                            ret.append(lines[0])
-                        else:
-                            ret.append(lines)
-
-                # does it look like we received the end of an answer?
-                if not continuing and not ans and len(ret) >= len(com):
+                                        "plugged in and turned on." %
+                                        ", ".join("%s" % a for a in parser.missing()))
+                # does it look like we received the end of the reports?
+                if parser.feed(char):
                     break
 
-        if len(ret) > len(com):
-            logging.warning("Skipping previous answers from hardware %r",
-                            ret[:-len(com)])
-            ret = ret[-len(com):]
-        elif len(ret) < len(com):
-            logging.error("Expected %d answers but only got %d", len(com), len(ret))
-
-        if not multicom:
-            return ret[0]
-        else:
-            return ret
+        return parser.get_reports()
 
     def flushInput(self):
         """
@@ -3594,45 +3874,36 @@ class IPBusAccesser(object):
            IOError: if error during the communication (such as the protocol is
               not respected)
         """
-        assert(addr is None or 1 <= addr <= 16 or addr == 254)
-
         if isinstance(com, basestring):
-            com = [com]
-            multicom = False
+            return self.sendQueryCommands([(addr, com)])[0]
         else:
-            multicom = True
-
-        for c in com:
-            assert(len(c) <= 100)  # commands can be quite long (with floats)
-
-        if addr is None:
-            full_com = "".join(com)
-            prefix = ""
-        else:
-            full_com = "".join("%d %s" % (addr, c) for c in com)
-            prefix = "0 %d " % addr
+            return self.sendQueryCommands([(addr, c) for c in com])
 
+    def sendQueryCommands(self, reqs):
+        """
+        Send queries, possibly to different controllers, and return their
+        reports (raw). All the queries are sent in one packet, so that it costs
+        only one round-trip.
+        reqs (list of (None or 1<=int<=16 or 254, str)): address of the
+          controller and command (without address prefix but with \n) of each query
+        return (list of (str or list of str)): the report of each query, in
+          the same order, as returned by sendQueryCommand()
+        raise: same as sendQueryCommand()
+        """
+        parser = _ReportParser(reqs)
         with self.ser_access:
-            logging.debug("Sending: '%s'", full_com.encode('string_escape'))
-            self.socket.sendall(full_com)
+            logging.debug("Sending: '%s'", parser.full_com.encode('string_escape'))
+            self.socket.sendall(parser.full_com)
 
             # Read the answer
-            # The basic is simple. An answer starts with a prefix, and finishes
-            # with \n. If it actually finishes with " \n", then it's just a new
-            # line and not the end of the answer.
-            # However, it gets muddy sometimes with empty answers. For instance,
-            # it can answer "0 1 \n", which is an empty answer. But some
-            # controllers answer "1 HLP\n" with "0 1 \nBla bla \nBla\n"
             end_time = time.time() + 0.5
-            ans = ""  # received data not yet processed
-            ret = []  # one answer per command
-            continuing = False
             while True:
                 try:
                     data = self.socket.recv(4096)
                 except socket.timeout:
                     raise model.HwError("Controller %s timed out, check the device is "
-                                        "plugged in and turned on." % addr)
+                                        "plugged in and turned on." %
+                                        ", ".join("%s" % a for a in parser.missing()))
                 # If the master is already accessed from somewhere else it will just
                 # immediately answer an empty message
                 if not data:
@@ -3644,59 +3915,11 @@ class IPBusAccesser(object):
                     time.sleep(0.01)
                     continue
 
-                logging.debug("Received: '%s'", data.encode('string_escape'))
-                ans += data
-
-                anssplited = ans.split("\n")
-                # if the answer finishes with \n, last split is empty
-                anssplited, ans = anssplited[:-1], anssplited[-1]
-
-                for l in anssplited:
-                    # logging.debug("Processing %s", l)
-                    if not continuing:
-                        lines = []  # one string per answer line
-                        # remove the prefix
-                        if l.startswith(prefix):
-                            l = l[len(prefix):]
-                        else:
-                            # Maybe the previous line was actually continuing (but the hardware is strange)?
-                            if ret and ret[-1] == "":
-                                logging.debug("Reconcidering previous line as beginning of multi-line")
-                                ret = ret[:-1]
-                            else:
-                                # TODO: maybe we got some garbage data from before,
-                                # check if there is already data available that fits the
-                                # prefix. (=> keep reading but with a short timeout)
-                                logging.debug("Failed to decode answer '%s'", l.encode('string_escape'))
-                                raise IOError("Report prefix unexpected after '%s': '%s'." % (full_com, l))
-
-                    if l[-1:] == " ":  # multi-line
-                        continuing = True
-                        lines.append(l[:-1])  # remove the space indicating multi-line
-                    else:
-                        # End of the answer for that command
-                        continuing = False
-                        lines.append(l)
-                        if len(lines) == 1:
-                            ret.append(lines[0])
-                        else:
-                            ret.append(lines)
-
-                # does it look like we received the end of an answer?
-                if not continuing and not ans and len(ret) >= len(com):
+                # does it look like we received the end of the reports?
+                if parser.feed(data):
                     break
 
-        if len(ret) > len(com):
-            logging.warning("Skipping previous answers from hardware %r",
-                            ret[:-len(com)])
-            ret = ret[-len(com):]
-        elif len(ret) < len(com):
-            logging.error("Expected %d answers but only got %d", len(com), len(ret))
-
-        if not multicom:
-            return ret[0]
-        else:
-            return ret
+        return parser.get_reports()
 
     def flushInput(self):
         """
@@ -4177,7 +4400,8 @@ class DaisyChainSimulator(object):
         self.port = port
         self.timeout = timeout
         self._subports = kwargs["subports"]
-        self._output_buf = "" # TODO: probably cleaner to user lock to access it
+        self._output_buf = ""
+        self._output_lock = threading.Lock()  # to be taken to add to _output_buf
 
         # TODO: for each port, put a thread listening on the read and push to output
         self._is_terminated = False
@@ -4201,14 +4425,17 @@ class DaisyChainSimulator(object):
         # simulate timeout
         end_time = time.time() + self.timeout
 
-        ret = self._output_buf[:size]
-        self._output_buf = self._output_buf[len(ret):]
+        with self._output_lock:
+            ret = self._output_buf[:size]
+            self._output_buf = self._output_buf[len(ret):]
 
         while len(ret) < size:
             time.sleep(0.01)
             left = size - len(ret)
-            ret += self._output_buf[:left]
-            self._output_buf = self._output_buf[len(ret):]
+            with self._output_lock:
+                r = self._output_buf[:left]
+                self._output_buf = self._output_buf[len(r):]
+            ret += r
             if self.timeout and time.time() > end_time:
                 break
 
@@ -4218,13 +4445,20 @@ class DaisyChainSimulator(object):
         """
         Push the output of the given serial port into our output
         """
+        # Only push full lines, so that when several controllers answer at the
+        # same time, their reports are not mixed up (as the real daisy chain).
+        line = ""
         try:
             while not self._is_terminated:
                 c = ser.read(1)
                 if len(c) == 0:
                     time.sleep(0.01)
                 else:
-                    self._output_buf += c
+                    line += c
+                    if c == "\n":
+                        with self._output_lock:
+                            self._output_buf += line
+                        line = ""
         except Exception:
             logging.exception("Fake daisy chain thread received an exception")
 
@@ -285,7 +285,7 @@ class PVCam(model.DigitalCamera):
             temp = self.GetTemperature()
             self.temperature = model.FloatVA(temp, unit=u"°C", readonly=True)
             self._metadata[model.MD_SENSOR_TEMP] = temp
-            self._temp_timer = util.RepeatingTimer(10, self.updateTemperatureVA,
+            self._temp_timer = util.PeriodicTask(10, self.updateTemperatureVA,
                                               "PVCam temperature update")
             self._temp_timer.start()
         except PVCamError:
@@ -318,6 +318,7 @@ class PVCam(model.DigitalCamera):
 
         # binning is needed for _setResolution()
         self._binning = (1, 1) # px
+        self._translation = (0, 0) # px, shift of the centre of the ROI
         max_bin = self._getMaxBinning()
         self._image_rect = (0, resolution[0] - 1, 0, resolution[1] - 1)
         self._min_res = self.GetMinResolution()
@@ -336,6 +337,17 @@ class PVCam(model.DigitalCamera):
                             self._transposeSizeToUser(max_bin)],
                                           setter=self._setBinning)
 
+        # translation is automatically adjusted to fit whenever res/bin change
+        # The region can be anywhere on the sensor => provide translation
+        # With a ROI of 1 px, it can be shifted up to the first and last pixel
+        hlf_shape = (self._shape[0] // 2, self._shape[1] // 2)
+        uh_shape = self._transposeSizeToUser(hlf_shape)
+        tran_rng = ((-uh_shape[0], -uh_shape[1]),
+                    (uh_shape[0], uh_shape[1]))
+        self.translation = model.ResolutionVA((0, 0), tran_rng,
+                                              cls=(int, long), unit="px",
+                                              setter=self._setTranslation)
+
         # default values try to get live microscopy imaging more likely to show something
         try:
             minexp = self.get_param(pv.PARAM_EXP_MIN_TIME) #s
@@ -467,7 +479,7 @@ class PVCam(model.DigitalCamera):
         self._setStaticSettings()
         self.setTargetTemperature(self.targetTemperature.value)
 
-        self._temp_timer = util.RepeatingTimer(10, self.updateTemperatureVA,
+        self._temp_timer = util.PeriodicTask(10, self.updateTemperatureVA,
                                          "PVCam temperature update")
         self._temp_timer.start()
 
@@ -876,9 +888,9 @@ class PVCam(model.DigitalCamera):
         """
         Check the size is correct (it should) and store it ready for SetImage
         size (2-tuple int): Width and height of the image. It will be centred
-         on the captor. It depends on the binning, so the same region has a size
-         twice smaller if the binning is 2 instead of 1. It must be a allowed
-         resolution.
+         on the captor, shifted by the translation. It depends on the binning,
+         so the same region has a size twice smaller if the binning is 2 instead
+         of 1. It must be a allowed resolution.
         """
         full_res = self._shape[:2]
         resolution = (int(full_res[0] // self._binning[0]),
@@ -887,20 +899,71 @@ class PVCam(model.DigitalCamera):
                (1 <= size[1]) and (size[1] <= resolution[1]))
 
         # Region of interest
-        # center the image
-        lt = ((resolution[0] - size[0]) // 2,
-              (resolution[1] - size[1]) // 2)
+        # center the image (in normal pixels), and shift it by the translation,
+        # while staying within the sensor
+        lt = [max(0, min((fr - s * b) // 2 + t, fr - s * b))
+              for fr, s, b, t in zip(full_res, size, self._binning,
+                                     self._translation)]
 
         # the rectangle is defined in normal pixels (not super-pixels) from (0,0)
-        self._image_rect = (lt[0] * self._binning[0], (lt[0] + size[0]) * self._binning[0] - 1,
-                            lt[1] * self._binning[1], (lt[1] + size[1]) * self._binning[1] - 1)
+        self._image_rect = (lt[0], lt[0] + size[0] * self._binning[0] - 1,
+                            lt[1], lt[1] + size[1] * self._binning[1] - 1)
 
     def _setResolution(self, value):
         value = self._transposeSizeFromUser(value)
         new_res = self.resolutionFitter(value)
         self._storeSize(new_res)
+        if model.hasVA(self, "translation"):
+            self.translation.value = self.translation.value  # force re-check
         return self._transposeSizeToUser(new_res)
 
+    def _setTranslation(self, value):
+        """
+        value (int, int): shift from the center. It will always ensure that
+          the whole ROI fits the sensor.
+        returns actual shift accepted
+        """
+        value = self._transposeTransFromUser(value)
+        rect = self._image_rect
+        roi_size = (rect[1] - rect[0] + 1, rect[3] - rect[2] + 1)
+        # compute the min/max of the shift. It's the same as the margin between
+        # the centered ROI and the border, taking into account the binning.
+        # If the margin is odd, the ROI is centred towards the top-left, so
+        # the shift can be one pixel more to the bottom-right.
+        margin = (self._shape[0] - roi_size[0], self._shape[1] - roi_size[1])
+        min_tran = (-(margin[0] // 2), -(margin[1] // 2))
+        max_tran = (margin[0] - margin[0] // 2, margin[1] - margin[1] // 2)
+
+        # between -margin and +margin
+        trans = (max(min_tran[0], min(value[0], max_tran[0])),
+                 max(min_tran[1], min(value[1], max_tran[1])))
+        self._translation = trans
+        self._storeSize((roi_size[0] // self._binning[0],
+                         roi_size[1] // self._binning[1]))
+        return self._transposeTransToUser(trans)
+
+    def _getPhysTrans(self):
+        """
+        Compute the translation in physical units (using the available metadata).
+        Note: the convention is that in internal coordinates Y goes down, while
+        in physical coordinates, Y goes up.
+        returns (tuple of 2 floats): physical position in meters
+        """
+        try:
+            pxs = self._metadata[model.MD_PIXEL_SIZE]
+            # take into account correction
+            pxs_cor = self._metadata.get(model.MD_PIXEL_SIZE_COR, (1, 1))
+            pxs = (pxs[0] * pxs_cor[0], pxs[1] * pxs_cor[1])
+        except KeyError:
+            pxs = self._metadata[model.MD_SENSOR_PIXEL_SIZE]
+
+        trans = self.translation.value # use user transposed value, as it's external world
+        # subtract 0.5 px if the resolution is a odd number
+        shift = [t - (r % 2) / 2 for t, r in zip(trans, self.resolution.value)]
+        phyt = (shift[0] * pxs[0], -shift[1] * pxs[1]) # - to invert Y
+
+        return phyt
+
     def resolutionFitter(self, size_req):
         """
         Finds a resolution allowed by the camera which fits best the requested
@@ -1084,6 +1147,7 @@ class PVCam(model.DigitalCamera):
                     # require a memcpy afterwards. So we keep it simple.
 
                     exposure, region, size = self._update_settings()
+                    phyt = self._getPhysTrans()
                     self.pvcam.pl_exp_init_seq()
                     blength = c_uint32()
                     exp_ms = int(math.ceil(exposure * 1e3)) # ms
@@ -1110,6 +1174,8 @@ class PVCam(model.DigitalCamera):
                     start = time.time()
                     metadata = dict(self._metadata) # duplicate
                     metadata[model.MD_ACQ_DATE] = start
+                    center = metadata.get(model.MD_POS, (0, 0))
+                    metadata[model.MD_POS] = (center[0] + phyt[0], center[1] + phyt[1])
                     expected_end = start + duration
                     timeout = expected_end + 1
                     array = self._buffer_as_array(cbuffer, size, metadata)
@@ -108,6 +108,12 @@ NI_AO_TRIG_AI_START1 = 19  # Trigger number for AI Start1 (= beginning of a comm
 ACQ_CMD_UPD = 1
 ACQ_CMD_TERM = 2
 
+# Minimum time between two frames in progress sent on .partialData (s)
+PARTIAL_DATA_PERIOD = 0.25
+
+# Size of the blocks read at once when averaging the samples on the fly (bytes)
+READ_CHUNK_SIZE = 2 ** 20
+
 # helper functions
 def get_best_dtype_for_acc(idtype, count):
     """
@@ -249,6 +255,8 @@ class SEMComedi(model.HwComponent):
         self._max_ao_period_ns = self._get_max_ao_period_ns()
         # maximum number of samples that can be acquired by one command
         self._max_bufsz = self._get_max_buffer_size()
+        # True if the latest acquisition reused its reading buffers
+        self._acq_reuses_buffers = False
 
         # acquisition thread setup
         # FIXME: we have too many locks. Need to simplify the acquisition and cancellation code
@@ -258,6 +266,7 @@ class SEMComedi(model.HwComponent):
         self._acq_cmd_q = Queue.Queue()
         self._acquisition_must_stop = threading.Event()
         self._acquisitions = set()  # detectors currently active
+        self._last_partial_data = 0  # time the last frame in progress was sent
 
         # create the detector children "detectorN" and "counterN"
         self._detectors = {}  # str (name) -> component
@@ -605,57 +614,6 @@ class SEMComedi(model.HwComponent):
         converter = self._get_converter(subdevice, channel, range, comedi.FROM_PHYSICAL)
         return converter(value)
 
-    def _array_to_phys(self, subdevice, channels, ranges, data):
-        """
-        Converts an array containing raw values to physical
-        subdevice (int): the subdevice index
-        channel (list of int): the channel index for each value of the last dim
-        ranges (list of int): the range index for each value of the last dim
-        data (numpy.ndarray): the array to convert, its last dimension must be the
-          same as the channels and ranges. dtype should be uint (of any size)
-        return (numpy.ndarray of the same shape as data, dtype=double): physical values
-        """
-        # FIXME: this is very slow (2us/element), might need to go into numba,
-        # cython, C, or be avoided.
-        array = numpy.empty(shape=data.shape, dtype=numpy.double)
-        converters = []
-        for i, c in enumerate(channels):
-            converters.append(self._get_converter(subdevice, c, ranges[i],
-                                                  comedi.TO_PHYSICAL))
-
-        # converter needs lsampl (uint32). So for lsampl devices, it's pretty
-        # straightforward, just a matter of convincing SWIG that a numpy.uint32
-        # is a uint32. For sampl devices, everything needs to be converted.
-
-        # Note: it should be possible to access always the values as ctypes
-        # using data.ctypes.strides and
-        # cbuf = data.ctypes.data_as(ctypes.POINTER(ctypes.c_uint32))
-        # but ctypes.addressof(cbuf) != data.ctypes.data
-        # which is a sign of copy (bad)
-        try:
-            flat_data = numpy.reshape(data, numpy.prod(data.shape))
-            cbuf = numpy.ctypeslib.as_ctypes(flat_data)
-        except TypeError:
-            # strided array
-            cbuf = None
-
-        if data.dtype.char == 'L' and cbuf is not None:
-            logging.debug("Using casting to access the raw data")
-            # can just force-cast to a ctype buffer of unsigned int (that swig accepts)
-            # TODO: maybe could be speed-up by something like vectorize()/map()?
-            flat_array = numpy.reshape(array, numpy.prod(data.shape))
-            nchans = len(channels)
-            for i in range(flat_data.size / nchans):
-                for j in range(nchans):
-                    flat_array[nchans * i + j] = converters[j](cbuf[nchans * i + j])
-        else:
-            # Needs real conversion
-            logging.debug("Using full conversion of the raw data")
-            for i, v in numpy.ndenumerate(data):
-                array[i] = converters[i[-1]](int(v))
-
-        return array
-
     def _array_from_phys(self, subdevice, channels, ranges, data):
         """
         Converts an array containing physical values to raw
@@ -912,7 +870,7 @@ class SEMComedi(model.HwComponent):
         comedi.command(self._device, cmd)
 
     def write_read_2d_data_raw(self, wchannels, wranges, rchannels, rranges,
-                               period, margin, osr, dpr, data):
+                               period, margin, osr, dpr, data, progress=None):
         """
         write data on the given analog output channels and read synchronously on
          the given analog input channels and convert back to 2d array
@@ -928,6 +886,9 @@ class SEMComedi(model.HwComponent):
         data (3D numpy.ndarray of int): array to write (raw values)
           first dimension is along the slow axis, second is along the fast axis,
           third is along the channels
+        progress (None or callable): called during the scan, every time some
+          lines have been acquired, with the buffers being filled (list of 2D
+          arrays) and the number of lines complete.
         return (list of 2D numpy.array with shape=(data.shape[0], data.shape[1]-margin)
          and dtype=device type): the data read (raw) for each channel, after
          decimation.
@@ -948,8 +909,16 @@ class SEMComedi(model.HwComponent):
         linesz = data.shape[1] * nrchans * osr * self._reader.dtype.itemsize
         if linesz < self._max_bufsz and not force_per_pixel:
             lines = self._max_bufsz // linesz
+            if progress:
+                # Don't acquire too many lines at once, to report regularly
+                line_dur = data.shape[1] * period
+                lines = min(lines, max(1, int(PARTIAL_DATA_PERIOD / line_dur)))
+            # The oversampled data is averaged while being read, in buffers
+            # reused from one frame to the next.
+            self._acq_reuses_buffers = True
             return self._write_read_2d_lines(wchannels, wranges, rchannels, rranges,
-                                             period, margin, osr, lines, data)
+                                             period, margin, osr, lines, data,
+                                             progress)
 
         # fit a pixel
         max_dpr = (self._max_bufsz / self._reader.dtype.itemsize) // osr
@@ -962,7 +931,8 @@ class SEMComedi(model.HwComponent):
                               "<= %d", pixelsz / 2 ** 20, dpr, max_dpr)
 
             return self._write_read_2d_pixel(wchannels, wranges, rchannels, rranges,
-                                             period, margin, osr, dpr, data)
+                                             period, margin, osr, dpr, data,
+                                             progress)
 
         # separate each pixel into #dpr acquisitions
         pixelsz = nrchans * osr * self._reader.dtype.itemsize
@@ -973,10 +943,11 @@ class SEMComedi(model.HwComponent):
                           pixelsz / 2 ** 20, osr, dpr)
 
         return self._write_read_2d_subpixel(wchannels, wranges, rchannels, rranges,
-                                            period, margin, osr, dpr, data)
+                                            period, margin, osr, dpr, data,
+                                            progress)
 
     def _write_read_2d_lines(self, wchannels, wranges, rchannels, rranges,
-                             period, margin, osr, maxlines, data):
+                             period, margin, osr, maxlines, data, progress=None):
         """
         Implementation of write_read_2d_data_raw by reading the input data n
           lines at a time.
@@ -995,9 +966,6 @@ class SEMComedi(model.HwComponent):
         buf = []
         for c in rchannels:
             buf.append(numpy.empty(rshape, dtype=self._reader.dtype))
-        # TODO: this is pessimistic if max_data of device < dtype.max, so
-        # better use the max_data of the device directly.
-        adtype = get_best_dtype_for_acc(self._reader.dtype, osr)
 
         # read "maxlines" lines at a time
         x = 0
@@ -1007,16 +975,20 @@ class SEMComedi(model.HwComponent):
             wdata = data[x:x + lines, :, :] # just a couple of lines
             wdata = wdata.reshape(-1, wdata.shape[2]) # flatten X/Y
             islast = (x + lines >= data.shape[0])
+            # The oversampled data is averaged as soon as it's read
             rbuf = self._write_read_raw_one_cmd(wchannels, wranges, rchannels,
                                     rranges, period, osr, wdata, margin,
-                                    rest=(islast and self._scanner.fast_park))
+                                    rest=(islast and self._scanner.fast_park),
+                                    average=True)
 
-            # decimate into each buffer
+            # copy into each buffer (without margin)
             for i, b in enumerate(buf):
-                self._scan_raw_to_lines(rshape, margin, osr, x,
-                                        rbuf[..., i], b[x:x + lines, ...], adtype)
+                self._scan_raw_to_lines(rshape, margin, 1, x,
+                                        rbuf[..., i], b[x:x + lines, ...], None)
 
             x += lines
+            if progress and not islast:
+                progress(buf, x)
 
         return buf
 
@@ -1046,7 +1018,7 @@ class SEMComedi(model.HwComponent):
             umath.true_divide(acc, osr, out=oarray, casting='unsafe', subok=False)
 
     def _write_read_2d_pixel(self, wchannels, wranges, rchannels, rranges,
-                             period, margin, osr, dpr, data):
+                             period, margin, osr, dpr, data, progress=None):
         """
         Implementation of write_read_2d_data_raw by reading the input data one
           pixel at a time.
@@ -1080,10 +1052,13 @@ class SEMComedi(model.HwComponent):
             for i, b in enumerate(buf):
                 self._scan_raw_to_pixel(rshape, margin, osr, dpr, x, y,
                                         rbuf[..., i], b, adtype)
+
+            if progress and y == data.shape[1] - 1 and not islast:
+                progress(buf, x + 1)
         return buf
 
     def _write_read_2d_subpixel(self, wchannels, wranges, rchannels, rranges,
-                                period, margin, osr, dpr, data):
+                                period, margin, osr, dpr, data, progress=None):
         """
         Implementation of write_read_2d_data_raw by reading the input data one
          part of a pixel at a time.
@@ -1123,6 +1098,9 @@ class SEMComedi(model.HwComponent):
                 self._scan_raw_to_pixel(rshape, margin, 1, dpr, x, y,
                                         px_rbuf[..., i], b, adtype)
 
+            if progress and y == data.shape[1] - 1 and not islast:
+                progress(buf, x + 1)
+
         return buf
 
     @staticmethod
@@ -1143,7 +1121,8 @@ class SEMComedi(model.HwComponent):
         oarray[x, y - margin] = numpy.sum(data, dtype=adtype) / (osr * dpr)
 
     def _fake_write_read_raw_one_cmd(self, wchannels, wranges, rchannels, rranges,
-                                     period, osr, data, settling_samples, rest=False):
+                                     period, osr, data, settling_samples, rest=False,
+                                     average=False):
         """
         Imitates _write_read_raw_one_cmd() but works with the comedi_test driver,
           just read data.
@@ -1181,7 +1160,8 @@ class SEMComedi(model.HwComponent):
             self._writer.prepare(wbuf, expected_time)
 
             # prepare read buffer info
-            self._reader.prepare(nrscans * nrchans, expected_time)
+            self._reader.prepare(nrscans * nrchans, expected_time,
+                                 osr if average else 1, nrchans)
 
         # FIXME: some times, after many fine acquisitions, this command fails
         # with "ComediError: returned -1 -> (16) Device or resource busy"
@@ -1210,14 +1190,17 @@ class SEMComedi(model.HwComponent):
         rbuf = self._reader.wait(timeout)
         self._writer.wait(0.1)
         # reshape to 2D
-        rbuf.shape = (nrscans, nrchans)
+        if average:
+            osr = 1  # already averaged
+        rbuf.shape = (nwscans * osr, nrchans)
         if rest:
             rbuf = rbuf[:-osr, :] # remove data read during rest positioning
         logging.debug("acquisition took %g s, init=%g s", time.time() - begin, start - begin)
         return rbuf
 
     def _write_read_raw_one_cmd(self, wchannels, wranges, rchannels, rranges,
-                                period, osr, data, settling_samples, rest=False):
+                                period, osr, data, settling_samples, rest=False,
+                                average=False):
         """
         write data on the given analog output channels and read synchronously
           on the given analog input channels in one command
@@ -1234,9 +1217,12 @@ class SEMComedi(model.HwComponent):
         settling_samples (int): number of first write samples used for the
           settling of the beam, and so don't need to trigger newPosition
         rest (boolean): if True, will add one more write to set to rest position
+        average (boolean): if True, the osr samples of each output sample are
+          averaged while reading.
         return (2D numpy.array with dtype=device type)
-            the raw data read (first dimension is data.shape[0] * osr) for each
-            channel (as second dimension).
+            the raw data read (first dimension is data.shape[0] * osr, or
+            data.shape[0] if average is True) for each channel (as second
+            dimension).
         raises:
             IOError: in case of timeout or cancellation
         """
@@ -1269,7 +1255,8 @@ class SEMComedi(model.HwComponent):
             self.setup_timed_command(self._ai_subdevice, rchannels, rranges,
                                      rperiod_ns, stop_arg=nrscans, aref=comedi.AREF_DIFF)
             # prepare to read
-            self._reader.prepare(nrscans * nrchans, expected_time)
+            self._reader.prepare(nrscans * nrchans, expected_time,
+                                 osr if average else 1, nrchans)
 
             # create a command for writing
             # HACK WARNING:
@@ -1318,7 +1305,9 @@ class SEMComedi(model.HwComponent):
         if nwscans != 1:
             self._writer.wait() # writer is faster, so there should be no wait
         # reshape to 2D
-        rbuf.shape = (nrscans, nrchans)
+        if average:
+            osr = 1  # already averaged
+        rbuf.shape = (nwscans * osr, nrchans)
         if rest:
             rbuf = rbuf[:-osr, :] # remove data read during rest positioning
         return rbuf
@@ -1631,6 +1620,7 @@ class SEMComedi(model.HwComponent):
                 if detectors:
                     self._scanner.indicate_scan_state(True)
                     # write and read the raw data
+                    self._acq_reuses_buffers = False  # updated by the acquisition
                     try:
                         if any(isinstance(d, CountingDetector) for d in detectors):
                             rdas = self._acquire_counting_detector(detectors)
@@ -1661,9 +1651,11 @@ class SEMComedi(model.HwComponent):
                             da = (d.shape[0] - 1) - da
                         d.data.notify(da)
 
-                    # force the GC to non-used buffers, for some reason, without this
-                    # the GC runs only after we've managed to fill up the memory
-                    if time.time() - last_gc > 2:  # Costly, so not too often
+                    # Force the GC to non-used buffers, for some reason, without this
+                    # the GC runs only after we've managed to fill up the memory.
+                    # Not needed when the acquisition reuses its reading buffers.
+                    if (not self._acq_reuses_buffers and
+                        time.time() - last_gc > 2):  # Costly, so not too often
                         gc.collect()  # TODO: if scan is long enough, during scan
                         last_gc = time.time()
                 else:  # nothing to acquire => rest
@@ -1756,18 +1748,21 @@ class SEMComedi(model.HwComponent):
         for dmdi, mdi in zip(dmd, md):
             mdi.update(dmdi)
 
+        # If someone is interested, send the frame while it's being acquired
+        if any(d.partialData._count_listeners() for d in detectors):
+            self._last_partial_data = time.time()
+            progress = functools.partial(self._notify_partial_data, detectors, md)
+        else:
+            progress = None
+
         # write and read the raw data
         rbuf = self.write_read_2d_data_raw(wchannels, wranges, rchannels,
-                            rranges, period, margin, osr, dpr, scan)
+                            rranges, period, margin, osr, dpr, scan, progress)
+        # In case of scan path, one value per position
+        rbuf = [self._scanner.merge_path_samples(b) for b in rbuf]
 
-        # logging.debug("Converting raw data to physical: %s", rbuf)
-        # TODO decimate/convert the data while reading, to save time, or do not convert at all
-        # TODO: fast way to convert to physical values (and if possible keep
-        # integers as output
-        # converting to physical value would look a bit like this:
-        # the ranges could be save in the metadata.
-        # parray = self._array_to_phys(self_sem._ai_subdevice,
-        #                              [self.component.channel], [rranges], data)
+        # The data is kept raw (integers), the conversion to physical values
+        # (V) is not needed.
 
         # Transform raw data + metadata into a 2D DataArray
         rdas = []
@@ -1776,6 +1771,33 @@ class SEMComedi(model.HwComponent):
 
         return rdas
 
+    def _notify_partial_data(self, detectors, md, buf, nlines):
+        """
+        Send the frame in progress on the .partialData of the detectors, if
+          the previous one was sent long enough ago.
+        detectors (AnalogDetectors)
+        md (list of dict): metadata of the frame of each detector
+        buf (list of 2D ndarrays): the raw data of each detector, being filled
+        nlines (int): number of lines (from the top) already acquired
+        """
+        now = time.time()
+        if now < self._last_partial_data + PARTIAL_DATA_PERIOD:
+            return
+        self._last_partial_data = now
+
+        for d, mdi, b in zip(detectors, md, buf):
+            if not d.partialData._count_listeners():
+                continue
+            # The lines not yet acquired are left to 0
+            pb = numpy.zeros_like(b)
+            if d.inverted:
+                pb[:nlines] = (d.shape[0] - 1) - b[:nlines]
+            else:
+                pb[:nlines] = b[:nlines]
+            pmd = mdi.copy()
+            pmd[model.MD_ROWS_ACQUIRED] = nlines
+            d.partialData.notify(model.DataArray(pb, pmd))
+
     def _acquire_counting_detector(self, detectors):
         """
         Run the acquisition for one counting detector (and the other detectors
@@ -1832,6 +1854,7 @@ class SEMComedi(model.HwComponent):
         # write and read the raw data
         rbuf = self.write_count_2d_data_raw(wchannels, wranges, counter,
                                             period, margin, dpr, scan)
+        rbuf = [self._scanner.merge_path_samples(b, mean=False) for b in rbuf]
 
         # Transform raw data + metadata into a 2D DataArray
         rdas = []
@@ -2017,16 +2040,27 @@ class Reader(Accesser):
         self.dtype = parent._get_dtype(self._subdevice)
         self.buf = None
         self.count = None
+        self.osr = 1
+        self.nchans = 1
         self._lock = threading.Lock()
+        # Buffers reused between reads, when averaging the samples
+        self._chunk = None
+        self._acc = None
 
-    def prepare(self, count, duration):
+    def prepare(self, count, duration, osr=1, nchans=1):
         """
         count: number of values to read
         duration: expected total duration it will take (in s)
+        osr (1<=int): number of consecutive samples of each channel to average
+          while reading. The result only contains count / osr values.
+        nchans (1<=int): number of channels interleaved in the data
         """
         with self._lock:
             self.count = count
             self.duration = duration
+            self.osr = osr
+            self.nchans = nchans
+            self.buf = None
             self.cancelled = False
             if self.thread and self.thread.isAlive():
                 logging.warning("Preparing a new acquisition while previous one is not over")
@@ -2043,7 +2077,10 @@ class Reader(Accesser):
     def _thread(self):
         """To be called in a separate thread"""
         try:
-            self.buf = numpy.fromfile(self.file, dtype=self.dtype, count=self.count)
+            if self.osr == 1:
+                self.buf = numpy.fromfile(self.file, dtype=self.dtype, count=self.count)
+            else:
+                self.buf = self._read_average()
             logging.debug("read took %g s", time.time() - self._begin)
         except IOError:
             # might be due to a cancel
@@ -2072,11 +2109,47 @@ class Reader(Accesser):
         # the result should be in self.buf
         if self.buf is None:
             raise IOError("Failed to read all the %d expected values" % self.count)
-        elif self.buf.size != self.count:
-            raise IOError("Read only %d values from the %d expected" % (self.buf.size, self.count))
+        elif self.buf.size != self.count // self.osr:
+            raise IOError("Read only %d values from the %d expected" %
+                          (self.buf.size * self.osr, self.count))
 
         return self.buf
 
+    def _read_average(self):
+        """
+        Read the data by blocks, and average the samples of each pixel as soon
+          as they are received. It avoids keeping all the raw data in memory.
+        return (1D ndarray of self.dtype): the average of every osr
+          samples of each channel (so of length count / osr)
+        raise IOError: if not all the data could be read
+        """
+        osr, nchans = self.osr, self.nchans
+        spp = osr * nchans  # samples per pixel
+        npixels = self.count // spp
+        out = numpy.empty((npixels, nchans), dtype=self.dtype)
+        adtype = get_best_dtype_for_acc(self.dtype, osr)
+
+        # Number of pixels per block
+        cpx = min(npixels, max(1, READ_CHUNK_SIZE // (spp * self.dtype.itemsize)))
+        if (self._chunk is None or self._chunk.size < cpx * spp or
+            self._acc.size < cpx * nchans or self._acc.dtype != adtype):
+            self._chunk = numpy.empty(cpx * spp, dtype=self.dtype)
+            self._acc = numpy.empty(cpx * nchans, dtype=adtype)
+
+        p = 0
+        while p < npixels:
+            n = min(cpx, npixels - p)
+            chunk = self._chunk[:n * spp]
+            nbytes = self.file.readinto(chunk)
+            if nbytes != chunk.nbytes:
+                raise IOError("Read only %d bytes out of %d" % (nbytes, chunk.nbytes))
+            acc = self._acc[:n * nchans].reshape(n, nchans)
+            umath.add.reduce(chunk.reshape(n, osr, nchans), axis=1, dtype=adtype, out=acc)
+            umath.true_divide(acc, osr, out=out[p:p + n], casting='unsafe')
+            p += n
+
+        return out.ravel()
+
     def cancel(self):
         with self._lock:
             logging.debug("Cancelling read")
@@ -2211,7 +2284,9 @@ class MMapReader(Reader):
     def close(self):
         Reader.close(self)
 
-    def prepare(self, count, duration):
+    def prepare(self, count, duration, osr=1, nchans=1):
+        if osr != 1:
+            raise NotImplementedError("MMapReader cannot average the samples")
         with self._lock:
             self.count = count
             self.duration = duration
@@ -2733,6 +2808,13 @@ class Scanner(model.Emitter):
         self._prev_settings = [None, None, None, None] # resolution, scale, translation, margin
         self._scan_array = None # last scan array computed
 
+        # None for a standard (raster) scan, or the arbitrary path to scan:
+        # positions (Nx2 ndarray, in px, Y/X) and dwell times (None or N floats)
+        self._scan_path = None
+        self._scan_path_version = 0  # incremented every time the path changes
+        # None, or the number of scan periods of each point of the path
+        self._path_repeats = None
+
     def terminate(self):
         if self._scanning_mng:
             self.indicate_scan_state(False)
@@ -2752,6 +2834,42 @@ class Scanner(model.Emitter):
     def HFWNoMag(self):
         return self._hfw_nomag
 
+    def setScanPath(self, positions, dwellTimes=None):
+        """
+        Scan an arbitrary list of positions instead of the rectangular area
+          defined by .resolution, .scale and .translation. The whole path is
+          scanned by the hardware in one go, which is much faster than moving
+          the beam by changing the translation for each point.
+          While a path is set, the data acquired has a shape of 1 x N, with one
+          value per position (in the same order).
+        positions (None or array of shape Nx2 of floats): X/Y positions in px
+          from the center of the whole scanning area, as .translation. If None,
+          the standard scan is used again.
+        dwellTimes (None or array of N floats): time spent on each position (s).
+          They are rounded to a multiple of .dwellTime, which is the time spent
+          on each position if None.
+        raise ValueError: if a position is outside of the scanning area
+        """
+        if positions is None:
+            self._scan_path = None
+        else:
+            pos = numpy.array(positions, dtype=numpy.double)
+            if pos.ndim != 2 or pos.shape[1] != 2 or pos.shape[0] < 1:
+                raise ValueError("positions should be of shape Nx2, but got %s" % (pos.shape,))
+            hsize = numpy.array(self._shape) / 2
+            if numpy.any(numpy.abs(pos) > hsize):
+                raise ValueError("Some positions are outside of the scanning area of %s px" %
+                                 (self._shape,))
+            if dwellTimes is not None:
+                dwellTimes = numpy.array(dwellTimes, dtype=numpy.double)
+                if dwellTimes.shape != (pos.shape[0],):
+                    raise ValueError("dwellTimes should contain %d values, but got shape %s" %
+                                     (pos.shape[0], dwellTimes.shape))
+                if numpy.any(dwellTimes <= 0):
+                    raise ValueError("dwellTimes should be all positive")
+            self._scan_path = (pos[:, ::-1], dwellTimes)  # as Y/X
+        self._scan_path_version += 1
+
     def pixelToPhy(self, px_pos):
         """
         Converts a position in pixels to physical (at the current magnification)
@@ -3041,12 +3159,30 @@ class Scanner(model.Emitter):
         Note: it can update the dwell time, if nrchans changed since previous time
         Note: it only recomputes the scanning array if the settings have changed
         Note: it's not thread-safe, you must ensure no simultaneous calls.
+        Note: if a scan path is set, the array is of shape 1x(N+margin)x2,
+          and the data read should be passed to merge_path_samples().
         """
         if nrchans != self._nrchans:
             # force updating the dwell time for this new number of read channels
             self.dwellTime.value = self.dwellTime.value
             assert nrchans == self._nrchans
         dwell_time, osr, dpr = self.dwellTime.value, self._osr, self._dpr
+
+        scan_path = self._scan_path
+        if scan_path is not None:
+            # Settle time for the move from the resting position to the first point
+            margin = int(math.ceil(self._settle_time / dwell_time))
+            new_settings = ["path", self._scan_path_version, dwell_time, margin]
+            if self._prev_settings != new_settings:
+                self._update_raw_path_array(scan_path[0], scan_path[1],
+                                            dwell_time, margin)
+                self._prev_settings = new_settings
+
+            shape = (1, self._scan_array.shape[1] - margin)
+            return (self._scan_array, dwell_time, shape,
+                    margin, self._channels, self._ranges, osr, dpr)
+
+        self._path_repeats = None
         resolution = self.resolution.value
         scale = self.scale.value
         translation = self.translation.value
@@ -3142,6 +3278,89 @@ class Scanner(model.Emitter):
             self._scan_array = self.parent._array_from_phys(self.parent._ao_subdevice,
                                             self._channels, ranges, scan_phys)
 
+    def _update_raw_path_array(self, pos, dwell_times, period, margin):
+        """
+        Update the raw array of values to send to scan an arbitrary path.
+        pos (Nx2 ndarray of floats): Y/X positions in px from the center
+        dwell_times (None or N floats): time to spend on each position (s)
+        period (float): time spent on each write sample (s)
+        margin (0<=int): number of samples at the first position to add at
+          the beginning, for the settling of the beam
+        returns nothing, but update ._scan_array, ._ranges and ._path_repeats.
+        """
+        area_shape = self._shape[::-1]
+        volts = numpy.empty(pos.shape, dtype=numpy.double)
+        for i, lim in enumerate(self._limits):
+            center = (lim[0] + lim[1]) / 2
+            pxv = (lim[1] - lim[0]) / area_shape[i]  # V/px
+            volts[:, i] = center + pos[:, i] * pxv
+
+        vlim = numpy.array([volts.min(axis=0), volts.max(axis=0)])  # min/max x Y/X
+        ranges = []
+        for i, channel in enumerate(self._channels):
+            best_range = comedi.find_range(self.parent._device,
+                                           self.parent._ao_subdevice,
+                                           channel, comedi.UNIT_volt,
+                                           vlim[0, i], vlim[1, i])
+            ranges.append(best_range)
+        self._ranges = ranges
+
+        # The conversion is linear (cf _can_generate_raw_directly), so only the
+        # limits need to be converted, and the rest is interpolated.
+        rlim = self.parent._array_from_phys(self.parent._ao_subdevice,
+                                            self._channels, ranges, vlim)
+        raw = numpy.empty(pos.shape, dtype=rlim.dtype)
+        for i in range(2):
+            rmin, rmax = float(rlim[0, i]), float(rlim[1, i])
+            if vlim[1, i] == vlim[0, i]:
+                raw[:, i] = rmin
+            else:
+                ratio = (rmax - rmin) / (vlim[1, i] - vlim[0, i])
+                raw[:, i] = numpy.round(rmin + (volts[:, i] - vlim[0, i]) * ratio)
+
+        # Each position is written as many times as needed to last its dwell time
+        if dwell_times is None:
+            self._path_repeats = None
+        else:
+            repeats = numpy.maximum(1, numpy.round(dwell_times / period)).astype(numpy.intp)
+            if numpy.all(repeats == 1):
+                self._path_repeats = None
+            else:
+                self._path_repeats = repeats
+                raw = numpy.repeat(raw, repeats, axis=0)
+
+        if margin:
+            raw = numpy.concatenate([numpy.repeat(raw[:1], margin, axis=0), raw])
+        self._scan_array = raw.reshape(1, raw.shape[0], 2)
+
+    def merge_path_samples(self, data, mean=True):
+        """
+        Reduce the data acquired with a scan path, so that there is only one
+          value per position, even when the dwell times are longer than the
+          dwell time.
+        data (2D ndarray of shape 1xM): the data acquired, with the last scan
+          array returned by get_scan_data().
+        mean (bool): if True, the samples of each position are averaged
+          (eg, for analog detectors), otherwise they are summed (eg, for
+          counters).
+        return (2D ndarray of shape 1xN): the data with one value per position.
+          If no scan path or if each position is written once, it is the same
+          as data.
+        """
+        repeats = self._path_repeats
+        if repeats is None:
+            return data
+
+        starts = numpy.cumsum(repeats) - repeats
+        adtype = get_best_dtype_for_acc(data.dtype, int(repeats.max()))
+        acc = umath.add.reduceat(data[0], starts, dtype=adtype)
+        if mean:
+            out = numpy.empty(acc.shape, dtype=data.dtype)
+            umath.true_divide(acc, repeats, out=out, casting='unsafe')
+        else:
+            out = acc
+        return out.reshape(1, -1)
+
     @staticmethod
     def _generate_scan_array(shape, limits, margin):
         """
@@ -3227,6 +3446,11 @@ class AnalogDetector(model.Detector):
                                      channel)
         self._shape = (maxdata + 1,) # only one point
         self.data = SEMDataFlow(self, parent)
+        # The frames being acquired, while .data is subscribed. It is useful
+        # to see a long scan build up. The images have the full size, with
+        # MD_ROWS_ACQUIRED indicating how many rows (from the top) are valid.
+        # Subscribing to it doesn't start an acquisition.
+        self.partialData = model.DataFlow()
 
         # Special event to request software unblocking on the scan
         self.softwareTrigger = model.Event()
@@ -27,7 +27,6 @@ import numpy
 from odemis import model, util, dataio
 from odemis.model import isasync, oneway
 import os
-from scipy import ndimage
 import time
 
 
@@ -128,6 +127,9 @@ class Camera(model.DigitalCamera):
         self._generator = None
         # Convenience event for the user to connect and fire
         self.softwareTrigger = model.Event()
+        # Number of frames the camera is armed for, when synchronized. If > 1,
+        # the frames only wait for the event, without any overhead.
+        self.sequenceLength = model.IntContinuous(1, (1, 1000000), unit="")
 
     def _setBinning(self, value):
         """
@@ -207,13 +209,15 @@ class Camera(model.DigitalCamera):
         self.data._waitSync()
         if self.data._sync_event:
             # If sync event, we need to simulate period after event (not efficient, but works)
-            time.sleep(self.exposureTime.value)
+            exp = self.exposureTime.value
+            time.sleep(exp)
+        else:
+            exp = timer.period
 
         metadata = gen_img.metadata.copy()
         metadata.update(self._metadata)
 
         # update fake output metadata
-        exp = timer.period
         metadata[model.MD_ACQ_DATE] = time.time() - exp
         metadata[model.MD_EXP_TIME] = exp
         logging.debug("Generating new fake image of shape %s", gen_img.shape)
@@ -221,6 +225,7 @@ class Camera(model.DigitalCamera):
             # apply the defocus
             pos = self._focus.position.value['z']
             dist = abs(pos - self._focus._good_focus) * 1e4
+            from scipy import ndimage  # not needed when there is no focus
             img = ndimage.gaussian_filter(gen_img, sigma=dist)
         else:
             img = gen_img
@@ -230,8 +235,12 @@ class Camera(model.DigitalCamera):
         # send the new image (if anyone is interested)
         self.data.notify(img)
 
-        # simulate exposure time
-        timer.period = self.exposureTime.value
+        if self.data._sync_event and self.sequenceLength.value > 1:
+            # Armed for a sequence => directly wait for the next event
+            timer.period = 0
+        else:
+            # simulate exposure time
+            timer.period = self.exposureTime.value
 
     def _simulate(self):
         """
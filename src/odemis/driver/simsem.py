@@ -23,18 +23,28 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 from __future__ import division
 
 from Pyro4.core import isasync
+import collections
 import logging
 import math
 import numpy
 from odemis import model, util, dataio
 from odemis.util import img
 import os
-from scipy import ndimage
 import threading
 import time
 import weakref
 
 
+# Number of random values kept to generate the noise. Each frame uses a
+# different part of them, so it should be much bigger than a frame.
+NOISE_POOL_SIZE = 2 ** 22
+# The defocus blur is only simulated by steps of this size (in px), so that
+# the blurred images can be cached.
+BLUR_STEP = 0.25
+# Number of (blurred or depth reduced) full fake images kept
+BLUR_CACHE_SIZE = 4
+
+
 class SimSEM(model.HwComponent):
     '''
     This is an extension of the model.HwComponent class. It first reads and
@@ -44,6 +54,7 @@ class SimSEM(model.HwComponent):
     '''
 
     def __init__(self, name, role, children, image=None, drift_period=None,
+                 drift_model="step", noise=None, noise_level=0.02,
                  daemon=None, **kwargs):
         '''
         children (dict string->kwargs): parameters setting for the children.
@@ -52,8 +63,23 @@ class SimSEM(model.HwComponent):
         image (str or None): path to a file to use as fake image (relative to
          the directory of this class)
         drift_period (None or 0<float): time period for drift updating in seconds
+        drift_model ("step" or "smooth"): with "step", the drift moves by 1 px
+         every drift_period. With "smooth", it moves continuously (sub-pixel),
+         back and forth, at the same average speed.
+        noise (None, "gaussian" or "poisson"): type of noise added to each
+         image. "gaussian" is independent of the signal, while "poisson" is
+         (an approximation of) shot noise, proportional to the square root of
+         the signal.
+        noise_level (0<=float): standard deviation of the noise, as a ratio of
+         the maximum value of the image (for "poisson", at the maximum value).
         Raise an exception if the device cannot be opened
         '''
+        if drift_model not in ("step", "smooth"):
+            raise ValueError("drift_model should be 'step' or 'smooth', but got %s" % (drift_model,))
+        if noise not in (None, "gaussian", "poisson"):
+            raise ValueError("noise should be None, 'gaussian' or 'poisson', but got %s" % (noise,))
+        if noise_level < 0:
+            raise ValueError("noise_level should be positive, but got %s" % (noise_level,))
         # fake image setup
         if image is None:
             image = u"simsem-fake-output.h5"
@@ -65,6 +91,9 @@ class SimSEM(model.HwComponent):
         self.fake_img = img.ensure2DImage(converter.read_data(image)[0])
 
         self._drift_period = drift_period
+        self._drift_model = drift_model
+        self._noise = noise
+        self._noise_level = noise_level
 
         # we will fill the set of children with Components later in ._children
         model.HwComponent.__init__(self, name, role, daemon=daemon, **kwargs)
@@ -114,10 +143,13 @@ class Scanner(model.Emitter):
     etc. Similarly it subscribes to the VAs of scale and magnification in order
     to update the pixel size.
     """
-    def __init__(self, name, role, parent, aperture=100e-6, wd=10e-3, **kwargs):
+    def __init__(self, name, role, parent, aperture=100e-6, wd=10e-3,
+                 min_dwell_time=1e-6, **kwargs):
         """
         aperture (0 < float): aperture diameter of the electron lens
         wd (0 < float): working distance
+        min_dwell_time (0 < float): shortest dwell time accepted (s). It can be
+         set very small to simulate a very fast scan (eg, for load testing).
         """
         # It will set up ._shape and .parent
         model.Emitter.__init__(self, name, role, parent=parent, **kwargs)
@@ -193,7 +225,8 @@ class Scanner(model.Emitter):
         self.rotation = model.FloatContinuous(0, [0, 2 * math.pi], unit="rad",
                                               readonly=True)
 
-        self.dwellTime = model.FloatContinuous(1e-06, (1e-06, 1000), unit="s")
+        self.dwellTime = model.FloatContinuous(max(1e-06, min_dwell_time),
+                                               (min_dwell_time, 1000), unit="s")
 
         # VAs to control the ebeam, purely fake
         self.probeCurrent = model.FloatEnumerated(1.3e-9,
@@ -355,12 +388,21 @@ class Detector(model.Detector):
         # Given that max resolution is half the shape of fake_img,
         # we set the drift bound to stay inside the fake_img bounds
         self.drift_bound = min(v // 4 for v in self.fake_img.shape[::-1])
+        self._drift_start = time.time()
         self._update_drift_timer = util.RepeatingTimer(parent._drift_period,
                                                        self._update_drift,
                                                        "Drift update")
-        if parent._drift_period:
+        if parent._drift_period and parent._drift_model == "step":
             self._update_drift_timer.start()
 
+        # (lt, scale, res) -> (rows, cols): index vectors of the last frame
+        self._coord_cache = (None, None)
+        # (bpp, blur) -> ndarray: full fake images, with the depth reduced and
+        # blurred, last used
+        self._src_cache = collections.OrderedDict()
+        self._noise_pool = None  # ndarray of float32, to generate the noise
+        self._img_max = max(1, int(self.fake_img.max()))
+
         self._metadata[model.MD_DET_TYPE] = model.MD_DT_NORMAL
 
     @isasync
@@ -410,6 +452,133 @@ class Detector(model.Detector):
         if abs(self.current_drift) == self.drift_bound:
             self.drift_factor = -self.drift_factor
 
+    def _get_drift(self):
+        """
+        return (float, float): the current drift in X and Y (in px of the fake image)
+        """
+        if self.parent._drift_period and self.parent._drift_model == "smooth":
+            # Same amplitude and average speed as the step model
+            period = 4 * self.drift_bound * self.parent._drift_period
+            t = time.time() - self._drift_start
+            drift = self.drift_bound * math.sin(2 * math.pi * t / period)
+        else:
+            drift = self.current_drift
+        return -drift, drift
+
+    def _get_coordinates(self, lt, scale, res):
+        """
+        Compute the rows and columns of the fake image which are scanned
+        lt (float, float): position of the top-left pixel
+        scale (float, float): distance between two pixels
+        res (int, int): number of pixels
+        return (ndarray of int, ndarray of int): the rows and the columns
+        """
+        key = (lt, scale, res)
+        if self._coord_cache[0] != key:
+            shape = self.fake_img.shape
+            # floor(x + 0.5) is the same as round(x), for positive values
+            cols = numpy.floor(lt[0] + numpy.arange(res[0]) * scale[0] + 0.5).astype(numpy.intp)
+            rows = numpy.floor(lt[1] + numpy.arange(res[1]) * scale[1] + 0.5).astype(numpy.intp)
+            # The drift can bring the last pixel just outside
+            numpy.clip(cols, 0, shape[1] - 1, out=cols)
+            numpy.clip(rows, 0, shape[0] - 1, out=rows)
+            self._coord_cache = (key, (rows, cols))
+        return self._coord_cache[1]
+
+    def _take_pixels(self, img, rows, cols):
+        """
+        Select the pixels of an image at the given rows and columns
+        img (ndarray): 2D image of the same shape as the fake image
+        return (ndarray): 2D array of shape len(rows), len(cols). It might be
+          a view on img, so it must not be modified.
+        """
+        # Most of the time the steps are regular, and slicing is much faster
+        # than fancy indexing.
+        sl = []
+        for idx in (rows, cols):
+            step = idx[1] - idx[0] if len(idx) > 1 else 1
+            if step > 0 and numpy.all(numpy.diff(idx) == step):
+                sl.append(slice(idx[0], idx[-1] + 1, step))
+            else:
+                sl.append(idx)
+
+        return img[sl[0], :][:, sl[1]]
+
+    def _get_source(self, bpp, blur):
+        """
+        Get the whole fake image, with the depth reduced and blurred, or reuse
+          one recently computed. As it doesn't depend on the drift, shift or
+          ROI, it only has to be computed again when the focus or bpp change.
+        bpp (int): number of bits per pixel
+        blur (0<=float): standard deviation of the defocus blur (in px)
+        return (ndarray): the image. It must not be modified.
+        """
+        key = (bpp, blur)
+        try:
+            src = self._src_cache.pop(key)
+        except KeyError:
+            if blur > 0:
+                from scipy import ndimage  # not needed as long as the image is in focus
+                src = ndimage.gaussian_filter(self._get_source(bpp, 0), sigma=blur)
+            elif bpp < 16:
+                # reduce image depth
+                mind, maxd = self.fake_img.min(), self.fake_img.max()
+                maxf = 2 ** bpp - 1
+                b = maxf / max(1, maxd - mind)
+                src = numpy.empty(self.fake_img.shape, dtype=numpy.uint8)
+                numpy.multiply(self.fake_img - mind, b, out=src, casting="unsafe")
+            else:
+                src = self.fake_img
+
+            if len(self._src_cache) >= BLUR_CACHE_SIZE:
+                self._src_cache.popitem(last=False)
+        self._src_cache[key] = src  # (put back) as most recent
+        return src
+
+    def _generate_frame(self, lt, scale, res, bpp, blur):
+        """
+        Generate an image without noise
+        blur (0<=float): standard deviation of the defocus blur (in px)
+        return (ndarray): the image. It must not be modified.
+        """
+        rows, cols = self._get_coordinates(lt, scale, res)
+        return self._take_pixels(self._get_source(bpp, blur), rows, cols)
+
+    def _add_noise(self, sim_img, bpp):
+        """
+        Add the noise to an image
+        sim_img (ndarray of int): the image without noise
+        bpp (int): the number of bits per pixel of the image
+        return (ndarray): a new image, of the same shape and dtype
+        """
+        noise = self.parent._noise
+        if noise is None:
+            return sim_img.copy()
+
+        n = sim_img.size
+        if self._noise_pool is None or self._noise_pool.size < 2 * n:
+            self._noise_pool = numpy.random.standard_normal(max(NOISE_POOL_SIZE, 2 * n)).astype(numpy.float32)
+        # Pick a random part of the pool, which is much faster than generating
+        # new random values for every frame.
+        start = numpy.random.randint(0, self._noise_pool.size - n + 1)
+        rnd = self._noise_pool[start:start + n].reshape(sim_img.shape)
+
+        # The noise level is relative to the brightest pixel possible
+        if bpp < 16:
+            ref = 2 ** bpp - 1  # The image is stretched to the whole range
+        else:
+            ref = self._img_max
+        level = self.parent._noise_level * ref
+        if noise == "gaussian":
+            noisy = rnd * numpy.float32(level)
+        else:  # "poisson": std is proportional to sqrt(signal)
+            noisy = numpy.sqrt(sim_img, dtype=numpy.float32)
+            noisy *= numpy.float32(level / math.sqrt(ref))
+            noisy *= rnd
+        noisy += sim_img
+        numpy.clip(noisy, 0, numpy.iinfo(sim_img.dtype).max, out=noisy)
+        return noisy.astype(sim_img.dtype)
+
     def _simulate_image(self):
         """
         Generates the fake output based on the translation, resolution and
@@ -434,35 +603,26 @@ class Detector(model.Detector):
 
             shape = self.fake_img.shape
             # Simulate shift and drift
-            center = (shape[1] / 2 - shi[0] / pxs[0] - self.current_drift,
-                      shape[0] / 2 - shi[1] / pxs[1] + self.current_drift)
+            drift = self._get_drift()
+            center = (shape[1] / 2 - shi[0] / pxs[0] + drift[0],
+                      shape[0] / 2 - shi[1] / pxs[1] + drift[1])
 
             lt = (center[0] + pxs_pos[0] - (res[0] / 2) * scale[0],
                   center[1] + pxs_pos[1] - (res[1] / 2) * scale[1])
             assert(lt[0] >= 0 and lt[1] >= 0)
-            # compute each row and column that will be included
-            coord = ([int(round(lt[0] + i * scale[0])) for i in range(res[0])],
-                     [int(round(lt[1] + i * scale[1])) for i in range(res[1])])
-            sim_img = self.fake_img[numpy.ix_(coord[1], coord[0])] # copy
 
-            # reduce image depth if requested
             bpp = self.bpp.value
-            if bpp < 16:
-                mind, maxd = sim_img.min(), sim_img.max()
-                maxf = 2 ** bpp - 1
-                b = maxf / (maxd - mind)
-                sim_img -= mind
-                sim_img *= b
-                if bpp <= 8:
-                    sim_img = sim_img.astype(numpy.uint8)
-
             metadata[model.MD_BPP] = bpp
 
             if self.parent._focus:
                 # apply the defocus
                 pos = self.parent._focus.position.value['z']
                 dist = abs(pos - self.parent._focus._good_focus) * 1e4
-                sim_img = ndimage.gaussian_filter(sim_img, sigma=dist)
+                blur = round(dist / BLUR_STEP) * BLUR_STEP
+            else:
+                blur = 0
+
+            sim_img = self._add_noise(self._generate_frame(lt, scale, res, bpp, blur), bpp)
 
             # update fake output metadata
             metadata[model.MD_POS] = updated_phy_pos
@@ -482,13 +642,19 @@ class Detector(model.Detector):
         the Dataflow.
         """
         try:
+            sim_dur = 0  # time it took to generate the previous image
             while not self._acquisition_must_stop.is_set():
                 dwelltime = self.parent._scanner.dwellTime.value
                 resolution = self.parent._scanner.resolution.value
                 duration = numpy.prod(resolution) * dwelltime
-                if self._acquisition_must_stop.wait(duration):
+                # The generation of the image takes time too, so it's
+                # counted as part of the scan (except for the first frame).
+                if self._acquisition_must_stop.wait(max(0, duration - sim_dur)):
                     break
-                callback(self._simulate_image())
+                tstart = time.time()
+                im = self._simulate_image()
+                sim_dur = time.time() - tstart
+                callback(im)
         except Exception:
             logging.exception("Unexpected failure during image acquisition")
         finally:
@@ -210,7 +210,7 @@ class Chamber(model.Actuator):
             self.pressure = model.VigilantAttribute(self._position,
                                         unit="Pa", readonly=True)
 
-            self._press_timer = util.RepeatingTimer(1, self._updatePressure,
+            self._press_timer = util.PeriodicTask(1, self._updatePressure,
                                              "Simulated pressure update")
             self._press_timer.start()
         else:
@@ -22,6 +22,7 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 from __future__ import division
 from odemis import model
 from odemis.model import ComponentBase, DataFlowBase
+from odemis.util import spectrum
 import logging
 import math
 
@@ -50,6 +51,8 @@ class CompositedSpectrometer(model.Detector):
        of the shape).
      * the metadata has an additional entry MD_WL_LIST which indicates the
        wavelength associated to each pixel.
+     * if the detector can shift its region of interest, only the rows of the
+       .readoutBand are read, and they are all binned together.
     '''
 
     def __init__(self, name, role, children, **kwargs):
@@ -105,9 +108,6 @@ class CompositedSpectrometer(model.Detector):
         # The resolution and binning are derived from the detector, but with
         # settings set so that there is only one horizontal line.
 
-        # TODO: give a init parameter or VA to specify a smaller window height
-        # than the entire CCD (some spectrometers have only noise on the top and
-        # bottom)
         if dt.binning.range[1][1] < dt.resolution.range[1][1]:
             # without software binning, we are stuck to the max binning
             # TODO: support software binning by rolling up our own dataflow that
@@ -125,16 +125,29 @@ class CompositedSpectrometer(model.Detector):
         # 2D binning is like a "small resolution"
         # Initial binning is minimum binning horizontally, and maximum vertically
         self._binning = (1, min(dt.binning.range[1][1], dt.resolution.range[1][1]))
+        self._band = None  # set later, if supported
         self.binning = model.ResolutionVA(self._binning, dt.binning.range,
                                           setter=self._setBinning)
 
         self._setBinning(self._binning) # will also update the resolution
 
-        # TODO: also wrap translation, if it exists?
+        # Some spectrometers have only noise on the top and bottom of the CCD.
+        # If the detector supports it, only read the rows with signal (first
+        # row, and last row + 1), all binned together.
+        if model.hasVA(dt, "translation") and not dt.translation.readonly:
+            self._band = self._fitBand(self._shape[1] / 2, self._binning[1])
+            h = self._shape[1]
+            self.readoutBand = model.TupleContinuous(self._band,
+                                                     ((0, 1), (h - 1, h)),
+                                                     cls=(int, long), unit="px",
+                                                     setter=self._setReadoutBand)
 
         # duplicate every other VA and Event from the detector
         # that includes required VAs like .pixelSize and .exposureTime
         for aname, value in model.getVAs(dt).items() + model.getEvents(dt).items():
+            if aname == "translation" and self._band is not None:
+                # Controlled via the .readoutBand
+                continue
             if not hasattr(self, aname):
                 setattr(self, aname, value)
             else:
@@ -185,8 +198,16 @@ class CompositedSpectrometer(model.Detector):
         prev_binning = self._binning
         self._binning = tuple(value) # duplicate
 
+        if self._band is not None and self._binning[1] != prev_binning[1]:
+            # Keep the band centred, with the new height
+            band = self._fitBand(sum(self._band) / 2, self._binning[1])
+            self._band = band
+            self.readoutBand._value = band
+            self.readoutBand.notify(band)
+
         if self.data.active:
             self._applyBinning(value)
+            self._applyBand()
 
         # adapt horizontal resolution so that the AOI stays the same
         changeh = prev_binning[0] / self._binning[0]
@@ -219,6 +240,83 @@ class CompositedSpectrometer(model.Detector):
 
         return size
 
+    def _fitBand(self, center, height):
+        """
+        Compute a band of rows of the given height, as close as possible to
+        the given center, and fitting the sensor.
+        center (float): center of the band (in px)
+        height (int): number of rows
+        return (int, int): first row, and last row + 1
+        """
+        height = max(1, min(height, self._shape[1]))
+        top = int(round(center - height / 2))
+        top = max(0, min(top, self._shape[1] - height))
+        return top, top + height
+
+    def _setReadoutBand(self, value):
+        """
+        Called when the readoutBand VA is to be updated. The vertical binning
+        is updated to cover the whole band.
+        value (int, int): first row, and last row + 1
+        return (int, int): the accepted band
+        """
+        top, bottom = value
+        height = max(1, bottom - top)
+        max_height = self.binning.range[1][1]
+        if height > max_height:
+            logging.info("Reducing the readout band %s to the maximum binning "
+                         "of %d px", value, max_height)
+        band = self._fitBand((top + bottom) / 2, min(height, max_height))
+        self._band = band
+
+        b = (self._binning[0], band[1] - band[0])
+        if b != self._binning:
+            # Only the height changes, so the resolution stays the same
+            self._binning = b
+            self.binning._value = b
+            self.binning.notify(b)
+
+        if self.data.active:
+            self._applyBinning(b)
+            self._applyBand()
+
+        return band
+
+    def detectReadoutBand(self, margin=0.1):
+        """
+        Acquire an image of the whole CCD to find the rows which receive light,
+        and set the .readoutBand to cover them. The light to measure must
+        reach the CCD during this acquisition.
+        margin (0 <= float): proportion of the height of the band added on
+          each side
+        return (int, int): the new readout band (first row, and last row + 1)
+        raise:
+            IOError: if the spectrometer is acquiring
+            LookupError: if no illuminated band was found (the readout band is
+              not changed)
+        """
+        if self._band is None:
+            raise NotImplementedError("Detector doesn't support a readout band")
+        if self.data.active:
+            raise IOError("Cannot detect the readout band while acquiring")
+
+        dt = self._detector
+        prev_settings = (dt.binning.value, dt.resolution.value,
+                         dt.translation.value)
+        try:
+            # Keep every row, and the same horizontal binning, to get the
+            # same signal per pixel as during the acquisition
+            dt.binning.value = (self._binning[0], 1)
+            dt.resolution.value = dt.resolution.range[1]
+            dt.translation.value = (0, 0)
+            img = dt.data.get()
+        finally:
+            dt.binning.value, dt.resolution.value, dt.translation.value = prev_settings
+
+        band = spectrum.find_illuminated_band(img, margin)
+        self.readoutBand.value = band
+        return self.readoutBand.value
+
     def _applyBinning(self, b):
         self._detector.binning.value = b
         if self._detector.binning.value != b:
@@ -228,9 +326,26 @@ class CompositedSpectrometer(model.Detector):
         self._detector.resolution.value = res
         assert self._detector.resolution.value[1] == 1
 
+    def _applyBand(self):
+        """
+        Shift the region of interest of the detector to the readout band
+        """
+        if self._band is None:
+            return
+        top, bottom = self._band
+        # The region of the detector is centred on the sensor, shifted by the
+        # translation
+        trans = (0, top - (self._shape[1] - (bottom - top)) // 2)
+        self._detector.translation.value = self._detector.translation.clip(trans)
+        if self._detector.translation.value != trans:
+            logging.warning("Hw translation %s doesn't match the readout band %s",
+                            self._detector.translation.value, self._band)
+
     def _applyCCDSettings(self):
         self._applyBinning(self.binning.value)
         self._applyResolution(self.resolution.value)
+        # Must be last, as the translation is limited by the resolution
+        self._applyBand()
 
     def selfTest(self):
         return self._detector.selfTest() and self._spectrograph.selfTest()
@@ -33,11 +33,19 @@ from odemis.model import (HwError, isasync, CancellableThreadPoolExecutor,
 from odemis.util import TimeoutError
 import re
 import socket
-from tescan import sem, CancelledError
 import threading
 import time
 import weakref
 
+try:
+    from tescan import sem, CancelledError
+except ImportError:
+    # Only the simulator is available (host="fake")
+    sem = None
+
+    class CancelledError(Exception):
+        pass
+
 
 ACQ_CMD_UPD = 1
 ACQ_CMD_TERM = 2
@@ -59,29 +67,26 @@ class SEM(model.HwComponent):
         children (dict string->kwargs): parameters setting for the children.
             Known children are "scanner", "detector", "stage", "focus", "camera"
             and "pressure". They will be provided back in the .children VA
-        host (string): ip address of the SEM server 
+        host (string): ip address of the SEM server. Use "fake" to use a
+          simulator instead.
         Raise an exception if the device cannot be opened
         '''
         # we will fill the set of children with Components later in ._children
         model.HwComponent.__init__(self, name, role, daemon=daemon, **kwargs)
 
         self._host = host
-        self._device = sem.Sem()
         logging.debug("Going to connect to host")
-        result = self._device.Connect(host, 8300)
-        if result < 0:
-            raise HwError("Failed to connect to TESCAN server '%s'. "
-                          "Check that the IP address is correct and TESCAN server "
-                          "connected to the network." % (host,))
+        self._device = self._openDevice()
         logging.info("Connected")
-        # Disable Nagle's algorithm (batching data messages) and send them asap instead.
-        # This is to avoid the 200ms ceiling on data transmission.
-        self._device.connection.socket_c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-        self._device.connection.socket_d.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         # Lock in order to synchronize all the child component functions
-        # that acquire data from the SEM while we continuously acquire images
+        # that use the control channel of the SEM
         self._acq_progress_lock = threading.Lock()
+        # All the commands which don't need to be waited for (VA settings,
+        # polling, starting a scan) are sent from this queue. So they are sent
+        # in order, even while an image is being downloaded (via the data
+        # channel), and only the latest value of a setting is sent.
+        self._requests = util.RequestQueue("Tescan requests", lock=self._acq_progress_lock)
         self._acquisition_mng_lock = threading.Lock()
         self._acquisition_init_lock = threading.Lock()
         self._acq_cmd_q = Queue.Queue()
@@ -173,6 +178,46 @@ class SEM(model.HwComponent):
                                                     name="SEM acquisition thread")
         self._acquisition_thread.start()
 
+    def _openDevice(self):
+        """
+        Connect to the SEM server
+        return (sem.Sem or FakeSem): the connection to the SEM
+        raise HwError: if the connection failed
+        """
+        if self._host == "fake":
+            # When reconnecting, the simulator keeps its state, as a real SEM
+            device = getattr(self, "_device", None) or FakeSem()
+        elif sem is None:
+            raise HwError("TESCAN SEM API not available, check it is installed")
+        else:
+            device = sem.Sem()
+        result = device.Connect(self._host, 8300)
+        if result < 0:
+            raise HwError("Failed to connect to TESCAN server '%s'. "
+                          "Check that the IP address is correct and TESCAN server "
+                          "connected to the network." % (self._host,))
+        # Disable Nagle's algorithm (batching data messages) and send them asap instead.
+        # This is to avoid the 200ms ceiling on data transmission.
+        device.connection.socket_c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        device.connection.socket_d.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return device
+
+    def _send(self, key, cmd, *args):
+        """
+        Queue a command for the SEM, without waiting for it to be sent
+        key (None or str): if not None, the command replaces the command with
+          the same key which is not yet sent.
+        cmd (str): name of the command (ie, method of the sem.Sem API)
+        args: the arguments of the command
+        return (Future): to get the result of the command
+        """
+        return self._requests.submit_coalesced(key, self._runCmd, cmd, *args)
+
+    def _runCmd(self, cmd, *args):
+        # The connection can be reopened (by flush()), so only look for the
+        # method just before the command is sent
+        return getattr(self._device, cmd)(*args)
+
     def _reset_device(self):
         pass
 #         logging.info("Resetting device %s", self._hwName)
@@ -326,12 +371,7 @@ class SEM(model.HwComponent):
 
     def flush(self):
         self._device.Disconnect()
-        self._device = sem.Sem()
-        result = self._device.Connect(self._host, 8300)
-        if result < 0:
-            raise HwError("Failed to connect to TESCAN server '%s'. "
-                          "Check that the ip address is correct and TESCAN server "
-                          "connected to the network." % (self._host,))
+        self._device = self._openDevice()
         self._device.ScStopScan()
         for name, det in self._detectors.iteritems():
             self._device.DtSelect(det._channel, det._detector)
@@ -343,11 +383,14 @@ class SEM(model.HwComponent):
         """
         with self._acquisition_init_lock:
             self._acquisition_must_stop.set()
-            self._device.ScStopScan()
+            with self._acq_progress_lock:
+                self._device.ScStopScan()
+            # Unblock the download of the image (on the data channel)
             self._device.CancelRecv()
             if self._scanner.resolution.value == (1, 1):
-                # flush remaining data in data buffer
-                self.flush()
+                with self._acq_progress_lock:
+                    # flush remaining data in data buffer
+                    self.flush()
                 self.pre_res = None
 
     def _acq_wait_detectors_ready(self):
@@ -417,60 +460,80 @@ class SEM(model.HwComponent):
             b = t + res[1] - 1
 
             dt = self._scanner.dwellTime.value * 1e9
-            # with self._acquisition_init_lock:
             logging.debug("Acquiring SEM image of %s with dwell time %f ns", res, dt)
-        with self._acq_progress_lock:
-            try:
-                # make sure socket settings are always set
-                self._device.connection.socket_c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                self._device.connection.socket_d.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                # Check if spot mode is required
-                if res == (1, 1):
-                    if ((self._scaled_shape != scaled_shape) or
-                        (self._roi != (l, t, r, b)) or
-                        (self._dt != dt) or
-                        (self.pre_res != res)):
-                        self._device.ScStopScan()
-                        # flush remaining data in data buffer
-                        self.flush()
-                        # need to reset
-                        self._device.connection.socket_c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                        self._device.connection.socket_d.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                        self._device.ScScanLine(1, scaled_shape[0], scaled_shape[1],
-                                             l + 1, t + 1, r + 1, b + 1, (dt / TESCAN_PXL_LIMIT), TESCAN_PXL_LIMIT, 0)
-                        self._scaled_shape = scaled_shape
-                        self._roi = (l, t, r, b)
-                        self._dt = dt
-                else:
-                    if self.pre_res == (1, 1):
-                        self._device.ScStopScan()
-                        # flush remaining data in data buffer
-                        self.flush()
-                    self._device.ScScanXY(0, scaled_shape[0], scaled_shape[1],
-                                         l, t, r, b, 1, dt)
-                # we must stop the scanning even after single scan
-                # fetch the image (blocking operation), ndarray is returned
-                if res == (1, 1):
-                    sem_pxs = self._device.FetchArray(channel, TESCAN_PXL_LIMIT)
-                    # Since we acquired TESCAN_PXL_LIMIT integrations of
-                    # dt/TESCAN_PXL_LIMIT we now get the mean signal and return
-                    # it as the result
-                    sem_img = numpy.array([sem_pxs.mean()])
-                else:
-                    sem_img = self._device.FetchArray(channel, res[0] * res[1])
-            except CancelledError:
-                raise CancelledError("Acquisition cancelled during scanning")
-
-            if res != (1, 1):
-                # we must stop the scanning even after single scan
-                self._device.ScStopScan()
 
-            self.pre_res = res
-            sem_img.shape = res[::-1]
-            # Change endianess
-            sem_img.byteswap(True)
+        try:
+            # The scan is started after all the settings requested so far
+            f = self._requests.submit(self._startScan, res, scaled_shape,
+                                      (l, t, r, b), dt)
+            if not f.result():
+                raise CancelledError("Acquisition cancelled before scanning")
+            # Fetch the image (blocking operation), ndarray is returned.
+            # It's received via the data channel, so in the mean time, the
+            # requests (eg, settings for the next scan) can be sent.
+            if res == (1, 1):
+                sem_pxs = self._device.FetchArray(channel, TESCAN_PXL_LIMIT)
+                # Since we acquired TESCAN_PXL_LIMIT integrations of
+                # dt/TESCAN_PXL_LIMIT we now get the mean signal and return
+                # it as the result
+                sem_img = numpy.array([sem_pxs.mean()])
+            else:
+                sem_img = self._device.FetchArray(channel, res[0] * res[1])
+        except CancelledError:
+            raise CancelledError("Acquisition cancelled during scanning")
+
+        if res != (1, 1):
+            # we must stop the scanning even after single scan. No need to
+            # wait for it, as the next scan will only be started afterwards.
+            self._send(None, "ScStopScan")
 
-            return model.DataArray(sem_img, metadata)
+        self.pre_res = res
+        sem_img.shape = res[::-1]
+        # Change endianess
+        sem_img.byteswap(True)
+
+        return model.DataArray(sem_img, metadata)
+
+    def _startScan(self, res, scaled_shape, roi, dt):
+        """
+        Start scanning the given area. To be run from the request queue.
+        res (int, int): number of pixels to scan
+        scaled_shape (float, float): size of the whole area (in scaled pixels)
+        roi (int, int, int, int): left, top, right, bottom of the area to scan
+          (in scaled pixels)
+        dt (float): dwell time (in ns)
+        return (bool): False if the acquisition was stopped in the mean time (and
+          so the scan was not started)
+        """
+        if self._acquisition_must_stop.is_set():
+            return False
+
+        l, t, r, b = roi
+        # make sure socket settings are always set
+        self._device.connection.socket_c.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._device.connection.socket_d.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Check if spot mode is required
+        if res == (1, 1):
+            if ((self._scaled_shape != scaled_shape) or
+                (self._roi != roi) or
+                (self._dt != dt) or
+                (self.pre_res != res)):
+                self._device.ScStopScan()
+                # flush remaining data in data buffer (also resets the socket settings)
+                self.flush()
+                self._device.ScScanLine(1, scaled_shape[0], scaled_shape[1],
+                                     l + 1, t + 1, r + 1, b + 1, (dt / TESCAN_PXL_LIMIT), TESCAN_PXL_LIMIT, 0)
+                self._scaled_shape = scaled_shape
+                self._roi = roi
+                self._dt = dt
+        else:
+            if self.pre_res == (1, 1):
+                self._device.ScStopScan()
+                # flush remaining data in data buffer
+                self.flush()
+            self._device.ScScanXY(0, scaled_shape[0], scaled_shape[1],
+                                 l, t, r, b, 1, dt)
+        return True
 
     def terminate(self):
         """
@@ -478,6 +541,7 @@ class SEM(model.HwComponent):
         but the component shouldn't be used afterwards.
         """
         # Terminate components
+        self._scanner.terminate()
         self._stage.terminate()
         self._focus.terminate()
         if hasattr(self, "_camera"):
@@ -491,6 +555,7 @@ class SEM(model.HwComponent):
                 self._acq_cmd_q.put(ACQ_CMD_TERM)
                 self._req_stop_acquisition()
             self._acquisition_thread.join(10)
+            self._requests.shutdown()
             self._device.Disconnect()
             self._device = None
 
@@ -600,7 +665,7 @@ class Scanner(model.Emitter):
         self.blanker = model.VAEnumerated(None, choices={None})
 
         # Timer polling VAs so we keep up to date with changes made via Tescan UI
-        self._va_poll = util.RepeatingTimer(5, self._pollVAs, "VAs polling")
+        self._va_poll = util.PeriodicTask(5, self._pollVAs, "VAs polling")
         self._va_poll.start()
 
     # we share metadata with our parent
@@ -616,31 +681,44 @@ class Scanner(model.Emitter):
         self._updateMagnification()
 
     def _updateHorizontalFOV(self):
-        prev_fov = self.horizontalFoV.value
-
         with self.parent._acq_progress_lock:
-            new_fov = self.parent._device.GetViewField() * 1e-3
+            self._readHorizontalFOV()
+
+    def _readHorizontalFOV(self):
+        """
+        Update the VA with the FoV of the SEM. The caller must hold the lock of
+        the control channel.
+        """
+        prev_fov = self.horizontalFoV.value
+        new_fov = self.parent._device.GetViewField() * 1e-3
 
         if prev_fov != new_fov:
             self.horizontalFoV._value = new_fov
             self.horizontalFoV.notify(new_fov)
 
     def _setHorizontalFOV(self, value):
+        # Clip to the range of the SEM, so that the value returned is the one
+        # the SEM will report: the read-back after sending it might run before
+        # this value is stored in the VA.
+        value = self.horizontalFoV.clip(value)
+        self.parent._requests.submit_coalesced("hfw", self._applyHorizontalFOV, value)
+        return value
+
+    def _applyHorizontalFOV(self, value):
+        # FOV to mm to comply with Tescan API
+        self.parent._device.SetViewField(value * 1e3)
         # Ensure fov odemis field always shows the right value
         # Also useful in case fov value that we try to set is
-        # out of range
-        with self.parent._acq_progress_lock:
-            # FOV to mm to comply with Tescan API
-            self.parent._device.SetViewField(value * 1e3)
-            cur_fov = self.parent._device.GetViewField() * 1e-3
-        return cur_fov
+        # out of range. No need if it's about to be changed again.
+        if not self.parent._requests.has_pending("hfw"):
+            self._readHorizontalFOV()
 
     def _updateMagnification(self):
         mag = self._hfw_nomag / self.horizontalFoV.value
         self.magnification._set_value(mag, force_write=True)
 
     def _setVoltage(self, volt):
-        self.parent._device.HVSetVoltage(volt)
+        self.parent._send("voltage", "HVSetVoltage", volt)
         # Adjust brightness and contrast
         # TODO: should be part of the detector (and up to the client)
         # with self.parent._acq_progress_lock:
@@ -655,15 +733,15 @@ class Scanner(model.Emitter):
 
         power = util.find_closest(value, powers)
         if power == 0:
-            self.parent._device.HVBeamOff()
+            self.parent._send("power", "HVBeamOff")
         else:
-            self.parent._device.HVBeamOn()
+            self.parent._send("power", "HVBeamOn")
         return power
 
     def _setPC(self, value):
         # Set the corresponding current index to Tescan SEM
         ipc = util.index_closest(value, self._list_currents)
-        self.parent._device.SetPCIndex(ipc + 1)
+        self.parent._send("pc", "SetPCIndex", ipc + 1)
 
         pc = self._list_currents[ipc]
 
@@ -788,23 +866,31 @@ class Scanner(model.Emitter):
         return phy_pos
 
     def _pollVAs(self):
+        # Read the values after the settings already requested are sent
+        self.parent._requests.submit_coalesced("poll VAs", self._readVAs)
+
+    def _readVAs(self):
+        # A setting which is not yet sent would be overridden by the old value
+        requests = self.parent._requests
         try:
-            with self.parent._acquisition_init_lock:
-                logging.debug("Updating FoV, voltage and current")
-                self._updateHorizontalFOV()
-                with self.parent._acq_progress_lock:
-                    prev_volt = self.accelVoltage._value
-                    new_volt = self.parent._device.HVGetVoltage()
-                    if prev_volt != new_volt:
-                        # Skip the setter
-                        self.accelVoltage._value = new_volt
-                        self.accelVoltage.notify(new_volt)
-
-                    prev_pc = self.probeCurrent._value
-                    new_pc = self._list_currents[self.parent._device.GetPCIndex() - 1]
-                    if prev_pc != new_pc:
-                        self.probeCurrent._value = new_pc
-                        self.probeCurrent.notify(new_pc)
+            logging.debug("Updating FoV, voltage and current")
+            if not requests.has_pending("hfw"):
+                self._readHorizontalFOV()
+
+            if not requests.has_pending("voltage"):
+                prev_volt = self.accelVoltage._value
+                new_volt = self.parent._device.HVGetVoltage()
+                if prev_volt != new_volt:
+                    # Skip the setter
+                    self.accelVoltage._value = new_volt
+                    self.accelVoltage.notify(new_volt)
+
+            if not requests.has_pending("pc"):
+                prev_pc = self.probeCurrent._value
+                new_pc = self._list_currents[self.parent._device.GetPCIndex() - 1]
+                if prev_pc != new_pc:
+                    self.probeCurrent._value = new_pc
+                    self.probeCurrent.notify(new_pc)
         except Exception:
             logging.exception("Unexpected failure during VAs polling")
 
@@ -989,16 +1075,12 @@ class Stage(model.Actuator):
         self.position = model.VigilantAttribute({}, unit="m", readonly=True)
         self._updatePosition()
 
-        self._xyz_poll = util.RepeatingTimer(5, self._pollXYZ, "XYZ polling")
+        self._xyz_poll = util.PeriodicTask(5, self._pollXYZ, "XYZ polling")
         self._xyz_poll.start()
 
     def _pollXYZ(self):
-        try:
-            with self.parent._acquisition_init_lock:
-                with self.parent._acq_progress_lock:
-                    self._updatePosition()
-        except Exception:
-            logging.exception("Unexpected failure during XYZ polling")
+        # Don't wait for the position, it's updated from the request queue
+        self.parent._requests.submit_coalesced("poll XYZ", self._updatePosition)
 
     def _updatePosition(self):
         """
@@ -1281,7 +1363,7 @@ class ChamberView(model.DigitalCamera):
          acquisition callback is not permitted (it would cause a dead-lock).
         """
         # "if" is to not wait if it's already finished
-        if self.acquire_must_stop.is_set():
+        if self.acquire_must_stop.is_set() and self.acquire_thread:
             self.acquire_thread.join(10)  # 10s timeout for safety
             if self.acquire_thread.isAlive():
                 raise OSError("Failed to stop the acquisition thread")
@@ -1449,3 +1531,250 @@ class Light(model.Emitter):
             self.parent._device.ChamberLed(1)
         else:
             self.parent._device.ChamberLed(0)
+
+
+def _control(f):
+    """
+    Decorator for the commands of the FakeSem sent via the control channel:
+    they are run one at a time, and take (at least) the latency.
+    """
+    def wrapper(self, *args):
+        with self._ctrl_lock:
+            time.sleep(self.latency)
+            return f(self, *args)
+    wrapper.__name__ = f.__name__
+    wrapper.__doc__ = f.__doc__
+    return wrapper
+
+
+class FakeSocket(object):
+    def setsockopt(self, level, optname, value):
+        pass
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.socket_c = FakeSocket()  # control channel
+        self.socket_d = FakeSocket()  # data channel
+
+
+class FakeSem(object):
+    """
+    Simulates a TESCAN SEM, with the same interface as sem.Sem (but only the
+    commands used by the driver). Only used for testing.
+    Like with the real connection, the commands are sent on a control channel,
+    one at a time, while the images are received on a separate data channel.
+    """
+    def __init__(self, latency=0):
+        """
+        latency (0 <= float): time (in s) taken by each command, to simulate
+          the round-trip of a real connection
+        """
+        self.latency = latency
+        self.connection = FakeConnection()
+        self._ctrl_lock = threading.Lock()
+
+        # internal state
+        self._voltages = (200, 1000, 5000, 10000, 20000, 30000)  # V
+        self._currents = (1, 10, 50, 100, 500, 1000)  # pA
+        self._viewfield = 1.0  # mm
+        self._voltage = 10000  # V
+        self._ipc = 3  # index of the probe current (from 1)
+        self._beam = 1
+        self._wd = 10.0  # mm
+        self._position = [0, 0, 0, 0, 0]  # x, y, z (mm), rotation, tilt (°)
+        self._camera = 0  # chamber camera status
+        self._pressure = PRESSURE_PUMPED
+        self._scan = None  # (number of pixels, duration) of the current scan
+        self._recv_cancelled = threading.Event()
+
+    def Connect(self, host, port):
+        return 0
+
+    def Disconnect(self):
+        pass
+
+    def CancelRecv(self):
+        self._recv_cancelled.set()
+
+    def FetchArray(self, channel, count):
+        """
+        Receive the image of the current scan (via the data channel)
+        """
+        time.sleep(self.latency)
+        if self._scan is None:
+            # the real SEM would wait forever
+            self._recv_cancelled.wait()
+        else:
+            npx, dur = self._scan
+            if count != npx:
+                logging.warning("Fetching %d pixels, while scanning %d", count, npx)
+            self._recv_cancelled.wait(dur)
+        if self._recv_cancelled.is_set():
+            self._recv_cancelled.clear()
+            raise CancelledError("Reception cancelled")
+
+        return numpy.random.randint(0, 2 ** 16, count).astype(numpy.uint16)
+
+    @_control
+    def TcpGetDevice(self):
+        return "FakeSEM"
+
+    @_control
+    def TcpGetSWVersion(self):
+        return "1.0"
+
+    @_control
+    def TcpGetVersion(self):
+        return "3.2.20"
+
+    @_control
+    def GUISetScanning(self, enable):
+        pass
+
+    @_control
+    def ScStopScan(self):
+        self._scan = None
+
+    @_control
+    def ScSetBlanker(self, channel, mode):
+        pass
+
+    @_control
+    def ScScanXY(self, frameid, width, height, left, top, right, bottom, single, dwell):
+        # dwell is in ns, and each line takes a bit more for the flyback
+        npx = (right - left + 1) * (bottom - top + 1)
+        dur = npx * dwell * 1e-9 + (bottom - top + 1) * 5e-6
+        self._recv_cancelled.clear()
+        self._scan = (npx, dur)
+
+    @_control
+    def ScScanLine(self, frameid, width, height, x0, y0, x1, y1, dwell, pixels, single):
+        self._recv_cancelled.clear()
+        self._scan = (pixels, pixels * dwell * 1e-9)
+
+    @_control
+    def DtSelect(self, channel, detector):
+        pass
+
+    @_control
+    def DtEnable(self, channel, enable, bpp):
+        pass
+
+    @_control
+    def DtAutoSignal(self, channel):
+        pass
+
+    @_control
+    def GetViewField(self):
+        return self._viewfield
+
+    @_control
+    def SetViewField(self, fov):
+        self._viewfield = max(1e-4, min(fov, 25.6))
+
+    @_control
+    def HVEnumIndexes(self):
+        return "".join("%d=%f\n" % (i, v) for i, v in enumerate(self._voltages))
+
+    @_control
+    def HVGetVoltage(self):
+        return self._voltage
+
+    @_control
+    def HVSetVoltage(self, volt):
+        self._voltage = volt
+
+    @_control
+    def HVGetBeam(self):
+        return self._beam
+
+    @_control
+    def HVBeamOn(self):
+        self._beam = 1
+
+    @_control
+    def HVBeamOff(self):
+        self._beam = 0
+
+    @_control
+    def EnumPCIndexes(self):
+        return "".join("%d=%f\n" % (i + 1, c) for i, c in enumerate(self._currents))
+
+    @_control
+    def GetPCIndex(self):
+        return self._ipc
+
+    @_control
+    def SetPCIndex(self, index):
+        self._ipc = index
+
+    @_control
+    def StgIsCalibrated(self):
+        return 1
+
+    @_control
+    def StgCalibrate(self):
+        pass
+
+    @_control
+    def StgIsBusy(self):
+        return 0
+
+    @_control
+    def StgGetPosition(self):
+        return tuple(self._position)
+
+    @_control
+    def StgMoveTo(self, x, y, z):
+        self._position[0:3] = [x, y, z]
+
+    @_control
+    def StgStop(self):
+        pass
+
+    @_control
+    def GetWD(self):
+        return self._wd
+
+    @_control
+    def SetWD(self, wd):
+        self._wd = wd
+
+    @_control
+    def CameraEnable(self, channel, zoom, fps, mode):
+        self._camera = 1
+
+    @_control
+    def CameraDisable(self):
+        self._camera = 0
+
+    @_control
+    def CameraGetStatus(self, channel):
+        return (self._camera,)
+
+    def FetchCameraImage(self, channel):
+        time.sleep(self.latency + 0.2)  # 5 fps
+        width, height = 320, 240
+        img = numpy.random.randint(0, 256, width * height).astype(numpy.uint8)
+        return width, height, img.tostring()
+
+    @_control
+    def VacGetStatus(self):
+        return 0
+
+    @_control
+    def VacGetPressure(self, gauge):
+        return self._pressure
+
+    @_control
+    def VacPump(self):
+        self._pressure = PRESSURE_PUMPED
+
+    @_control
+    def VacVent(self):
+        self._pressure = PRESSURE_VENTED
+
+    @_control
+    def ChamberLed(self, state):
+        pass
@@ -24,8 +24,11 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 from __future__ import division
 
 import logging
+import math
 from odemis.driver import andorcam2
 import os
+import threading
+import time
 import unittest
 from unittest.case import skip
 
@@ -69,6 +72,93 @@ class TestFake(VirtualTestCam, unittest.TestCase):
     camera_kwargs = KWARGS_SIM
 
 
+class TestSequenceFake(unittest.TestCase):
+    """
+    Test the synchronized acquisition by sequences (kinetic series), with the
+    software trigger, on the fake version
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.ccd = CLASS_SIM(**KWARGS_SIM)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ccd.terminate()
+
+    def setUp(self):
+        if not hasattr(self.ccd, "sequenceLength"):
+            self.skipTest("Camera doesn't support sequences")
+        self.ccd.binning.value = (1, 1)
+        self.ccd.resolution.value = self.ccd.resolution.range[1]
+        self.ccd.exposureTime.value = 0.01 # s
+        self.got_image = threading.Event()
+        self.ccd_left = 0
+
+        # Record the calls to the DLL
+        self.calls = []
+        atcore = self.ccd.atcore
+        self._orig_calls = {}
+        for fn in ("StartAcquisition", "SetTriggerMode", "SendSoftwareTrigger"):
+            self._orig_calls[fn] = getattr(atcore, fn)
+            setattr(atcore, fn, self._recorder(fn, self._orig_calls[fn]))
+
+    def tearDown(self):
+        for fn, f in self._orig_calls.items():
+            setattr(self.ccd.atcore, fn, f)
+        self.ccd.sequenceLength.value = 1
+
+    def _recorder(self, name, f):
+        def record_call(*args):
+            self.calls.append((name,) + args)
+            return f(*args)
+        return record_call
+
+    def receive_ccd_image(self, dataflow, image):
+        self.ccd_left -= 1
+        if self.ccd_left <= 0:
+            dataflow.unsubscribe(self.receive_ccd_image)
+        self.got_image.set()
+
+    def test_sequence(self):
+        """
+        Send more triggers than the length of the sequence, to check the camera
+        is armed again after each sequence, and goes back to the normal mode at
+        the end
+        """
+        seql = 3
+        numbert = 8
+        self.ccd.sequenceLength.value = seql
+        self.ccd_left = numbert
+
+        self.ccd.data.synchronizedOn(self.ccd.softwareTrigger)
+        self.ccd.data.subscribe(self.receive_ccd_image)
+
+        for i in range(numbert):
+            self.got_image.clear()
+            self.ccd.softwareTrigger.notify()
+            gi = self.got_image.wait(10)
+            self.assertTrue(gi, "image %d not received after 10 s" % (i,))
+
+        self.assertEqual(self.ccd_left, 0)
+        self.ccd.data.synchronizedOn(None)
+
+        # Armed once per sequence, and one software trigger per frame
+        starts = [c for c in self.calls if c[0] == "StartAcquisition"]
+        self.assertEqual(len(starts), int(math.ceil(numbert / seql)))
+        triggers = [c for c in self.calls if c[0] == "SendSoftwareTrigger"]
+        self.assertEqual(len(triggers), numbert)
+
+        # The trigger mode is reset after the acquisition
+        time.sleep(0.1)
+        modes = [c for c in self.calls if c[0] == "SetTriggerMode"]
+        self.assertEqual(modes[-1][1], 0)
+
+        # check we can still get data normally
+        d = self.ccd.data.get()
+        self.assertEqual(d.shape, self.ccd.resolution.value[::-1])
+
+
 #@skip("simple")
 class StaticTestAndorCam2(VirtualStaticTestCam, unittest.TestCase):
     camera_type = CLASS
@@ -22,13 +22,14 @@ from __future__ import division
 
 import Pyro4
 import copy
-from odemis import model
+from odemis import model, util
 from odemis.driver import phenom
 import os
 import pickle
 import threading
 import time
 import unittest
+import weakref
 from unittest.case import skip
 from odemis.model import HwError
 
@@ -109,6 +110,138 @@ class TestSEMStatic(unittest.TestCase):
         daemon.shutdown()
 
 
+class FakeDevice(object):
+    """
+    Records the calls to the Phenom API which are used to apply the settings
+    """
+    def __init__(self):
+        self.calls = []
+        self.tilt = phenom.TILT_BLANK
+
+    def GetSEMSourceTilt(self):
+        tilt = FakeObject()
+        tilt.aX, tilt.aY = self.tilt
+        return tilt
+
+    def SetSEMSourceTilt(self, x, y, b):
+        self.calls.append(("SetSEMSourceTilt", x, y, b))
+        self.tilt = (x, y)
+
+    def SEMSetHighTension(self, volt):
+        self.calls.append(("SEMSetHighTension", volt))
+        # The Phenom unblanks the beam when changing the voltage
+        self.tilt = (0.1, 0.2)
+
+    def SetSEMImageShift(self, pos, b):
+        self.calls.append(("SetSEMImageShift", pos.x, pos.y, b))
+
+
+class FakeObject(object):
+    pass
+
+
+class FakeObjects(object):
+    def create(self, name):
+        return FakeObject()
+
+
+class FakeSEM(object):
+    """
+    Just the attributes of phenom.SEM used to apply the settings
+    """
+    def __init__(self):
+        self._device = FakeDevice()
+        self._objects = FakeObjects()
+        self._acq_progress_lock = threading.Lock()
+        self._requests = util.RequestQueue("Test requests", lock=self._acq_progress_lock)
+        self._blank_supported = False
+        self._detector = FakeObject()
+        self._detector._tilt_unblank = None
+
+
+class TestRequests(unittest.TestCase):
+    """
+    Tests of the settings sent via the request queue, and of the images passed
+    on by the notifier thread, which don't need a SEM
+    """
+    def setUp(self):
+        self.sem = FakeSEM()
+        self.scanner = phenom.Scanner.__new__(phenom.Scanner)
+        self.scanner._parent = weakref.ref(self.sem)
+        self.scanner.spotSize = model.FloatVA(2.1)
+
+    def tearDown(self):
+        self.sem._requests.shutdown()
+
+    def test_voltage(self):
+        """
+        Only the latest voltage is sent, and the beam stays blanked
+        """
+        # Block the queue, as if a previous request was taking time
+        release = threading.Event()
+        self.sem._requests.submit(release.wait)
+        for v in (5000, 10000, 15000):
+            self.scanner._onVoltage(v)
+        self.assertEqual(self.sem._device.calls, [])
+
+        release.set()
+        self.sem._requests.submit(lambda: None).result()
+        self.assertEqual(self.sem._device.calls,
+                         [("SEMSetHighTension", -15000),
+                          ("SetSEMSourceTilt", phenom.TILT_BLANK[0], phenom.TILT_BLANK[1], False)])
+        self.assertEqual(self.sem._detector._tilt_unblank, (0.1, 0.2))
+        self.assertEqual(self.sem._device.tilt, phenom.TILT_BLANK)
+
+    def test_shift(self):
+        """
+        The shift is sent after the voltage, as requested
+        """
+        with self.sem._acq_progress_lock:  # as if an image was being acquired
+            self.scanner._onVoltage(5000)
+            self.scanner._onShift((1e-6, -2e-6))
+            time.sleep(0.1)
+            self.assertEqual(self.sem._device.calls, [])
+
+        self.sem._requests.submit(lambda: None).result()
+        self.assertEqual(self.sem._device.calls[0], ("SEMSetHighTension", -5000))
+        self.assertEqual(self.sem._device.calls[-1], ("SetSEMImageShift", 1e-6, -2e-6, True))
+
+    def test_notifier(self):
+        """
+        The images are passed on in order, from a separate thread, while the
+        next one is downloaded
+        """
+        detector = phenom.Detector.__new__(phenom.Detector)
+        detector._acquisition_must_stop = threading.Event()
+        detector._acquisition_init_lock = threading.Lock()
+        numbert = 5
+        acquired = []
+
+        def acquire_image():
+            i = len(acquired)
+            if i == numbert - 1:
+                detector._acquisition_must_stop.set()
+            acquired.append(received[:])
+            return model.DataArray([i])
+
+        received = []
+        threads = set()
+
+        def callback(da):
+            time.sleep(0.05)  # slower than the download
+            threads.add(threading.current_thread())
+            received.append(da[0])
+
+        detector._acquire_image = acquire_image
+        detector._acquire_thread(callback)
+
+        self.assertEqual(received, range(numbert))
+        self.assertNotIn(threading.current_thread(), threads)
+        # At most one image was waiting to be received during a download
+        for i, r in enumerate(acquired):
+            self.assertGreaterEqual(len(r), i - 1)
+
+
 # @skip("skip")
 class TestSEM(unittest.TestCase):
     """
@@ -22,6 +22,7 @@ from __future__ import division
 
 import copy
 import logging
+import numpy
 from odemis import model
 from odemis.driver import picoquant
 import os
@@ -68,6 +69,54 @@ class TestPH300Static(unittest.TestCase):
         wrong_config["device"] = "NOTAGOODSN"
         self.assertRaises(Exception, picoquant.PH300, **wrong_config)
 
+    def test_decode_t3(self):
+        records = numpy.array([(1 << 28) | (5 << 16) | 10,
+                               0xf << 28,  # overflow
+                               (2 << 28) | (7 << 16) | 3,
+                               (0xf << 28) | (2 << 16) | 4,  # marker 2
+                               ], dtype=numpy.uint32)
+        events, ovf = picoquant.decode_records(records, picoquant.MODE_T3, 1)
+        self.assertEqual(ovf, 2)
+        self.assertEqual(list(events["channel"]), [1, 2, picoquant.MARKER_CHANNEL])
+        self.assertEqual(list(events["time"]), [65536 + 10, 2 * 65536 + 3, 2 * 65536 + 4])
+        self.assertEqual(list(events["dtime"]), [5, 7, 2])
+
+        # Nothing to decode
+        events, ovf = picoquant.decode_records(records[:0], picoquant.MODE_T3, 2)
+        self.assertEqual(events.shape, (0,))
+        self.assertEqual(ovf, 2)
+
+    def test_decode_t2(self):
+        wrap = picoquant.T2WRAPAROUND
+        records = numpy.array([(0 << 28) | 100,  # sync
+                               (1 << 28) | 150,
+                               0xf << 28,  # overflow
+                               (1 << 28) | 20,
+                               (0 << 28) | 30,
+                               (1 << 28) | 45,
+                               ], dtype=numpy.uint32)
+        events, ovf = picoquant.decode_records(records, picoquant.MODE_T2)
+        self.assertEqual(ovf, 1)
+        self.assertEqual(list(events["time"]), [100, 150, wrap + 20, wrap + 30, wrap + 45])
+
+        dtimes, last_sync = picoquant.t2_start_stop(events)
+        self.assertEqual(list(dtimes), [50, wrap + 20 - 100, 15])
+        self.assertEqual(last_sync, wrap + 30)
+
+        # The first photon has no sync before
+        dtimes, last_sync = picoquant.t2_start_stop(events[1:])
+        self.assertEqual(list(dtimes), [15])
+
+    def test_ring_buffer(self):
+        ring = picoquant.RingBuffer(10)
+        self.assertEqual(ring.write(numpy.arange(7)), 7)
+        self.assertEqual(list(ring.read()), list(range(7)))
+        # Wraps around, and drops what doesn't fit
+        self.assertEqual(ring.write(numpy.arange(12)), 10)
+        self.assertEqual(ring.lost, 2)
+        self.assertEqual(list(ring.read()), list(range(10)))
+        self.assertEqual(ring.read().size, 0)
+
 
 class TestPH300(unittest.TestCase):
     """
@@ -107,5 +156,37 @@ class TestPH300(unittest.TestCase):
         self._cnt += 1
         self._lastdata = data
 
+    def test_acquire_tttr(self):
+        for mode in ("T3", "T2"):
+            self.dev.recordMode.value = mode
+            self.dev.refreshPeriod.value = 0.1
+            self._hists = []
+            self._events = []
+            self.dev.data.subscribe(self._on_hist)
+            self.dev.rawData.subscribe(self._on_events)
+            time.sleep(2)
+            self.dev.data.unsubscribe(self._on_hist)
+            self.dev.rawData.unsubscribe(self._on_events)
+
+            self.assertGreater(len(self._hists), 10)  # Should be 10Hz => ~20
+            hist = self._hists[-1]
+            self.assertEqual(hist.shape, (picoquant.T3HISTCHAN,))
+            self.assertIn(model.MD_PIXEL_DUR, hist.metadata)
+            # The histogram accumulates
+            self.assertGreaterEqual(hist.sum(), self._hists[0].sum())
+
+            if TEST_NOHW:  # Only the simulator is sure to generate events
+                self.assertGreater(hist.sum(), 0)
+                self.assertGreater(len(self._events), 0)
+            if self._events:
+                times = numpy.concatenate([e["time"] for e in self._events]).astype(numpy.int64)
+                self.assertTrue((numpy.diff(times) >= 0).all())
+
+    def _on_hist(self, df, data):
+        self._hists.append(data)
+
+    def _on_events(self, df, data):
+        self._events.append(data)
+
 if __name__ == "__main__":
     unittest.main()
@@ -28,6 +28,7 @@ import logging
 import math
 from odemis.driver import pigcs
 import os
+import threading
 import time
 import unittest
 from unittest.case import skip
@@ -159,6 +160,91 @@ class TestFakeCL(TestController):
         self.config_ctrl = CONFIG_CTRL_CL
 
 
+class TestBatch(unittest.TestCase):
+    """
+    Test the batched queries to several controllers of the daisy chain
+    """
+    def setUp(self):
+        self.ser = pigcs.FakeBus._openSerialPort(PORT, _addresses={1: False, 2: True, 3: True})
+        self.accesser = pigcs.SerialBusAccesser(self.ser)
+
+    def tearDown(self):
+        self.accesser.terminate()
+
+    def test_send_queries(self):
+        idn = self.accesser.sendQueryCommand(2, "*IDN?\n")
+        reps = self.accesser.sendQueryCommands([(1, "ERR?\n"), (2, "*IDN?\n"),
+                                                (3, "ERR?\n"), (1, "*IDN?\n"),
+                                                (2, "ERR?\n")])
+        self.assertEqual(reps, ["0", idn, "0", idn, "0"])
+
+    def test_batch_query(self):
+        ctrls = [pigcs.Controller(self.accesser, 1, {1: False}),
+                 pigcs.Controller(self.accesser, 2, {1: True}),
+                 pigcs.Controller(self.accesser, 3, {1: True})]
+        self.assertEqual(pigcs.batchQuery([]), [])
+
+        poss = pigcs.batchQuery([(c, c.queryPositions({1})) for c in ctrls])
+        for c, pos in zip(ctrls, poss):
+            self.assertAlmostEqual(pos[1], c.getPosition(1))
+
+        # Move the closed-loop axes, and wait for the end of the move
+        for c in ctrls[1:]:
+            c.moveRel(1, 100e-6)
+        for i in range(100):
+            moving = pigcs.batchQuery([(c, c.queryMoving({1})) for c in ctrls])
+            if not any(moving):
+                break
+            time.sleep(0.01)
+        else:
+            self.fail("Axes still moving: %s" % (moving,))
+
+        poss2 = pigcs.batchQuery([(c, c.queryPositions({1})) for c in ctrls])
+        for pos, pos2 in zip(poss[1:], poss2[1:]):
+            self.assertAlmostEqual(pos2[1] - pos[1], 100e-6)
+
+        for c in ctrls:
+            c.terminate()
+
+    def test_batch_servo_suspend(self):
+        """
+        Batched queries while the servo is switched on and off don't deadlock
+        """
+        ctrls = [pigcs.Controller(self.accesser, 2, {1: True}),
+                 pigcs.Controller(self.accesser, 3, {1: True})]
+        end = time.time() + 2
+        errors = []
+
+        def switch_servo(c):
+            try:
+                while time.time() < end:
+                    c._stopServo(1)
+                    c._startServo(1)
+            except Exception as ex:
+                errors.append(ex)
+
+        def query():
+            try:
+                while time.time() < end:
+                    pigcs.batchQuery([(c, c.queryPositions({1})) for c in ctrls])
+                    pigcs.batchQuery([(c, c.queryPositions({1})) for c in reversed(ctrls)])
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=switch_servo, args=(c,)) for c in ctrls]
+        threads += [threading.Thread(target=query) for i in range(2)]
+        for t in threads:
+            t.daemon = True
+            t.start()
+        for t in threads:
+            t.join(10)
+            self.assertFalse(t.is_alive(), "Thread %s deadlocked" % (t.name,))
+        self.assertEqual(errors, [])
+
+        for c in ctrls:
+            c.terminate()
+
+
 #@skip("faster")
 class TestActuator(unittest.TestCase):
 
@@ -28,6 +28,7 @@ import logging
 import numpy
 import os
 import pickle
+import tempfile
 import threading
 import time
 import unittest
@@ -68,6 +69,74 @@ KWARGS_SEM_CNT = {"name": "sem", "role": "sem", "device": "/dev/comedi0",
               "children": {"detector0": CONFIG_SED, "counter0": CONFIG_CNT, "scanner": CONFIG_SCANNER}
               }
 
+class FakeSEMComedi(object):
+    """
+    Just what the Reader needs from the SEMComedi, reading from a file instead
+    of a device
+    """
+    def __init__(self, fileno, dtype):
+        self._device = None
+        self._fileno = fileno
+        self._ai_subdevice = 0
+        self._dtype = dtype
+
+    def _get_dtype(self, subdevice):
+        return self._dtype
+
+
+class TestReader(unittest.TestCase):
+    """
+    Tests the Reader, without device
+    """
+    def setUp(self):
+        self._tmpfile = tempfile.TemporaryFile()
+        self._orig_chunk_size = semcomedi.READ_CHUNK_SIZE
+
+    def tearDown(self):
+        semcomedi.READ_CHUNK_SIZE = self._orig_chunk_size
+        self._tmpfile.close()
+
+    def _create_reader(self, data):
+        """
+        data (ndarray): the raw data that will be read
+        """
+        data.tofile(self._tmpfile)
+        self._tmpfile.flush()
+        self._tmpfile.seek(0)
+        fd = os.dup(self._tmpfile.fileno())
+        reader = semcomedi.Reader(FakeSEMComedi(fd, data.dtype))
+        self.addCleanup(reader.close)
+        return reader
+
+    def test_read_average(self):
+        # Small blocks, to check the data spread over several ones
+        semcomedi.READ_CHUNK_SIZE = 1000
+        npixels, osr, nchans = 1003, 7, 2
+        data = numpy.random.randint(0, 2 ** 16, npixels * osr * nchans).astype(numpy.uint16)
+        reader = self._create_reader(data)
+
+        for i in range(2):  # 2nd time reuses the buffers
+            self._tmpfile.seek(0)
+            reader.prepare(data.size, 0.1, osr, nchans)
+            adata = reader._read_average()
+            self.assertEqual(adata.dtype, data.dtype)
+            self.assertEqual(adata.shape, (npixels * nchans,))
+
+            exp = data.reshape(npixels, osr, nchans).sum(axis=1, dtype=numpy.uint32) // osr
+            numpy.testing.assert_array_equal(adata, exp.ravel())
+
+    def test_read_average_short(self):
+        """
+        Not enough data received
+        """
+        npixels, osr, nchans = 100, 4, 1
+        data = numpy.ones(npixels * osr * nchans - 3, dtype=numpy.uint16)
+        reader = self._create_reader(data)
+        reader.prepare(npixels * osr * nchans, 0.1, osr, nchans)
+        with self.assertRaises(IOError):
+            reader._read_average()
+
+
 #@unittest.skip("simple")
 class TestSEMStatic(unittest.TestCase):
     """
@@ -407,6 +476,70 @@ class TestSEM(unittest.TestCase):
 
         self.assertEqual(self.left, 0)
 
+    def test_scan_path(self):
+        """
+        Check scanning an arbitrary list of positions
+        """
+        npoints = 100
+        shape = self.scanner.shape
+        pos = [((i * 37) % shape[0] - shape[0] / 2, (i * 53) % shape[1] - shape[1] / 2)
+               for i in range(npoints)]
+        self.assertRaises(ValueError, self.scanner.setScanPath, [(shape[0], 0)])
+
+        self.scanner.dwellTime.value = 10e-6  # s
+        try:
+            self.scanner.setScanPath(pos)
+            im = self.sed.data.get()
+            self.assertEqual(im.shape, (1, npoints))
+
+            # Every point 3 times longer
+            dt = self.scanner.dwellTime.value
+            self.scanner.setScanPath(pos, [dt * 3] * npoints)
+            start = time.time()
+            im = self.sed.data.get()
+            duration = time.time() - start
+            self.assertEqual(im.shape, (1, npoints))
+            self.assertGreaterEqual(duration, npoints * dt * 3)
+        finally:
+            self.scanner.setScanPath(None)
+
+        # Back to normal
+        im = self.sed.data.get()
+        self.assertEqual(im.shape, self.size[::-1])
+
+    def test_partial_data(self):
+        """
+        Check the frames in progress are sent during a long scan
+        """
+        self.scanner.dwellTime.value = 10e-6  # s
+        self.scanner.resolution.value = (1024, 256)
+        self.size = self.scanner.resolution.value
+        expected_duration = self.compute_expected_duration()  # ~ 3 s
+
+        partial = []
+        def receive_partial(df, data):
+            partial.append(data)
+
+        # Subscribing to the partial data alone doesn't acquire anything
+        self.sed.partialData.subscribe(receive_partial)
+        time.sleep(0.5)
+        self.assertEqual(partial, [])
+
+        self.left = 1
+        self.sed.data.subscribe(self.receive_image)
+        self.acq_done.wait(2 + expected_duration * 1.1)
+        self.sed.partialData.unsubscribe(receive_partial)
+        self.assertEqual(self.left, 0)
+
+        self.assertGreater(len(partial), 1)
+        prev_rows = 0
+        for p in partial:
+            self.assertEqual(p.shape, self.size[::-1])
+            rows = p.metadata[model.MD_ROWS_ACQUIRED]
+            self.assertGreater(rows, prev_rows)
+            self.assertLess(rows, self.size[1])
+            prev_rows = rows
+
 #     @unittest.skip("simple")
     def test_acquire_with_va(self):
         """
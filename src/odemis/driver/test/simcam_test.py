@@ -257,6 +257,36 @@ class TestSimCam(unittest.TestCase):
         self.assertEqual(self.left, 0)
         self.assertEqual(self.left2, 0)
 
+#     @unittest.skip("simple")
+    def test_sequence(self):
+        """
+        Check the synchronized acquisition by sequences, with more triggers
+        than the length of the sequence
+        """
+        self._ensureExp(0.01)
+        self.camera.sequenceLength.value = 3
+        number = 8
+        self.left = number
+        self.camera.data.synchronizedOn(self.camera.softwareTrigger)
+        self.camera.data.subscribe(self.receive_image)
+
+        for i in range(number):
+            self.camera.softwareTrigger.notify()
+            # wait for the image to be received
+            for j in range(100):
+                if self.left <= number - i - 1:
+                    break
+                time.sleep(0.1)
+            self.assertEqual(self.left, number - i - 1,
+                             "image %d not received after 10 s" % (i,))
+
+        self.camera.data.synchronizedOn(None)
+        self.camera.sequenceLength.value = 1
+
+        # check we can still get data normally
+        im = self.camera.data.get()
+        self.assertEqual(im.shape, self.imshp)
+
     def receive_image(self, dataflow, image):
         """
         callback for df of test_acquire_flow()
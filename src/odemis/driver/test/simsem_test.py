@@ -23,6 +23,7 @@ from __future__ import division
 import Pyro4
 import copy
 import logging
+import numpy
 from odemis import model
 from odemis.driver import simsem
 import os
@@ -96,6 +97,94 @@ class TestSEMStatic(unittest.TestCase):
         sem.terminate()
         daemon.shutdown()
 
+    def test_noise_drift(self):
+        """
+        Check the noise and the smooth drift models
+        """
+        config = copy.deepcopy(CONFIG_SEM)
+        config["noise"] = "poisson"
+        config["drift_model"] = "smooth"
+        config["children"]["scanner"]["min_dwell_time"] = 1e-9
+        sem = simsem.SimSEM(**config)
+        for child in sem.children.value:
+            if child.name == CONFIG_SED["name"]:
+                sed = child
+            elif child.name == CONFIG_SCANNER["name"]:
+                scanner = child
+
+        scanner.dwellTime.value = scanner.dwellTime.range[0]
+        scanner.resolution.value = scanner.resolution.range[1]
+        im1 = sed.data.get()
+        im2 = sed.data.get()
+        self.assertEqual(im1.shape, scanner.resolution.value[::-1])
+        self.assertEqual(im1.dtype, sed.fake_img.dtype)
+        self.assertFalse(numpy.array_equal(im1, im2))
+        sem.terminate()
+
+    def test_defocus_cache(self):
+        """
+        With drift and defocus, the blurred image is only computed once per
+        focus step
+        """
+        from scipy import ndimage
+        config = copy.deepcopy(CONFIG_SEM)
+        config["drift_model"] = "smooth"
+        config["children"]["scanner"]["min_dwell_time"] = 1e-9
+        sem = simsem.SimSEM(**config)
+        for child in sem.children.value:
+            if child.name == CONFIG_SED["name"]:
+                sed = child
+            elif child.name == CONFIG_SCANNER["name"]:
+                scanner = child
+            elif child.name == CONFIG_FOCUS["name"]:
+                focus = child
+
+        scanner.dwellTime.value = scanner.dwellTime.range[0]
+        scanner.resolution.value = (256, 256)
+
+        orig_gaussian_filter = ndimage.gaussian_filter
+        sigmas = []
+        def gaussian_filter(input, sigma, *args, **kwargs):
+            sigmas.append(sigma)
+            return orig_gaussian_filter(input, sigma, *args, **kwargs)
+
+        ndimage.gaussian_filter = gaussian_filter
+        try:
+            good_focus = focus.position.value["z"]
+            for i in range(2):
+                focus.moveAbs({"z": good_focus + (i + 1) * 1e-4}).result()  # 1 px, 2 px
+                for j in range(3):
+                    sed.data.get()
+                    scanner.shift.value = (j * scanner.pixelSize.value[0], 0)
+        finally:
+            ndimage.gaussian_filter = orig_gaussian_filter
+            sem.terminate()
+
+        self.assertEqual(len(sigmas), 2)
+
+    def test_image_selection(self):
+        """
+        Check the pixels selected are the same as with a simple loop
+        """
+        sem = simsem.SimSEM(**CONFIG_SEM)
+        for child in sem.children.value:
+            if child.name == CONFIG_SED["name"]:
+                sed = child
+
+        for lt, scale, res in (((10, 20), (1, 1), (100, 50)),
+                               ((10.4, 20.6), (2, 3), (100, 50)),
+                               ((0.5, 1.5), (1.3, 2.7), (101, 51)),
+                               ((5, 7), (1, 1), (1, 1))):
+            rows, cols = sed._get_coordinates(lt, scale, res)
+            exp_cols = [int(round(lt[0] + i * scale[0])) for i in range(res[0])]
+            exp_rows = [int(round(lt[1] + i * scale[1])) for i in range(res[1])]
+            numpy.testing.assert_array_equal(cols, exp_cols)
+            numpy.testing.assert_array_equal(rows, exp_rows)
+            numpy.testing.assert_array_equal(sed._take_pixels(sed.fake_img, rows, cols),
+                                             sed.fake_img[numpy.ix_(exp_rows, exp_cols)])
+        sem.terminate()
+
+
 class TestSEM(unittest.TestCase):
     """
     Tests which can share one SEM device
@@ -136,6 +136,42 @@ class TestSimulated(unittest.TestCase):
         self.assertEqual(data.shape[0], 1)
         self.assertEqual(data.shape[-1::-1], self.spectrometer.resolution.value)
 
+    def test_readout_band(self):
+        """
+        Check that only the rows of the readout band are read
+        """
+        if not model.hasVA(self.spectrometer, "readoutBand"):
+            self.skipTest("Spectrometer doesn't support a readout band")
+
+        orig_band = self.spectrometer.readoutBand.value
+        self.spectrometer.readoutBand.value = (10, 30)
+        self.assertEqual(self.spectrometer.readoutBand.value, (10, 30))
+        self.assertEqual(self.spectrometer.binning.value[1], 20)
+
+        # The detector is only updated when acquiring
+        data = self.spectrometer.data.get()
+        self.assertEqual(data.shape[0], 1)
+        self.assertEqual(data.shape[-1::-1], self.spectrometer.resolution.value)
+        self.assertEqual(data.metadata[model.MD_BINNING][1], 20)
+        self.assertEqual(self.detector.translation.value[1],
+                         10 - (self.detector.shape[1] - 20) // 2)
+
+        # Changing the vertical binning keeps the band centred
+        self.spectrometer.binning.value = (self.spectrometer.binning.value[0], 10)
+        self.assertEqual(self.spectrometer.readoutBand.value, (15, 25))
+
+        # The first and last rows can be read too
+        h = self.detector.shape[1]
+        for band in ((0, 1), (h - 1, h)):
+            self.spectrometer.readoutBand.value = band
+            self.assertEqual(self.spectrometer.readoutBand.value, band)
+            data = self.spectrometer.data.get()
+            self.assertEqual(data.metadata[model.MD_BINNING][1], 1)
+            self.assertEqual(self.detector.translation.value[1],
+                             band[0] - (h - 1) // 2)
+
+        self.spectrometer.readoutBand.value = orig_band
+
 
 class TestSimulatedShamrock(TestSimulated):
     """
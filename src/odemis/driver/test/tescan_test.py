@@ -39,7 +39,8 @@ logging.getLogger().setLevel(logging.DEBUG)
 # needing real hardware
 TEST_NOHW = (os.environ.get("TEST_NOHW", 0) != 0)  # Default to Hw testing
 
-# Note: there is a simulator, but it must be run in a (Windows) virtual machine
+# Note: there is a simulator, but it must be run in a (Windows) virtual machine,
+# so without hardware, the (simpler) simulator of the driver is used.
 
 # arguments used for the creation of basic components
 CONFIG_SED = {"name": "sed", "role": "sed", "channel": 0, "detector": 0}
@@ -57,6 +58,9 @@ CONFIG_SEM = {"name": "sem", "role": "sem",
               "host": "192.168.92.91"
               }
 
+if TEST_NOHW:
+    CONFIG_SEM["host"] = "fake"
+
 
 # @skip("skip")
 class TestSEMStatic(unittest.TestCase):
@@ -67,9 +71,6 @@ class TestSEMStatic(unittest.TestCase):
         """
         Doesn't even try to acquire an image, just create and delete components
         """
-        if TEST_NOHW:
-            self.skipTest("No hardware present")
-
         sem = tescan.SEM(**CONFIG_SEM)
         self.assertEqual(len(sem.children.value), 6)
 
@@ -99,9 +100,6 @@ class TestSEMStatic(unittest.TestCase):
         self.assertRaises(Exception, tescan.SEM, **wrong_config)
 
     def test_pickle(self):
-        if TEST_NOHW:
-            self.skipTest("No hardware present")
-
         try:
             os.remove("test")
         except OSError:
@@ -125,8 +123,6 @@ class TestSEM(unittest.TestCase):
     """
     @classmethod
     def setUpClass(cls):
-        if TEST_NOHW:
-            return
         cls.sem = tescan.SEM(**CONFIG_SEM)
 
         for child in cls.sem.children.value:
@@ -145,16 +141,10 @@ class TestSEM(unittest.TestCase):
 
     @classmethod
     def tearDownClass(cls):
-        if TEST_NOHW:
-            return
-
         cls.sem.terminate()
         time.sleep(3)
 
     def setUp(self):
-        if TEST_NOHW:
-            self.skipTest("No hardware present")
-
         # reset resolution and dwellTime
         self.scanner.scale.value = (1, 1)
         self.scanner.resolution.value = (512, 256)
@@ -332,6 +322,48 @@ class TestSEM(unittest.TestCase):
         # if it has acquired a least 5 pictures we are already happy
         self.assertLessEqual(self.left, 10000)
 
+    def test_set_during_acquisition(self):
+        """
+        Changing the settings doesn't wait for the end of the image download
+        """
+        self.scanner.resolution.value = (512, 512)
+        self.size = self.scanner.resolution.value
+        self.scanner.dwellTime.value = 10e-6  # s => ~2.6s per image
+        self.left = 10000  # don't unsubscribe automatically
+        self.sed.data.subscribe(self.receive_image)
+        time.sleep(0.5)  # make sure the scan has started
+
+        fov = self.scanner.horizontalFoV.value
+        volt = self.scanner.accelVoltage.value
+        start = time.time()
+        for i in range(10):
+            self.scanner.horizontalFoV.value = fov / (i + 2)
+            self.scanner.accelVoltage.value = self.scanner.accelVoltage.range[i % 2]
+        dur = time.time() - start
+        self.assertLess(dur, 1)
+        self.assertAlmostEqual(self.scanner.horizontalFoV.value, fov / 11)
+
+        self.sed.data.unsubscribe(self.receive_image)
+        self.scanner.horizontalFoV.value = fov
+        self.scanner.accelVoltage.value = volt
+
+    def test_hfv_range(self):
+        """
+        The FoV reported is the one of the SEM, even at the limits of the range
+        """
+        fov = self.scanner.horizontalFoV.value
+        for v in self.scanner.horizontalFoV.range:
+            self.scanner.horizontalFoV.value = v
+            self.assertEqual(self.scanner.horizontalFoV.value, v)
+            # wait for the FoV to be sent and read back
+            self.sem._requests.submit(lambda: None).result()
+            self.assertAlmostEqual(self.scanner.horizontalFoV.value, v)
+            with self.sem._acq_progress_lock:
+                sem_fov = self.sem._device.GetViewField() * 1e-3
+            self.assertAlmostEqual(self.scanner.horizontalFoV.value, sem_fov)
+
+        self.scanner.horizontalFoV.value = fov
+
     def onEvent(self):
         self.events += 1
 
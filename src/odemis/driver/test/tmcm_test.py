@@ -204,6 +204,30 @@ class TestActuator(unittest.TestCase):
         dur = time.time() - start
         self.assertGreaterEqual(dur, expected_time)
 
+    def test_parallel(self):
+        """
+        Moves on independent axes are run (and checked) simultaneously
+        """
+        move_x = {'x': 1e-3}
+        move_y = {'y': 1e-3}
+        dur_x = move_x["x"] / self.dev.speed.value["x"]
+        dur_y = move_y["y"] / self.dev.speed.value["y"]
+        start = time.time()
+        fx = self.dev.moveRel(move_x)
+        fy = self.dev.moveRel(move_y)
+        fy.result()
+        fx.result()
+        dur = time.time() - start
+        self.assertGreaterEqual(dur, max(dur_x, dur_y))
+        self.assertLess(dur, dur_x + dur_y)
+
+        # Going back, while the first move is on-going
+        fx = self.dev.moveRel({'x': -1e-3})
+        time.sleep(0.01)
+        fy = self.dev.moveRel({'y': -1e-3})
+        fx.result()
+        fy.result()
+
     def test_cancel(self):
         # long moves
         move_forth = {'x': 1e-3}
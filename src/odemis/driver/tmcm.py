@@ -226,6 +226,13 @@ class TMCLController(model.Actuator):
         # will take care of executing axis move asynchronously
         self._executor = ParallelThreadPoolExecutor()  # one task at a time
 
+        # The end of all the moves is checked by a single thread, which polls
+        # all the moving axes together.
+        self._moves_lock = threading.Lock()  # to be taken to access _moves and _move_poller
+        self._moves = set()  # Futures of the moves waiting for their axes to stop
+        self._moves_changed = threading.Event()  # set when a move is added
+        self._move_poller = None  # thread polling the status, or None if no move
+
         axes_def = {}
         for n, i in self._name_to_axis.items():
             if not n:
@@ -251,11 +258,8 @@ class TMCLController(model.Actuator):
 
         # TODO: add support for changing speed. cf p.68: axis param 4 + p.81 + TMC 429 p.6
         self.speed = model.VigilantAttribute({}, unit="m/s", readonly=True)
-        self._updateSpeed()
-
         self._accel = {}
-        for n, i in self._name_to_axis.items():
-            self._accel[n] = self._readAccel(i)
+        self._updateSpeed()
 
         if refproc is not None:
             # str -> boolean. Indicates whether an axis has already been referenced
@@ -281,8 +285,8 @@ class TMCLController(model.Actuator):
             # report both.
             self.temperature = model.FloatVA(0, unit=u"°C", readonly=True)
             self.temperature1 = model.FloatVA(0, unit=u"°C", readonly=True)
-            self._temp_timer = util.RepeatingTimer(1, self._updateTemperatureVA,
-                                                   "TMCM temperature update")
+            self._temp_timer = util.PeriodicTask(1, self._updateTemperatureVA,
+                                                 "TMCM temperature update")
             self._updateTemperatureVA() # make sure the temperature is correct
             self._temp_timer.start()
 
@@ -1196,44 +1200,41 @@ class TMCLController(model.Actuator):
 
     def _updateSpeed(self):
         """
-        Update the speed VA from the controller settings
+        Update the speed VA and the acceleration from the controller settings
         """
         speed = {}
         for n, i in self._name_to_axis.items():
-            speed[n] = self._readSpeed(i)
+            speed[n], self._accel[n] = self._readSpeedAccel(i)
 
         # it's read-only, so we change it via _value
         self.speed._value = speed
         self.speed.notify(self.speed.value)
 
-    def _readSpeed(self, a):
+    def _readSpeedAccel(self, a):
         """
-        return (float): the speed of the axis in m/s
+        Read the speed and acceleration of an axis. The parameters common to
+        both are read only once.
+        return (float, float): the speed of the axis in m/s, and its
+          acceleration in m/s²
         """
+        velocity = self.GetAxisParam(a, 4)
+        amax = self.GetAxisParam(a, 5)
+        pulse_div = self.GetAxisParam(a, 154)
+        ramp_div = self.GetAxisParam(a, 153)
+
         # As described in section 3.4.1:
         #       fCLK * velocity
         # usf = ------------------------
         #       2**pulse_div * 2048 * 32
-        velocity = self.GetAxisParam(a, 4)
-        pulse_div = self.GetAxisParam(a, 154)
         # fCLK = 16 MHz
         usf = (16e6 * velocity) / (2 ** pulse_div * 2048 * 32)
-        return usf * self._ustepsize[a]  # m/s
 
-    def _readAccel(self, a):
-        """
-        return (float): the acceleration of the axis in m²/s
-        """
         # Described in section 3.4.2:
         #       fCLK ** 2 * Amax
         # a = -------------------------------
         #       2**(pulse_div +ramp_div + 29)
-        amax = self.GetAxisParam(a, 5)
-        pulse_div = self.GetAxisParam(a, 154)
-        ramp_div = self.GetAxisParam(a, 153)
-        # fCLK = 16 MHz
         usa = (16e6 ** 2 * amax) / 2 ** (pulse_div + ramp_div + 29)
-        return usa * self._ustepsize[a]  # m²/s
+        return usf * self._ustepsize[a], usa * self._ustepsize[a]
 
     def _updateTemperatureVA(self):
         """
@@ -1269,6 +1270,12 @@ class TMCLController(model.Actuator):
         f._moving_lock = threading.Lock() # taken while moving
         f._must_stop = threading.Event() # cancel of the current future requested
         f._was_stopped = False # if cancel was successful
+        # Status of the move, updated by the move poller
+        f._moving_axes = set()  # axes not yet on target
+        f._move_end = 0  # expected end of the move
+        f._move_timeout = 0  # time after which the move is considered failed
+        f._move_error = None  # exception raised while checking the move
+        f._move_done = threading.Event()  # set when the move is over (or must stop)
         f.task_canceller = self._cancelCurrentMove
         return f
 
@@ -1403,7 +1410,7 @@ class TMCLController(model.Actuator):
     def _waitEndMove(self, future, axes, end=0):
         """
         Wait until all the given axes are finished moving, or a request to
-        stop has been received.
+        stop has been received. The axes are checked by the move poller.
         future (Future): the future it handles
         axes (set of int): the axes IDs to check
         end (float): expected end time
@@ -1411,54 +1418,97 @@ class TMCLController(model.Actuator):
             TimeoutError: if took too long to finish the move
             CancelledError: if cancelled before the end of the move
         """
-        moving_axes = set(axes)
-
-        last_upd = time.time()
-        dur = max(0.01, min(end - last_upd, 60))
+        now = time.time()
+        dur = max(0.01, min(end - now, 60))
         max_dur = dur * 2 + 1
         logging.debug("Expecting a move of %g s, will wait up to %g s", dur, max_dur)
-        timeout = last_upd + max_dur
-        last_axes = moving_axes.copy()
-        try:
-            while not future._must_stop.is_set():
-                for aid in moving_axes.copy(): # need copy to remove during iteration
-                    if self._isOnTarget(aid):
-                        moving_axes.discard(aid)
-                if not moving_axes:
-                    # no more axes to wait for
-                    break
-
-                now = time.time()
-                if now > timeout:
-                    logging.warning("Stopping move due to timeout after %g s.", max_dur)
-                    for i in moving_axes:
-                        self.MotorStop(i)
-                    raise TimeoutError("Move is not over after %g s, while "
-                                       "expected it takes only %g s" %
-                                       (max_dur, dur))
+        future._move_end = now + dur
+        future._move_timeout = now + max_dur
+        future._moving_axes = set(axes)
+
+        with self._moves_lock:
+            self._moves.add(future)
+            if self._move_poller is None:
+                self._move_poller = threading.Thread(target=self._pollMoves,
+                                                     name="TMCM move poller")
+                self._move_poller.daemon = True
+                self._move_poller.start()
+            else:
+                self._moves_changed.set()
 
-                # Update the position from time to time (10 Hz)
-                if now - last_upd > 0.1 or last_axes != moving_axes:
-                    last_names = set(n for n, i in self._name_to_axis.items() if i in last_axes)
-                    self._updatePosition(last_names)
-                    last_upd = time.time()
-                    last_axes = moving_axes.copy()
+        try:
+            future._move_done.wait()
+            with self._moves_lock:
+                self._moves.discard(future)
+                moving_axes = set(future._moving_axes)
 
-                # Wait half of the time left (maximum 0.1 s)
-                left = end - time.time()
-                sleept = max(0.001, min(left / 2, 0.1))
-                future._must_stop.wait(sleept)
-            else:
+            if future._must_stop.is_set():
                 logging.debug("Move of axes %s cancelled before the end", axes)
                 # stop all axes still moving them
                 for i in moving_axes:
                     self.MotorStop(i)
                 future._was_stopped = True
                 raise CancelledError()
+            elif future._move_error is not None:
+                raise future._move_error
+            elif moving_axes:
+                logging.warning("Stopping move due to timeout after %g s.", max_dur)
+                for i in moving_axes:
+                    self.MotorStop(i)
+                raise TimeoutError("Move is not over after %g s, while "
+                                   "expected it takes only %g s" %
+                                   (max_dur, dur))
         finally:
             # TODO: check if the move succeded ? (= Not failed due to stallguard/limit switch)
             self._updatePosition() # update (all axes) with final position
 
+    def _pollMoves(self):
+        """
+        Check the status of the axes of all the moves on-going, until there is
+        no more move. Each axis is read once per iteration, independently of
+        the number of moves, and all the moves whose axes are all on target
+        are completed together.
+        Runs in its own thread, started by _waitEndMove().
+        """
+        last_upd = time.time()
+        try:
+            while True:
+                self._moves_changed.clear()
+                with self._moves_lock:
+                    moves = [f for f in self._moves if not f._move_done.is_set()]
+                    if not moves:
+                        self._move_poller = None
+                        return
+                    axes = set()
+                    for f in moves:
+                        axes |= f._moving_axes
+
+                reached = set(a for a in axes if self._isOnTarget(a))
+                now = time.time()
+                with self._moves_lock:
+                    for f in moves:
+                        f._moving_axes -= reached
+                        if not f._moving_axes or now > f._move_timeout:
+                            f._move_done.set()
+
+                # Update the position from time to time (10 Hz)
+                if now - last_upd > 0.1:
+                    self._updatePosition(set(n for n, i in self._name_to_axis.items()
+                                             if i in axes))
+                    last_upd = time.time()
+
+                # Wait half of the time left (maximum 0.1 s), or a new move
+                left = min(f._move_end for f in moves) - time.time()
+                self._moves_changed.wait(max(0.001, min(left / 2, 0.1)))
+        except Exception as ex:
+            logging.exception("Failed to check the end of the moves")
+            with self._moves_lock:
+                for f in self._moves:
+                    if not f._move_done.is_set():
+                        f._move_error = ex
+                        f._move_done.set()
+                self._move_poller = None
+
     def _cancelCurrentMove(self, future):
         """
         Cancels the current move (both absolute or relative). Non-blocking.
@@ -1472,6 +1522,7 @@ class TMCLController(model.Actuator):
         logging.debug("Cancelling current move")
 
         future._must_stop.set() # tell the thread taking care of the move it's over
+        future._move_done.set()
         with future._moving_lock:
             if not future._was_stopped:
                 logging.debug("Cancelling failed")
@@ -1678,9 +1729,14 @@ class TMCMSimulator(object):
     Simulates a TMCM-3110 or -6110 (+ serial port). Only used for testing.
     Same interface as the serial port
     """
-    def __init__(self, timeout=0, naxes=3, *args, **kwargs):
+    def __init__(self, timeout=0, naxes=3, latency=0, *args, **kwargs):
+        """
+        latency (0 <= float): time (in s) taken by each instruction, to simulate
+          the round-trip of a real connection
+        """
         # we don't care about the actual parameters but timeout
         self.timeout = timeout
+        self.latency = latency
         self._output_buf = "" # what the commands sends back to the "host computer"
         self._input_buf = "" # what we receive from the "host computer"
 
@@ -1748,6 +1804,8 @@ class TMCMSimulator(object):
         while len(self._input_buf) >= 9:
             msg = self._input_buf[:9]
             self._input_buf = self._input_buf[9:]
+            if self.latency:
+                time.sleep(self.latency)
             self._parseMessage(msg) # will update _output_buf
 
     def read(self, size=1):
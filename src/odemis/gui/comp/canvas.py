@@ -148,13 +148,14 @@ import cairo
 from decorator import decorator
 import logging
 import math
-from odemis import util
+import numpy
 from odemis.gui import BLEND_DEFAULT, BLEND_SCREEN, BufferSizeEvent
 from odemis.gui.comp.overlay.base import WorldOverlay, ViewOverlay
 from odemis.gui.evt import EVT_KNOB_ROTATE, EVT_KNOB_PRESS
-from odemis.gui.util import call_in_wx_main
-from odemis.gui.util.img import add_alpha_byte, apply_rotation, apply_shear, apply_flip, get_sub_img
-from odemis.util import intersect
+from odemis.gui.util import call_in_wx_main, ignore_dead
+from odemis.gui.util.img import add_alpha_byte, apply_rotation, apply_shear, apply_flip, \
+    get_sub_img, image_pyramids, PlotDecimator
+from odemis.util import intersect, almost_equal
 from odemis.util.conversion import wxcol_to_frgb
 import os
 import sys
@@ -739,6 +740,83 @@ class BufferedCanvas(wx.Panel):
             margins
         )
 
+    # Same conversions, but for many positions at once
+
+    @classmethod
+    def world_to_buffer_pos_array(cls, w_pos, w_buff_center, scale, offset=(0, 0)):
+        """ Convert positions in world coordinates into buffer coordinates
+
+        See `world_to_buffer_pos` for more details.
+
+        :param w_pos: (array of shape N×2) the coordinates in the world
+        :param w_buff_center: the center of the buffer in world coordinates
+        :param scale: the scale of the world compared to the buffer.
+        :param offset (int, int): the returned values are translated using the offset
+
+        :return: (numpy array of shape N×2 of floats) the buffer coordinates (rounded)
+
+        """
+        b_pos = ((numpy.asarray(w_pos, dtype=numpy.float64) - w_buff_center) * scale +
+                 numpy.asarray(offset))
+        # Same rounding as round(): halfway values are rounded away from zero
+        return numpy.copysign(numpy.floor(numpy.abs(b_pos) + 0.5), b_pos)
+
+    @classmethod
+    def buffer_to_world_pos_array(cls, b_pos, w_buffer_center, scale, offset=(0, 0)):
+        """ Convert positions from buffer coordinates into world coordinates
+
+        See `buffer_to_world_pos` for more details.
+
+        :param b_pos: (array of shape N×2) the buffer coordinates
+
+        :return: (numpy array of shape N×2 of floats)
+
+        """
+        return (numpy.asarray(w_buffer_center, dtype=numpy.float64) +
+                (numpy.asarray(b_pos, dtype=numpy.float64) - offset) / scale)
+
+    @classmethod
+    def view_to_buffer_pos_array(cls, v_pos, margins):
+        """ Convert view port coordinates to buffer coordinates
+
+        :param v_pos: (array of shape N×2) the coordinates in the view
+        :param margins: (int, int) the horizontal and vertical buffer margins
+
+        :return: (numpy array of shape N×2)
+
+        """
+        return numpy.asarray(v_pos) + margins
+
+    @classmethod
+    def buffer_to_view_pos_array(cls, b_pos, margins):
+        """ Convert buffer positions into view positions
+
+        :param b_pos: (array of shape N×2) the coordinates in the buffer
+        :param margins: (int, int) the horizontal and vertical buffer margins
+
+        :return: (numpy array of shape N×2)
+
+        """
+        return numpy.asarray(b_pos) - margins
+
+    @classmethod
+    def view_to_world_pos_array(cls, v_pos, w_buff_cent, margins, scale, offset=(0, 0)):
+        """ Convert positions in view coordinates into world coordinates """
+        return cls.buffer_to_world_pos_array(
+            cls.view_to_buffer_pos_array(v_pos, margins),
+            w_buff_cent,
+            scale,
+            offset
+        )
+
+    @classmethod
+    def world_to_view_pos_array(cls, w_pos, w_buff_cent, margins, scale, offset=(0, 0)):
+        """ Convert positions in world coordinates into view coordinates """
+        return cls.buffer_to_view_pos_array(
+            cls.world_to_buffer_pos_array(w_pos, w_buff_cent, scale, offset),
+            margins
+        )
+
     # ########### END Position conversion ############
 
     # Utility methods
@@ -804,9 +882,17 @@ class BitmapCanvas(BufferedCanvas):
         self.scale = 1.0  # px/wu
         self.margins = (0, 0)
 
+        # Copies of the buffer after drawing the background and the first images, to avoid
+        # redrawing the images which have not changed.
+        # int (number of images drawn) -> (list of layer keys, composition key, cairo.ImageSurface)
+        self._layer_snapshots = {}
+        # Index of the (non-None) image which changed the last time set_images() was called
+        self._live_layer = 0
+
     def clear(self):
         """ Remove the images and clear the canvas """
         self.images = [None]
+        self._layer_snapshots = {}
         BufferedCanvas.clear(self)
 
     def set_images(self, im_args):
@@ -832,10 +918,7 @@ class BitmapCanvas(BufferedCanvas):
 
         """
 
-        # TODO:
-        # * take an image composition tree (operator + images + scale + pos)
-        # * allow to indicate just one image has changed (and so the rest
-        #   doesn't need to be recomputed)
+        # TODO: take an image composition tree (operator + images + scale + pos)
 
         images = []
 
@@ -866,8 +949,25 @@ class BitmapCanvas(BufferedCanvas):
 
                 images.append(im)
 
+        # Detect the first image which changed, so that next time the images below can be
+        # reused directly from a snapshot.
+        prev_ims = [im for im in self.images if im is not None]
+        new_ims = [im for im in images if im is not None]
+        for i, im in enumerate(new_ims):
+            if i >= len(prev_ims) or im is not prev_ims[i]:
+                self._live_layer = i
+                break
+
         self.images = images
 
+    @call_in_wx_main
+    @ignore_dead
+    def _on_pyramid_ready(self):
+        """ Called when the reduced versions of an image are available """
+        # The images can now be drawn from the reduced versions
+        self._layer_snapshots = {}
+        self.request_drawing_update()
+
     def draw(self, interpolate_data=False):
         """ Draw the images and overlays into the buffer
 
@@ -934,56 +1034,115 @@ class BitmapCanvas(BufferedCanvas):
 
         images = [im for im in self.images if im is not None]
 
-        if images:
-            n = len(images)
-            last_image = images.pop()
-            # For every image, except the last
-            for i, im in enumerate(images):
-                # print "Drawing %s %s %s %s merge: %s" % (id(im),
-                #                                          im.shape,
-                #                                          im.metadata['blend_mode'],
-                #                                          im.metadata['name'],
-                #                                          1.0)
-                if im.metadata['blend_mode'] == BLEND_SCREEN:
-                    merge_ratio = 1.0
-                else:
-                    merge_ratio = 1 - i / n
-
-                self._draw_image(
-                    ctx,
-                    im,
-                    im.metadata['dc_center'],
-                    merge_ratio,
-                    im_scale=im.metadata['dc_scale'],
-                    rotation=im.metadata['dc_rotation'],
-                    shear=im.metadata['dc_shear'],
-                    flip=im.metadata['dc_flip'],
-                    blend_mode=im.metadata['blend_mode'],
-                    interpolate_data=interpolate_data
-                )
-
-            if not images or last_image.metadata['blend_mode'] == BLEND_SCREEN:
+        # The merge ratio of each image
+        n = len(images)
+        layers = []
+        for i, im in enumerate(images[:-1]):
+            if im.metadata['blend_mode'] == BLEND_SCREEN:
                 merge_ratio = 1.0
             else:
-                merge_ratio = self.merge_ratio
+                merge_ratio = 1 - i / n
+            layers.append((im, merge_ratio))
 
-            # print "Drawing last %s %s %s %s merge: %s" % (id(last_image),
-            #                                               last_image.shape,
-            #                                               last_image.metadata['blend_mode'],
-            #                                               last_image.metadata['name'],
-            #                                               merge_ratio)
+        last_image = images[-1]
+        if n == 1 or last_image.metadata['blend_mode'] == BLEND_SCREEN:
+            merge_ratio = 1.0
+        else:
+            merge_ratio = self.merge_ratio
+        layers.append((last_image, merge_ratio))
+
+        layer_keys = [self._get_layer_key(im, r) for im, r in layers]
+        compo_key = self._get_composition_key(interpolate_data)
+
+        # Start from the biggest snapshot of the bottom layers which is still valid
+        valid = {k: snap for k, snap in self._layer_snapshots.items()
+                 if snap[1] == compo_key and self._same_layers(snap[0], layer_keys[:k])}
+        start = max(valid) if valid else 0
+        if start:
+            self._paint_snapshot(ctx, valid[start][2])
+
+        # Snapshots to keep: all the layers (for redraws due to the overlays),
+        # and the layers below the one which changed last, as it's likely to be
+        # a live stream, which will change again soon.
+        wanted = {n}
+        if 0 < self._live_layer < n:
+            wanted.add(self._live_layer)
+        snapshots = {k: snap for k, snap in valid.items() if k in wanted}
+
+        for i in range(start, n):
+            im, merge_ratio = layers[i]
             self._draw_image(
                 ctx,
-                last_image,
-                last_image.metadata['dc_center'],
+                im,
+                im.metadata['dc_center'],
                 merge_ratio,
-                im_scale=last_image.metadata['dc_scale'],
-                rotation=last_image.metadata['dc_rotation'],
-                shear=last_image.metadata['dc_shear'],
-                flip=last_image.metadata['dc_flip'],
-                blend_mode=last_image.metadata['blend_mode'],
+                im_scale=im.metadata['dc_scale'],
+                rotation=im.metadata['dc_rotation'],
+                shear=im.metadata['dc_shear'],
+                flip=im.metadata['dc_flip'],
+                blend_mode=im.metadata['blend_mode'],
                 interpolate_data=interpolate_data
             )
+            if i + 1 in wanted:
+                snapshots[i + 1] = (layer_keys[:i + 1], compo_key, self._snapshot_buffer(ctx))
+
+        self._layer_snapshots = snapshots
+
+    @staticmethod
+    def _get_layer_key(im, merge_ratio):
+        """ Describe how an image is drawn
+
+        :param im: (DataArray) image, with the dc_* metadata
+        :param merge_ratio: (float) opacity of the image
+
+        :return: (DataArray, tuple) the image itself (to be compared by identity), and all the
+            parameters which influence its rendering
+
+        """
+        md = im.metadata
+        return im, (md['dc_center'], md['dc_scale'], md['dc_rotation'], md['dc_shear'],
+                    md['dc_flip'], md['dc_keepalpha'], md['blend_mode'], merge_ratio)
+
+    @staticmethod
+    def _same_layers(keys1, keys2):
+        """ Check whether two lists of layer keys would be rendered identically """
+        if len(keys1) != len(keys2):
+            return False
+        return all(im1 is im2 and p1 == p2 for (im1, p1), (im2, p2) in zip(keys1, keys2))
+
+    def _get_composition_key(self, interpolate_data):
+        """ Describe the state of the buffer on which the images are drawn
+
+        :return: (tuple) all the parameters of the buffer (and its background) which influence
+            the rendering of the images
+
+        """
+        return (self._bmp_buffer_size, self.w_buffer_center, self.scale, interpolate_data,
+                self.background_brush, self.background_offset,
+                wxcol_to_frgb(self.BackgroundColour))
+
+    def _snapshot_buffer(self, ctx):
+        """ Copy the current content of the buffer
+
+        :return: (cairo.ImageSurface) the copy
+
+        """
+        surface = cairo.ImageSurface(cairo.FORMAT_RGB24, *self._bmp_buffer_size)
+        sctx = cairo.Context(surface)
+        sctx.set_source_surface(ctx.get_target())
+        sctx.set_operator(cairo.OPERATOR_SOURCE)
+        sctx.paint()
+        return surface
+
+    @staticmethod
+    def _paint_snapshot(ctx, surface):
+        """ Replace the content of the buffer by a snapshot """
+        ctx.save()
+        ctx.identity_matrix()
+        ctx.set_source_surface(surface)
+        ctx.set_operator(cairo.OPERATOR_SOURCE)
+        ctx.paint()
+        ctx.restore()
 
     def _draw_image(self, ctx, im_data, w_im_center, opacity=1.0,
                     im_scale=(1.0, 1.0), rotation=None, shear=None, flip=None,
@@ -1065,6 +1224,16 @@ class BitmapCanvas(BufferedCanvas):
         else:
             im_format = cairo.FORMAT_RGB24
 
+        if total_scale_x < 0.5 and total_scale_y < 0.5:
+            # Strongly zoomed out => use the smallest reduced version of the
+            # image (already computed) which still has enough pixels.
+            pyramid = image_pyramids.find(im_data)
+            if pyramid is not None:
+                im_data, lvl = pyramid.get_level(max(total_scale))
+                if lvl > 0:
+                    total_scale_x = b_im_rect[2] / im_data.shape[1]
+                    total_scale_y = b_im_rect[3] / im_data.shape[0]
+
         height, width, _ = im_data.shape
         # logging.debug("Image data shape is %s", im_data.shape)
 
@@ -1189,6 +1358,28 @@ class BitmapCanvas(BufferedCanvas):
     def buffer_to_view(self, pos):
         return super(BitmapCanvas, self).buffer_to_view_pos(pos, self.margins)
 
+    # Same, for arrays of positions (N×2)
+
+    def world_to_buffer_array(self, pos, offset=(0, 0)):
+        return self.world_to_buffer_pos_array(pos, self.w_buffer_center, self.scale, offset)
+
+    def buffer_to_world_array(self, pos, offset=(0, 0)):
+        return self.buffer_to_world_pos_array(pos, self.w_buffer_center, self.scale, offset)
+
+    def view_to_world_array(self, pos, offset=(0, 0)):
+        return self.view_to_world_pos_array(pos, self.w_buffer_center, self.margins,
+                                            self.scale, offset)
+
+    def world_to_view_array(self, pos, offset=(0, 0)):
+        return self.world_to_view_pos_array(pos, self.w_buffer_center, self.margins,
+                                            self.scale, offset)
+
+    def view_to_buffer_array(self, pos):
+        return self.view_to_buffer_pos_array(pos, self.margins)
+
+    def buffer_to_view_array(self, pos):
+        return self.buffer_to_view_pos_array(pos, self.margins)
+
     # END Position conversion
 
 
@@ -1595,31 +1786,40 @@ class DraggableCanvas(BitmapCanvas):
 
     # TODO: just return best scale and center? And let the caller do what it wants?
     # It would allow to decide how to redraw depending if it's on size event or more high level.
-    def fit_to_content(self, recenter=False):
-        """ Adapt the scale and (optionally) center to fit to the current content
+    def _get_content_bbox(self):
+        """ Find the bounding box of all the content
 
-        :param recenter: (boolean) If True, also recenter the view.
+        :return: (None or 4 floats) left, top, right, bottom in world units, or None if there
+            is no content
 
         """
-
-        # TODO: take into account the dragging. For now we skip it (is unlikely to happen anyway)
-
-        # Find bounding box of all the content
-        bbox = [None, None, None, None]  # ltrb in wu
+        bbox = None
         for im in self.images:
             if im is None:
                 continue
             im_scale = im.metadata['dc_scale']
             w, h = im.shape[1] * im_scale[0], im.shape[0] * im_scale[1]
             c = im.metadata['dc_center']
-            bbox_im = [c[0] - w / 2, c[1] - h / 2, c[0] + w / 2, c[1] + h / 2]
-            if bbox[0] is None:
+            bbox_im = (c[0] - w / 2, c[1] - h / 2, c[0] + w / 2, c[1] + h / 2)
+            if bbox is None:
                 bbox = bbox_im
             else:
                 bbox = (min(bbox[0], bbox_im[0]), min(bbox[1], bbox_im[1]),
                         max(bbox[2], bbox_im[2]), max(bbox[3], bbox_im[3]))
 
-        if bbox[0] is None:
+        return bbox
+
+    def fit_to_content(self, recenter=False):
+        """ Adapt the scale and (optionally) center to fit to the current content
+
+        :param recenter: (boolean) If True, also recenter the view.
+
+        """
+
+        # TODO: take into account the dragging. For now we skip it (is unlikely to happen anyway)
+
+        bbox = self._get_content_bbox()
+        if bbox is None:
             return  # no image => nothing to do
 
         # if no recenter, increase bbox so that its center is the current center
@@ -1667,6 +1867,12 @@ class PlotCanvas(BufferedCanvas):
 
         # The data to be plotted: list of 2-tuples (x, y, for each point)
         self._data = None
+        # Same data, as arrays of X and Y values
+        self._xs = None
+        self._ys = None
+        # Min/max of the data per pixel column, which is what is actually drawn
+        self._decimator = None
+        self._data_changed = False  # True if data_prop needs to be recomputed
 
         # The range of the x and y data
         self.range_x = None
@@ -1707,11 +1913,17 @@ class PlotCanvas(BufferedCanvas):
 
         """
         if data:
+            if len(data[0]) != 2:
+                raise ValueError("The data should be 2D!")
+
+            xs = numpy.array([d[0] for d in data], dtype=numpy.float64)
+            ys = numpy.array([d[1] for d in data], dtype=numpy.float64)
+
             # Check if sorted
-            s = all(data[i][0] < data[i + 1][0] for i in xrange(len(data) - 1))
+            dx = numpy.diff(xs)
             try:
-                if not s:
-                    if any(data[i][0] == data[i + 1][0] for i in xrange(len(data) - 1)):
+                if not (dx > 0).all():
+                    if (dx == 0).any():
                         raise ValueError("The horizontal data points should be unique.")
                     else:
                         raise ValueError("The horizontal data should be sorted.")
@@ -1720,12 +1932,15 @@ class PlotCanvas(BufferedCanvas):
                 logging.exception("Horizontal data is incorrect, will drop it. Was: %s",
                                   [d[0] for d in data])
                 data = [(i, d[1]) for i, d in enumerate(data)]
+                xs = numpy.arange(len(data), dtype=numpy.float64)
                 unit_x = None
 
-            if len(data[0]) != 2:
-                raise ValueError("The data should be 2D!")
-
-            self._data = data
+            # Copy, as the list might be modified by append_1d_data()
+            self._data = list(data)
+            self._xs = xs
+            self._ys = ys
+            self._decimator = None
+            self._data_changed = True
 
             self.unit_x = unit_x
             self.unit_y = unit_y
@@ -1739,8 +1954,66 @@ class PlotCanvas(BufferedCanvas):
 
         wx.CallAfter(self.request_drawing_update)
 
+    def append_1d_data(self, xs, ys, range_x=None, range_y=None, min_x=None):
+        """ Add points at the end of the data plotted, and optionally remove the oldest ones
+
+        The units are kept. When the X range is explicitly given, only the new points have to be
+        processed to update the plot, which is useful for series which keep growing, such as a
+        chronogram.
+
+        :param xs: (list of floats) The X values, which must be sorted and bigger than the ones
+            already present.
+        :param ys: (list of floats) The Y values
+        :param range_x: (None or float, float) The new X range, or None to keep the current one
+        :param range_y: (None or float, float) The new Y range, or None to keep the current one
+        :param min_x: (None or float) If not None, the points with a smaller X value are removed
+
+        """
+        if len(xs) != len(ys):
+            msg = "X and Y list are of unequal length. X: %s, Y: %s, Xs: %s..."
+            raise ValueError(msg % (len(xs), len(ys), str(xs)[:30]))
+
+        if not self._data:
+            self.set_1d_data(xs, ys, self.unit_x, self.unit_y, range_x, range_y)
+            return
+        elif not len(xs):
+            return
+
+        xs = numpy.asarray(xs, dtype=numpy.float64)
+        ys = numpy.asarray(ys, dtype=numpy.float64)
+        if xs[0] <= self._xs[-1] or not (numpy.diff(xs) > 0).all():
+            raise ValueError("The horizontal data should be sorted, unique, and after %s." %
+                             (self._xs[-1],))
+
+        first = 0
+        if min_x is not None:
+            first = numpy.searchsorted(self._xs, min_x)
+        del self._data[:first]
+        self._data.extend(zip(xs, ys))
+        self._xs = numpy.concatenate((self._xs[first:], xs))
+        self._ys = numpy.concatenate((self._ys[first:], ys))
+
+        if range_x is not None:
+            self.range_x = range_x
+        if range_y is not None:
+            self.range_y = range_y
+
+        if self._decimator is not None and self.range_x:
+            if first:
+                self._decimator.trim(min_x)
+            self._decimator.append(xs, ys)
+        else:
+            # The X range depends on the data, so everything has to be recomputed
+            self._decimator = None
+        self._data_changed = True
+
+        wx.CallAfter(self.request_drawing_update)
+
     def clear(self):
         self._data = None
+        self._xs = None
+        self._ys = None
+        self._decimator = None
         self.unit_y = None
         self.unit_x = None
         self.range_x = None
@@ -1753,24 +2026,18 @@ class PlotCanvas(BufferedCanvas):
 
     # Attribute calculators
 
-    def _calc_data_characteristics(self, data):
+    def _calc_data_characteristics(self):
         """ Get the minimum and maximum
 
         This method can be used to override the values derived from the data set, so that the
         extreme values will not make the graph touch the edge of the canvas.
 
         """
-
-        try:
-            horz, vert = zip(*data)
-        except TypeError:
-            logging.exception("Failed to separate tuples in %s", data)
-            raise
-
-        min_x = min(horz)
-        max_x = max(horz)
-        min_y = min(vert)
-        max_y = max(vert)
+        # X is sorted
+        min_x = float(self._xs[0])
+        max_x = float(self._xs[-1])
+        min_y = float(self._ys.min())
+        max_y = float(self._ys.max())
 
         # If a range is not given, we calculate it from the data
         if not self.range_x:
@@ -1863,26 +2130,35 @@ class PlotCanvas(BufferedCanvas):
 
         if snap:
             # Return the value closest to val_x
-            return util.find_closest(val_x, [x for x, _ in self._data])
+            return self._data[self._find_closest_index(val_x)][0]
         else:
             # Clip the value
             val_x = max(min(val_x, self.data_prop[1][1]), self.data_prop[1][0])
 
         return val_x
 
+    def _find_closest_index(self, val_x):
+        """ Find the index of the data point with the X value closest to the given one """
+        # As the data is sorted over X, it's a dichotomy search
+        xs = self._xs
+        i = int(numpy.searchsorted(xs, val_x))
+        if i >= len(xs):
+            return len(xs) - 1
+        elif i > 0 and val_x - xs[i - 1] <= xs[i] - val_x:
+            return i - 1
+        return i
+
     def val_x_to_val(self, val_x):
         """
         Find the X/Y value from the data closest to the given X value
         val_x (number): the value in X
         return (tuple of data): X, Y value
         """
-        # TODO: as _data is sorted over X, it would be much faster to use
-        # dichotomy search, cf bisect.bisect() or numpy.searchsorted()
-        return min(self._data, key=lambda v: abs(v[0] - val_x))
+        return self._data[self._find_closest_index(val_x)]
 
     def _val_x_to_val_y(self, val_x, snap=False):
         """ Map the given x pixel value to a y value """
-        return min((abs(val_x - x), y) for x, y in self._data)[1]
+        return self._data[self._find_closest_index(val_x)][1]
 
     def SetForegroundColour(self, *args, **kwargs):
         BufferedCanvas.SetForegroundColour(self, *args, **kwargs)
@@ -1917,15 +2193,41 @@ class PlotCanvas(BufferedCanvas):
             self._draw_background(ctx)
 
             if self._data:
-                data = self._data
-                # TODO: reuse data_prop if the data has not changed
-                data_width, range_x, data_height, range_y = self._calc_data_characteristics(data)
-                self.data_prop = (data_width, range_x, data_height, range_y)
+                if self._data_changed or self.data_prop is None:
+                    self.data_prop = self._calc_data_characteristics()
+                    self._data_changed = False
+                data_width, range_x, data_height, range_y = self.data_prop
+                data = self._get_plot_data(range_x)
                 ctx = wxcairo.ContextFromDC(self._dc_buffer)
                 self._plot_data(ctx, data, data_width, range_x, data_height, range_y)
 
             # self._locked = False
 
+    def _get_plot_data(self, range_x):
+        """ Get the points to draw, with at most 2 points per pixel column (the minimum and the
+        maximum), so that the drawing time depends on the canvas width, not the data length.
+
+        The decimation is only recomputed when the data, the width or the size of the X range
+        changes. When the X range only slides, as with a chronogram, the columns are kept, so
+        they might be shifted by a fraction of a pixel.
+
+        :param range_x: (float, float) The X values at the left and right of the canvas
+        :return: (list of 2-tuples) The X, Y coordinates of each point to draw
+
+        """
+        width = self.ClientSize.x
+        if width <= 0 or len(self._data) <= 2 * width:
+            return self._data
+
+        dec = self._decimator
+        if (dec is None or dec.width != width or
+                not almost_equal(dec.range_x[1] - dec.range_x[0], range_x[1] - range_x[0])):
+            dec = PlotDecimator(range_x, width)
+            dec.append(self._xs, self._ys)
+            self._decimator = dec
+
+        return zip(*dec.get_data())
+
     def _plot_data(self, ctx, data, data_width, range_x, data_height, range_y):
         """ Plot the current `_data` to the given context """
 
@@ -34,7 +34,7 @@ from odemis.gui import BLEND_SCREEN, BLEND_DEFAULT
 from odemis.gui.comp.canvas import CAN_ZOOM, CAN_DRAG, CAN_FOCUS, BitmapCanvas
 from odemis.gui.comp.overlay.view import HistoryOverlay, PointSelectOverlay, MarkingLineOverlay, CurveOverlay
 from odemis.gui.util import wxlimit_invocation, ignore_dead, img
-from odemis.gui.util.img import format_rgba_darray
+from odemis.gui.util.img import format_rgba_darray, image_pyramids
 from odemis.model import VigilantAttributeBase
 from odemis.util import units
 import time
@@ -383,11 +383,11 @@ class DblMicroscopeCanvas(canvas.DraggableCanvas):
             # FluoStreams are merged using the "Screen" method that handles colour
             # merging without decreasing the intensity.
             if isinstance(s, stream.OpticalStream):
-                images_opt.append((s.image.value, BLEND_SCREEN, s.name.value))
+                images_opt.append((s.image.value, BLEND_SCREEN, s))
             elif isinstance(s, (stream.SpectrumStream, stream.CLStream)):
-                images_spc.append((s.image.value, BLEND_DEFAULT, s.name.value))
+                images_spc.append((s.image.value, BLEND_DEFAULT, s))
             else:
-                images_std.append((s.image.value, BLEND_DEFAULT, s.name.value))
+                images_std.append((s.image.value, BLEND_DEFAULT, s))
 
         # Sort by size, so that the biggest picture is first drawn (no opacity)
         def get_area(d):
@@ -414,14 +414,20 @@ class DblMicroscopeCanvas(canvas.DraggableCanvas):
         # add the images in order
         ims = []
         im_cache = {}
-        for rgbim, blend_mode, name in images:
+        for rgbim, blend_mode, s in images:
             # Get converted RGBA image from cache, or create it and cache it
-            # On large images it costs 100 ms (per image and per canvas)
+            # On large images it costs 100 ms (per image)
             im_id = id(rgbim)
             if im_id in self.images_cache:
                 rgba_im = self.images_cache[im_id]
             else:
-                rgba_im = format_rgba_darray(rgbim)
+                # The RGBA image, and its reduced versions (computed in
+                # background) for when zoomed out, are shared between all the
+                # canvases showing the stream. Each canvas has its own view on
+                # it, as set_images() updates the metadata.
+                pyramid = image_pyramids.get(rgbim, convert=format_rgba_darray,
+                                             owner=s, callback=self._on_pyramid_ready)
+                rgba_im = model.DataArray(pyramid.image)
             im_cache[im_id] = rgba_im
 
             keepalpha = False
@@ -431,7 +437,7 @@ class DblMicroscopeCanvas(canvas.DraggableCanvas):
             shear = rgbim.metadata.get(model.MD_SHEAR, 0)
             flip = rgbim.metadata.get(model.MD_FLIP, 0)
 
-            ims.append((rgba_im, pos, scale, keepalpha, rot, shear, flip, blend_mode, name))
+            ims.append((rgba_im, pos, scale, keepalpha, rot, shear, flip, blend_mode, s.name.value))
 
         # Replace the old cache, so the obsolete RGBA images can be garbage collected
         self.images_cache = im_cache
@@ -769,6 +775,14 @@ class DblMicroscopeCanvas(canvas.DraggableCanvas):
         # The y value needs to be flipped between physical and world coordinates.
         return phy_pos[0], -phy_pos[1]
 
+    def physical_to_world_pos_array(self, phy_pos):
+        """ Translate many physical coordinates into world coordinates at once.
+
+        :param phy_pos: (array of shape N×2) "physical" coordinates in m
+        :return: (numpy array of shape N×2)
+        """
+        return numpy.asarray(phy_pos, dtype=numpy.float64) * (1, -1)
+
     def _get_sem_rect(self):
         """
         Returns the (theoretical) scanning area of the SEM. Works even if the
@@ -924,9 +938,10 @@ class DblMicroscopeCanvas(canvas.DraggableCanvas):
         """
 
         interpolate_data = False if self.microscope_view is None else self.microscope_view.interpolate_content.value
+        tstart = time.time()
         if self._fps_ol:
             if self._last_frame_update is None:
-                self._last_frame_update = time.time()
+                self._last_frame_update = tstart
             super(DblMicroscopeCanvas, self).draw(interpolate_data=interpolate_data)
             now = time.time()
 
@@ -940,6 +955,21 @@ class DblMicroscopeCanvas(canvas.DraggableCanvas):
         else:
             super(DblMicroscopeCanvas, self).draw(interpolate_data=interpolate_data)
 
+        self._report_draw_cost(time.time() - tstart)
+
+    def _report_draw_cost(self, dur):
+        """ Share the time spent drawing between the live streams of the view,
+        so that their update rate takes it into account.
+
+        :param dur: (float) time spent drawing (s)
+
+        """
+        if self.microscope_view is None:
+            return
+        live = [s for s in self.microscope_view.getStreams() if s.should_update.value]
+        for s in live:
+            stream.image_update_scheduler.report_cost(s, dur / len(live), "display")
+
 
 class OverviewCanvas(DblMicroscopeCanvas):
     """ Canvas for displaying the overview stream """
@@ -961,12 +991,96 @@ class OverviewCanvas(DblMicroscopeCanvas):
         # This canvas can have a special overlay for tracking position history
         self.history_overlay = None
 
+        # id -> (tile, BGRA tile): mosaic tiles converted for display
+        self._tiles_cache = {}
+        # Area covered by the mosaics, the last time the view was fit to it
+        self._mosaic_bbox = None
+
         self.SetMinSize((400, 400))
 
     def _on_view_mpp(self, mpp):
         DblMicroscopeCanvas._on_view_mpp(self, mpp)
         self.fit_view_to_content(True)
 
+    def _get_mosaic_streams(self):
+        """
+        return (list of MosaicStream): the streams of the view which accumulate
+          their images into a mosaic
+        """
+        if not self.microscope_view:
+            return []
+        return [s for s in self.microscope_view.getStreams() if isinstance(s, stream.MosaicStream)]
+
+    @ignore_dead
+    def _on_view_image_update(self, t):
+        super(OverviewCanvas, self)._on_view_image_update(t)
+
+        # Show the whole mosaic whenever it grows
+        bbox = self._get_content_bbox()
+        if self._get_mosaic_streams() and bbox != self._mosaic_bbox:
+            self._mosaic_bbox = bbox
+            self.fit_view_to_content(True)
+
+    def _get_ordered_images(self):
+        # The images of the mosaic streams are not drawn directly, as they are
+        # already part of the mosaic.
+        mimages = [s.image.value for s in self._get_mosaic_streams()]
+        images = super(OverviewCanvas, self)._get_ordered_images()
+        return [i for i in images if not any(i[0] is mim for mim in mimages)]
+
+    def _get_content_bbox(self):
+        bbox = super(OverviewCanvas, self)._get_content_bbox()
+        for s in self._get_mosaic_streams():
+            mbbox = s.mosaic.get_bbox()
+            if mbbox is None:
+                continue
+            # physical ltrb -> world ltrb (Y is inverted)
+            mbbox = (mbbox[0], -mbbox[3], mbbox[2], -mbbox[1])
+            if bbox is None:
+                bbox = mbbox
+            else:
+                bbox = (min(bbox[0], mbbox[0]), min(bbox[1], mbbox[1]),
+                        max(bbox[2], mbbox[2]), max(bbox[3], mbbox[3]))
+        return bbox
+
+    def _get_composition_key(self, interpolate_data):
+        key = super(OverviewCanvas, self)._get_composition_key(interpolate_data)
+        # The mosaic is part of the background
+        return key + (tuple((id(s.mosaic), s.mosaic.version) for s in self._get_mosaic_streams()),)
+
+    def _draw_background(self, ctx):
+        """ Draw the background, and the mosaics on top of it """
+        super(OverviewCanvas, self)._draw_background(ctx)
+
+        mstreams = self._get_mosaic_streams()
+        if not mstreams:
+            return
+
+        # Only get the tiles which are visible, at the level adapted to the scale
+        pxs = 1 / self.scale
+        hw, hh = self._bmp_buffer_size[0] * pxs / 2, self._bmp_buffer_size[1] * pxs / 2
+        c = self.world_to_physical_pos(self.w_buffer_center)
+        rect = (c[0] - hw, c[1] - hh, c[0] + hw, c[1] + hh)
+
+        tiles_cache = {}
+        for s in mstreams:
+            for tile in s.mosaic.get_tiles(pxs, rect):
+                # The tiles are never modified, so the conversion can be reused
+                try:
+                    bgra = self._tiles_cache[id(tile)][1]
+                except KeyError:
+                    bgra = format_rgba_darray(tile)
+                tiles_cache[id(tile)] = (tile, bgra)
+
+                self._draw_image(
+                    ctx,
+                    bgra,
+                    self.physical_to_world_pos(tile.metadata[model.MD_POS]),
+                    im_scale=tile.metadata[model.MD_PIXEL_SIZE],
+                    blend_mode=BLEND_DEFAULT,
+                )
+        self._tiles_cache = tiles_cache
+
     def setView(self, microscope_view, tab_data):
         super(OverviewCanvas, self).setView(microscope_view, tab_data)
         self.history_overlay = HistoryOverlay(self, tab_data.stage_history)
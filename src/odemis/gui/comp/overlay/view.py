@@ -1373,33 +1373,49 @@ class HistoryOverlay(base.ViewOverlay):
           it is scaled
         """
 
+        history = self.history.value
+        if not history:
+            return
+
         ctx.set_line_width(1)
         offset = self.cnvs.get_half_buffer_size()
-
-        for i, (p_center, p_size) in enumerate(self.history.value):
-            alpha = (i + 1) * (0.8 / len(self.history.value)) + 0.2 if self.fade else 1.0
-            v_center = self.cnvs.world_to_view(self.cnvs.physical_to_world_pos(p_center), offset)
-
-            if scale:
-                v_center = (shift[0] + v_center[0] * scale,
-                            shift[1] + v_center[1] * scale)
-                marker_size = (2, 2)
-            elif p_size:
-                marker_size = (int(p_size[0] * self.cnvs.scale),
-                               int(p_size[0] * self.cnvs.scale))
-
-                # Prevent the marker from becoming too small
-                if marker_size[0] < 2 or marker_size[1] < 2:
-                    marker_size = (3, 3)
-            else:
-                marker_size = (5, 5)
-
-            if i < len(self.history.value) - 1:
+        n = len(history)
+
+        # Convert all the positions at once
+        p_centers = numpy.array([c for c, _ in history], dtype=numpy.float64)
+        v_centers = self.cnvs.world_to_view_array(self.cnvs.physical_to_world_pos_array(p_centers),
+                                                  offset)
+        view_rect = (0, 0, self.cnvs.ClientSize.x, self.cnvs.ClientSize.y)
+
+        if scale:
+            v_centers = v_centers * scale + shift
+            view_rect = (shift[0], shift[1],
+                         shift[0] + view_rect[2] * scale, shift[1] + view_rect[3] * scale)
+            marker_sizes = numpy.full(n, 2, dtype=numpy.int64)
+        else:
+            p_sizes = numpy.array([s[0] if s else 0 for _, s in history], dtype=numpy.float64)
+            marker_sizes = (p_sizes * self.cnvs.scale).astype(numpy.int64)
+            # Prevent the marker from becoming too small
+            marker_sizes[marker_sizes < 2] = 3
+            marker_sizes[numpy.array([not s for _, s in history], dtype=bool)] = 5
+
+        # Only draw the markers which are (at least partly) visible
+        margin = marker_sizes / 2 + 2
+        visible = ((v_centers[:, 0] + margin >= view_rect[0]) &
+                   (v_centers[:, 0] - margin <= view_rect[2]) &
+                   (v_centers[:, 1] + margin >= view_rect[1]) &
+                   (v_centers[:, 1] - margin <= view_rect[3]))
+
+        for i in numpy.flatnonzero(visible):
+            alpha = (i + 1) * (0.8 / n) + 0.2 if self.fade else 1.0
+
+            if i < n - 1:
                 colour = self.trail_colour
             else:
                 colour = self.pos_colour
 
-            self._draw_rect(ctx, v_center, marker_size, colour, alpha)
+            marker_size = (int(marker_sizes[i]),) * 2
+            self._draw_rect(ctx, tuple(v_centers[i]), marker_size, colour, alpha)
 
     @staticmethod
     def _draw_rect(ctx, v_center, v_size, colour, alpha):
@@ -26,6 +26,7 @@ from __future__ import division
 import cairo
 import logging
 import math
+import numpy
 from odemis import model, util
 from odemis.acq.stream import UNDEFINED_ROI
 from odemis.gui.comp.overlay.base import Vec, WorldOverlay, SelectionMixin, DragMixin, \
@@ -35,7 +36,6 @@ from odemis.util import clip_line
 import wx
 
 import odemis.gui as gui
-from odemis.gui import img
 import odemis.util.conversion as conversion
 import odemis.util.units as units
 
@@ -266,6 +266,9 @@ class RepetitionSelectOverlay(WorldSelectOverlay):
     FILL_GRID = 1
     FILL_POINT = 2
 
+    # Colour of the repetition points (as BGRA)
+    _POINT_BGRA = (212, 167, 47, 255)
+
     def __init__(self, cnvs, roa=None, colour=gui.SELECTION_COLOUR):
         WorldSelectOverlay.__init__(self, cnvs, colour)
 
@@ -276,8 +279,9 @@ class RepetitionSelectOverlay(WorldSelectOverlay):
             self._roa.subscribe(self.on_roa, init=True)
 
         self._bmp = None  # used to cache repetition with FILL_POINT
-        # ROI for which the bmp is valid
-        self._bmp_bpos = (None, None, None, None)
+        self._bmp_data = None  # numpy array containing the data of the bmp
+        # ROI (whole and clipped) for which the bmp is valid
+        self._bmp_bpos = (None, None)
 
     @property
     def fill(self):
@@ -374,57 +378,48 @@ class RepetitionSelectOverlay(WorldSelectOverlay):
                 int(end_x - start_x), int(end_y - start_y))
             ctx.fill()
             ctx.stroke()
-        else:
+        elif end_x - start_x >= 1 and end_y - start_y >= 1:
             # check whether the cache is still valid
             cl_pos = (start_x, start_y, end_x, end_y)
-            if not self._bmp or self._bmp_bpos != cl_pos:
+            if not self._bmp or self._bmp_bpos != (b_pos, cl_pos):
                 # Cache the image as it's quite a lot of computations
-                half_step_x = step_x / 2
-                half_step_y = step_y / 2
-
-                # The number of repetitions that fits into the buffer
-                # clipped selection
-                buf_rep_x = int((end_x - start_x) / step_x)
-                buf_rep_y = int((end_y - start_y) / step_y)
-
-                # TODO: need to take into account shift, like drawGrid
-                logging.debug("Rendering %sx%s points", buf_rep_x, buf_rep_y)
-
-                point = img.getBitmap("dot.png")
-                point_dc = wx.MemoryDC()
-                point_dc.SelectObject(point)
-                point.SetMaskColour(wx.BLACK)
-
-                horz_dc = wx.MemoryDC()
-                horz_bmp = wx.EmptyBitmap(int(end_x - start_x), 3)
-                horz_dc.SelectObject(horz_bmp)
-                horz_dc.SetBackground(wx.BLACK_BRUSH)
-                horz_dc.Clear()
-
-                blit = horz_dc.Blit
-                for i in range(buf_rep_x):
-                    x = i * step_x + half_step_x
-                    blit(x, 0, 3, 3, point_dc, 0, 0)
-
-                total_dc = wx.MemoryDC()
-                self._bmp = wx.EmptyBitmap(int(end_x - start_x), int(end_y - start_y))
-                total_dc.SelectObject(self._bmp)
-                total_dc.SetBackground(wx.BLACK_BRUSH)
-                total_dc.Clear()
-
-                blit = total_dc.Blit
-                for j in range(buf_rep_y):
-                    y = j * step_y + half_step_y
-                    blit(0, y, int(end_x - start_x), 3, horz_dc, 0, 0)
-
-                self._bmp.SetMaskColour(wx.BLACK)
-                self._bmp_bpos = cl_pos
-
-            self.cnvs.dc_buffer.DrawBitmapPoint(
-                self._bmp,
-                wx.Point(int(start_x), int(start_y)),
-                useMask=True
-            )
+                self._bmp = self._render_points(b_pos, cl_pos, step_x, step_y)
+                self._bmp_bpos = (b_pos, cl_pos)
+
+            ctx.set_source_surface(self._bmp, int(start_x), int(start_y))
+            ctx.paint()
+
+    def _render_points(self, b_pos, cl_pos, step_x, step_y):
+        """ Render the repetition points visible in the buffer
+
+        :param b_pos: (4 floats) ltrb position of the whole selection in buffer coordinates
+        :param cl_pos: (4 floats) ltrb position of the selection clipped to the buffer
+        :param step_x, step_y: (float) distance between points in buffer pixels
+
+        :return: (cairo.ImageSurface) an image of the clipped selection, transparent
+            except for the points
+
+        """
+        start_x, start_y, end_x, end_y = cl_pos
+        width, height = int(end_x - start_x), int(end_y - start_y)
+        rep_x, rep_y = self.repetition
+
+        # Center of each point in the image, only keeping the ones inside (with
+        # a 1px margin, for the dot)
+        xs = numpy.floor(b_pos[0] + (numpy.arange(rep_x) + 0.5) * step_x - int(start_x))
+        xs = xs[(xs >= 1) & (xs < width - 1)].astype(numpy.intp)
+        ys = numpy.floor(b_pos[1] + (numpy.arange(rep_y) + 0.5) * step_y - int(start_y))
+        ys = ys[(ys >= 1) & (ys < height - 1)].astype(numpy.intp)
+        logging.debug("Rendering %sx%s points", len(xs), len(ys))
+
+        # Each point is a small diamond of 4 pixels, set all at once
+        stride = cairo.ImageSurface.format_stride_for_width(cairo.FORMAT_ARGB32, width)
+        im = numpy.zeros((height, stride // 4, 4), dtype=numpy.uint8)
+        for dx, dy in ((0, -1), (-1, 0), (1, 0), (0, 1)):
+            im[(ys + dy)[:, numpy.newaxis], xs + dx] = self._POINT_BGRA
+
+        self._bmp_data = im  # The surface doesn't keep a reference to the data
+        return cairo.ImageSurface.create_for_data(im, cairo.FORMAT_ARGB32, width, height, stride)
 
     def _draw_grid(self, ctx):
         # Calculate the offset of the center of the buffer relative to the
@@ -1166,6 +1161,9 @@ class PointsOverlay(WorldOverlay):
         self.point = None
         # The possible choices for point as a world pos => point mapping
         self.choices = {}
+        # Same world positions, as a list and as an array N×2, to convert them all at once
+        self._w_keys = []
+        self._w_points = numpy.empty((0, 2))
 
         self.min_dist = None
 
@@ -1232,16 +1230,16 @@ class PointsOverlay(WorldOverlay):
 
                 b_hover_box = None
 
-                for w_pos in self.choices.keys():
-                    b_box_x, b_box_y = self.cnvs.world_to_buffer(w_pos, offset)
-
-                    if abs(b_box_x - b_x) <= self.dot_size and abs(b_box_y - b_y) <= self.dot_size:
-                        # Calculate box in buffer coordinates
-                        b_hover_box = (b_box_x - self.dot_size,
-                                       b_box_y - self.dot_size,
-                                       b_box_x + self.dot_size,
-                                       b_box_y + self.dot_size)
-                        break
+                b_points = self.cnvs.world_to_buffer_array(self._w_points, offset)
+                hits = numpy.flatnonzero((numpy.abs(b_points[:, 0] - b_x) <= self.dot_size) &
+                                         (numpy.abs(b_points[:, 1] - b_y) <= self.dot_size))
+                if len(hits):
+                    b_box_x, b_box_y = (float(v) for v in b_points[hits[0]])
+                    # Calculate box in buffer coordinates
+                    b_hover_box = (b_box_x - self.dot_size,
+                                   b_box_y - self.dot_size,
+                                   b_box_x + self.dot_size,
+                                   b_box_y + self.dot_size)
 
                 if self.b_hover_box != b_hover_box:
                     self.b_hover_box = b_hover_box
@@ -1288,6 +1286,8 @@ class PointsOverlay(WorldOverlay):
                 w_x, w_y = self.cnvs.physical_to_world_pos(physical_points[0])
                 self.choices[(w_x, w_y)] = physical_points[0]
 
+        self._w_keys = list(self.choices.keys())
+        self._w_points = numpy.array(self._w_keys, dtype=numpy.float64).reshape(-1, 2)
         self.min_dist = min_dist / 2.0  # get radius
 
     def draw(self, ctx, shift=(0, 0), scale=1.0):
@@ -1295,46 +1295,56 @@ class PointsOverlay(WorldOverlay):
         if not self.choices or not self.active:
             return
 
-        if self.b_hover_box:
-            b_l, b_t, b_r, b_b = self.b_hover_box
-
-        w_cursor_over = None
         offset = self.cnvs.get_half_buffer_size()
+        b_points = self.cnvs.world_to_buffer_array(self._w_points, offset)
 
-        for w_pos in self.choices.keys():
-            b_x, b_y = self.cnvs.world_to_buffer(w_pos, offset)
-
-            ctx.new_sub_path()
-            ctx.arc(b_x, b_y, self.dot_size, 0, 2 * math.pi)
+        # Only draw the dots which are (at least partly) in the buffer
+        buf_w, buf_h = self.cnvs.buffer_size
+        ds = self.dot_size
+        visible = numpy.flatnonzero((b_points[:, 0] >= -ds) & (b_points[:, 0] <= buf_w + ds) &
+                                    (b_points[:, 1] >= -ds) & (b_points[:, 1] <= buf_h + ds))
 
-            # If the mouse is hovering over a dot (and we are not dragging)
-            if (self.b_hover_box and (b_l <= b_x <= b_r and b_t <= b_y <= b_b) and
-                    not self.cnvs.was_dragged):
-                w_cursor_over = w_pos
-                ctx.set_source_rgba(*self.select_colour)
-            elif self.point.value == self.choices[w_pos]:
-                ctx.set_source_rgba(*self.select_colour)
-            else:
-                ctx.set_source_rgba(*self.dot_colour)
-
-            ctx.fill()
-
-            ctx.arc(b_x, b_y, 2.0, 0, 2 * math.pi)
-            ctx.set_source_rgb(0.0, 0.0, 0.0)
+        # If the mouse is hovering over a dot (and we are not dragging)
+        w_cursor_over = None
+        highlighted = set()
+        if self.b_hover_box and not self.cnvs.was_dragged:
+            b_l, b_t, b_r, b_b = self.b_hover_box
+            vb_points = b_points[visible]
+            hovered = visible[(b_l <= vb_points[:, 0]) & (vb_points[:, 0] <= b_r) &
+                              (b_t <= vb_points[:, 1]) & (vb_points[:, 1] <= b_b)]
+            if len(hovered):
+                w_cursor_over = self._w_keys[hovered[-1]]
+            highlighted.update(hovered)
+
+        for i in visible:
+            if self.choices[self._w_keys[i]] == self.point.value:
+                highlighted.add(i)
+
+        # Draw all the dots of the same colour in one go
+        for colour, idxs in ((self.dot_colour, [i for i in visible if i not in highlighted]),
+                             (self.select_colour, sorted(highlighted))):
+            for i in idxs:
+                ctx.new_sub_path()
+                ctx.arc(b_points[i, 0], b_points[i, 1], ds, 0, 2 * math.pi)
+            ctx.set_source_rgba(*colour)
             ctx.fill()
 
-            ctx.arc(b_x, b_y, 1.5, 0, 2 * math.pi)
-            ctx.set_source_rgb(*self.point_colour)
+        for radius, colour in ((2.0, (0.0, 0.0, 0.0)), (1.5, self.point_colour)):
+            for i in visible:
+                ctx.new_sub_path()
+                ctx.arc(b_points[i, 0], b_points[i, 1], radius, 0, 2 * math.pi)
+            ctx.set_source_rgb(*colour)
             ctx.fill()
 
-            # Draw hit boxes (for debugging purposes)
-            # ctx.set_line_width(1)
-            # ctx.set_source_rgb(1.0, 1.0, 1.0)
-            # ctx.rectangle(b_x - self.dot_size * 0.95,
-            #               b_y - self.dot_size * 0.95,
-            #               self.dot_size * 1.9,
-            #               self.dot_size * 1.9)
-            # ctx.stroke()
+        # Draw hit boxes (for debugging purposes)
+        # ctx.set_line_width(1)
+        # ctx.set_source_rgb(1.0, 1.0, 1.0)
+        # for i in visible:
+        #     ctx.rectangle(b_points[i, 0] - self.dot_size * 0.95,
+        #                   b_points[i, 1] - self.dot_size * 0.95,
+        #                   self.dot_size * 1.9,
+        #                   self.dot_size * 1.9)
+        # ctx.stroke()
 
         self.cursor_over_point = w_cursor_over
 
@@ -28,6 +28,7 @@ from __future__ import division
 from abc import abstractmethod, ABCMeta
 from concurrent.futures._base import CancelledError
 import logging
+import numpy
 from odemis import gui, model, util
 from odemis.acq.stream import OpticalStream, EMStream, SpectrumStream, StaticStream
 from odemis.gui import BG_COLOUR_LEGEND, FG_COLOUR_LEGEND
@@ -1021,6 +1022,9 @@ class ChronographViewport(PlotViewport):
     def __init__(self, *args, **kwargs):
         super(ChronographViewport, self).__init__(*args, **kwargs)
         self.canvas.markline_overlay.hide_x_label()
+        # Date of the last point passed to the canvas. The canvas is fed with
+        # the absolute dates, so that only the new points have to be passed.
+        self._last_date = None
 
     def setView(self, view, tab_data):
         super(ChronographViewport, self).setView(view, tab_data)
@@ -1036,7 +1040,25 @@ class ChronographViewport(PlotViewport):
             range_x = (min(x[0], -self.stream.windowPeriod.value), x[-1])
             range_y = (0, float(max(data)))  # float() to avoid numpy arrays
 
-            self.canvas.set_data(zip(x, y), unit_x, range_x=range_x, range_y=range_y)
+            dates = data.metadata.get(model.MD_AD_LIST)
+            if dates is None:
+                self._last_date = None
+                self.canvas.set_data(zip(x, y), unit_x, range_x=range_x, range_y=range_y)
+            else:
+                # Same range as displayed, but on the absolute dates
+                drange_x = (dates[-1] + range_x[0], dates[-1] + range_x[1])
+                # Only append if the last point plotted is still there (otherwise,
+                # it's probably another stream, or the window was reset)
+                i = 0
+                if self._last_date is not None:
+                    i = numpy.searchsorted(dates, self._last_date)
+                if i < len(dates) and dates[i] == self._last_date:
+                    self.canvas.append_1d_data(dates[i + 1:], y[i + 1:], drange_x,
+                                               range_y, min_x=dates[0])
+                else:
+                    self.canvas.set_1d_data(dates, y, unit_x, range_x=drange_x,
+                                            range_y=range_y)
+                self._last_date = dates[-1]
 
             self.bottom_legend.unit = unit_x
             self.bottom_legend.range = range_x
@@ -1046,6 +1068,10 @@ class ChronographViewport(PlotViewport):
             self.clear()
         self.Refresh()
 
+    def clear(self):
+        self._last_date = None
+        super(ChronographViewport, self).clear()
+
     def _on_pixel_select(self, pixel):
         pass
 
@@ -211,6 +211,9 @@ HW_SETTINGS_CONFIG = {
             ("translation", {
                 "control_type": odemis.gui.CONTROL_NONE,
             }),
+            ("readoutBand", {  # Set via the autoReadoutBand of the stream
+                "control_type": odemis.gui.CONTROL_NONE,
+            }),
             ("targetTemperature", {
                 "control_type": odemis.gui.CONTROL_NONE,
             }),
@@ -253,6 +256,9 @@ HW_SETTINGS_CONFIG = {
             ("translation", {
                 "control_type": odemis.gui.CONTROL_NONE,
             }),
+            ("readoutBand", {  # Set via the autoReadoutBand of the stream
+                "control_type": odemis.gui.CONTROL_NONE,
+            }),
             ("targetTemperature", {
                 "control_type": odemis.gui.CONTROL_NONE,
             }),
@@ -448,6 +454,10 @@ STREAM_SETTINGS_CONFIG = {
             ("fuzzing", {
                 "tooltip": u"Scans each pixel over their complete area, instead of only scanning the center the pixel area.",
             }),
+            ("autoReadoutBand", {
+                "label": "Auto readout band",
+                "tooltip": u"Only read the rows of the CCD which receive light, detected when starting the live view.",
+            }),
             ("wavelength", {
                 "range": (0.0, 1900e-9),
             }),
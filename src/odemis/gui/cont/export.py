@@ -22,13 +22,19 @@ This file is part of Odemis.
 
 from __future__ import division
 
+from concurrent.futures._base import CancelledError
 import logging
+from odemis import model
+from odemis.acq._futures import executeTask
 from odemis.dataio import get_converter
 from odemis.gui.comp import popup
 from odemis.gui.util import formats_to_wildcards
 from odemis.gui.util import get_picture_folder, call_in_wx_main
 from odemis.gui.util.img import ar_to_export_data, spectrum_to_export_data, images_to_export_data
 import os
+import shutil
+import tempfile
+import threading
 import time
 import wx
 
@@ -64,6 +70,7 @@ class ExportController(object):
         self._tab_panel.btn_secom_export.Bind(wx.EVT_BUTTON, self.start_export_as_viewport)
 
         self._viewports = viewports.keys()
+        self._export_progress = None  # ExportProgressDialog of the last export
 
         wx.EVT_MENU(self._main_frame,
                     self._main_frame.menu_item_export_as.GetId(),
@@ -93,8 +100,6 @@ class ExportController(object):
         """ Wrapper to run export_viewport in a separate thread."""
         filepath, export_format, export_type = self._get_export_info()
         if filepath is not None:
-            # TODO: run the real export function in a future, and based on the
-            # result, show a message box or popup or log message
             self.export_viewport(filepath, export_format, export_type)
 
     def _get_export_info(self):
@@ -122,6 +127,9 @@ class ExportController(object):
     def export_viewport(self, filepath, export_format, export_type):
         """ Export the image from the focused view to the filesystem.
 
+        The export runs in a separate thread, and a progress dialog is shown if
+        it takes a while, which allows to cancel it.
+
         :param filepath: (str) full path to the destination file
         :param export_format: (str) the format name
         :param export_type: (str) spatial, AR or spectrum
@@ -129,16 +137,63 @@ class ExportController(object):
         try:
             exporter = get_converter(export_format)
             raw = export_format in EXPORTERS[export_type][1]
-            exported_data = self.export(export_type, raw)
-            # record everything to a file
-            exporter.export(filepath, exported_data)
-
-            popup.show_message(self._main_frame,
-                               "Exported in %s" % (filepath,),
-                               timeout=3
-                               )
+            # Read the settings from the GUI now, as they shouldn't be accessed
+            # from another thread
+            export_fn, args, kwargs = self._get_export_task(export_type, raw)
+        except Exception:
+            logging.exception("Failed to export a %s view as %s", export_type, export_format)
+            return
+
+        f = model.ProgressiveFuture()
+        f.task_canceller = self._cancel_export
+        kwargs["future"] = f
+        export_thread = threading.Thread(target=executeTask,
+                                         name="Export view",
+                                         args=(f, self._export_to_file, filepath,
+                                               exporter, export_fn, args, kwargs))
+        export_thread.daemon = True
+        export_thread.start()
+
+        self._export_progress = ExportProgressDialog(self._main_frame, f)
+        f.add_done_callback(lambda f: self._on_export_done(f, filepath, export_format, export_type))
+
+    def _export_to_file(self, filepath, exporter, export_fn, args, kwargs):
+        """ Compute the data to export and write it to the file (in a separate thread)
+
+        The file is first written in a temporary directory, and only moved to its final place if
+        the export hasn't been cancelled in the mean time.
+        """
+        future = kwargs["future"]
+        exported_data = export_fn(*args, **kwargs)
+        if future.cancelled():
+            raise CancelledError()
+
+        # Some exporters write several files, named after the file name, so the temporary
+        # directory is used to keep the same names. It's in the same folder, so that the files
+        # can just be renamed.
+        dirname, basename = os.path.split(filepath)
+        tmpdir = tempfile.mkdtemp(prefix=".export-", dir=dirname)
+        try:
+            exporter.export(os.path.join(tmpdir, basename), exported_data)
+            if future.cancelled():
+                raise CancelledError()
+            for fn in os.listdir(tmpdir):
+                os.rename(os.path.join(tmpdir, fn), os.path.join(dirname, fn))
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def _cancel_export(self, future):
+        # The export functions regularly check whether the future is cancelled
+        logging.debug("Cancelling export")
+        return True
 
-            logging.info("Exported a %s view into file '%s'.", export_type, filepath)
+    @call_in_wx_main
+    def _on_export_done(self, future, filepath, export_format, export_type):
+        """ Report the result of the export to the user """
+        try:
+            future.result()
+        except CancelledError:
+            logging.info("Export of a %s view as %s cancelled.", export_type, export_format)
         except LookupError as ex:
             logging.info("Export of a %s view as %s seems to contain no data.",
                          export_type, export_format, exc_info=True)
@@ -151,6 +206,13 @@ class ExportController(object):
             dlg.Destroy()
         except Exception:
             logging.exception("Failed to export a %s view as %s", export_type, export_format)
+        else:
+            popup.show_message(self._main_frame,
+                               "Exported in %s" % (filepath,),
+                               timeout=3
+                               )
+
+            logging.info("Exported a %s view into file '%s'.", export_type, filepath)
 
     def get_export_type(self, view):
         """
@@ -180,15 +242,29 @@ class ExportController(object):
         raises:
             LookupError: if no data found to export
         """
+        export_fn, args, kwargs = self._get_export_task(export_type, raw)
+        return export_fn(*args, **kwargs)
+
+    def _get_export_task(self, export_type, raw=False):
+        """
+        Find the function and its arguments to compute the data to export, with
+        respect to the settings and options.
+
+        :param export_type (string): spatial, AR or spectrum
+        :param raw (boolean): raw data format if True
+
+        returns (callable, tuple, dict): the function, its arguments, and its
+          keyword arguments
+        """
         fview = self._data_model.focussedView.value
         vp = self.get_viewport_by_view(fview)
         streams = fview.getStreams()
         if export_type == 'AR':
-            exported_data = ar_to_export_data(streams, raw)
+            return ar_to_export_data, (streams, raw), {}
         elif export_type == 'spectrum':
             spectrum = vp.stream.get_pixel_spectrum()
             spectrum_range, unit = vp.stream.get_spectrum_range()
-            exported_data = spectrum_to_export_data(spectrum, raw, unit, spectrum_range)
+            return spectrum_to_export_data, (spectrum, raw, unit, spectrum_range), {}
         else:
             export_type = 'spatial'
             view_px = tuple(vp.canvas.ClientSize)
@@ -197,13 +273,10 @@ class ExportController(object):
             view_pos = fview.view_pos.value
             draw_merge_ratio = fview.stream_tree.kwargs.get("merge", 0.5)
             interpolate_data = fview.interpolate_content.value
-            exported_data = images_to_export_data(streams,
-                                                  view_hfw, view_pos,
-                                                  draw_merge_ratio, raw,
-                                                  interpolate_data=interpolate_data,
-                                                  logo=self._main_frame.legend_logo)
-
-        return exported_data
+            return (images_to_export_data,
+                    (streams, view_hfw, view_pos, draw_merge_ratio, raw),
+                    {"interpolate_data": interpolate_data,
+                     "logo": self._main_frame.legend_logo})
 
     def get_viewport_by_view(self, view):
         """ Return the ViewPort associated with the given view """
@@ -304,3 +377,54 @@ class ExportController(object):
             logging.error("No file converter found!")
 
         return export_formats
+
+
+class ExportProgressDialog(object):
+    """
+    Shows the progress of an export, with the possibility to cancel it.
+    The dialog only appears if the export takes more than a second.
+    """
+
+    def __init__(self, parent, future, delay=1):
+        """
+        parent (wx.Window): the parent of the dialog
+        future (ProgressiveFuture): the export task
+        delay (float): time before showing the dialog (s)
+        """
+        self._parent = parent
+        self._future = future
+        self._show_time = time.time() + delay
+        self._dlg = None
+
+        # a repeating timer, always called in the GUI thread
+        self._timer = wx.PyTimer(self._update_progress)
+        self._timer.Start(250.0)  # 4 Hz
+
+    def _update_progress(self):
+        if self._future.done():
+            self._timer.Stop()
+            if self._dlg:
+                self._dlg.Destroy()
+                self._dlg = None
+            return
+
+        now = time.time()
+        if self._dlg is None:
+            if now < self._show_time:
+                return
+            self._dlg = wx.ProgressDialog("Exporting",
+                                          "Exporting the view...",
+                                          maximum=100,
+                                          parent=self._parent,
+                                          style=wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME |
+                                                wx.PD_REMAINING_TIME)
+
+        start, end = self._future.get_progress()
+        if end > start:
+            ratio = (now - start) / (end - start)
+        else:
+            ratio = 0
+        cont, _ = self._dlg.Update(min(99, int(ratio * 100)))
+        if not cont:
+            logging.info("Export cancelled by the user")
+            self._future.cancel()
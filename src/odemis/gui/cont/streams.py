@@ -2013,7 +2013,8 @@ class SparcStreamsController(StreamBarController):
                 axes["band"] = fw
 
         return self._addRepStream(spec_stream, sem_spec_stream,
-                                  vas=("repetition", "pixelSize", "fuzzing"),
+                                  vas=("repetition", "pixelSize", "fuzzing",
+                                       "autoReadoutBand"),
                                   axes=axes,
                                   )
 
@@ -34,7 +34,8 @@ from odemis import dataio, model
 from odemis.acq import calibration
 from odemis.acq.align import AutoFocus
 from odemis.acq.stream import OpticalStream, SpectrumStream, CLStream, EMStream, \
-    ARStream, CLSettingsStream, ARSettingsStream, MonochromatorSettingsStream, RGBCameraStream, BrightfieldStream, RGBStream
+    ARStream, CLSettingsStream, ARSettingsStream, MonochromatorSettingsStream, RGBCameraStream, BrightfieldStream, RGBStream, \
+    MosaicStream
 from odemis.driver.actuator import ConvertStage
 import odemis.gui
 from odemis.gui.comp.canvas import CAN_ZOOM
@@ -282,6 +283,7 @@ class SecomStreamsTab(Tab):
         self.overview_controller = viewcont.OverviewController(tab_data,
                                                                panel.vp_overview_sem.canvas)
         ovv = self.panel.vp_overview_sem.microscope_view
+        self._mosaic_stream = None
         if main_data.overview_ccd:
             # Overview camera can be RGB => in that case len(shape) == 4
             if len(main_data.overview_ccd.shape) == 4:
@@ -291,7 +293,9 @@ class SecomStreamsTab(Tab):
                 overview_stream = acqstream.BrightfieldStream("Overview", main_data.overview_ccd,
                                                               main_data.overview_ccd.data, None)
 
-            ovv.addStream(overview_stream)
+            # Stitch all the overview images, to show the whole area already seen
+            self._mosaic_stream = acqstream.MosaicStream("Overview", overview_stream)
+            ovv.addStream(self._mosaic_stream)
             # TODO: add it to self.tab_data_model.streams?
             # In any case, to support displaying Overview in the normal 2x2
             # views we'd need to have a special Overview class
@@ -480,7 +484,7 @@ class SecomStreamsTab(Tab):
                 "cls": guimod.OverviewView,
                 "name": "Overview",
                 "stage": main_data.overview_stage,
-                "stream_classes": (RGBCameraStream, BrightfieldStream),
+                "stream_classes": (RGBCameraStream, BrightfieldStream, MosaicStream),
             }
 
         # Add connection to SEM hFoV if possible (on SEM-only views)
@@ -615,6 +619,11 @@ class SecomStreamsTab(Tab):
         if state == guimod.CHAMBER_PUMPING:
             # Ensure we still have both optical and SEM streams
             self._ensure_base_streams()
+        elif state in (guimod.CHAMBER_VENTING, guimod.CHAMBER_VENTED):
+            # The sample is (going to be) unloaded, so the areas seen so far
+            # are not relevant anymore
+            if self._mosaic_stream is not None:
+                self._mosaic_stream.clear()
 
     # TODO: move to stream controller?
     # => we need to update the state of optical/sem when the streams are play/paused
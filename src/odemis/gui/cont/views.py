@@ -23,7 +23,8 @@ This file is part of Odemis.
 from __future__ import division
 
 import logging
-from odemis.acq.stream import EMStream
+from odemis.acq.stream import EMStream, PRIORITY_FOCUSSED, PRIORITY_VISIBLE, \
+    PRIORITY_HIDDEN
 from odemis.gui import model
 from odemis.gui.comp.grid import ViewportGrid
 from odemis.gui.cont import tools
@@ -77,6 +78,11 @@ class ViewPortController(object):
             self._grid_panel = None
             logging.info("Multiple viewports, but no ViewportGrid to manage them")
 
+        # Update more often the streams of the views displayed
+        tab_data.visible_views.subscribe(self._update_view_priorities)
+        tab_data.viewLayout.subscribe(self._update_view_priorities)
+        tab_data.focussedView.subscribe(self._update_view_priorities, init=True)
+
     @property
     def viewports(self):
         return self._viewports
@@ -193,6 +199,24 @@ class ViewPortController(object):
         viewport.SetFocus(True)
         viewport.Refresh()
 
+    def _update_view_priorities(self, _=None):
+        """ Set the update priority of the streams according to how their view is displayed """
+        focussed = self._data_model.focussedView.value
+        if self._data_model.viewLayout.value == model.VIEW_LAYOUT_ONE:
+            shown = [focussed]
+        else:
+            shown = self._data_model.visible_views.value
+
+        for view in self._data_model.views.value:
+            if not isinstance(view, model.StreamView):
+                continue
+            if view is focussed:
+                view.set_update_priority(PRIORITY_FOCUSSED)
+            elif view in shown:
+                view.set_update_priority(PRIORITY_VISIBLE)
+            else:
+                view.set_update_priority(PRIORITY_HIDDEN)
+
     def _on_knob_press(self, _):
         """ Advance the focus to the next grid Viewport, if any """
 
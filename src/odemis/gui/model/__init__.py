@@ -29,7 +29,7 @@ import logging
 import math
 from odemis import model
 from odemis.acq import path
-from odemis.acq.stream import Stream, StreamTree
+from odemis.acq.stream import Stream, StreamTree, image_update_scheduler, PRIORITY_VISIBLE
 from odemis.gui.conf import get_general_conf
 from odemis.model import (FloatContinuous, VigilantAttribute, IntEnumerated, StringVA, BooleanVA,
                           MD_POS, InstantaneousFuture, hasVA, StringEnumerated)
@@ -925,6 +925,10 @@ class StreamView(View):
         # Streams are active? If so, is there another/better way?
         self._streams_lock = threading.Lock()
 
+        # How often the images of the streams should be updated, compared to
+        # the other streams. Changed via set_update_priority().
+        self._update_priority = PRIORITY_VISIBLE
+
         # TODO: list of annotations to display
         self.show_crosshair = model.BooleanVA(True)
         self.interpolate_content = model.BooleanVA(False)
@@ -1185,6 +1189,7 @@ class StreamView(View):
         # operation possible
         with self._streams_lock:
             self.stream_tree.add_stream(stream)
+        image_update_scheduler.set_priority(stream, self, self._update_priority)
 
         # subscribe to the stream's image
         if hasattr(stream, "image"):
@@ -1214,10 +1219,21 @@ class StreamView(View):
             # remove stream from the StreamTree()
             # TODO: handle more complex trees
             self.stream_tree.remove_stream(stream)
+        image_update_scheduler.set_priority(stream, self, None)
 
         # let everyone know that the view has changed
         self.lastUpdate.value = time.time()
 
+    def set_update_priority(self, priority):
+        """
+        Change how often the images of the streams of this view are updated,
+        compared to the streams of the other views.
+        priority (float >= 0): one of the acq.stream.PRIORITY_* values
+        """
+        self._update_priority = priority
+        for s in self.getStreams():
+            image_update_scheduler.set_priority(s, self, priority)
+
     def _onNewImage(self, im):
         """
         Called when one stream has its image updated
@@ -25,7 +25,7 @@ from __future__ import division
 
 import numpy
 from odemis import model
-from odemis.gui import test
+from odemis.gui import test, BLEND_SCREEN
 from odemis.gui.comp.canvas import BufferedCanvas
 import unittest
 import wx
@@ -272,6 +272,62 @@ class TestDblMicroscopeCanvas(test.GuiTestCase):
         mpp_recenter = self.view.mpp.value
         self.assertGreaterEqual(mpp_no_recenter, mpp_recenter)
 
+    def test_partial_redraw(self):
+        """ Only the images which changed (and the ones above) are redrawn """
+        self.view.show_crosshair.value = False
+        test.gui_loop()
+        scale = (1 / self.canvas.scale, 1 / self.canvas.scale)  # 1 px = 1 px of the buffer
+        pos = self.canvas.w_buffer_center
+
+        def create_image(bgr):
+            im = model.DataArray(numpy.zeros((51, 51, 4), dtype=numpy.uint8))
+            im[:, :] = bgr + (255,)
+            return im
+
+        nb_drawn = [0]
+        orig_draw_image = self.canvas._draw_image
+
+        def counting_draw_image(*args, **kwargs):
+            nb_drawn[0] += 1
+            orig_draw_image(*args, **kwargs)
+
+        self.canvas._draw_image = counting_draw_image
+
+        def update(im2):
+            self.canvas.set_images([
+                (im1, pos, scale, False, None, None, None, None, "red"),
+                (im2, pos, scale, False, None, None, None, BLEND_SCREEN, "live")
+            ])
+            nb_drawn[0] = 0
+            self.canvas.draw()
+            result_im = get_image_from_buffer(self.canvas)
+            return get_rgb(result_im, result_im.Width // 2, result_im.Height // 2)
+
+        im1 = create_image((0, 0, 255))  # red (in BGR)
+        self.assertEqual(update(create_image((0, 255, 0))), (255, 255, 0))
+        self.assertEqual(nb_drawn[0], 2)
+
+        # First time the second image changes, all is redrawn
+        self.assertEqual(update(create_image((255, 0, 0))), (255, 0, 255))
+        self.assertEqual(nb_drawn[0], 2)
+
+        # Afterwards, the first image is reused
+        self.assertEqual(update(create_image((0, 255, 0))), (255, 255, 0))
+        self.assertEqual(nb_drawn[0], 1)
+
+        # Nothing changed => no image redrawn
+        nb_drawn[0] = 0
+        self.canvas.draw()
+        self.assertEqual(nb_drawn[0], 0)
+        result_im = get_image_from_buffer(self.canvas)
+        self.assertEqual(get_rgb(result_im, result_im.Width // 2, result_im.Height // 2),
+                         (255, 255, 0))
+
+        # Moving the buffer => everything is redrawn
+        self.canvas.w_buffer_center = (pos[0] + 10 * scale[0], pos[1])
+        self.canvas.draw()
+        self.assertEqual(nb_drawn[0], 2)
+
     def test_conversion_functions(self):
         """ This test checks the various conversion functions and methods """
 
@@ -377,6 +433,42 @@ class TestDblMicroscopeCanvas(test.GuiTestCase):
             self.assertTrue(all([isinstance(v, float) for v in bp]))
             self.assertEqual(world_point, wp)
 
+    def test_conversion_arrays(self):
+        """ The array conversions should give the same values as the scalar ones """
+        buffer_world_center = (10, -20)
+        buffer_margin = (100, 100)
+        offset = (200, 200)
+
+        view_points = [(-201, -201), (-1, -1), (0, 0), (100, 100), (200, 200),
+                       (400, 400), (401, 401), (33, -17), (250, 7)]
+        v_arr = numpy.array(view_points)
+
+        for scale in (1.0, 2.0, 0.3):
+            w_arr = BufferedCanvas.view_to_world_pos_array(v_arr, buffer_world_center,
+                                                           buffer_margin, scale, offset)
+            self.assertEqual(w_arr.shape, (len(view_points), 2))
+            vb_arr = BufferedCanvas.world_to_view_pos_array(w_arr, buffer_world_center,
+                                                            buffer_margin, scale, offset)
+            b_arr = BufferedCanvas.world_to_buffer_pos_array(w_arr, buffer_world_center,
+                                                             scale, offset)
+
+            for vp, wp, vbp, bp in zip(view_points, w_arr, vb_arr, b_arr):
+                exp_wp = BufferedCanvas.view_to_world_pos(vp, buffer_world_center,
+                                                          buffer_margin, scale, offset)
+                numpy.testing.assert_allclose(wp, exp_wp)
+                exp_vp = BufferedCanvas.world_to_view_pos(exp_wp, buffer_world_center,
+                                                          buffer_margin, scale, offset)
+                numpy.testing.assert_array_equal(vbp, exp_vp)
+                exp_bp = BufferedCanvas.world_to_buffer_pos(exp_wp, buffer_world_center,
+                                                            scale, offset)
+                numpy.testing.assert_array_equal(bp, exp_bp)
+
+        # Halfway values are rounded the same way as round()
+        w_arr = numpy.array([(0.5, -0.5), (1.5, -2.5)])
+        b_arr = BufferedCanvas.world_to_buffer_pos_array(w_arr, (0, 0), 1)
+        for wp, bp in zip(w_arr, b_arr):
+            self.assertEqual(BufferedCanvas.world_to_buffer_pos(wp, (0, 0), 1), tuple(bp))
+
     def test_conversion_methods(self):
 
         offset = (200, 200)
@@ -25,8 +25,12 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 from __future__ import division
 
 import cairo
+import collections
+from concurrent import futures
+from concurrent.futures._base import CancelledError
 import logging
 import math
+import multiprocessing
 import numpy
 from odemis import model
 from odemis.acq import stream
@@ -36,6 +40,7 @@ from odemis.util import intersect, fluo
 from odemis.util import polar, img
 from odemis.util import units
 import operator
+import threading
 import time
 import wx
 
@@ -45,6 +50,10 @@ import odemis.gui.img as guiimg
 BAR_PLOT_COLOUR = (0.5, 0.5, 0.5)
 CROP_RES_LIMIT = 1024
 MAX_RES_FACTOR = 5  # upper limit resolution factor to exported image
+# The exported images are drawn by horizontal bands of this height (px)
+EXPORT_BAND_HEIGHT = 256
+# Maximum number of threads drawing the bands in parallel
+EXPORT_WORKERS = multiprocessing.cpu_count()
 SPEC_PLOT_SIZE = 1024
 SPEC_SCALE_WIDTH = SPEC_PLOT_SIZE // 10
 # legend ratios
@@ -66,6 +75,10 @@ LINE_THICKNESS = 0.0016
 ARC_RADIUS = 0.002
 ARC_LEFT_MARGIN = 0.01
 ARC_TOP_MARGIN = 0.0104
+# The image pyramids are not reduced below this size (px, along each dimension)
+MIPMAP_MIN_SIZE = 256
+# Maximum memory used by the images for which the pyramid is kept (in bytes)
+MIPMAP_CACHE_SIZE = 512 * 2 ** 20
 
 
 # @profile
@@ -607,7 +620,8 @@ def calc_img_buffer_rect(im_data, im_scale, w_im_center, buffer_center, buffer_s
 
 def draw_image(ctx, im_data, w_im_center, buffer_center, buffer_scale,
                buffer_size, opacity=1.0, im_scale=(1.0, 1.0), rotation=None,
-               shear=None, flip=None, blend_mode=BLEND_DEFAULT, interpolate_data=False, upscaling=False):
+               shear=None, flip=None, blend_mode=BLEND_DEFAULT, interpolate_data=False, upscaling=False,
+               band=None):
     """ Draw the given image to the Cairo context
 
     The buffer is considered to have it's 0,0 origin at the top left
@@ -627,6 +641,8 @@ def draw_image(ctx, im_data, w_im_center, buffer_center, buffer_scale,
     interpolate_data (boolean): apply interpolation if True
     upscaling (boolean): if True you need to crop the intersection of the image
     and the buffer
+    band (None or (int, int)): if not None, the context only covers the
+      horizontal band of the buffer between these two rows (first, last + 1).
 
     """
 
@@ -646,6 +662,10 @@ def draw_image(ctx, im_data, w_im_center, buffer_center, buffer_scale,
 
     # Get the intersection with the actual buffer
     buffer_rect = (0, 0) + buffer_size
+    if band is not None and not rotation and not shear and not flip:
+        # Only the part of the image visible in the band is needed. (If the image
+        # is transformed, the visible part is harder to find, so all is kept.)
+        buffer_rect = (0, band[0], buffer_size[0], band[1] - band[0])
 
     intersection = intersect(buffer_rect, b_im_rect)
 
@@ -659,6 +679,10 @@ def draw_image(ctx, im_data, w_im_center, buffer_center, buffer_scale,
     # Rotate if needed
     ctx.save()
 
+    if band is not None:
+        # Move to buffer coordinates
+        ctx.translate(0, -band[0])
+
     # apply transformations if needed
     apply_rotation(ctx, rotation, b_im_rect)
     apply_shear(ctx, shear, b_im_rect)
@@ -690,6 +714,15 @@ def draw_image(ctx, im_data, w_im_center, buffer_center, buffer_scale,
     else:
         im_format = cairo.FORMAT_RGB24
 
+    if total_scale_x < 0.5 and total_scale_y < 0.5:
+        # Strongly reduced => start from a smaller version of the image
+        pyramid = image_pyramids.find(im_data)
+        if pyramid is not None:
+            im_data, lvl = pyramid.get_level(max(total_scale), build=True)
+            if lvl > 0:
+                total_scale_x = w / im_data.shape[1]
+                total_scale_y = h / im_data.shape[0]
+
     height, width, _ = im_data.shape
 
     # Note: Stride calculation is done automatically when no stride parameter is provided.
@@ -760,15 +793,18 @@ def calculate_raw_ar(data, bg_data):
     return polard
 
 
-def ar_to_export_data(streams, raw=False):
+def ar_to_export_data(streams, raw=False, future=None):
     """
     Creates either raw or WYSIWYG representation for the AR projection
 
     streams (list of Stream objects): streams displayed in the current view
     client_size (wx._core.Size)
     raw (boolean): if True returns raw representation
+    future (ProgressiveFuture or None): if the export is run as a future, it
+      is used to check for cancellation
 
     returns (model.DataArray)
+    raise CancelledError: if the future has been cancelled
     """
     # we expect just one stream
     if len(streams) == 0:
@@ -789,6 +825,7 @@ def ar_to_export_data(streams, raw=False):
                 sempos[d.metadata[model.MD_POS]] = img.ensure2DImage(d)
             except KeyError:
                 logging.info("Skipping DataArray without known position")
+        _check_export_cancelled(future)
         raw_ar = calculate_raw_ar(sempos[pos], s.background.value)
         return raw_ar
     else:
@@ -801,6 +838,7 @@ def ar_to_export_data(streams, raw=False):
         ar_margin = int(0.2 * sim.shape[0])
         ar_size = sim.shape[0] + ar_margin, sim.shape[1] + ar_margin
         scale = fit_to_content(images, sim.shape)
+        _check_export_cancelled(future)
 
         # Make surface based on the maximum resolution
         data_to_draw = numpy.zeros((ar_size[1], ar_size[0], 4), dtype=numpy.uint8)
@@ -1118,12 +1156,155 @@ def val_y_to_pos_y(val_y, client_size, data_height=None, range_y=None, data_prop
         return 0
 
 
+def _get_plot_columns(xs, range_x, width):
+    """
+    Compute the pixel column of each X value
+    xs (ndarray of floats): X values
+    range_x (float, float): X values at the left and right of the plot
+    width (int > 0): number of pixel columns of the plot
+    returns (ndarray of ints): column index, clipped to 0 -> width - 1
+    """
+    if range_x[1] <= range_x[0]:
+        return numpy.zeros(len(xs), dtype=numpy.intp)
+    cols = numpy.floor((xs - range_x[0]) * (width / (range_x[1] - range_x[0])))
+    return numpy.clip(cols, 0, width - 1).astype(numpy.intp)
+
+
+def _decimate_columns(xs, ys, cols):
+    """
+    Keep only the minimum and maximum points of each column
+    xs (ndarray of N floats): X values, sorted
+    ys (ndarray of N floats): Y values
+    cols (ndarray of N ints): column of each point (so, sorted too)
+    returns (ndarray, ndarray): X and Y values of the points kept, in the same
+      order as originally.
+    """
+    if len(xs) == 0:
+        return xs, ys
+    # As X is sorted, the points of a column are contiguous
+    bounds = numpy.flatnonzero(numpy.diff(cols)) + 1
+    starts = numpy.concatenate(([0], bounds))
+    ends = numpy.concatenate((bounds, [len(cols)])) - 1
+    # Sorted by column, then by Y => the first point of each column is its
+    # minimum, and the last one its maximum.
+    order = numpy.lexsort((ys, cols))
+    keep = numpy.union1d(order[starts], order[ends])  # sorted and unique
+    return xs[keep], ys[keep]
+
+
+def decimate_plot_data(xs, ys, range_x, width):
+    """
+    Reduce a series of points to at most 2 points per pixel column: the minimum
+    and the maximum. Once drawn, it looks the same as the whole series, but
+    the drawing time only depends on the width of the plot.
+    xs (ndarray of N floats): X values, sorted
+    ys (ndarray of N floats): Y values
+    range_x (float, float): X values at the left and right of the plot
+    width (int > 0): number of pixel columns of the plot
+    returns (ndarray, ndarray): X and Y values of the points kept, in the same
+      order as originally. If there are not more than 2 points per column on
+      average, the original arrays are returned.
+    """
+    if len(xs) <= 2 * width:
+        return xs, ys
+    return _decimate_columns(xs, ys, _get_plot_columns(xs, range_x, width))
+
+
+class PlotDecimator(object):
+    """
+    Min/max decimation (cf decimate_plot_data()) of a series of points which is
+    only extended at the end, and possibly trimmed at the beginning, such as a
+    chronogram. When points are appended, only the new points and the ones kept
+    for the last column are processed.
+    """
+
+    def __init__(self, range_x, width):
+        """
+        range_x (float, float): X values at the left and right of the plot. The
+          columns keep the same size if the series goes beyond.
+        width (int > 0): number of pixel columns of the plot
+        """
+        self.range_x = range_x
+        self.width = width
+        if range_x[1] > range_x[0]:
+            self._scale = width / (range_x[1] - range_x[0])
+        else:
+            self._scale = 0
+        self._xs = numpy.empty((0,), dtype=numpy.float64)
+        self._ys = numpy.empty((0,), dtype=numpy.float64)
+        self._last_col = None  # column of the last point kept
+
+    def _get_columns(self, xs):
+        # Not clipped, as the series can slide out of the original range
+        return numpy.floor((xs - self.range_x[0]) * self._scale).astype(numpy.intp)
+
+    def append(self, xs, ys):
+        """
+        Add points at the end of the series
+        xs (ndarray of floats): X values, sorted, and bigger than the ones
+          already in the series
+        ys (ndarray of floats): Y values
+        raise ValueError: if the X values are before the end of the series
+        """
+        xs = numpy.asarray(xs, dtype=numpy.float64)
+        ys = numpy.asarray(ys, dtype=numpy.float64)
+        if len(xs) == 0:
+            return
+        if len(self._xs) and xs[0] <= self._xs[-1]:
+            raise ValueError("Points must be appended after %s, but got %s" %
+                             (self._xs[-1], xs[0]))
+
+        cols = self._get_columns(xs)
+        if self._last_col is not None and cols[0] == self._last_col:
+            # The last column has to be decimated again with the new points
+            # (there are at most 2 points kept for it)
+            first = len(self._xs) - 1
+            if first > 0 and self._get_columns(self._xs[first - 1:first])[0] == self._last_col:
+                first -= 1
+            xs = numpy.concatenate((self._xs[first:], xs))
+            ys = numpy.concatenate((self._ys[first:], ys))
+            cols = numpy.concatenate(([self._last_col] * (len(self._xs) - first), cols))
+        else:
+            first = len(self._xs)
+
+        dxs, dys = _decimate_columns(xs, ys, cols)
+        self._xs = numpy.concatenate((self._xs[:first], dxs))
+        self._ys = numpy.concatenate((self._ys[:first], dys))
+        self._last_col = cols[-1]
+
+    def trim(self, min_x):
+        """
+        Remove the points at the beginning of the series
+        min_x (float): the points with a smaller X value are removed. Note that
+          the column containing min_x only keeps the points kept so far which
+          are after min_x, so its min/max might be not exactly the ones of the
+          remaining points.
+        """
+        first = numpy.searchsorted(self._xs, min_x)
+        if first:
+            self._xs = self._xs[first:]
+            self._ys = self._ys[first:]
+            if not len(self._xs):
+                self._last_col = None
+
+    def get_data(self):
+        """
+        returns (ndarray, ndarray): X and Y values of the points to draw
+        """
+        return self._xs, self._ys
+
+
 def bar_plot(ctx, data, data_width, range_x, data_height, range_y, client_size, fill_colour):
     """ Do a bar plot of the current `_data` """
 
     if len(data) < 2:
         return
 
+    if 0 < client_size.x < len(data) / 2:
+        xs, ys = zip(*data)
+        xs, ys = decimate_plot_data(numpy.array(xs), numpy.array(ys), range_x, client_size.x)
+        data = zip(xs, ys)
+
     vx_to_px = val_x_to_pos_x
     vy_to_py = val_y_to_pos_y
 
@@ -1162,7 +1343,7 @@ def bar_plot(ctx, data, data_width, range_x, data_height, range_y, client_size,
     ctx.fill()
 
 
-def spectrum_to_export_data(spectrum, raw, unit, spectrum_range):
+def spectrum_to_export_data(spectrum, raw, unit, spectrum_range, future=None):
     """
     Creates either raw or WYSIWYG representation for the spectrum data plot
 
@@ -1171,9 +1352,13 @@ def spectrum_to_export_data(spectrum, raw, unit, spectrum_range):
     raw (boolean): if True returns raw representation
     unit (string): wavelength unit
     spectrum_range (list of float): spectrum range
+    future (ProgressiveFuture or None): if the export is run as a future, it
+      is used to check for cancellation
 
     returns (model.DataArray)
+    raise CancelledError: if the future has been cancelled
     """
+    _check_export_cancelled(future)
 
     if raw:
         return spectrum
@@ -1198,6 +1383,7 @@ def spectrum_to_export_data(spectrum, raw, unit, spectrum_range):
         range_y = (min_y, max_y)
         data_height = max_y - min_y
         bar_plot(ctx, data, data_width, range_x, data_height, range_y, client_size, fill_colour)
+        _check_export_cancelled(future)
 
         # Differentiate the scale bar colour so the user later on
         # can easily change the bar plot or the scale bar colour
@@ -1550,7 +1736,14 @@ def convert_streams_to_images(streams, raw=False):
     # add the images in order
     ims = []
     for rgbim, blend_mode, stream in images:
-        rgba_im = format_rgba_darray(rgbim)
+        pyramid = image_pyramids.lookup(rgbim)
+        if pyramid is not None:
+            # Already converted for the display: reuse the RGBA image and its
+            # reduced versions. The metadata is separate, as it's updated by
+            # set_images().
+            rgba_im = model.DataArray(pyramid.image)
+        else:
+            rgba_im = format_rgba_darray(rgbim)
         keepalpha = False
         date = rgbim.metadata.get(model.MD_ACQ_DATE, None)
         scale = rgbim.metadata[model.MD_PIXEL_SIZE]
@@ -1645,19 +1838,23 @@ def get_sub_img(b_intersect, b_im_rect, im_data, total_scale):
 
 def images_to_export_data(streams, view_hfw, view_pos,
                           draw_merge_ratio, raw=False,
-                          interpolate_data=False, logo=None):
+                          interpolate_data=False, logo=None, future=None):
     """
     view_hfw (tuple of float): X (width), Y (heigth) in m
     view_pos (tuple of float): center position X, Y in m
     raw (bool): if False, generates one RGB image out of all the streams, otherwise
       generates one image per stream using the raw data
     logo (RGBA DataArray): Image to display in the legend
+    future (ProgressiveFuture or None): if the export is run as a future, it
+      is used to report the progress and to check for cancellation
     return (list of DataArray)
     raise LookupError: if no data visible in the selected FoV
+    raise CancelledError: if the future has been cancelled
     """
     images, streams_data, im_min_type = convert_streams_to_images(streams, raw)
     if not images:
         raise LookupError("There is no stream data to be exported")
+    _check_export_cancelled(future)
 
     # Find min pixel size
     min_pxs = min(im.metadata['dc_scale'] for im in images)
@@ -1716,128 +1913,162 @@ def images_to_export_data(streams, view_hfw, view_pos,
 
     # TODO: make sure that Y dim of the buffer_size is not crazy high
 
-    # Make surface based on the maximum resolution
-    data_to_draw = numpy.zeros((buffer_size[1], buffer_size[0], 4), dtype=numpy.uint8)
-    surface = cairo.ImageSurface.create_for_data(
-        data_to_draw, cairo.FORMAT_ARGB32, buffer_size[0], buffer_size[1])
-    ctx = cairo.Context(surface)
-
-    # The list of images to export
-    data_to_export = []
-
     n = len(images)
-    last_image = images.pop()
-    # For every image, except the last
-    i = 0
+    # Arguments of draw_image() for each image, in the drawing order
+    draw_args = []
     for i, im in enumerate(images):
-        if im.metadata['blend_mode'] == BLEND_SCREEN or raw:
+        if im.metadata['blend_mode'] == BLEND_SCREEN or raw or n == 1:
             # No transparency in case of "raw" export
             merge_ratio = 1.0
+        elif i == n - 1:
+            merge_ratio = draw_merge_ratio
         else:
             merge_ratio = 1 - i / n
 
         # TODO: make interpolation work also with 16 bits and higher data type
         # For now, as Cairo is convinced it's RGB, it computes wrong data.
         # cf util.img.rescale_hq() before casting to RGB?
-        draw_image(
-            ctx,
-            im,
-            im.metadata['dc_center'],
-            buffer_center,
-            buffer_scale,
-            buffer_size,
-            merge_ratio,
-            im_scale=im.metadata['dc_scale'],
-            rotation=im.metadata['dc_rotation'],
-            shear=im.metadata['dc_shear'],
-            flip=im.metadata['dc_flip'],
-            blend_mode=im.metadata['blend_mode'],
-            interpolate_data=(interpolate_data and im_min_type == numpy.uint8),
-            upscaling=(min_res == buffer_size)  # TODO: why not always upscaling?
-        )
-        if raw:
-            # Create legend
-            legend_to_draw = numpy.zeros((n * int(buffer_size[0] * SUB_LAYER) + int(buffer_size[0] * MAIN_LAYER), buffer_size[0], 4), dtype=numpy.uint8)
-            legend_surface = cairo.ImageSurface.create_for_data(
-                legend_to_draw, cairo.FORMAT_ARGB32, buffer_size[0], n * int(buffer_size[0] * SUB_LAYER) + int(buffer_size[0] * MAIN_LAYER))
-            legend_ctx = cairo.Context(legend_surface)
-            draw_export_legend(legend_ctx, images + [last_image], buffer_size, buffer_scale,
-                               view_hfw[0], last_image.metadata['date'], streams_data, im.metadata['stream'], logo=logo)
-
-            new_data_to_draw = numpy.zeros((data_to_draw.shape[0], data_to_draw.shape[1]), dtype=numpy.uint32)
-            new_data_to_draw[:, :] = numpy.left_shift(data_to_draw[:, :, 2], 8, dtype=numpy.uint32) | data_to_draw[:, :, 1]
-            new_data_to_draw[:, :] = new_data_to_draw[:, :] | numpy.left_shift(data_to_draw[:, :, 0], 16, dtype=numpy.uint32)
-            new_data_to_draw[:, :] = new_data_to_draw[:, :] | numpy.left_shift(data_to_draw[:, :, 3], 24, dtype=numpy.uint32)
-            new_data_to_draw = new_data_to_draw.astype(im_min_type)
-            # Turn legend to grayscale
-            new_legend_to_draw = legend_to_draw[:, :, 0] + legend_to_draw[:, :, 1] + legend_to_draw[:, :, 2]
-            new_legend_to_draw = new_legend_to_draw.astype(im_min_type)
-            new_legend_to_draw = numpy.where(new_legend_to_draw == 0, numpy.min(new_data_to_draw), numpy.max(new_data_to_draw))
-            data_with_legend = numpy.append(new_data_to_draw, new_legend_to_draw, axis=0)
-            # Clip background to baseline
-            baseline = im_min_type(streams_data[im.metadata['stream']][1][-1])
-            data_with_legend = numpy.clip(data_with_legend, baseline, numpy.max(new_data_to_draw))
+        draw_args.append((im, {
+            "w_im_center": im.metadata['dc_center'],
+            "buffer_center": buffer_center,
+            "buffer_scale": buffer_scale,
+            "buffer_size": buffer_size,
+            "opacity": merge_ratio,
+            "im_scale": im.metadata['dc_scale'],
+            "rotation": im.metadata['dc_rotation'],
+            "shear": im.metadata['dc_shear'],
+            "flip": im.metadata['dc_flip'],
+            "blend_mode": im.metadata['blend_mode'],
+            "interpolate_data": (interpolate_data and im_min_type == numpy.uint8),
+            "upscaling": (min_res == buffer_size)  # TODO: why not always upscaling?
+        }))
 
+    # The list of images to export
+    data_to_export = []
+    date = images[-1].metadata['date']
+    if raw:
+        # One image per stream
+        for i, (im, kwargs) in enumerate(draw_args):
+            data_to_draw = numpy.zeros((buffer_size[1], buffer_size[0], 4), dtype=numpy.uint8)
+            _draw_export_images(data_to_draw, [(im, kwargs)], future, (i, n))
+            legend_to_draw = _draw_export_legend_data(images, buffer_size, buffer_scale, view_hfw[0],
+                                                      date, streams_data, im.metadata['stream'], logo)
+            baseline = streams_data[im.metadata['stream']][1][-1]
+            data_with_legend = _raw_export_data(data_to_draw, legend_to_draw, im_min_type, baseline)
             md = {model.MD_DESCRIPTION: im.metadata['name']}
             data_to_export.append(model.DataArray(data_with_legend, md))
-
-            data_to_draw = numpy.zeros((buffer_size[1], buffer_size[0], 4), dtype=numpy.uint8)
-            surface = cairo.ImageSurface.create_for_data(
-                data_to_draw, cairo.FORMAT_ARGB32, buffer_size[0], buffer_size[1])
-            ctx = cairo.Context(surface)
-
-    if not images or last_image.metadata['blend_mode'] == BLEND_SCREEN or raw:
-        merge_ratio = 1.0
-    else:
-        merge_ratio = draw_merge_ratio
-
-    draw_image(
-        ctx,
-        last_image,
-        last_image.metadata['dc_center'],
-        buffer_center,
-        buffer_scale,
-        buffer_size,
-        merge_ratio,
-        im_scale=last_image.metadata['dc_scale'],
-        rotation=last_image.metadata['dc_rotation'],
-        shear=last_image.metadata['dc_shear'],
-        flip=last_image.metadata['dc_flip'],
-        blend_mode=last_image.metadata['blend_mode'],
-        interpolate_data=(interpolate_data and im_min_type == numpy.uint8),
-        upscaling=(min_res == buffer_size)
-    )
-    # Create legend
-    legend_to_draw = numpy.zeros((n * int(buffer_size[0] * SUB_LAYER) + int(buffer_size[0] * MAIN_LAYER), buffer_size[0], 4), dtype=numpy.uint8)
-    legend_surface = cairo.ImageSurface.create_for_data(
-        legend_to_draw, cairo.FORMAT_ARGB32, buffer_size[0], n * int(buffer_size[0] * SUB_LAYER) + int(buffer_size[0] * MAIN_LAYER))
-    legend_ctx = cairo.Context(legend_surface)
-    draw_export_legend(legend_ctx, images + [last_image], buffer_size, buffer_scale,
-                       view_hfw[0], last_image.metadata['date'], streams_data, last_image.metadata['stream'] if raw else None, logo=logo)
-    if raw:
-        new_data_to_draw = numpy.zeros((data_to_draw.shape[0], data_to_draw.shape[1]), dtype=numpy.uint32)
-        new_data_to_draw[:, :] = numpy.left_shift(data_to_draw[:, :, 2], 8, dtype=numpy.uint32) | data_to_draw[:, :, 1]
-        new_data_to_draw[:, :] = new_data_to_draw[:, :] | numpy.left_shift(data_to_draw[:, :, 0], 16, dtype=numpy.uint32)
-        new_data_to_draw[:, :] = new_data_to_draw[:, :] | numpy.left_shift(data_to_draw[:, :, 3], 24, dtype=numpy.uint32)
-        new_data_to_draw = new_data_to_draw.astype(im_min_type)
-        # Turn legend to grayscale
-        new_legend_to_draw = legend_to_draw[:, :, 0] + legend_to_draw[:, :, 1] + legend_to_draw[:, :, 2]
-        new_legend_to_draw = new_legend_to_draw.astype(im_min_type)
-        new_legend_to_draw = numpy.where(new_legend_to_draw == 0, numpy.min(new_data_to_draw), numpy.max(new_data_to_draw))
-        data_with_legend = numpy.append(new_data_to_draw, new_legend_to_draw, axis=0)
-        # Clip background to baseline
-        baseline = im_min_type(streams_data[last_image.metadata['stream']][1][-1])
-        data_with_legend = numpy.clip(data_with_legend, baseline, numpy.max(new_data_to_draw))
-        md = {model.MD_DESCRIPTION: last_image.metadata['name']}
     else:
+        # Make surface based on the maximum resolution
+        data_to_draw = numpy.zeros((buffer_size[1], buffer_size[0], 4), dtype=numpy.uint8)
+        _draw_export_images(data_to_draw, draw_args, future)
+        legend_to_draw = _draw_export_legend_data(images, buffer_size, buffer_scale, view_hfw[0],
+                                                  date, streams_data, None, logo)
         data_with_legend = numpy.append(data_to_draw, legend_to_draw, axis=0)
         data_with_legend[:, :, [2, 0]] = data_with_legend[:, :, [0, 2]]
         md = {model.MD_DIMS: 'YXC'}
-    data_to_export.append(model.DataArray(data_with_legend, md))
+        data_to_export.append(model.DataArray(data_with_legend, md))
 
     return data_to_export
 
 
+def _check_export_cancelled(future):
+    """
+    future (Future or None): the future of the export
+    raise CancelledError: if the future has been cancelled
+    """
+    if future is not None and future.cancelled():
+        raise CancelledError()
+
+
+def _draw_export_images(data_to_draw, draw_args, future=None, progress=(0, 1)):
+    """
+    Draw images on the export buffer. The buffer is split in horizontal bands,
+    which are drawn in parallel, each using only the part of the images it shows.
+    data_to_draw (numpy array of shape YX4 and dtype uint8): the buffer (BGRA)
+    draw_args (list of (DataArray, dict)): each image to draw, in order, with
+      the arguments to pass to draw_image()
+    future (ProgressiveFuture or None): the future of the export, to report the
+      progress to, and to check for cancellation
+    progress (int, int): number of drawings already done, and total number of
+      drawings for the export
+    raise CancelledError: if the future has been cancelled
+    """
+    height, width = data_to_draw.shape[:2]
+    bands = [(y, min(y + EXPORT_BAND_HEIGHT, height))
+             for y in range(0, height, EXPORT_BAND_HEIGHT)]
+
+    def draw_band(band):
+        _check_export_cancelled(future)
+        # The rows are contiguous, so the band can directly be used by cairo
+        surface = cairo.ImageSurface.create_for_data(
+            data_to_draw[band[0]:band[1]], cairo.FORMAT_ARGB32, width, band[1] - band[0])
+        ctx = cairo.Context(surface)
+        for im, kwargs in draw_args:
+            draw_image(ctx, im, band=band, **kwargs)
+        surface.flush()
+
+    # cairo releases the GIL while drawing, so the bands are drawn in parallel
+    executor = futures.ThreadPoolExecutor(max_workers=EXPORT_WORKERS)
+    fs = [executor.submit(draw_band, b) for b in bands]
+    try:
+        for i, f in enumerate(futures.as_completed(fs)):
+            f.result()  # raises an exception if the drawing failed
+            if future is not None:
+                start = future.get_progress()[0]
+                ratio = (progress[0] + (i + 1) / len(bands)) / progress[1]
+                future.set_progress(end=start + (time.time() - start) / ratio)
+    finally:
+        for f in fs:
+            f.cancel()
+        executor.shutdown()
+
+
+def _draw_export_legend_data(images, buffer_size, buffer_scale, hfw, date,
+                             streams_data, stream=None, logo=None):
+    """
+    Draw the legend of an exported image
+    images (list of DataArray): all the images exported
+    stream (Stream or None): the stream to highlight (when exporting one image
+      per stream)
+    See draw_export_legend() for the other arguments.
+    returns (numpy array of shape YX4 and dtype uint8): the legend (BGRA)
+    """
+    n = len(images)
+    legend_height = n * int(buffer_size[0] * SUB_LAYER) + int(buffer_size[0] * MAIN_LAYER)
+    legend_to_draw = numpy.zeros((legend_height, buffer_size[0], 4), dtype=numpy.uint8)
+    legend_surface = cairo.ImageSurface.create_for_data(
+        legend_to_draw, cairo.FORMAT_ARGB32, buffer_size[0], legend_height)
+    legend_ctx = cairo.Context(legend_surface)
+    draw_export_legend(legend_ctx, images, buffer_size, buffer_scale,
+                       hfw, date, streams_data, stream, logo=logo)
+    return legend_to_draw
+
+
+def _raw_export_data(data_to_draw, legend_to_draw, im_min_type, baseline):
+    """
+    Convert the buffer of a "raw" export back to the original data type
+    data_to_draw (numpy array of shape YX4 and dtype uint8): the image, with the
+      bits of the raw data split over the 4 channels
+    legend_to_draw (numpy array of shape YX4 and dtype uint8): the legend
+    im_min_type (numpy.dtype): data type of the output
+    baseline (number): value of the background
+    returns (numpy array of shape YX): the image with the legend below
+    """
+    new_data_to_draw = numpy.zeros((data_to_draw.shape[0], data_to_draw.shape[1]), dtype=numpy.uint32)
+    new_data_to_draw[:, :] = numpy.left_shift(data_to_draw[:, :, 2], 8, dtype=numpy.uint32) | data_to_draw[:, :, 1]
+    new_data_to_draw[:, :] = new_data_to_draw[:, :] | numpy.left_shift(data_to_draw[:, :, 0], 16, dtype=numpy.uint32)
+    new_data_to_draw[:, :] = new_data_to_draw[:, :] | numpy.left_shift(data_to_draw[:, :, 3], 24, dtype=numpy.uint32)
+    new_data_to_draw = new_data_to_draw.astype(im_min_type)
+    # Turn legend to grayscale
+    new_legend_to_draw = legend_to_draw[:, :, 0] + legend_to_draw[:, :, 1] + legend_to_draw[:, :, 2]
+    new_legend_to_draw = new_legend_to_draw.astype(im_min_type)
+    new_legend_to_draw = numpy.where(new_legend_to_draw == 0, numpy.min(new_data_to_draw), numpy.max(new_data_to_draw))
+    data_with_legend = numpy.append(new_data_to_draw, new_legend_to_draw, axis=0)
+    # Clip background to baseline
+    baseline = im_min_type(baseline)
+    return numpy.clip(data_with_legend, baseline, numpy.max(new_data_to_draw))
+
+
 def add_alpha_byte(im_darray, alpha=255):
 
     height, width, depth = im_darray.shape
@@ -1860,6 +2091,241 @@ def add_alpha_byte(im_darray, alpha=255):
         raise ValueError("Unexpected colour depth of %d bytes!" % depth)
 
 
+def mipmap_reduce(im):
+    """
+    Halve the size of an image by averaging each block of 2x2 pixels.
+    As cairo uses pre-multiplied alpha, the average is also correct for the
+    alpha channel.
+    im (ndarray of shape YXC and dtype uint8): the image
+    returns (ndarray of shape Y/2, X/2, C, and dtype uint8): the reduced image.
+      If the size is odd, the last row/column is dropped.
+    """
+    h, w = (im.shape[0] // 2) * 2, (im.shape[1] // 2) * 2
+    s = im[0:h:2, 0:w:2].astype(numpy.uint16)
+    s += im[1:h:2, 0:w:2]
+    s += im[0:h:2, 1:w:2]
+    s += im[1:h:2, 1:w:2]
+    s += 2  # to round to the closest value
+    s >>= 2
+    return s.astype(numpy.uint8)
+
+
+class ImagePyramid(object):
+    """
+    Multi-resolution (aka "mipmap") version of a RGBA image.
+    Level 0 is the image itself, and each following level is half the size of
+    the previous one, down to MIPMAP_MIN_SIZE. When drawing an image
+    much smaller than its actual size, it's much faster to let cairo rescale
+    a reduced version of it than the full image.
+    The levels are computed only when build() is called, so it's possible to
+    do it in a separate thread.
+    """
+
+    def __init__(self, im):
+        """
+        im (DataArray of shape YX4 and dtype uint8): the full resolution image
+        """
+        self._levels = [im]
+        self._lock = threading.Lock()  # taken while computing the levels
+        # True when all the levels are computed
+        self.complete = (min(im.shape[:2]) // 2 < MIPMAP_MIN_SIZE)
+        self._cancelled = False
+        self.build_future = None  # Future of the computation in background
+
+    @property
+    def image(self):
+        """ The full resolution image """
+        return self._levels[0]
+
+    @property
+    def nbytes(self):
+        """ Memory used by all the levels, once computed (in bytes) """
+        shape = self._levels[0].shape
+        n = numpy.prod(shape)
+        while min(shape[:2]) // 2 >= MIPMAP_MIN_SIZE:
+            shape = (shape[0] // 2, shape[1] // 2) + shape[2:]
+            n += numpy.prod(shape)
+        return int(n) * self._levels[0].itemsize
+
+    def cancel(self):
+        """
+        Stop computing the reduced levels (in background), as they are not
+        needed anymore.
+        """
+        self._cancelled = True
+        if self.build_future is not None:
+            self.build_future.cancel()
+
+    def build(self, max_level=None):
+        """
+        Compute the reduced levels of the image. Can be called from any thread.
+        max_level (None or int): the computation stops once this level is
+          available. If None, all the levels are computed.
+        """
+        with self._lock:
+            while not self.complete and not self._cancelled:
+                if max_level is not None and len(self._levels) > max_level:
+                    return
+                prev = self._levels[-1]
+                if min(prev.shape[:2]) // 2 < MIPMAP_MIN_SIZE:
+                    self.complete = True
+                    return
+                # list.append() is atomic, so get_level() can safely read the
+                # levels at the same time.
+                self._levels.append(mipmap_reduce(prev))
+
+    def get_level(self, scale, build=False):
+        """
+        Select the smallest level which is still at least as large as the image
+        will be drawn.
+        scale (float): ratio between the size at which the image will be drawn
+          and its full resolution (< 1 when the image is reduced).
+        build (bool): if True, the levels needed which are not yet computed are
+          computed immediately. Otherwise, the best level already available is
+          returned.
+        returns:
+          level image (ndarray of shape YX4 and dtype uint8)
+          level (int): 0 for the full resolution, n for an image 2^n times smaller
+        """
+        if scale >= 0.5:
+            return self._levels[0], 0
+
+        n = int(math.floor(math.log(1 / scale, 2)))
+        if build and len(self._levels) <= n:
+            self.build(n)
+        n = min(n, len(self._levels) - 1)
+        return self._levels[n], n
+
+
+class ImagePyramidCache(object):
+    """
+    Keeps the pyramids of the most recently displayed images, to share them
+    between the canvases and the export. The images are identified by their
+    source, ie the image as provided by the stream (the same DataArray object),
+    so the source images must be considered read-only.
+    """
+
+    def __init__(self, max_size=MIPMAP_CACHE_SIZE):
+        """
+        max_size (int > 0): maximum memory used by the images kept (in bytes).
+          The most recently used pyramid is always kept, even if it's bigger.
+        """
+        self._max_size = max_size
+        self._size = 0  # bytes of all the images kept (sources and levels)
+        self._lock = threading.Lock()
+        # id(source) -> (source, id(owner), ImagePyramid, size), ordered from the
+        # least to the most recently used. The source is kept to be sure its
+        # id is not reused.
+        self._pyramids = collections.OrderedDict()
+        # id(owner) -> id(source) of the latest image of the owner
+        self._by_owner = {}
+        # (address, shape) of the level 0 image -> ImagePyramid
+        self._by_image = {}
+        self._executor = futures.ThreadPoolExecutor(max_workers=1)
+
+    def get(self, src, convert=add_alpha_byte, owner=None, build_async=True,
+            callback=None):
+        """
+        Return the pyramid for the given image, creating it if needed.
+        src (DataArray of shape YXC, with C = 3 or 4, and dtype uint8): the
+          source image.
+        convert (callable): converts the source image to the RGBA image used as
+          level 0. Only called if the pyramid is not yet in the cache.
+        owner (None or object): the producer of the image (typically, the
+          stream). A new image from the same owner makes the previous one
+          obsolete, so its pyramid is dropped (and its computation stopped).
+        build_async (bool): if True, the reduced levels are computed in a
+          separate thread.
+        callback (None or callable): called without argument (from a separate
+          thread) when the reduced levels have been computed in background.
+        returns (ImagePyramid): the pyramid of the image
+        """
+        key = id(src)
+        with self._lock:
+            entry = self._pyramids.get(key)
+
+        if entry is None:
+            # The conversion can be long, so it's done without blocking the
+            # other users of the cache.
+            pyramid = ImagePyramid(convert(src))
+            size = pyramid.nbytes
+            if not numpy.may_share_memory(src, pyramid.image):
+                size += src.nbytes
+            oid = None if owner is None else id(owner)
+            entry = (src, oid, pyramid, size)
+
+        with self._lock:
+            if key in self._pyramids:
+                # Already there (maybe just added by another thread)
+                entry = self._pyramids.pop(key)
+            else:
+                src, oid, pyramid, size = entry
+                if oid is not None:
+                    if oid in self._by_owner:
+                        # The previous image of the owner is obsolete
+                        self._remove(self._by_owner[oid])
+                    self._by_owner[oid] = key
+                self._by_image[_buffer_key(pyramid.image)] = pyramid
+                self._size += size
+                while self._pyramids and self._size > self._max_size:
+                    self._remove(next(iter(self._pyramids)))
+            self._pyramids[key] = entry  # most recently used
+            pyramid = entry[2]
+
+            if build_async and not pyramid.complete:
+                if pyramid.build_future is None:
+                    pyramid.build_future = self._executor.submit(pyramid.build)
+                if callback is not None:
+                    pyramid.build_future.add_done_callback(lambda f: callback())
+
+        return pyramid
+
+    def _remove(self, key):
+        """
+        Drop a pyramid from the cache. Must be called with the lock taken.
+        key (int): id of the source image
+        """
+        _, oid, pyramid, size = self._pyramids.pop(key)
+        del self._by_image[_buffer_key(pyramid.image)]
+        if self._by_owner.get(oid) == key:
+            del self._by_owner[oid]
+        self._size -= size
+        pyramid.cancel()
+
+    def lookup(self, src):
+        """
+        Look for the pyramid of the given source image, without adding it to
+        the cache if it's not present.
+        src (DataArray): the source image, as passed to get()
+        returns (ImagePyramid or None): the pyramid, or None if not in the cache
+        """
+        with self._lock:
+            entry = self._pyramids.get(id(src))
+        return None if entry is None else entry[2]
+
+    def find(self, im):
+        """
+        Look for the pyramid of which the given image is the full resolution level.
+        im (ndarray): the (RGBA) image, as returned by ImagePyramid.image, or
+          a view of it (eg, a DataArray with different metadata)
+        returns (ImagePyramid or None): the pyramid, or None if not in the cache
+        """
+        with self._lock:
+            return self._by_image.get(_buffer_key(im))
+
+
+def _buffer_key(im):
+    """
+    returns (tuple): identifies the memory of the image, identical for all the
+      views on the same data
+    """
+    return im.__array_interface__["data"][0], im.shape, im.strides
+
+
+# Pyramids shared by all the canvases (and the export)
+image_pyramids = ImagePyramidCache()
+
+
 def scale_to_alpha(im_darray):
     """
     Scale the R, G and B values to the alpha value present.
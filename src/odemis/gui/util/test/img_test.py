@@ -22,10 +22,12 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 from __future__ import division
 
 import cairo
+from concurrent.futures._base import CancelledError
 import logging
 import math
 import numpy
 import os
+import threading
 import time
 import unittest
 import wx
@@ -108,6 +110,173 @@ class TestRGBA(unittest.TestCase):
         self.assertTrue((bgraim[2, 2] == [200, 100, 1, 0]).all())
 
 
+class TestImagePyramid(unittest.TestCase):
+
+    def test_reduce(self):
+        im = numpy.zeros((5, 8, 4), dtype=numpy.uint8)
+        im[0, 0] = 255
+        im[1, 1] = 1
+        rim = img.mipmap_reduce(im)
+        self.assertEqual(rim.shape, (2, 4, 4))  # odd row dropped
+        self.assertEqual(rim.dtype, numpy.uint8)
+        self.assertEqual(rim[0, 0, 0], 64)  # (255 + 1) / 4
+        self.assertTrue((rim[1:, 1:] == 0).all())
+
+    def test_levels(self):
+        im = model.DataArray(numpy.zeros((2048, 1500, 4), dtype=numpy.uint8))
+        pyramid = img.ImagePyramid(im)
+        self.assertFalse(pyramid.complete)
+        self.assertIs(pyramid.image, im)
+
+        # Not yet computed => full resolution
+        lim, lvl = pyramid.get_level(0.2)
+        self.assertEqual(lvl, 0)
+        self.assertIs(lim, im)
+
+        # Computed on demand
+        lim, lvl = pyramid.get_level(0.2, build=True)
+        self.assertEqual(lvl, 2)  # 1/4 is the smallest level bigger than 0.2
+        self.assertEqual(lim.shape, (512, 375, 4))
+        self.assertFalse(pyramid.complete)
+
+        # No need for reduced version when drawn (nearly) full size
+        lim, lvl = pyramid.get_level(0.6)
+        self.assertEqual(lvl, 0)
+
+        # Cannot go below the minimum size
+        pyramid.build()
+        self.assertTrue(pyramid.complete)
+        lim, lvl = pyramid.get_level(0.001)
+        self.assertEqual(lvl, 2)
+
+    def test_cache(self):
+        # Each entry holds the RGB source, and the RGBA levels of 1024, 512, and 256 px
+        src_size = 1024 * 1024 * 3
+        im_size = src_size + (1024 ** 2 + 512 ** 2 + 256 ** 2) * 4
+        cache = img.ImagePyramidCache(max_size=3 * im_size)
+        ims = [model.DataArray(numpy.zeros((1024, 1024, 3), dtype=numpy.uint8))
+               for i in range(4)]
+
+        pyramid = cache.get(ims[0], build_async=False)
+        self.assertEqual(pyramid.image.shape, (1024, 1024, 4))  # RGBA
+        self.assertEqual(pyramid.nbytes, im_size - src_size)
+        self.assertIs(cache.get(ims[0], build_async=False), pyramid)
+        self.assertIs(cache.find(pyramid.image), pyramid)
+        # A view on the same data (but different metadata) is also found
+        self.assertIs(cache.find(model.DataArray(pyramid.image)), pyramid)
+        self.assertIsNone(cache.find(ims[0]))
+
+        # lookup() doesn't add the image
+        self.assertIs(cache.lookup(ims[0]), pyramid)
+        self.assertIsNone(cache.lookup(ims[3]))
+        self.assertIsNone(cache.lookup(ims[3]))
+
+        # Computation in background, with notification
+        done = threading.Event()
+        cache.get(ims[1], callback=done.set)
+        self.assertTrue(done.wait(10))
+        self.assertTrue(cache.find(cache.get(ims[1]).image).complete)
+
+        # The least recently used is dropped when it's full
+        for im in ims[1:]:
+            cache.get(im, build_async=False)
+        self.assertIsNone(cache.find(pyramid.image))
+        self.assertIsNone(cache.lookup(ims[0]))
+        self.assertIsNot(cache.get(ims[0], build_async=False), pyramid)
+
+    def test_cache_owner(self):
+        """
+        A new image from the same owner replaces the previous one
+        """
+        cache = img.ImagePyramidCache()
+        owner = object()
+        ims = [model.DataArray(numpy.zeros((2048, 2048, 4), dtype=numpy.uint8))
+               for i in range(3)]
+
+        # Block the background computation, to check it's not done for nothing
+        unblock = threading.Event()
+        cache._executor.submit(unblock.wait)
+        try:
+            p0 = cache.get(ims[0], owner=owner)
+            p1 = cache.get(ims[1], owner=owner)
+            self.assertIsNone(cache.lookup(ims[0]))
+            self.assertIsNone(cache.find(p0.image))
+            self.assertIs(cache.lookup(ims[1]), p1)
+            self.assertTrue(p0.build_future.cancelled())
+
+            # Another owner doesn't affect it
+            p2 = cache.get(ims[2], owner=object())
+            self.assertIs(cache.lookup(ims[1]), p1)
+        finally:
+            unblock.set()
+
+        p1.build_future.result(10)
+        p2.build_future.result(10)
+        self.assertTrue(p1.complete)
+        self.assertFalse(p0.complete)
+
+
+class TestPlotDecimation(unittest.TestCase):
+
+    def test_decimate(self):
+        xs = numpy.arange(10000, dtype=numpy.float64)
+        ys = numpy.sin(xs / 100)
+        ys[5003] = 10  # spike
+
+        dxs, dys = img.decimate_plot_data(xs, ys, (0, 9999), 100)
+        self.assertLessEqual(len(dxs), 2 * 100)
+        self.assertTrue((numpy.diff(dxs) > 0).all())
+        # The extremes are kept
+        self.assertIn(5003, dxs)
+        self.assertEqual(dys.max(), 10)
+        self.assertAlmostEqual(dys.min(), ys.min())
+        # Only real points
+        numpy.testing.assert_array_equal(dys, ys[dxs.astype(numpy.int64)])
+
+        # Not enough points => unchanged
+        short_xs, short_ys = xs[:150], ys[:150]
+        dxs, dys = img.decimate_plot_data(short_xs, short_ys, (0, 149), 100)
+        self.assertIs(dxs, short_xs)
+        self.assertIs(dys, short_ys)
+
+    def test_incremental(self):
+        xs = numpy.arange(5000, dtype=numpy.float64)
+        ys = numpy.random.random(5000)
+        range_x = (0, 5000)
+
+        dec = img.PlotDecimator(range_x, 64)
+        for i in range(0, 5000, 7):  # by small chunks
+            dec.append(xs[i:i + 7], ys[i:i + 7])
+        ixs, iys = dec.get_data()
+
+        exs, eys = img.decimate_plot_data(xs, ys, range_x, 64)
+        numpy.testing.assert_array_equal(ixs, exs)
+        numpy.testing.assert_array_equal(iys, eys)
+
+        with self.assertRaises(ValueError):
+            dec.append([10], [0])
+
+    def test_incremental_trim(self):
+        """
+        A sliding window, as in a chronogram: the columns which are trimmed
+        completely are removed, and the new ones are like a full decimation.
+        """
+        xs = numpy.arange(10000, dtype=numpy.float64)
+        ys = numpy.random.random(10000)
+        range_x = (0, 5000)  # the columns have a width of 125
+
+        dec = img.PlotDecimator(range_x, 40)
+        for i in range(0, 10000, 7):
+            dec.append(xs[i:i + 7], ys[i:i + 7])
+            dec.trim(xs[min(i + 6, 9999)] - 5000)
+        dec.trim(5000)
+        ixs, iys = dec.get_data()
+
+        exs, eys = img.decimate_plot_data(xs[5000:], ys[5000:], (5000, 10000), 40)
+        numpy.testing.assert_array_equal(ixs, exs)
+        numpy.testing.assert_array_equal(iys, eys)
+
+
 class TestARExport(unittest.TestCase):
 
     def test_ar_frame(self):
@@ -358,6 +527,52 @@ class TestSpatialExport(unittest.TestCase):
         self.assertEqual(len(exp_data[0].shape), 3)  # RGB
         self.assertEqual(exp_data[0].shape[1], img.CROP_RES_LIMIT)
 
+    def test_bands(self):
+        """
+        Drawing by bands gives the same result as drawing all at once
+        """
+        for s in self.streams:
+            md = s.image.value.metadata
+            rgb = numpy.random.randint(0, 256, s.image.value.shape[:2] + (3,))
+            s.image.value = model.DataArray(rgb.astype(numpy.uint8), md)
+        view_hfw = (8.191282393266523e-05, 6.205915392651362e-05)
+        view_pos = [-0.001203511795256, -0.000295338300158]
+
+        orig_height = img.EXPORT_BAND_HEIGHT
+        try:
+            img.EXPORT_BAND_HEIGHT = 100000
+            exp_full = img.images_to_export_data(self.streams, view_hfw, view_pos, 0.3, False)
+            img.EXPORT_BAND_HEIGHT = 100
+            exp_bands = img.images_to_export_data(self.streams, view_hfw, view_pos, 0.3, False)
+        finally:
+            img.EXPORT_BAND_HEIGHT = orig_height
+        numpy.testing.assert_array_equal(exp_full[0], exp_bands[0])
+
+    def test_future(self):
+        """
+        The export reports its progress, and stops when cancelled
+        """
+        view_hfw = (0.00025158414075691866, 0.00017445320835792754)
+        view_pos = [-0.001211588332679978, -0.00028726176273402186]
+
+        f = model.ProgressiveFuture()
+        f.task_canceller = lambda f: True
+        updates = []
+        f.add_update_callback(lambda f, s, e: updates.append(e))
+        f.set_running_or_notify_cancel()
+        exp_data = img.images_to_export_data([self.streams[0]], view_hfw, view_pos, 0.3, False,
+                                             future=f)
+        self.assertEqual(exp_data[0].shape, (1226, 1576, 4))
+        self.assertGreater(len(updates), 2)
+
+        f = model.ProgressiveFuture()
+        f.task_canceller = lambda f: True
+        f.set_running_or_notify_cancel()
+        f.cancel()
+        with self.assertRaises(CancelledError):
+            img.images_to_export_data([self.streams[0]], view_hfw, view_pos, 0.3, False,
+                                      future=f)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -26,6 +26,7 @@ from Pyro4.core import oneway
 import inspect
 import logging
 import multiprocessing
+import multiprocessing.util
 import os
 import threading
 import urllib
@@ -349,7 +350,10 @@ def createNewContainer(name, validate=True, in_own_process=True):
         isready = threading.Event()
         p = threading.Thread(name="Container " + name, target=_manageContainer,
                              args=(name, isready))
-    p.start()
+    if in_own_process:
+        _start_process_safely(p)
+    else:
+        p.start()
     if not isready.wait(5):  # wait maximum 5s
         logging.error("Container %s is taking too long to get ready", name)
         raise IOError("Container creation timeout")
@@ -372,6 +376,43 @@ def createNewContainer(name, validate=True, in_own_process=True):
     return getContainer(name, validate)
 
 
+def _start_process_safely(p):
+    """
+    Starts a process, while ensuring no other thread holds the logging locks.
+    If a thread holds a lock while the process is forked, the lock will never
+    be released in the new process (see http://bugs.python.org/issue6721).
+    As the logging is the main lock shared between all the threads, hold it
+    (and the locks of the handlers) while forking.
+    p (multiprocessing.Process): the process to start
+    """
+    handlers = list(logging.getLogger().handlers)
+    logging._acquireLock()
+    try:
+        for h in handlers:
+            h.acquire()
+        try:
+            p.start()
+        finally:
+            for h in handlers:
+                h.release()
+    finally:
+        logging._releaseLock()
+
+
+def _reset_logging_locks(obj):
+    """
+    Called in the new process, just after the fork. As the locks were held by
+    the parent while forking, they are held in the new process too, and would
+    never be released (as p.start() doesn't return in the new process). So
+    replace them by new (free) locks.
+    """
+    logging._lock = threading.RLock()
+    for h in logging.getLogger().handlers:
+        h.createLock()
+
+multiprocessing.util.register_after_fork(_start_process_safely, _reset_logging_locks)
+
+
 def createInNewContainer(container_name, klass, kwargs):
     """
     creates a new component in a new container
@@ -26,6 +26,8 @@ These are the conventional metadata available in a DataArray.
 MD_EXP_TIME = "Exposure time" # s
 MD_ACQ_DATE = "Acquisition date" # s since epoch
 MD_AD_LIST = "Acquisition dates" # s since epoch for each element in dimension T
+MD_ROWS_ACQUIRED = "Rows acquired"  # int, for an image still being acquired, number of rows (from the top) which contain data
+MD_PIXEL_DUR = "Pixel duration"  # s, duration of each pixel along the time dimension (eg, start-stop time bin)
 # distance between two points on the sample that are seen at the centre of two
 # adjacent pixels considering that these two points are in focus
 MD_PIXEL_SIZE = "Pixel size" # (m, m)
@@ -29,6 +29,7 @@ import logging
 import numbers
 import numpy
 import threading
+import time
 from types import NoneType
 import zmq
 
@@ -116,7 +117,8 @@ class VigilantAttribute(VigilantAttributeBase):
      * observable behaviour (anyone can ask to be notified when the value changes)
     """
 
-    def __init__(self, initval, readonly=False, setter=None, getter=None, max_discard=100, *args, **kwargs):
+    def __init__(self, initval, readonly=False, setter=None, getter=None, max_discard=100,
+                 max_rate=None, *args, **kwargs):
         """
         readonly (bool): if True, value setter will raise an exception. It's still
             possible to change the value by calling _set() and then notify()
@@ -129,6 +131,10 @@ class VigilantAttribute(VigilantAttributeBase):
                            a new one is already available. 0 to keep (notify)
                            all the messages (dangerous if callback is slower
                            than the generator).
+        max_rate (None or float > 0): maximum number of notifications per second
+          sent to the remote subscribers. If the value changes more often,
+          only the latest value is sent, and the final value is always sent.
+          None means no limit. The local subscribers are always notified.
         """
         VigilantAttributeBase.__init__(self, initval, *args, **kwargs)
 
@@ -152,6 +158,14 @@ class VigilantAttribute(VigilantAttributeBase):
         self.debug = False  # If True, this VA will print a call stack when its value is set
         self.max_discard = max_discard
 
+        # For the rate limitation of the remote notifications
+        self._pipe_lock = threading.Lock()  # to send on the pipe from multiple threads
+        self._min_period = 0  # s
+        self._last_pub = 0  # time of the last remote notification
+        self._pending = None  # latest value not yet published
+        self._pending_timer = None  # threading.Timer to publish _pending
+        self._set_max_rate(max_rate)
+
     def __default_setter(self, value):
         return value
 
@@ -231,6 +245,80 @@ class VigilantAttribute(VigilantAttributeBase):
 
     value = property(_get_value, _set_value, _del_value, "The actual value")
 
+    def _set_max_rate(self, rate):
+        """
+        Change the maximum notification rate to the remote subscribers
+        rate (None or float > 0): maximum number of notifications per second.
+          None means no limit.
+        """
+        if rate is None:
+            min_period = 0
+        elif rate > 0:
+            min_period = 1 / rate
+        else:
+            raise ValueError("Maximum rate must be > 0, but got %s" % (rate,))
+
+        with self._pipe_lock:
+            self._min_period = min_period
+            # Don't hold the latest value according to the previous rate
+            if self._pending_timer is not None:
+                self._pending_timer.cancel()
+                self._pending_timer = None
+                self._send_pending()
+
+    def _publish(self, v):
+        """
+        Send the value to the remote subscribers
+        """
+        with self._pipe_lock:
+            # Any value still pending is older, so no need to send it anymore
+            self._pending = None
+            self._last_pub = time.time()
+            if self.pipe:
+                self.pipe.send_pyobj(v)
+
+    def _publish_limited(self, v):
+        """
+        Send the value to the remote subscribers, while respecting the maximum
+        rate. If the previous notification was too recently sent, the value is
+        sent later, unless a newer one comes in the mean time.
+        """
+        with self._pipe_lock:
+            self._pending = (v,)
+            if self._pending_timer is not None:
+                return  # It will be sent by the timer
+
+            wait = self._last_pub + self._min_period - time.time()
+            if wait > 0:
+                self._pending_timer = threading.Timer(wait, self._publish_pending)
+                self._pending_timer.daemon = True
+                self._pending_timer.start()
+            else:
+                self._send_pending()
+
+    def _publish_pending(self):
+        """
+        Called by the timer to send the latest value to the remote subscribers
+        """
+        with self._pipe_lock:
+            # The timer might have been cancelled (and replaced) just as it fired
+            if threading.current_thread() is not self._pending_timer:
+                return
+            self._pending_timer = None
+            self._send_pending()
+
+    def _send_pending(self):
+        """
+        Send the pending value (if any). Must be called with _pipe_lock acquired.
+        """
+        if self._pending is None:
+            return
+        v, = self._pending
+        self._pending = None
+        self._last_pub = time.time()
+        if self.pipe:
+            self.pipe.send_pyobj(v)
+
     def _register(self, daemon):
         """ Get the VigilantAttributeBase ready to be shared.
 
@@ -264,6 +352,9 @@ class VigilantAttribute(VigilantAttributeBase):
         daemon = getattr(self, "_pyroDaemon", None)
         if daemon:
             daemon.unregister(self)
+        timer = getattr(self, "_pending_timer", None)
+        if timer:
+            timer.cancel()
         try:
             if self.pipe:
                 self.pipe.close()
@@ -284,7 +375,7 @@ class VigilantAttribute(VigilantAttributeBase):
         if isinstance(listener, basestring):
             self._remote_listeners.add(listener)
             if init:
-                self.pipe.send_pyobj(self.value)
+                self._publish(self.value)
         else:
             VigilantAttributeBase.subscribe(self, listener, init, **kwargs)
 
@@ -307,7 +398,10 @@ class VigilantAttribute(VigilantAttributeBase):
 
         # publish the data remotely
         if len(self._remote_listeners) > 0:
-            self.pipe.send_pyobj(v)
+            if self._min_period:
+                self._publish_limited(v)
+            else:
+                self._publish(v)
 
         # publish locally
         VigilantAttributeBase.notify(self, v)
@@ -373,6 +467,14 @@ class VigilantAttributeProxy(VigilantAttributeBase, Pyro4.Proxy):
         return (proxy_state, _core.dump_roattributes(self), self.unit,
                 self.readonly, self.max_discard)
 
+    def _set_max_rate(self, rate):
+        """
+        Change the maximum notification rate to the remote subscribers
+        rate (None or float > 0): maximum number of notifications per second.
+          None means no limit.
+        """
+        return self.__getattr__("_set_max_rate")(rate)
+
     def __setstate__(self, state):
         """
         roattributes (dict string -> value)
@@ -100,6 +100,20 @@ class ContainerTest(unittest.TestCase):
         # we are not terminating the children, but this should be caught by the container
         container.terminate()
 
+    def test_logging_after_fork(self):
+        """
+        The logging can be used from any thread of a new process
+        """
+        handler = logging.StreamHandler(open(os.devnull, "w"))
+        logging.getLogger().addHandler(handler)
+        try:
+            p = Process(target=log_from_thread)
+            model._core._start_process_safely(p)
+            p.join(10)
+            self.assertEqual(p.exitcode, 0)
+        finally:
+            logging.getLogger().removeHandler(handler)
+
     def test_timeout(self):
         if Pyro4.config.COMMTIMEOUT == 0 or Pyro4.config.COMMTIMEOUT > 20:
             self.skipTest("Timeout too long (%d s) to test." % Pyro4.config.COMMTIMEOUT)
@@ -113,6 +127,20 @@ class ContainerTest(unittest.TestCase):
         rdaemon.ping()
 
 
+def log_from_thread():
+    """
+    Logs from a separate thread, and fails if the logging blocks
+    """
+    def log():
+        logging.getLogger("test").warning("Logging from thread")
+
+    t = threading.Thread(target=log)
+    t.start()
+    t.join(5)
+    if t.isAlive():
+        os._exit(1)
+
+
 # @unittest.skip("simple")
 class SerializerTest(unittest.TestCase):
 
@@ -713,6 +741,47 @@ class RemoteTest(unittest.TestCase):
         except TypeError:
             pass # as it should be
 
+    def test_va_max_rate(self):
+        prop = self.comp.prop
+        prop._set_max_rate(10)  # Hz
+
+        self.called = 0
+        self.last_value = None
+        prop.subscribe(self.receive_va_update)
+        for i in range(50):
+            self.comp.change_prop(i + 100)
+            time.sleep(0.002)
+        time.sleep(0.5)  # give time to receive the final notification
+        prop.unsubscribe(self.receive_va_update)
+        prop._set_max_rate(None)
+
+        # The notifications should have been coalesced, but the final value
+        # always received
+        self.assertLess(self.called, 10)
+        self.assertEqual(self.last_value, 149)
+        self.assertEqual(prop.value, 149)
+
+    def test_va_max_rate_reset(self):
+        """
+        Removing the rate limit sends the value pending immediately
+        """
+        prop = self.comp.prop
+        prop._set_max_rate(0.1)  # Hz
+
+        self.called = 0
+        self.last_value = None
+        prop.subscribe(self.receive_va_update)
+        self.comp.change_prop(10)  # Sent immediately
+        self.comp.change_prop(11)  # Pending for 10s
+        time.sleep(0.1)
+        self.assertEqual(self.last_value, 10)
+
+        prop._set_max_rate(None)
+        time.sleep(0.1)
+        prop.unsubscribe(self.receive_va_update)
+        self.assertEqual(self.called, 2)
+        self.assertEqual(self.last_value, 11)
+
     def receive_va_update(self, value):
         self.called += 1
         self.last_value = value
@@ -23,7 +23,20 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 
 from __future__ import division
 
+import sys
+from odemis.util.startup import StartupProfiler
+
+# The import hook has to be installed before the imports below (which take most
+# of the import time) to record them too, so the command line is checked here,
+# before being actually parsed.
+if "--profile-startup" in sys.argv:
+    _startup_profiler = StartupProfiler()
+    _startup_profiler.install_import_hook()
+else:
+    _startup_profiler = None
+
 import argparse
+from concurrent import futures
 import grp
 from logging import FileHandler
 import logging
@@ -38,7 +51,6 @@ from odemis.util.driver import BACKEND_RUNNING, BACKEND_DEAD, BACKEND_STOPPED, \
 import os
 import signal
 import stat
-import sys
 import threading
 import time
 
@@ -49,13 +61,17 @@ status_to_xtcode = {BACKEND_RUNNING: 0,
                     BACKEND_STARTING: 3,
                     }
 
+# Maximum number of components instantiated simultaneously
+MAX_PARALLEL_STARTS = 8
+
 class BackendContainer(model.Container):
     """
     A normal container which also terminates all the other containers when it
     terminates.
     """
     def __init__(self, model_file, create_sub_containers=False,
-                 dry_run=False, name=model.BACKEND_NAME):
+                 dry_run=False, name=model.BACKEND_NAME,
+                 max_parallel=MAX_PARALLEL_STARTS, profiler=None):
         """
         inst_file (file): opened file that contains the yaml
         container (Container): container in which to instantiate the components
@@ -63,6 +79,11 @@ class BackendContainer(model.Container):
            have no children created separately) are running in isolated containers
         dry_run (bool): if True, it will check the semantic and try to instantiate the
           model without actually any driver contacting the hardware.
+        max_parallel (int > 0): maximum number of components instantiated
+          simultaneously. 1 means they are started one at a time.
+        profiler (None or StartupProfiler): if not None, the instantiation time
+          of each component is recorded, and a report is logged once all the
+          components are instantiated.
         """
         model.Container.__init__(self, name)
 
@@ -71,7 +92,10 @@ class BackendContainer(model.Container):
         self._inst_thread = None # thread running the component instantiation
         self._must_stop = threading.Event()
         self._dry_run = dry_run
-        # TODO: have an argument to ask for disabling parallel start? same as create_sub_containers?
+        self._max_parallel = max_parallel
+        self._profiler = profiler
+        # To ensure non-concurrent access to .ghosts and .alive of the microscope
+        self._comps_lock = threading.RLock()
 
         # parse the instantiation file
         logging.debug("model instantiation file is: %s", self._model.name)
@@ -126,6 +150,8 @@ class BackendContainer(model.Container):
         """
         Thread continuously monitoring the components that need to be instantiated
         """
+        executor = futures.ThreadPoolExecutor(max_workers=self._max_parallel)
+        starting = {}  # Future -> str: name of the components being instantiated
         try:
             # Hack warning: there is a bug in python when using lock (eg, logging)
             # and simultaneously using threads and process: is a thread acquires
@@ -137,64 +163,101 @@ class BackendContainer(model.Container):
 
             mic = self._instantiator.microscope
             failed = set() # set of str: name of components that failed recently
+            tstart = time.time()
             while not self._must_stop.is_set():
-                # Try to start simultaneously all the components that are
-                # independent from each other
-                nexts = set()
-                while not nexts:
+                # Start simultaneously all the components that are independent
+                # from each other, and as soon as one is instantiated, check
+                # again which ones can be started.
+                with self._comps_lock:
                     instantiated = set(c.name for c in mic.alive.value) | {mic.name}
-                    nexts = self._instantiator.get_instantiables(instantiated)
+                nexts = self._instantiator.get_instantiables(instantiated)
+                nexts -= failed
+                nexts -= set(starting.values())
+
+                if nexts:
+                    logging.debug("Trying to instantiate comp: %s", ", ".join(nexts))
+                    for n in nexts:
+                        with self._comps_lock:
+                            ghosts = mic.ghosts.value.copy()
+                            if n not in ghosts:
+                                logging.warning("going to instantiate %s but not a ghost", n)
+                            ghosts[n] = ST_STARTING
+                            mic.ghosts.value = ghosts
+                        f = executor.submit(self._instantiate_component, n)
+                        starting[f] = n
+                elif not starting:
                     # If still some non-failed component, immediately try again,
                     # otherwise give some time for things to get fixed or broken
-                    nexts -= failed
-                    if not nexts:
-                        if self._dry_run:
-                            return # everything instantiated, good enough
-
-                        if self._must_stop.wait(10):
-                            return
-                        failed = set() # not recent anymore
-
-                logging.debug("Trying to instantiate comp: %s", ", ".join(nexts))
-
-                for n in nexts:
-                    ghosts = mic.ghosts.value.copy()
-                    if n not in ghosts:
-                        logging.warning("going to instantiate %s but not a ghost", n)
-                    # TODO: run each of them in a future, so that they start
-                    # in parallel, and (bonus) when the future is done, check
-                    # immediately which component can be started. The only
-                    # difficulty is to ensure non-concurrent access to .ghosts
-                    # and .alive .
+                    if tstart is not None:
+                        logging.info("Instantiation of all components took %g s",
+                                     time.time() - tstart)
+                        tstart = None
+                        if self._profiler:
+                            logging.info("%s", self._profiler.report())
+                    if self._dry_run:
+                        return # everything instantiated, good enough
+
+                    if self._must_stop.wait(10):
+                        return
+                    failed = set() # not recent anymore
+                    continue
+
+                # Wait for at least one component to be done
+                done, not_done = futures.wait(starting.keys(), timeout=1,
+                                              return_when=futures.FIRST_COMPLETED)
+                for f in done:
+                    n = starting.pop(f)
                     try:
-                        ghosts[n] = ST_STARTING
-                        mic.ghosts.value = ghosts
-                        newcmps = self._instantiate_component(n)
-                        if self._must_stop.is_set():
-                            # in case the termination was too late to stop these new component
-                            for c in newcmps:
-                                try:
-                                    c.terminate()
-                                except Exception:
-                                    logging.warning("Failed to terminate component '%s'", c.name, exc_info=True)
-                            break
+                        newcmps = f.result()
                     except ValueError:
                         if self._dry_run:
                             raise
                         # We now need to stop, but cannot call terminate()
-                        # directly, as it would deadlock, waiting for us
+                        # directly, as it would deadlock, waiting for us.
+                        # Mark it as stopping already, so that the components
+                        # still being instantiated are stopped (see below).
                         logging.debug("Stopping instantiation due to unrecoverable error")
+                        self._must_stop.set()
                         threading.Thread(target=self.terminate).start()
                         return
                     if not newcmps:
                         failed.add(n)
+                    elif self._must_stop.is_set():
+                        # in case the termination was too late to stop these new component
+                        self._terminate_components(newcmps)
 
         except Exception:
             logging.exception("Instantiator thread failed")
             raise
         finally:
+            # Don't start anything new, and wait for the components being
+            # instantiated, so that they can be stopped.
+            for f in starting:
+                f.cancel()
+            executor.shutdown(wait=True)
+            if self._must_stop.is_set():
+                for f in starting:
+                    if f.cancelled() or f.exception() is not None:
+                        continue
+                    self._terminate_components(f.result())
             logging.debug("Instantiator thread finished")
 
+    def _terminate_components(self, comps):
+        """
+        Terminate components which have been just started
+        comps (set of HwComponent): the components to terminate
+        """
+        # Not alive anymore, so that they are not terminated a second time
+        mic = self._instantiator.microscope
+        with self._comps_lock:
+            mic.alive.value = mic.alive.value - comps
+
+        for c in comps:
+            try:
+                c.terminate()
+            except Exception:
+                logging.warning("Failed to terminate component '%s'", c.name, exc_info=True)
+
     def _instantiate_component(self, name):
         """
         Instantiate a component and handle the outcome
@@ -206,15 +269,17 @@ class BackendContainer(model.Container):
         # TODO: use the AST from the microscope (instead of the original one
         # in _instantiator) to allow modifying it online?
         mic = self._instantiator.microscope
-        ghosts = mic.ghosts.value.copy()
+        tstart = time.time()
         try:
             comp = self._instantiator.instantiate_component(name)
         except model.HwError as exp:
             # HwError means: hardware problem, try again later
             logging.warning("Failed to start component %s due to device error: %s",
                             name, exp)
-            ghosts[name] = exp
-            mic.ghosts.value = ghosts
+            with self._comps_lock:
+                ghosts = mic.ghosts.value.copy()
+                ghosts[name] = exp
+                mic.ghosts.value = ghosts
             return set()
         except Exception as exp:
             # Anything else means: microscope file or driver is borked => give up
@@ -228,15 +293,20 @@ class BackendContainer(model.Container):
                 pass
             raise ValueError("Failed to instantiate component %s" % name)
         else:
+            dur = time.time() - tstart
+            logging.info("Component %s started in %g s", name, dur)
+            if self._profiler:
+                self._profiler.add_component(name, dur)
             children = self._instantiator.get_children(comp)
             dchildren = self._instantiator.get_delegated_children(name)
             newcmps = set(c for c in children if c.name in dchildren)
-            mic.alive.value = mic.alive.value | newcmps
-            # update ghosts by removing all the new components
-            for n in dchildren:
-                del ghosts[n]
-
-            mic.ghosts.value = ghosts
+            with self._comps_lock:
+                mic.alive.value = mic.alive.value | newcmps
+                # update ghosts by removing all the new components
+                ghosts = mic.ghosts.value.copy()
+                for n in dchildren:
+                    del ghosts[n]
+                mic.ghosts.value = ghosts
             return newcmps
 
     def _terminate_all_alive(self):
@@ -351,14 +421,17 @@ class BackendRunner(object):
     CONTAINER_ALL_IN_ONE = "1" # one backend container for everything
     CONTAINER_SEPARATED = "+" # each component is started in a separate container
 
-    def __init__(self, model_file, daemon=False, dry_run=False, containement=CONTAINER_SEPARATED):
+    def __init__(self, model_file, daemon=False, dry_run=False, containement=CONTAINER_SEPARATED,
+                 profiler=None):
         """
         containement (CONTAINER_*): the type of container policy to use
+        profiler (None or StartupProfiler): to record the startup time
         """
         self.model = model_file
         self.daemon = daemon
         self.dry_run = dry_run
         self.containement = containement
+        self.profiler = profiler
 
         self._container = None
 
@@ -459,7 +532,7 @@ class BackendRunner(object):
             create_sub_containers = False
 
         self._container = BackendContainer(self.model, create_sub_containers,
-                                        dry_run=self.dry_run)
+                                        dry_run=self.dry_run, profiler=self.profiler)
 
         try:
             self._container.run()
@@ -527,11 +600,21 @@ def main(args):
                          default=0, help="Set verbosity level (0-2, default = 0)")
     opt_grp.add_argument("--log-target", dest="logtarget", metavar="{auto,stderr,filename}",
                          default="auto", help="Specify the log target (auto, stderr, filename)")
+    opt_grp.add_argument("--profile-startup", dest="profile", action="store_true", default=False,
+                         help="Report the time taken to import each module and "
+                         "instantiate each component (in the log)")
     parser.add_argument("model", metavar="file.odm.yaml", nargs='?', type=open,
                         help="Microscope model instantiation file (*.odm.yaml)")
 
     options = parser.parse_args(args[1:])
 
+    if options.profile:
+        # Reuse the profiler started at import, if the option was already there
+        profiler = _startup_profiler or StartupProfiler()
+        profiler.install_import_hook()
+    else:
+        profiler = None
+
     # Cannot use the internal feature, because it doesn't support multiline
     if options.version:
         print (odemis.__fullname__ + " " + odemis.__version__ + "\n" +
@@ -544,6 +627,9 @@ def main(args):
         parser.error("log-level must be positive.")
     loglev_names = [logging.WARNING, logging.INFO, logging.DEBUG]
     loglev = loglev_names[min(len(loglev_names) - 1, options.loglev)]
+    if profiler:
+        # The report is logged at info level
+        loglev = min(loglev, logging.INFO)
 
     # auto = {odemis.log if daemon, stderr otherwise}
     if options.logtarget == "auto":
@@ -613,7 +699,8 @@ def main(args):
 
         # let's become the back-end for real
         runner = BackendRunner(options.model, options.daemon,
-                               dry_run=options.validate, containement=cont_pol)
+                               dry_run=options.validate, containement=cont_pol,
+                               profiler=profiler)
         runner.run()
     except ValueError as exp:
         logging.error("%s", exp)
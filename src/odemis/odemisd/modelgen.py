@@ -31,6 +31,7 @@ import logging
 from odemis import model
 from odemis.util import mock
 import re
+import threading
 import yaml
 
 
@@ -113,6 +114,9 @@ class Instantiator(object):
         self._comp_container = {}  # comp name -> container: the container that runs the given component
         self.create_sub_containers = create_sub_containers # flag for creating sub-containers
         self.dry_run = dry_run # flag for instantiating mock version of the components
+        # To protect the attributes above when instantiating several components
+        # simultaneously
+        self._lock = threading.RLock()
 
         self._preparate_microscope()
 
@@ -417,23 +421,27 @@ class Instantiator(object):
             class_comp = mock.MockComponent
 
         try:
-            cont = self._get_container(name)
+            with self._lock:
+                cont = self._get_container(name)
             if cont is None:
                 # new container has the same name as the component
                 cont, comp = model.createInNewContainer(name, class_comp, args)
-                self.sub_containers[name] = cont
+                with self._lock:
+                    self.sub_containers[name] = cont
             else:
                 logging.debug("Creating %s in container %s", name, cont)
                 comp = cont.instantiate(class_comp, args)
-            self._comp_container[name] = cont
+            with self._lock:
+                self._comp_container[name] = cont
         except Exception:
             logging.error("Error while instantiating component %s.", name)
             raise
 
-        self.components.add(comp)
-        # Add all the children to our list of components. Useful only if child
-        # created by delegation, but can't hurt to add them all.
-        self.components |= comp.children.value
+        with self._lock:
+            self.components.add(comp)
+            # Add all the children to our list of components. Useful only if child
+            # created by delegation, but can't hurt to add them all.
+            self.components |= comp.children.value
 
         return comp
 
@@ -445,9 +453,10 @@ class Instantiator(object):
         Raises:
              LookupError: if no component is found
         """
-        for comp in self.components:
-            if comp.name == name:
-                return comp
+        with self._lock:
+            for comp in self.components:
+                if comp.name == name:
+                    return comp
         raise LookupError("No component named '%s' found" % name)
 
     def get_delegated_children(self, name):
@@ -546,6 +555,32 @@ class Instantiator(object):
 
             comp.updateMetadata(compmd)  # Ought to work
 
+    def _update_rate_limits(self, name):
+        """
+        Set the maximum notification rate of the VAs as defined in the
+        "rate_limits" section of the component
+
+        name (str): name of the component for which to limit the VAs
+        """
+        attrs = self.ast[name]
+        if "rate_limits" in attrs:
+            comp = self._get_component_by_name(name)
+            for prop_name, rate in attrs["rate_limits"].items():
+                try:
+                    va = getattr(comp, prop_name)
+                except AttributeError:
+                    raise SemanticError("Error in microscope file: "
+                            "Component '%s' has no property '%s'." % (name, prop_name))
+                if not isinstance(va, model.VigilantAttributeBase):
+                    raise SemanticError("Error in microscope file: "
+                            "Component '%s' has no property (VA) '%s'." % (name, prop_name))
+                try:
+                    va._set_max_rate(rate)
+                except Exception as exp:
+                    raise ValueError("Error in microscope file: "
+                                     "rate limit of %s.%s = '%s' failed due to '%s'" %
+                                     (name, prop_name, rate, exp))
+
     def _update_affects(self, name):
         """
         Update .affects of the given component, and of all the components which
@@ -577,9 +612,10 @@ class Instantiator(object):
             ValueError: if the component has already been instantiated
             KeyError: if component should be created by delegation
         """
-        for c in self.components:
-            if c.name == name:
-                raise ValueError("Trying to instantiate again component %s" % name)
+        with self._lock:
+            for c in self.components:
+                if c.name == name:
+                    raise ValueError("Trying to instantiate again component %s" % name)
 
         comp = self._instantiate_comp(name)
 
@@ -591,8 +627,10 @@ class Instantiator(object):
             self._update_properties(c.name)
             self._update_metadata(c.name)
             self._update_affects(c.name)
+            self._update_rate_limits(c.name)
         newchildren = set(c for c in newcmps if c.name in mchildren)
-        self.microscope.children.value = self.microscope.children.value | newchildren
+        with self._lock:
+            self.microscope.children.value = self.microscope.children.value | newchildren
 
         return comp
 
@@ -608,7 +646,8 @@ class Instantiator(object):
         """
         comps = set()
         if instantiated is None:
-            instantiated = set(c.name for c in self.components)
+            with self._lock:
+                instantiated = set(c.name for c in self.components)
         for n, attrs in self.ast.items():
             if n in instantiated: # should not be already instantiated
                 continue
@@ -32,6 +32,7 @@ from odemis.util import timeout
 import os
 import subprocess
 import sys
+import threading
 import time
 import unittest
 
@@ -275,6 +276,116 @@ class TestCommandLine(unittest.TestCase):
 
         return ret
 
+
+class FakeComponent(object):
+    """
+    Just enough of a component for the instantiation
+    """
+    def __init__(self, name):
+        self.name = name
+        self.children = model.VigilantAttribute(set())
+        self.terminated = False
+
+    def terminate(self):
+        self.terminated = True
+
+
+class FakeInstantiator(object):
+    """
+    Instantiates FakeComponents, taking the given time to start, or failing if
+    the time is None
+    """
+    def __init__(self, start_times):
+        """
+        start_times (dict str -> float or None): component name -> time to start (s)
+        """
+        self._start_times = start_times
+        self.microscope = FakeComponent("mic")
+        self.microscope.alive = model.VigilantAttribute(set())
+        ghosts = dict((n, model.ST_UNLOADED) for n in start_times)
+        self.microscope.ghosts = model.VigilantAttribute(ghosts)
+        self.sub_containers = {}
+        self.comps = []
+
+    def get_instantiables(self, instantiated):
+        return set(self._start_times.keys()) - instantiated
+
+    def instantiate_component(self, name):
+        dur = self._start_times[name]
+        if dur is None:
+            raise IOError("Component %s is broken" % (name,))
+        time.sleep(dur)
+        comp = FakeComponent(name)
+        self.comps.append(comp)
+        return comp
+
+    def get_children(self, comp):
+        return {comp}
+
+    def get_delegated_children(self, name):
+        return {name}
+
+
+class TestInstantiation(unittest.TestCase):
+    """
+    Test the instantiation of the components by the back-end, without actually
+    running it
+    """
+
+    def _create_backend(self, start_times):
+        # Only what is used by the instantiation, without starting the container
+        backend = main.BackendContainer.__new__(main.BackendContainer)
+        backend._instantiator = FakeInstantiator(start_times)
+        backend._must_stop = threading.Event()
+        backend._dry_run = False
+        backend._max_parallel = 4
+        backend._profiler = None
+        backend._comps_lock = threading.RLock()
+        backend._terminated = threading.Event()
+        backend.terminate = backend._terminated.set  # to not stop the container
+        return backend
+
+    @timeout(20)
+    def test_parallel(self):
+        """
+        Independent components are started simultaneously
+        """
+        start_times = {"comp%d" % i: 1 for i in range(4)}
+        backend = self._create_backend(start_times)
+        inst = backend._instantiator
+
+        t = threading.Thread(target=backend._instantiate_all)
+        t.start()
+        try:
+            tstart = time.time()
+            while len(inst.microscope.alive.value) < len(start_times):
+                time.sleep(0.1)
+            # 1s to start the thread + 1s to start all the components
+            self.assertLess(time.time() - tstart, 3.5)
+        finally:
+            backend._must_stop.set()
+            t.join(15)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(inst.microscope.ghosts.value, {})
+
+    @timeout(20)
+    def test_failure_stops_all(self):
+        """
+        A component failing badly stops all the ones being started
+        """
+        start_times = {"slow1": 2, "slow2": 3, "fail": None}
+        backend = self._create_backend(start_times)
+        inst = backend._instantiator
+
+        backend._instantiate_all()  # Returns due to the failure
+        self.assertTrue(backend._terminated.is_set())
+
+        # All the slow components are started, and immediately stopped
+        self.assertEqual(set(c.name for c in inst.comps), {"slow1", "slow2"})
+        for c in inst.comps:
+            self.assertTrue(c.terminated, "%s not terminated" % (c.name,))
+        self.assertEqual(inst.microscope.alive.value, set())
+
 # extends the class fully at module 
 TestCommandLine.create_tests()
                             
@@ -28,10 +28,14 @@ from __future__ import division, absolute_import
 
 import Queue
 import collections
+from concurrent import futures
 from functools import wraps
+import heapq
 import inspect
+import itertools
 import logging
 import math
+import random
 import signal
 import threading
 import time
@@ -460,3 +464,374 @@ class RepeatingTimer(threading.Thread):
 
     def cancel(self):
         self._must_stop.set()
+
+
+class Scheduler(object):
+    """
+    Calls periodic tasks from a few threads sharing a timer heap. It's meant to
+    replace the many threads (each with its own stack and wake-ups) used by
+    the drivers to regularly poll the hardware.
+    The threads are only started when the first task is scheduled. The
+    callbacks of the tasks should be short, as while a callback is running, it
+    holds one thread.
+    """
+    def __init__(self, nthreads=2, name="Scheduler"):
+        """
+        nthreads (int > 0): number of threads calling the tasks
+        name (str): base name of the threads
+        """
+        self.name = name
+        self._nthreads = nthreads
+        self._threads = []
+        self._heap = []  # (time, int, PeriodicTask): next tasks to run
+        self._tasks = weakref.WeakSet()  # all the tasks ever scheduled
+        self._counter = itertools.count()  # to never compare the tasks
+        self._cond = threading.Condition()
+
+    def _schedule(self, task, when):
+        """
+        Add a task to the heap
+        task (PeriodicTask): the task to run
+        when (float): time (as time.time()) at which to run it
+        """
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._counter), task))
+            self._tasks.add(task)
+            if len(self._threads) < self._nthreads:
+                t = threading.Thread(target=self._run,
+                                     name="%s %d" % (self.name, len(self._threads)))
+                t.daemon = True
+                t.start()
+                self._threads.append(t)
+            self._cond.notify()
+
+    def _run(self):
+        """
+        Main loop of each thread: wait for the next task due, and run it
+        """
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    now = time.time()
+                    if self._heap[0][0] > now:
+                        self._cond.wait(self._heap[0][0] - now)
+                        continue
+                    when, _, task = heapq.heappop(self._heap)
+                    break
+
+            try:
+                task._run(when)
+            except Exception:
+                logging.exception("Failure while running task %s", task.name)
+
+    def get_stats(self):
+        """
+        return (dict str -> dict): the statistics of each task still active (see
+          PeriodicTask.get_stats())
+        """
+        with self._cond:
+            tasks = list(self._tasks)
+        return {t.name: t.get_stats() for t in tasks if t.is_alive()}
+
+
+# The scheduler used by default by the PeriodicTasks
+_scheduler = Scheduler(name="Periodic tasks")
+
+
+def get_scheduler():
+    """
+    return (Scheduler): the scheduler shared by all the periodic tasks of the
+      process (ie, the polling of all the drivers in the back-end)
+    """
+    return _scheduler
+
+
+class PeriodicTask(object):
+    """
+    Calls a function at regular intervals, using a Scheduler. It has the same
+    interface as a RepeatingTimer, but without needing a thread per task.
+    It stops when calling cancel() or the callback disappears.
+    If the callback raises an exception, the interval is doubled (up to
+    max_backoff), until the callback succeeds again.
+    It can be suspended (eg, while an acquisition uses the hardware), and the
+    call that would have happened in the mean time is done when resuming.
+    """
+    def __init__(self, period, callback, name="PeriodicTask", jitter=0.1,
+                 max_backoff=60, scheduler=None):
+        """
+        period (float): time in second between two calls (from the end of a
+          call to the beginning of the next one)
+        callback (callable): function to call
+        name (str): fancy name to give to the task
+        jitter (0 <= float < 1): ratio of the period randomly added or removed
+          to each interval, so that tasks started simultaneously don't all run
+          at the same time.
+        max_backoff (float): maximum interval (s) between two calls, after the
+          callback failed.
+        scheduler (None or Scheduler): the scheduler running the task. If None,
+          the shared scheduler is used.
+        """
+        self.callback = weak.WeakMethod(callback)
+        self.period = period
+        self.name = name
+        self.jitter = jitter
+        self.max_backoff = max(period, max_backoff)
+        self._scheduler = scheduler or _scheduler
+
+        self._lock = threading.Lock()  # protects the state below
+        self._cancelled = False
+        self._suspended = 0  # number of suspend() calls not yet resumed
+        self._parked = False  # True if it's due but suspended
+        self._runner = None  # thread running the callback, or None
+        self._idle = threading.Event()  # set when the callback is not running
+        self._idle.set()
+        self._failures = 0  # number of consecutive failures
+
+        # statistics
+        self._count = 0
+        self._errors = 0
+        self._total_time = 0
+        self._max_time = 0
+        self._total_delay = 0
+
+    def start(self):
+        self._scheduler._schedule(self, self._next_time(time.time()))
+
+    def cancel(self):
+        with self._lock:
+            self._cancelled = True
+
+    def join(self, timeout=None):
+        """
+        Wait until the callback is not running anymore. Useful after cancel().
+        Does nothing if called from the callback itself.
+        timeout (None or float): maximum time to wait (s)
+        """
+        if self._runner is threading.current_thread():
+            return
+        self._idle.wait(timeout)
+
+    def is_alive(self):
+        return not self._cancelled
+
+    def suspend(self):
+        """
+        Stop calling the callback until resume() is called. If the callback is
+        running, it waits until it's over.
+        Can be called multiple times, in which case resume() must be called as
+        many times.
+        """
+        with self._lock:
+            self._suspended += 1
+        self.join()
+
+    def resume(self):
+        """
+        Restart calling the callback, after a call to suspend(). If the callback
+        was due while suspended, it's called immediately.
+        """
+        with self._lock:
+            if self._suspended <= 0:
+                raise ValueError("Task %s is not suspended" % (self.name,))
+            self._suspended -= 1
+            if self._suspended or not self._parked or self._cancelled:
+                return
+            self._parked = False
+        self._scheduler._schedule(self, time.time())
+
+    def _next_time(self, now):
+        """
+        return (float): the time of the next call, when the previous one ended
+          at the given time
+        """
+        period = min(self.period * 2 ** self._failures, self.max_backoff)
+        return now + period * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _run(self, when):
+        """
+        Called by the scheduler when the task is due
+        when (float): time at which the task was planned
+        """
+        with self._lock:
+            if self._cancelled:
+                return
+            if self._suspended:
+                self._parked = True
+                return
+            self._runner = threading.current_thread()
+            self._idle.clear()
+
+        start = time.time()
+        try:
+            self.callback()
+            self._failures = 0
+        except weak.WeakRefLostError:
+            # it's gone, it's over
+            self._cancelled = True
+        except Exception:
+            self._errors += 1
+            self._failures += 1
+            if self._failures == 1:
+                logging.exception("Failure while calling periodic task %s", self.name)
+            else:
+                logging.warning("Periodic task %s failed %d times in a row",
+                                self.name, self._failures)
+        finally:
+            end = time.time()
+            dur = end - start
+            self._count += 1
+            self._total_time += dur
+            self._max_time = max(self._max_time, dur)
+            self._total_delay += start - when
+            self._runner = None
+            self._idle.set()
+
+        with self._lock:
+            if self._cancelled:
+                logging.debug("Periodic task '%s' over", self.name)
+                return
+        self._scheduler._schedule(self, self._next_time(end))
+
+    def get_stats(self):
+        """
+        return (dict str -> number): the statistics of the calls:
+          count (int): number of calls
+          errors (int): number of calls which failed
+          total_time (float): total duration of the calls (s)
+          max_time (float): longest call (s)
+          mean_delay (float): average time between the planned and actual
+            start of the calls (s)
+        """
+        return {"count": self._count,
+                "errors": self._errors,
+                "total_time": self._total_time,
+                "max_time": self._max_time,
+                "mean_delay": self._total_delay / max(1, self._count),
+                }
+
+
+class RequestQueue(object):
+    """
+    Runs requests (ie, function calls) one at a time, in order, from a single
+    thread. It's typically used by the drivers to send the commands to a device
+    without blocking the caller (eg, the setter of a VA), while the commands
+    are still sent in the same order as they were requested.
+    A request can be submitted with a key, in which case it replaces the
+    request with the same key which is still waiting to be run. This allows to
+    only send the latest value when a VA is changed many times in a row.
+    """
+    def __init__(self, name="RequestQueue", lock=None):
+        """
+        name (str): fancy name to give to the thread
+        lock (None or Lock): if not None, it is held while running each request,
+          so that other threads using the device directly are not interrupted.
+        """
+        self.name = name
+        self._lock = lock
+        self._cond = threading.Condition()
+        self._queue = collections.deque()  # _Request waiting to be run
+        self._pending = {}  # key -> _Request waiting to be run
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._run, name=name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue a request
+        fn (callable): the function to call
+        args, kwargs: the arguments to pass to the function
+        return (Future): to get the result of the request
+        raise RuntimeError: if the queue has been shutdown
+        """
+        return self.submit_coalesced(None, fn, *args, **kwargs)
+
+    def submit_coalesced(self, key, fn, *args, **kwargs):
+        """
+        Queue a request, replacing the request with the same key if it has
+          not yet started.
+        key (None or hashable): identifier of the request. If None, the request
+          is never replaced.
+        fn (callable): the function to call
+        args, kwargs: the arguments to pass to the function
+        return (Future): to get the result of the request. If it replaced a
+          request, it's the same future as the one of the replaced request.
+        raise RuntimeError: if the queue has been shutdown
+        """
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Cannot submit request to %s after shutdown" % (self.name,))
+            req = self._pending.get(key)
+            if req is not None and not req.future.cancelled():
+                req.fn, req.args, req.kwargs = fn, args, kwargs
+                return req.future
+
+            req = _Request(key, fn, args, kwargs)
+            self._queue.append(req)
+            if key is not None:
+                self._pending[key] = req
+            self._cond.notify()
+            return req.future
+
+    def has_pending(self, key):
+        """
+        return (bool): True if a request with the given key is waiting to be run
+        """
+        with self._cond:
+            return key in self._pending
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting new requests. The requests already queued are still run.
+        wait (bool): if True, wait until all the requests have been run.
+        """
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify()
+        if wait and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self):
+        """
+        Main loop of the thread: run the requests, in order
+        """
+        while True:
+            with self._cond:
+                while not self._queue:
+                    if self._shutdown:
+                        logging.debug("Request queue '%s' over", self.name)
+                        return
+                    self._cond.wait()
+                req = self._queue.popleft()
+                if self._pending.get(req.key) is req:
+                    del self._pending[req.key]
+
+            if not req.future.set_running_or_notify_cancel():
+                continue
+            try:
+                if self._lock is None:
+                    ret = req.fn(*req.args, **req.kwargs)
+                else:
+                    with self._lock:
+                        ret = req.fn(*req.args, **req.kwargs)
+            except BaseException as ex:
+                logging.warning("Request %s of %s failed: %s",
+                                getattr(req.fn, "__name__", req.fn), self.name, ex)
+                req.future.set_exception(ex)
+            else:
+                req.future.set_result(ret)
+
+
+class _Request(object):
+    """
+    A function call waiting in a RequestQueue
+    """
+    def __init__(self, key, fn, args, kwargs):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = futures.Future()
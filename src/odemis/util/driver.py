@@ -25,6 +25,7 @@ from Pyro4.errors import CommunicationError
 import collections
 import logging
 import math
+import numpy
 from odemis import model
 import os
 import re
@@ -127,6 +128,58 @@ def estimateMoveDuration(distance, speed, accel):
         return t1 + t2
 
 
+class SequenceBuffer(object):
+    """
+    Memory for the frames of a sequence acquisition, allocated in advance.
+    The memory is allocated by blocks of several frames, so that receiving a
+    frame doesn't require any allocation. Each frame is a view on a block, so
+    a block is only freed once all its frames are not used anymore.
+    """
+
+    def __init__(self, nframes, shape, dtype=numpy.uint16, max_block=64 * 2 ** 20):
+        """
+        nframes (int > 0): number of frames in the sequence
+        shape (tuple of int): shape of a frame
+        dtype (numpy.dtype): type of the data
+        max_block (int > 0): maximum size of a block in bytes. A block always
+          contains at least one frame.
+        """
+        self.nframes = nframes
+        self.shape = tuple(shape)
+        self.dtype = numpy.dtype(dtype)
+        frame_size = self.dtype.itemsize * int(numpy.prod(self.shape))
+        self._frames_per_block = max(1, min(nframes, max_block // max(1, frame_size)))
+        self.remaining = nframes  # number of frames not yet returned
+        self._block = None
+        self._block_idx = 0  # index of the next frame in the current block
+        self._allocate()
+
+    def _allocate(self):
+        n = min(self._frames_per_block, self.remaining)
+        if n > 0:
+            self._block = numpy.empty((n,) + self.shape, dtype=self.dtype)
+        else:
+            self._block = None
+        self._block_idx = 0
+
+    def get(self):
+        """
+        Pick the memory for the next frame
+        return (ndarray of shape): memory for the frame (content is undefined)
+        raise IndexError: if all the frames of the sequence have been returned
+        """
+        if self.remaining <= 0:
+            raise IndexError("All the %d frames of the sequence have been used" %
+                             (self.nframes,))
+        frame = self._block[self._block_idx]
+        self._block_idx += 1
+        self.remaining -= 1
+        if self._block_idx >= self._block.shape[0]:
+            # Prepare the next block now, instead of when receiving the frame
+            self._allocate()
+        return frame
+
+
 def checkLightBand(band):
     """
     Check that the given object looks like a light band. It should either be
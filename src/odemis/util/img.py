@@ -28,11 +28,8 @@ import logging
 import math
 import numpy
 from odemis import model
-import scipy.misc
-# Next imprt statement needed under windows, because otherwise scipy.misc.bytescale won't be available
-# See: http://stackoverflow.com/questions/18049687/attributeerror-module-object-scipy-has-no-attribute-why-does-this-error
-import scipy.misc.pilutil
-import scipy.ndimage
+# Note: scipy is only imported within the functions which need it, as it's
+# slow to load, and most users of this module don't need it.
 
 
 # See if the optimised (cython-based) functions are available
@@ -347,6 +344,10 @@ def DataArray2RGB(data, irange=None, tint=(255, 255, 255)):
                 irange = (irange[1] - 1, irange[1])
 
         if data.dtype != "uint8":
+            import scipy.misc
+            # Next import statement needed under windows, because otherwise scipy.misc.bytescale won't be available
+            # See: http://stackoverflow.com/questions/18049687/attributeerror-module-object-scipy-has-no-attribute-why-does-this-error
+            import scipy.misc.pilutil
             drescaled = scipy.misc.bytescale(data, cmin=irange[0], cmax=irange[1])
         else: # bytescale never does anything on a data already in uint8
             b = 255 / (irange[1] - irange[0])
@@ -446,6 +447,7 @@ def rescale_hq(data, shape):
     """
     # TODO: support RGB(A) images
     # TODO: make it faster
+    import scipy.ndimage
     out = numpy.empty(shape, dtype=data.dtype)
     scale = tuple(n / o for o, n in zip(data.shape, shape))
     scipy.ndimage.interpolation.zoom(data, zoom=scale, output=out, order=1, prefilter=False)
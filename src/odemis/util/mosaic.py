@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the
+terms  of the GNU General Public License version 2 as published by the Free
+Software  Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY
+WARRANTY;  without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+PARTICULAR  PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+"""
+
+# Stitching of images into a large sparse mosaic, stored as tiles
+
+from __future__ import division
+
+import collections
+import logging
+import math
+import numpy
+from odemis import model
+import threading
+
+
+class TiledMosaic(object):
+    """
+    Sparse mosaic of RGB images, placed according to their MD_POS and
+    MD_PIXEL_SIZE. Each new image is drawn over the previous ones.
+    The mosaic is stored as fixed-size tiles, on a regular grid in physical
+    coordinates, at several zoom levels: level 0 has the pixel size of the first
+    image inserted, and each following level has a pixel size twice bigger.
+    Only the tiles which contain data are stored, and the least recently used
+    ones are dropped when the memory limit is reached.
+    Note: the images are resampled (nearest neighbour), and their rotation is
+    not taken into account.
+    """
+
+    def __init__(self, tile_size=256, levels=6, max_size=256 * 2 ** 20):
+        """
+        tile_size (int > 0): width and height of each tile (in px)
+        levels (int > 0): number of zoom levels
+        max_size (int > 0): maximum memory used by the tiles (in bytes)
+        """
+        self.tile_size = tile_size
+        self.levels = levels
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        # (int, int, int) -> DataArray: level, x, y -> tile
+        # Ordered from the least to the most recently used.
+        # x increases to the right, and y increases *downwards*.
+        self._tiles = collections.OrderedDict()
+        self._size = 0  # bytes used by the tiles
+        self._pxs = None  # pixel size of the level 0 (m)
+        self._bbox = None  # ltrb of all the images inserted, in physical coordinates (m)
+        # Incremented every time the mosaic is modified. As tiles are never
+        # modified in place, it allows to detect whether something has changed.
+        self.version = 0
+
+    def clear(self):
+        """
+        Remove all the data from the mosaic
+        """
+        with self._lock:
+            self._tiles.clear()
+            self._size = 0
+            self._pxs = None
+            self._bbox = None
+            self.version += 1
+
+    def get_bbox(self):
+        """
+        returns (None or 4 floats): left, bottom, right, top positions of the
+          area containing data, in physical coordinates (m). None if empty.
+        """
+        return self._bbox
+
+    def get_pixel_size(self, level):
+        """
+        level (0 <= int < levels): the zoom level
+        returns (float): the pixel size of the tiles at the given level (m)
+        raise LookupError: if the mosaic has never received any image
+        """
+        if self._pxs is None:
+            raise LookupError("Mosaic has no data yet")
+        return self._pxs * 2 ** level
+
+    def insert(self, im):
+        """
+        Draw an image into the mosaic
+        im (DataArray of shape YXC, with C = 3 or 4, and dtype uint8): the RGB(A)
+          image. It must have MD_POS and MD_PIXEL_SIZE in its metadata.
+        """
+        pos = im.metadata[model.MD_POS]
+        pxs = im.metadata[model.MD_PIXEL_SIZE]
+        h, w = im.shape[:2]
+        # Work in "world" coordinates: same as physical, but with Y downwards
+        ltrb = (pos[0] - w * pxs[0] / 2, -pos[1] - h * pxs[1] / 2,
+                pos[0] + w * pxs[0] / 2, -pos[1] + h * pxs[1] / 2)
+
+        with self._lock:
+            if self._pxs is None:
+                self._pxs = min(pxs)
+
+            for l in range(self.levels):
+                self._insert_level(im, ltrb, pxs, l)
+
+            phys_bbox = (ltrb[0], -ltrb[3], ltrb[2], -ltrb[1])
+            if self._bbox is None:
+                self._bbox = phys_bbox
+            else:
+                self._bbox = (min(self._bbox[0], phys_bbox[0]),
+                              min(self._bbox[1], phys_bbox[1]),
+                              max(self._bbox[2], phys_bbox[2]),
+                              max(self._bbox[3], phys_bbox[3]))
+            self.version += 1
+            self._drop_old_tiles()
+
+    def _insert_level(self, im, ltrb, pxs, level):
+        """
+        Write an image into the tiles of one level. Must be called with the
+        lock taken.
+        ltrb (4 floats): position of the image in world coordinates (m)
+        pxs (float, float): pixel size of the image (m)
+        """
+        ts = self.tile_size
+        lpxs = self._pxs * 2 ** level
+
+        # Index (in the whole level) of the first and last+1 pixels covered
+        gx0, gy0 = int(math.floor(ltrb[0] / lpxs)), int(math.floor(ltrb[1] / lpxs))
+        gx1, gy1 = int(math.ceil(ltrb[2] / lpxs)), int(math.ceil(ltrb[3] / lpxs))
+
+        # For each pixel of the level, the source pixel at its center
+        cols = numpy.floor(((numpy.arange(gx0, gx1) + 0.5) * lpxs - ltrb[0]) / pxs[0]).astype(numpy.int64)
+        rows = numpy.floor(((numpy.arange(gy0, gy1) + 0.5) * lpxs - ltrb[1]) / pxs[1]).astype(numpy.int64)
+        # The centers out of the image are skipped (they are contiguous, at the borders)
+        validc = numpy.nonzero((cols >= 0) & (cols < im.shape[1]))[0]
+        validr = numpy.nonzero((rows >= 0) & (rows < im.shape[0]))[0]
+        if not len(validc) or not len(validr):
+            return  # Too small to be visible at this level
+        gx0, gx1 = gx0 + validc[0], gx0 + validc[-1] + 1
+        gy0, gy1 = gy0 + validr[0], gy0 + validr[-1] + 1
+        cols = cols[validc[0]:validc[-1] + 1]
+        rows = rows[validr[0]:validr[-1] + 1]
+
+        # Resampled image, with alpha channel
+        block = numpy.empty((len(rows), len(cols), 4), dtype=numpy.uint8)
+        sub = im[rows[:, numpy.newaxis], cols]
+        block[..., :sub.shape[2]] = sub
+        if sub.shape[2] == 3:
+            block[..., 3] = 255
+
+        for ty in range(gy0 // ts, (gy1 - 1) // ts + 1):
+            by0, by1 = max(gy0, ty * ts), min(gy1, (ty + 1) * ts)
+            for tx in range(gx0 // ts, (gx1 - 1) // ts + 1):
+                bx0, bx1 = max(gx0, tx * ts), min(gx1, (tx + 1) * ts)
+                key = (level, tx, ty)
+                try:
+                    # Never modify a tile in place, so that the users can
+                    # keep using the previous version.
+                    tile = self._tiles.pop(key).copy()
+                    self._size -= tile.nbytes
+                except KeyError:
+                    tile = numpy.zeros((ts, ts, 4), dtype=numpy.uint8)
+                    tile = model.DataArray(tile, {
+                        model.MD_POS: ((tx + 0.5) * ts * lpxs, -(ty + 0.5) * ts * lpxs),
+                        model.MD_PIXEL_SIZE: (lpxs, lpxs),
+                        model.MD_DIMS: "YXC",
+                    })
+                tile[by0 - ty * ts:by1 - ty * ts, bx0 - tx * ts:bx1 - tx * ts] = \
+                    block[by0 - gy0:by1 - gy0, bx0 - gx0:bx1 - gx0]
+                self._tiles[key] = tile
+                self._size += tile.nbytes
+
+    def _drop_old_tiles(self):
+        """
+        Remove the least recently used tiles until the memory limit is respected.
+        Must be called with the lock taken.
+        """
+        ndropped = 0
+        while self._tiles and self._size > self._max_size:
+            _, tile = self._tiles.popitem(last=False)
+            self._size -= tile.nbytes
+            ndropped += 1
+        if ndropped:
+            logging.debug("Dropped %d tiles of the mosaic", ndropped)
+
+    def get_level(self, pxs):
+        """
+        Pick the zoom level to display the mosaic at a given pixel size.
+        pxs (float): the size of a pixel on the display (m)
+        returns (0 <= int < levels): the coarsest level which still has at least
+          the same resolution as the display
+        """
+        if self._pxs is None or pxs <= self._pxs:
+            return 0
+        l = int(math.floor(math.log(pxs / self._pxs, 2) + 1e-9))
+        return min(l, self.levels - 1)
+
+    def get_tiles(self, pxs, rect=None):
+        """
+        Return the tiles to draw the mosaic at a given pixel size.
+        pxs (float): the size of a pixel on the display (m)
+        rect (None or 4 floats): left, bottom, right, top positions of the area
+          to display, in physical coordinates (m). If None, all the tiles of the
+          level are returned.
+        returns (list of DataArray of shape YX4): the tiles, as RGBA, with
+          MD_POS and MD_PIXEL_SIZE. They are never modified afterwards.
+        """
+        with self._lock:
+            if self._pxs is None:
+                return []
+
+            level = self.get_level(pxs)
+            if rect is None:
+                keys = [k for k in self._tiles if k[0] == level]
+            else:
+                tsw = self.tile_size * self._pxs * 2 ** level  # m
+                tx0, tx1 = int(math.floor(rect[0] / tsw)), int(math.floor(rect[2] / tsw))
+                ty0, ty1 = int(math.floor(-rect[3] / tsw)), int(math.floor(-rect[1] / tsw))
+                if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) <= len(self._tiles):
+                    keys = [(level, tx, ty) for ty in range(ty0, ty1 + 1)
+                            for tx in range(tx0, tx1 + 1) if (level, tx, ty) in self._tiles]
+                else:  # less tiles stored than possible tiles in the rect
+                    keys = [k for k in self._tiles
+                            if k[0] == level and tx0 <= k[1] <= tx1 and ty0 <= k[2] <= ty1]
+
+            tiles = []
+            for k in keys:
+                tile = self._tiles.pop(k)
+                self._tiles[k] = tile  # most recently used
+                tiles.append(tile)
+
+        return tiles
@@ -21,7 +21,6 @@ from itertools import izip
 import logging
 import numpy
 from odemis import model
-from scipy.optimize import curve_fit
 import threading
 import time
 
@@ -285,6 +284,7 @@ class PeakFitter(object):
 
                 try:
                     # => in scipy 0.17, curve_fit() supports the 'bounds' parameter
+                    from scipy.optimize import curve_fit  # slow to load
                     params, _ = curve_fit(FitFunction, wavelength, spectrum, p0=fit_list)
                     break
                 except Exception:
@@ -17,8 +17,6 @@ You should have received a copy of the GNU General Public License along with Ode
 from __future__ import division
 
 import math
-from matplotlib.delaunay import Triangulation
-from matplotlib.delaunay.triangulate import DuplicatePointWarning
 from numpy import ma
 import numpy
 from odemis import model
@@ -101,6 +99,9 @@ def AngleResolved2Polar(data, output_size, hole=True, dtype=None):
 
     # FIXME: need rotation (=swap axes), but swapping theta/phi slows down the
     # interpolation by 3 ?!
+    # matplotlib is slow to load, so only import it when needed
+    from matplotlib.delaunay import Triangulation
+    from matplotlib.delaunay.triangulate import DuplicatePointWarning
     with warnings.catch_warnings():
         # Some points might be so close that they are identical (within float
         # precision). It's fine, no need to generate a warning.
@@ -185,6 +186,8 @@ def AngleResolved2Rectangular(data, output_size, hole=True, dtype=None):
     phi_data = numpy.append(numpy.append(phi_data - 2 * math.pi, phi_data, axis=1), phi_data + 2 * math.pi, axis=1)
 
     ARdata = numpy.tile(omega_data, (1, 3))
+    from matplotlib.delaunay import Triangulation
+    from matplotlib.delaunay.triangulate import DuplicatePointWarning
     with warnings.catch_warnings():
         # Some points might be so close that they are identical (within float
         # precision). It's fine, no need to generate a warning.
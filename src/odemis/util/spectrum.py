@@ -29,6 +29,8 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 from __future__ import division
 
 import logging
+import math
+import numpy
 from numpy.polynomial import polynomial
 from odemis import model
 
@@ -93,3 +95,44 @@ def coefficients_to_dataarray(coef):
     da.metadata[model.MD_WL_LIST] = wl_list
 
     return da
+
+
+def find_illuminated_band(data, margin=0.1, min_snr=10):
+    """
+    Find the rows of a spectrometer CCD which receive light. On a spectrometer,
+    the light coming out of the spectrograph typically only covers a thin
+    horizontal band of the sensor, and the other rows only contain noise.
+    data (numpy.ndarray of shape YX): image of the whole CCD, with the
+      wavelength along the X axis
+    margin (0 <= float): proportion of the height of the band added on each side
+    min_snr (0 < float): minimum ratio between the signal of the brightest row
+      and the noise of the background for a band to be detected
+    return (int, int): first row of the band, and last row + 1
+    raise LookupError: if no band with enough signal is found
+    """
+    profile = numpy.asarray(data, dtype=numpy.float64).mean(axis=1)
+    nrows = profile.shape[0]
+
+    # The background is given by the darkest rows, and its noise by the
+    # variations from one row to the next one
+    bg = numpy.percentile(profile, 5)
+    noise = numpy.median(numpy.abs(numpy.diff(profile))) if nrows > 1 else 0
+    peak_pos = int(numpy.argmax(profile))
+    peak = profile[peak_pos]
+    if peak - bg <= min_snr * max(noise, 1e-9):
+        raise LookupError("No illuminated band found (peak = %g, background = %g)"
+                          % (peak, bg))
+
+    # The band is all the rows around the peak above 10% of its signal
+    lit = profile > bg + (peak - bg) * 0.1
+    top = peak_pos
+    while top > 0 and lit[top - 1]:
+        top -= 1
+    bottom = peak_pos + 1
+    while bottom < nrows and lit[bottom]:
+        bottom += 1
+
+    extra = int(math.ceil((bottom - top) * margin))
+    top, bottom = max(0, top - extra), min(nrows, bottom + extra)
+    logging.debug("Found illuminated band between rows %d and %d", top, bottom)
+    return top, bottom
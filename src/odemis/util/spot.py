@@ -19,7 +19,6 @@ from __future__ import division
 import numpy
 from odemis import model
 from odemis.util import img
-import scipy.signal
 import warnings
 
 
@@ -148,6 +147,9 @@ def FindCenterCoordinates(image):
     # Smoothing
     h = numpy.tile(numpy.ones(3) / 9, 3).reshape(3, 3)  # simple 3x3 averaging filter
     # TODO: explain why it's ok to catch these warnings
+    # The streams only use the moment of inertia of this module, so only load
+    # scipy.signal when looking for the spot centre
+    import scipy.signal
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", numpy.ComplexWarning)
         dIdu = scipy.signal.convolve2d(dIdu, h, mode='same', fillvalue=0)
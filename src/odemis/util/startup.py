@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the terms
+of the GNU General Public License version 2 as published by the Free Software
+Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+
+"""
+
+# Helpers to find out what takes time when starting a program (--profile-startup)
+# Warning: do not put anything that has dependencies on non default python modules
+
+from __future__ import division, absolute_import
+
+import __builtin__
+import sys
+import threading
+import time
+
+
+class StartupProfiler(object):
+    """
+    Records how long it takes to import each module and to instantiate each
+    component.
+    The import times are inclusive: the time to import a module includes the
+    time to import all the modules it imports for the first time.
+    """
+
+    def __init__(self):
+        self._start = time.time()
+        self._lock = threading.Lock()
+        self.imports = {}  # str -> float: module name -> duration (s)
+        self.components = {}  # str -> float: component name -> duration (s)
+        self._orig_import = None
+
+    def install_import_hook(self):
+        """
+        Start recording the duration of the imports
+        """
+        if self._orig_import is not None:
+            return
+        self._orig_import = __builtin__.__import__
+        __builtin__.__import__ = self._timed_import
+
+    def remove_import_hook(self):
+        """
+        Stop recording the duration of the imports
+        """
+        if self._orig_import is None:
+            return
+        __builtin__.__import__ = self._orig_import
+        self._orig_import = None
+
+    def _timed_import(self, name, *args, **kwargs):
+        # Only the first import of a module takes time, the others are just
+        # a look-up in sys.modules.
+        if name in sys.modules:
+            return self._orig_import(name, *args, **kwargs)
+
+        tstart = time.time()
+        mod = self._orig_import(name, *args, **kwargs)
+        dur = time.time() - tstart
+        with self._lock:
+            self.imports.setdefault(name, dur)
+        return mod
+
+    def add_component(self, name, duration):
+        """
+        Record the instantiation time of a component
+        name (str): name of the component
+        duration (float): time to instantiate it (s)
+        """
+        with self._lock:
+            self.components[name] = duration
+
+    def report(self, max_entries=20):
+        """
+        Generate a human-readable report of the durations recorded
+        max_entries (int): maximum number of modules listed
+        returns (str): multi-line report
+        """
+        with self._lock:
+            imports = sorted(self.imports.items(), key=lambda i: i[1], reverse=True)
+            comps = sorted(self.components.items(), key=lambda i: i[1], reverse=True)
+
+        lines = ["Startup profile, %g s since the start:" % (time.time() - self._start,)]
+        if imports:
+            lines.append("Slowest module imports (inclusive):")
+            for n, d in imports[:max_entries]:
+                lines.append("  %8.3f s  %s" % (d, n))
+        if comps:
+            lines.append("Component instantiation:")
+            for n, d in comps:
+                lines.append("  %8.3f s  %s" % (d, n))
+        return "\n".join(lines)
@@ -22,10 +22,12 @@ Odemis. If not, see http://www.gnu.org/licenses/.
 from __future__ import division
 
 import logging
+import numpy
 from odemis import model
 import odemis
 from odemis.util import test
-from odemis.util.driver import getSerialDriver, speedUpPyroConnect, readMemoryUsage
+from odemis.util.driver import getSerialDriver, speedUpPyroConnect, readMemoryUsage, \
+    SequenceBuffer
 import os
 import time
 import unittest
@@ -70,6 +72,27 @@ class TestDriver(unittest.TestCase):
         m = readMemoryUsage()
         self.assertGreater(m, 1)
 
+    def test_sequence_buffer(self):
+        # 10 frames of 4x8, with blocks of 3 frames
+        seqbuf = SequenceBuffer(10, (4, 8), numpy.uint16, max_block=3 * 4 * 8 * 2)
+        frames = []
+        for i in range(10):
+            f = seqbuf.get()
+            self.assertEqual(f.shape, (4, 8))
+            self.assertEqual(f.dtype, numpy.uint16)
+            f[:] = i
+            frames.append(f)
+        self.assertEqual(seqbuf.remaining, 0)
+        self.assertRaises(IndexError, seqbuf.get)
+
+        # Each frame has its own memory
+        for i, f in enumerate(frames):
+            self.assertTrue((f == i).all())
+
+        # Frames bigger than a block are still returned
+        seqbuf = SequenceBuffer(2, (100, 100), max_block=10)
+        self.assertEqual(seqbuf.get().shape, (100, 100))
+
 
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the terms
+of the GNU General Public License version 2 as published by the Free Software
+Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+'''
+from __future__ import division
+
+import logging
+import numpy
+from odemis import model
+from odemis.util.mosaic import TiledMosaic
+import unittest
+
+
+logging.getLogger().setLevel(logging.DEBUG)
+
+
+def create_image(shape, pos, pxs, value=None):
+    """
+    Create a RGB image. If value is None, the red channel contains the column
+    index, and the green channel the row index.
+    """
+    im = numpy.empty(shape + (3,), dtype=numpy.uint8)
+    if value is None:
+        im[:, :, 0] = numpy.arange(shape[1])
+        im[:, :, 1] = numpy.arange(shape[0])[:, numpy.newaxis]
+        im[:, :, 2] = 0
+    else:
+        im[:] = value
+    md = {model.MD_POS: pos, model.MD_PIXEL_SIZE: (pxs, pxs), model.MD_DIMS: "YXC"}
+    return model.DataArray(im, md)
+
+
+def find_tile(tiles, pos):
+    for t in tiles:
+        if numpy.allclose(t.metadata[model.MD_POS], pos):
+            return t
+    raise LookupError("No tile at %s" % (pos,))
+
+
+class TestTiledMosaic(unittest.TestCase):
+
+    def test_simple(self):
+        mosaic = TiledMosaic(tile_size=64, levels=3)
+        self.assertEqual(mosaic.get_tiles(1e-6), [])
+        self.assertIsNone(mosaic.get_bbox())
+
+        im = create_image((80, 100), (0, 0), 1e-6)
+        mosaic.insert(im)
+        numpy.testing.assert_allclose(mosaic.get_bbox(), (-50e-6, -40e-6, 50e-6, 40e-6))
+
+        tiles = mosaic.get_tiles(1e-6)
+        self.assertEqual(len(tiles), 4)  # 2 x 2 tiles around the origin
+        for t in tiles:
+            self.assertEqual(t.shape, (64, 64, 4))
+            self.assertEqual(t.metadata[model.MD_PIXEL_SIZE], (1e-6, 1e-6))
+
+        # Top-left tile contains the top-left corner of the image
+        tl = find_tile(tiles, (-32e-6, 32e-6))
+        self.assertEqual(tl[0, 0, 3], 0)  # empty
+        numpy.testing.assert_array_equal(tl[24, 14], [0, 0, 0, 255])
+        numpy.testing.assert_array_equal(tl[63, 63], [49, 39, 0, 255])
+        # Bottom-right tile contains the bottom-right corner of the image
+        br = find_tile(tiles, (32e-6, -32e-6))
+        numpy.testing.assert_array_equal(br[39, 49], [99, 79, 0, 255])
+        self.assertEqual(br[40, 50, 3], 0)  # empty
+
+        # Coarser level
+        self.assertEqual(mosaic.get_level(2.5e-6), 1)
+        tiles = mosaic.get_tiles(2.5e-6)
+        self.assertEqual(len(tiles), 4)
+        tl = find_tile(tiles, (-64e-6, 64e-6))
+        self.assertEqual(tl.metadata[model.MD_PIXEL_SIZE], (2e-6, 2e-6))
+        # The pixel centers are on the border of the original pixels => either one
+        self.assertIn(tl[63, 63, 0], (48, 49))
+        self.assertIn(tl[63, 63, 1], (38, 39))
+        self.assertEqual(tl[63, 63, 3], 255)
+        self.assertEqual(tl[44, 39, 3], 255)  # top-left corner of the image
+        self.assertEqual(tl[43, 38, 3], 0)
+
+        # Never coarser than the last level
+        self.assertEqual(mosaic.get_level(1), 2)
+
+    def test_update(self):
+        mosaic = TiledMosaic(tile_size=64, levels=2)
+        mosaic.insert(create_image((10, 10), (0, 0), 1e-6, value=50))
+        v = mosaic.version
+        tiles = mosaic.get_tiles(1e-6)
+        self.assertEqual(len(tiles), 4)
+
+        # A new image on top
+        mosaic.insert(create_image((10, 10), (1e-6, 0), 1e-6, value=100))
+        self.assertGreater(mosaic.version, v)
+        ntiles = mosaic.get_tiles(1e-6)
+        ntl = find_tile(ntiles, (-32e-6, 32e-6))
+        numpy.testing.assert_array_equal(ntl[63, 59], [50, 50, 50, 255])
+        numpy.testing.assert_array_equal(ntl[63, 60], [100, 100, 100, 255])
+
+        # The previous tiles are not modified
+        tl = find_tile(tiles, (-32e-6, 32e-6))
+        self.assertIsNot(tl, ntl)
+        numpy.testing.assert_array_equal(tl[63, 60], [50, 50, 50, 255])
+
+        mosaic.clear()
+        self.assertEqual(mosaic.get_tiles(1e-6), [])
+
+    def test_visible_tiles(self):
+        mosaic = TiledMosaic(tile_size=64, levels=1)
+        # 1 cm wide => 16 tiles wide (of 640 µm)
+        mosaic.insert(create_image((10, 1000), (0, 0), 10e-6))
+        self.assertEqual(len(mosaic.get_tiles(10e-6)), 16 * 2)
+
+        # Only the tiles intersecting the rectangle
+        tiles = mosaic.get_tiles(10e-6, rect=(1e-3, -10e-6, 1.5e-3, 10e-6))
+        self.assertEqual(len(tiles), 2 * 2)
+        for t in tiles:
+            x = t.metadata[model.MD_POS][0]
+            self.assertTrue(1e-3 - 640e-6 <= x <= 1.5e-3 + 640e-6)
+
+    def test_memory_limit(self):
+        tile_nbytes = 64 * 64 * 4
+        mosaic = TiledMosaic(tile_size=64, levels=1, max_size=10 * tile_nbytes)
+        for i in range(20):
+            mosaic.insert(create_image((64, 64), (i * 1e-3, 0), 1e-6))
+        tiles = mosaic.get_tiles(1e-6)
+        self.assertLessEqual(len(tiles), 10)
+        # The most recent ones are kept
+        self.assertTrue(any(t.metadata[model.MD_POS][0] > 18.9e-3 for t in tiles))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -74,6 +74,31 @@ class TestGetWavelength(unittest.TestCase):
         self.assertEqual(wl[0], metadata[model.MD_WL_POLYNOMIAL][0])
         
 
+class TestFindIlluminatedBand(unittest.TestCase):
+
+    def test_band(self):
+        img = numpy.random.poisson(100, (256, 1024)).astype(numpy.uint16)
+        img[120:140] += numpy.random.poisson(500, (20, 1024)).astype(numpy.uint16)
+
+        band = spectrum.find_illuminated_band(img, margin=0)
+        self.assertEqual(band, (120, 140))
+
+        band = spectrum.find_illuminated_band(img, margin=0.1)
+        self.assertEqual(band, (118, 142))
+
+    def test_edge(self):
+        img = numpy.random.poisson(100, (64, 512)).astype(numpy.uint16)
+        img[58:] += 1000
+
+        band = spectrum.find_illuminated_band(img)
+        self.assertEqual(band, (57, 64))
+
+    def test_no_signal(self):
+        img = numpy.random.poisson(100, (256, 1024)).astype(numpy.uint16)
+        with self.assertRaises(LookupError):
+            spectrum.find_illuminated_band(img)
+
+
 class TestCoefToDA(unittest.TestCase):
     
     def test_simple(self):
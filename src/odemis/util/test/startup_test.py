@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+'''
+Created on 19 Oct 2016
+
+@author: Éric Piel
+
+Copyright © 2016 Éric Piel, Delmic
+
+This file is part of Odemis.
+
+Odemis is free software: you can redistribute it and/or modify it under the terms
+of the GNU General Public License version 2 as published by the Free Software
+Foundation.
+
+Odemis is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+PURPOSE. See the GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License along with
+Odemis. If not, see http://www.gnu.org/licenses/.
+'''
+from __future__ import division
+
+import __builtin__
+import sys
+import unittest
+from odemis.util.startup import StartupProfiler
+
+
+class TestStartupProfiler(unittest.TestCase):
+
+    def test_imports(self):
+        orig_import = __builtin__.__import__
+        prof = StartupProfiler()
+        prof.install_import_hook()
+        try:
+            # Make sure the module is not yet loaded
+            sys.modules.pop("colorsys", None)
+            import colorsys
+        finally:
+            prof.remove_import_hook()
+
+        self.assertIs(__builtin__.__import__, orig_import)
+        self.assertIn("colorsys", prof.imports)
+        self.assertGreaterEqual(prof.imports["colorsys"], 0)
+        self.assertIn("colorsys", prof.report())
+
+    def test_components(self):
+        prof = StartupProfiler()
+        prof.add_component("Fake CCD", 2.5)
+        prof.add_component("Stage", 0.1)
+        self.assertEqual(prof.components["Fake CCD"], 2.5)
+        rep = prof.report()
+        # Slowest first
+        self.assertLess(rep.index("Fake CCD"), rep.index("Stage"))
+
+
+if __name__ == "__main__":
+    unittest.main()
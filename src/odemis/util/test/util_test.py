@@ -27,6 +27,7 @@ import logging
 from odemis import util
 from odemis.util import limit_invocation, TimeoutError
 from odemis.util import timeout
+import threading
 import time
 import unittest
 import weakref
@@ -96,6 +97,152 @@ class TestTimeout(unittest.TestCase):
         time.sleep(1)
 
 
+class Polled(object):
+    """
+    Counts the calls, as a periodic task would do
+    """
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def poll(self):
+        self.calls.append(time.time())
+        if self.fail:
+            raise IOError("Hardware not responding")
+
+
+class TestPeriodicTask(unittest.TestCase):
+
+    def test_simple(self):
+        p = Polled()
+        task = util.PeriodicTask(0.1, p.poll, "test poll", jitter=0)
+        task.start()
+        time.sleep(0.55)
+        task.cancel()
+        task.join(1)
+        self.assertTrue(4 <= len(p.calls) <= 5, p.calls)
+        stats = task.get_stats()
+        self.assertEqual(stats["count"], len(p.calls))
+        self.assertEqual(stats["errors"], 0)
+
+        # No more calls after cancelling
+        ncalls = len(p.calls)
+        time.sleep(0.3)
+        self.assertEqual(len(p.calls), ncalls)
+        self.assertFalse(task.is_alive())
+
+    def test_many(self):
+        """
+        Many tasks in parallel are all handled by the same few threads
+        """
+        nthreads = threading.active_count()
+        polls = [Polled() for i in range(20)]
+        tasks = [util.PeriodicTask(0.05, p.poll, "test poll %d" % i)
+                 for i, p in enumerate(polls)]
+        for t in tasks:
+            t.start()
+        time.sleep(0.5)
+        self.assertLessEqual(threading.active_count(), nthreads + 2)
+        for t in tasks:
+            t.cancel()
+        for p in polls:
+            self.assertGreaterEqual(len(p.calls), 5)
+
+    def test_backoff(self):
+        p = Polled(fail=True)
+        task = util.PeriodicTask(0.05, p.poll, "test failing poll", jitter=0,
+                                 max_backoff=0.2)
+        task.start()
+        time.sleep(1)
+        task.cancel()
+        # Without back-off it would be called ~20 times
+        self.assertTrue(5 <= len(p.calls) <= 10, len(p.calls))
+        self.assertEqual(task.get_stats()["errors"], len(p.calls))
+
+    def test_suspend(self):
+        p = Polled()
+        task = util.PeriodicTask(0.1, p.poll, "test poll", jitter=0)
+        task.start()
+        task.suspend()
+        time.sleep(0.3)
+        self.assertEqual(len(p.calls), 0)
+
+        # Call immediately when resuming, as it was due
+        task.resume()
+        time.sleep(0.05)
+        self.assertEqual(len(p.calls), 1)
+        task.cancel()
+        self.assertRaises(ValueError, task.resume)
+
+    def test_weak(self):
+        p = Polled()
+        task = util.PeriodicTask(0.05, p.poll, "test poll")
+        task.start()
+        wp = weakref.ref(p)
+        del p
+        gc.collect()
+        self.assertIsNone(wp())
+        time.sleep(0.2)
+        self.assertFalse(task.is_alive())
+
+
+class TestRequestQueue(unittest.TestCase):
+
+    def test_order(self):
+        q = util.RequestQueue("test queue")
+        calls = []
+        fs = [q.submit(calls.append, i) for i in range(10)]
+        for f in fs:
+            f.result(1)
+        self.assertEqual(calls, list(range(10)))
+
+        # Exceptions are passed via the future
+        f = q.submit(int, "not a number")
+        self.assertRaises(ValueError, f.result, 1)
+        q.shutdown()
+        self.assertRaises(RuntimeError, q.submit, calls.append, 10)
+
+    def test_coalesce(self):
+        q = util.RequestQueue("test queue")
+        calls = []
+        # Block the thread, so that the next requests are all pending
+        started = threading.Event()
+        q.submit(lambda: (started.set(), time.sleep(0.2)))
+        started.wait()
+        fs = [q.submit_coalesced("val", calls.append, i) for i in range(5)]
+        fo = q.submit(calls.append, "other")
+        self.assertTrue(q.has_pending("val"))
+        self.assertTrue(all(f is fs[0] for f in fs))
+        fo.result(1)
+        # Only the latest value is used, at the place of the first request
+        self.assertEqual(calls, [4, "other"])
+        self.assertFalse(q.has_pending("val"))
+
+        # Once started, it's not replaced anymore
+        f1 = q.submit_coalesced("val", time.sleep, 0.1)
+        time.sleep(0.05)
+        f2 = q.submit_coalesced("val", calls.append, 5)
+        self.assertIsNot(f1, f2)
+        f2.result(1)
+        self.assertEqual(calls, [4, "other", 5])
+        q.shutdown()
+
+    def test_lock(self):
+        lock = threading.Lock()
+        q = util.RequestQueue("test queue", lock=lock)
+        self.assertTrue(q.submit(lock.locked).result(1))
+        with lock:
+            f = q.submit(lambda: None)
+            time.sleep(0.1)
+            self.assertFalse(f.done())
+        f.result(1)
+
+        # Pending requests are still run on shutdown
+        f = q.submit(time.sleep, 0.1)
+        q.shutdown(wait=True)
+        self.assertTrue(f.done())
+
+
 class SortedAccordingTestCase(unittest.TestCase):
 
     def test_simple(self):